@@ -8,7 +8,6 @@ from typing import Optional, Dict, Any
 import logging
 
 from app.db import get_db
-from app.services.copilot_agent import CopilotAgent
 from app.api.v1.schemas.copilot import CopilotChatRequest, CopilotChatResponse
 from app.models.copilot import (
     CopilotConversation,
@@ -86,6 +85,9 @@ async def chat(
         import time
         start_time = time.time()
         try:
+            # Imported per request: the agent pulls in httpx and the AI gateway,
+            # which should not slow down app startup.
+            from app.services.copilot_agent import CopilotAgent
             agent = CopilotAgent(db)
             response = await agent.process_query(
                 query=message,
@@ -9,6 +9,7 @@ from app.db import get_db
 from app.services.ingestion import DataIngestionService
 from app.services.fpl_ingestion import FPLIngestionService
 from app.services.fpl_extra_ingestion import FPLExtraIngestionService
+from app.services.scheduler import read_status
 
 router = APIRouter()
 
@@ -89,3 +90,8 @@ async def ingest_entry(req: EntryIngestRequest, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/scheduler/status")
+async def scheduler_status():
+    """Job schedule, last results and heartbeat written by the `run-scheduler` process."""
+    return read_status()
@@ -1,12 +1,17 @@
 """ML prediction and training endpoints."""
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import itertools
+import json
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from app.db import get_db
+from app.db import SessionLocal, get_db
 from app.api.v1.schemas.ml import MLPredictRequest, MLPredictResponse, MLTrainRequest
-from app.services.ml.predictor import MLPredictor
-from app.services.ml.trainer import MLTrainer
 
 router = APIRouter()
 
@@ -18,6 +23,7 @@ async def predict_points(
 ):
     """Get ML predictions for player points."""
     try:
+        from app.services.ml.predictor import MLPredictor
         predictor = MLPredictor(db)
         result = await predictor.predict(
             player_ids=request.player_ids,
@@ -35,6 +41,97 @@ async def predict_points(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+STREAM_FIELDS = ("player_id", "player_name", "predicted_points", "model_name", "gameweek", "position", "team_id")
+
+
+@router.get("/predict/stream")
+async def predict_points_stream(
+    season: str,
+    gameweek: int = Query(..., ge=1, le=38),
+    model_name: str = Query("xgboost", description="Model to use: ridge, xgboost, random_forest"),
+    position: Optional[str] = Query(None, description="Filter by position (GK/DEF/MID/FWD)"),
+    team: Optional[str] = Query(None, description="Filter by team name or short name"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(STREAM_FIELDS)}"),
+    chunk_size: int = Query(100, ge=1, le=1000, description="Players predicted per batch"),
+    per_chunk: bool = Query(False, description="Emit one line per chunk instead of one per player"),
+):
+    """
+    Predictions for the whole player pool as newline-delimited JSON.
+
+    Players are predicted `chunk_size` at a time and each batch is written as soon as
+    it is computed, one JSON object per player (or `{"chunk": i, "predictions": [...]}`
+    per batch with `per_chunk`).
+    """
+    selected: List[str] = list(STREAM_FIELDS)
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(selected) - set(STREAM_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    try:
+        from app.services.ml.predictor import MLPredictor
+        # Fail before the response starts if the model is missing
+        MLPredictor(db=None).load(model_name)
+    except ImportError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"ML prediction requires optional dependencies (joblib, sklearn, numpy, pandas). {str(e)}"
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    def load_pool(db: Session) -> dict:
+        from app.models.fixture import Team
+        from app.models.player import Player
+
+        query = db.query(Player.id, Player.position, Player.team_id).outerjoin(Team, Player.team_id == Team.id)
+        if position:
+            query = query.filter(Player.position == position.upper())
+        if team:
+            query = query.filter((Team.name.ilike(f"%{team}%")) | (Team.short_name.ilike(f"%{team}%")))
+        return {pid: (pos, team_id) for pid, pos, team_id in query.order_by(Player.id)}
+
+    async def generate() -> AsyncIterator[str]:
+        # The request-scoped session is closed before streaming starts; use our own.
+        # Database and model work runs in the threadpool one step at a time, so the
+        # session is never in use by a thread when the `finally` below closes it.
+        db = SessionLocal()
+        chunks = None
+        try:
+            pool = await run_in_threadpool(load_pool, db)
+            predictor = MLPredictor(db)
+            chunks = predictor.iter_predictions(pool, season, gameweek, model_name, chunk_size=chunk_size)
+            for i in itertools.count():
+                chunk = await run_in_threadpool(next, chunks, None)
+                if chunk is None:
+                    break
+                rows = []
+                for pred in chunk:
+                    pred["position"], pred["team_id"] = pool[pred["player_id"]]
+                    rows.append({f: pred.get(f) for f in selected})
+                if per_chunk:
+                    yield json.dumps({"chunk": i, "predictions": rows}) + "\n"
+                else:
+                    yield "".join(json.dumps(row) + "\n" for row in rows)
+        except Exception as e:
+            # Headers are already sent; report the failure as a final line.
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            if chunks is not None:
+                chunks.close()
+            db.close()
+
+    lines = generate()
+
+    async def close_stream() -> None:
+        # A client disconnect can leave the generator suspended at a `yield`; the
+        # background task runs either way and closes it, releasing the session.
+        await lines.aclose()
+
+    return StreamingResponse(lines, media_type="application/x-ndjson", background=BackgroundTask(close_stream))
+
+
 @router.post("/train")
 async def train_model(
     request: MLTrainRequest,
@@ -43,6 +140,7 @@ async def train_model(
 ):
     """Train an ML model (runs in background)."""
     try:
+        from app.services.ml.trainer import MLTrainer
         trainer = MLTrainer(db)
         # Run training in background
         background_tasks.add_task(
@@ -50,8 +148,11 @@ async def train_model(
             model_name=request.model_name,
             seasons=request.seasons,
             hyperparameters=request.hyperparameters,
+            tune=request.tune,
+            search_space=request.search_space,
+            n_candidates=request.n_candidates,
         )
-        return {"status": "training_started", "model": request.model_name}
+        return {"status": "training_started", "model": request.model_name, "tune": request.tune}
     except ImportError as e:
         raise HTTPException(
             status_code=503,
@@ -60,3 +161,16 @@ async def train_model(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/memory")
+async def memory():
+    """Memory of this worker process and the model artifacts it has mapped."""
+    from app.services.ml.artifacts import memory_report
+    return memory_report()
+
+
+@router.get("/predict/stats")
+async def prediction_stats():
+    """Single-flight metrics for neural predictions: computed vs coalesced vs cached calls."""
+    from app.services.ml.neural_predictor import PREDICTION_FLIGHT
+    return PREDICTION_FLIGHT.stats()
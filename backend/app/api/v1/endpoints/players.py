@@ -1,6 +1,7 @@
 """Player endpoints."""
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 from app.db import get_db
@@ -37,6 +38,21 @@ class PlayerResponse(BaseModel):
         from_attributes = True
 
 
+class PlayerChangeResponse(BaseModel):
+    """One detected change to a player between bootstrap ingests."""
+    id: int
+    player_id: int
+    season: str
+    change_type: str
+    field: Optional[str] = None
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    detected_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 @router.get("/", response_model=List[PlayerResponse])
 async def list_players(
     team: Optional[str] = Query(None, description="Filter by team name or short name"),
@@ -101,6 +117,20 @@ async def list_players(
     return result
 
 
+@router.get("/changes", response_model=List[PlayerChangeResponse])
+async def list_player_changes(
+    since_id: int = Query(default=0, ge=0, description="Only events with a larger id (poll with the last id seen)"),
+    change_type: Optional[List[str]] = Query(None, description="price, status, news, availability, stats, new_player"),
+    player_id: Optional[int] = None,
+    limit: int = Query(default=500, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Player change events (price, status, news, ...) recorded by bootstrap ingestion, oldest first."""
+    from app.services.player_changes import PlayerChangeLog
+
+    return PlayerChangeLog(db).since(since_id, change_types=change_type, player_id=player_id, limit=limit)
+
+
 @router.get("/{player_id}", response_model=PlayerResponse)
 async def get_player(
     player_id: int,
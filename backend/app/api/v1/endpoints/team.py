@@ -94,6 +94,8 @@ async def calculate_xg_score(
             season=request.season,
             squad=request.squad,
             gameweek=request.gameweek,
+            target_score=request.target_score,
+            n_simulations=request.n_simulations,
         )
         return result
     except Exception as e:
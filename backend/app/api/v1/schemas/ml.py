@@ -1,6 +1,6 @@
 """Schemas for ML prediction endpoints."""
 from __future__ import annotations
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from pydantic import BaseModel, Field
 
 
@@ -25,4 +25,9 @@ class MLTrainRequest(BaseModel):
     model_name: str = Field(..., description="Model to train")
     seasons: List[str] = Field(..., description="Seasons to train on")
     hyperparameters: Optional[dict] = None
+    tune: bool = Field(False, description="Run a successive-halving hyperparameter search before training")
+    search_space: Optional[Dict[str, List[Any]]] = Field(
+        None, description="Parameter name -> candidate values (defaults to the model's built-in space)"
+    )
+    n_candidates: Optional[int] = Field(None, ge=1, le=200, description="Configurations sampled for tuning")
 
@@ -25,6 +25,9 @@ class UpcomingFixture(BaseModel):
     is_home: bool
     difficulty: int = Field(3, ge=1, le=5, description="Fixture difficulty 1-5")
     kickoff_time: Optional[str] = None
+    expected_goals: Optional[float] = Field(None, description="Team expected goals (team-strength model)")
+    expected_goals_against: Optional[float] = Field(None, description="Opponent expected goals")
+    clean_sheet_prob: Optional[float] = Field(None, description="Probability of keeping a clean sheet")
 
 
 class OptimizedPlayer(BaseModel):
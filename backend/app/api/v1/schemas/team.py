@@ -1,6 +1,6 @@
 """Schemas for team-related endpoints."""
 from __future__ import annotations
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, Field
 
 
@@ -79,6 +79,8 @@ class XGScoreRequest(BaseModel):
     season: str
     squad: List[SquadMember]
     gameweek: Optional[int] = None
+    target_score: Optional[float] = Field(None, description="Score for p_beat_target (default: average GW score)")
+    n_simulations: Optional[int] = Field(None, ge=1000, le=1_000_000, description="Monte Carlo simulations")
 
 
 class XGScoreResponse(BaseModel):
@@ -92,4 +94,8 @@ class XGScoreResponse(BaseModel):
     monte_carlo_mean: float
     monte_carlo_std: float
     percentile_rank: float = Field(..., ge=0.0, le=100.0)
+    percentiles: Optional[Dict[str, float]] = Field(None, description="Simulated score percentiles (p5..p95)")
+    p_beat_target: Optional[float] = Field(None, ge=0.0, le=1.0)
+    target_score: Optional[float] = None
+    n_simulations: Optional[int] = None
 
@@ -67,10 +67,20 @@ def ingest_fpl(season: str, backfill_seasons: int, limit_players: int | None):
             click.echo("Fetching data from https://fantasy.premierleague.com/api/bootstrap-static/...")
             counts = await service.ingest_bootstrap_static(season=season)
             click.echo("✅ Current season bootstrap-static ingest complete")
-            click.echo(f"   Teams: {counts['teams']} new")
-            click.echo(f"   Players: {counts['players']} new")
+            upserts = counts.get("upserts", {})
+
+            def _detail(table: str) -> str:
+                u = upserts.get(table)
+                return f" ({u['updated']} updated, {u['unchanged']} unchanged)" if u else ""
+
+            click.echo(f"   Teams: {counts['teams']} new{_detail('teams')}")
+            click.echo(f"   Players: {counts['players']} new{_detail('players')}")
+            changes = counts.get("player_changes") or {}
+            if changes.get("by_type"):
+                by_type = ", ".join(f"{n} {t}" for t, n in sorted(changes["by_type"].items()))
+                click.echo(f"   Player changes: {by_type}")
             click.echo(f"   Gameweeks: {counts['gameweeks']} found")
-            click.echo(f"   Fixtures: {counts['fixtures']} new")
+            click.echo(f"   Fixtures: {counts['fixtures']} new{_detail('fixtures')}")
 
             if backfill_seasons and backfill_seasons > 1:
                 def _prev_season(s: str) -> str:
@@ -88,8 +98,8 @@ def ingest_fpl(season: str, backfill_seasons: int, limit_players: int | None):
                 await backfill.close()
                 click.echo("✅ Backfill complete")
                 click.echo(f"   Player season stats created: {result['stats_created']}")
-                click.echo(f"   Player season stats updated: {result['stats_updated']}")
-                click.echo(f"   Players processed: {result['players_processed']}")
+                click.echo(f"   Player season stats updated: {result['stats_updated']} ({result['stats_unchanged']} unchanged)")
+                click.echo(f"   Players processed: {result['players_processed']} ({result['players_failed']} failed)")
         except Exception as e:
             click.echo(f"❌ Error during ingestion: {e}", err=True)
             import traceback
@@ -154,13 +164,24 @@ def ingest_last5(current_season: str, include: int, limit_players: int | None):
 @click.option("--from-season", default=2020, type=int, help="First season year to backfill (2020 == 2020/21)")
 @click.option("--to-season", default=2024, type=int, help="Last season year to backfill (2024 == 2024/25)")
 @click.option("--current-season", default=2025, type=int, help="Current season year to keep updating (2025 == 2025/26)")
-@click.option("--rate-limit", default=0.3, type=float, help="Seconds to sleep between requests")
-def ingest_pl(from_season: int, to_season: int, current_season: int, rate_limit: float):
+@click.option("--rate-limit", default=0.3, type=float, help="Average seconds between requests (shared by all fetchers)")
+@click.option("--concurrency", default=4, type=int, help="Matches fetched concurrently")
+@click.option("--batch-size", default=20, type=int, help="Matches written per commit")
+@click.option("--full-refresh", is_flag=True, help="Refetch recent current-season matches even if their listing is unchanged")
+def ingest_pl(
+    from_season: int,
+    to_season: int,
+    current_season: int,
+    rate_limit: float,
+    concurrency: int,
+    batch_size: int,
+    full_refresh: bool,
+):
     """
     Build a historical Premier League match database from PremierLeague.com JSON endpoints.
 
     - Backfills from-season..to-season once (tracked in DB).
-    - Always refreshes current season.
+    - Always refreshes current season, skipping matches whose listing is unchanged.
     """
     import asyncio
     from app.db import init_db, get_db
@@ -171,7 +192,7 @@ def ingest_pl(from_season: int, to_season: int, current_season: int, rate_limit:
         init_db()
         db_gen = get_db()
         db = next(db_gen)
-        svc = PremierLeagueIngestionService(db, rate_limit_s=rate_limit)
+        svc = PremierLeagueIngestionService(db, rate_limit_s=rate_limit, concurrency=concurrency, batch_size=batch_size)
         try:
             # Historical backfill once
             for s in range(from_season, to_season + 1):
@@ -184,12 +205,18 @@ def ingest_pl(from_season: int, to_season: int, current_season: int, rate_limit:
                     click.echo(f"Re-backfilling season {s} (state says backfilled but matches_in_db={existing} looks incomplete)")
                 click.echo(f"Backfilling season {s} ...")
                 res = await svc.backfill_season(season=s)
-                click.echo(f"  matches_ingested={res['matches_ingested']}")
+                click.echo(
+                    f"  matches_ingested={res['matches_ingested']} failed={res['failed']} "
+                    f"({res['matches_per_min']} matches/min over {res['elapsed_s']}s)"
+                )
 
             # Current season always refreshed
             click.echo(f"Refreshing current season {current_season} ...")
-            res2 = await svc.update_current_season(season=current_season)
-            click.echo(f"  matches_refreshed={res2['matches_refreshed']}")
+            res2 = await svc.update_current_season(season=current_season, force=full_refresh)
+            click.echo(
+                f"  matches_refreshed={res2['matches_refreshed']} unchanged={res2['matches_unchanged']} "
+                f"failed={res2['failed']} requests={res2['requests']} ({res2['matches_per_min']} matches/min)"
+            )
         finally:
             await svc.close()
             db.close()
@@ -197,6 +224,60 @@ def ingest_pl(from_season: int, to_season: int, current_season: int, rate_limit:
     asyncio.run(run())
 
 
+@cli.command("rebuild-availability")
+@click.option("--season", default=None, type=int, help="Only rebuild matches from this season year (default: all)")
+def rebuild_availability(season: int | None):
+    """Rebuild the expected-minutes index from stored PremierLeague.com lineups and events."""
+    from app.services.availability_index import AvailabilityIndex
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        res = AvailabilityIndex(db).rebuild(season=season)
+        click.echo(f"matches={res['matches']} players={res['players']}")
+    finally:
+        db.close()
+
+
+@cli.command("compact-snapshots")
+@click.option("--dry-run", is_flag=True, help="Only report what would be expired/migrated")
+@click.option("--vacuum", is_flag=True, help="VACUUM the SQLite file afterwards to return freed pages to the OS")
+def compact_snapshots(dry_run: bool, vacuum: bool):
+    """Deduplicate and compress stored API payloads and apply snapshot retention."""
+    from sqlalchemy import text
+    from app.services.snapshot_store import SnapshotStore, sqlite_file_size
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        file_before = sqlite_file_size(db)
+        res = SnapshotStore(db).compact(dry_run=dry_run)
+        if dry_run:
+            click.echo(
+                f"Would expire {res['snapshots_expired']} snapshots and migrate "
+                f"{res['payloads_migrated']} inline payloads ({res['bytes_before'] / 1e6:.1f} MB stored)"
+            )
+            return
+        click.echo(
+            f"expired={res['snapshots_expired']} migrated={res['payloads_migrated']} "
+            f"blobs_deleted={res['blobs_deleted']} snapshots={res['snapshots']} blobs={res['blobs']}"
+        )
+        click.echo(
+            f"Payload bytes: {res['bytes_before'] / 1e6:.1f} MB -> {res['bytes_after'] / 1e6:.1f} MB "
+            f"({res['bytes_reclaimed'] / 1e6:.1f} MB reclaimed)"
+        )
+        if vacuum and file_before is not None:
+            db.close()
+            with db.get_bind().connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+            file_after = sqlite_file_size(db)
+            click.echo(f"SQLite file: {file_before / 1e6:.1f} MB -> {file_after / 1e6:.1f} MB")
+    finally:
+        db.close()
+
+
 @cli.command()
 @click.option("--season", required=True, help="Season identifier")
 @click.option("--gw", type=int, help="Specific gameweek (optional)")
@@ -209,15 +290,142 @@ def ingest_gw(season: str, gw: int, csv: str):
 
 
 @cli.command()
-@click.option("--model", default="xgboost", help="Model name")
-@click.option("--seasons", multiple=True, help="Seasons to train on")
-def train_models(model: str, seasons: tuple):
-    """Train ML models."""
-    click.echo(f"Training {model} model...")
-    # Implementation would go here
+@click.option("--model", "models", multiple=True, default=("xgboost",), help="Model name (repeatable)")
+@click.option("--seasons", multiple=True, help="Seasons to train on (default: the model's registered seasons)")
+@click.option("--tune", is_flag=True, help="Run a hyperparameter search before training")
+@click.option("--if-due", is_flag=True, help="Only retrain models flagged as needing a full retrain")
+def train_models(models: tuple, seasons: tuple, tune: bool, if_due: bool):
+    """Train ML models (full retrain; resets online-update state)."""
+    import asyncio
+    from app.services.ml.registry import ModelRegistry
+    from app.services.ml.trainer import MLTrainer
+
+    init_db()
+    registry = ModelRegistry()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        for model in models:
+            entry = registry.get(model) or {}
+            if if_due and entry and not entry.get("needs_full_retrain"):
+                click.echo(f"Skipping {model}: no full retrain due ({entry.get('incremental_updates', 0)} online updates)")
+                continue
+            model_seasons = list(seasons) or list(entry.get("seasons") or [])
+            if not model_seasons:
+                raise click.UsageError(f"--seasons is required for {model} (no registered seasons)")
+
+            click.echo(f"Training {model} model on {', '.join(model_seasons)}...")
+            # Keep the registered configuration unless a fresh search was requested.
+            hyperparameters = None if tune else entry.get("hyperparameters")
+            result = asyncio.run(MLTrainer(db).train(model, model_seasons, hyperparameters, tune=tune))
+            click.echo(
+                f"✅ {model} v{result['version']}: rmse={result['rmse']:.3f} "
+                f"cv_rmse={result['cv_rmse'] if result['cv_rmse'] is None else round(result['cv_rmse'], 3)}"
+            )
+    finally:
+        db.close()
     click.echo("Model training completed!")
 
 
+@cli.command()
+@click.option("--season", required=True, help="Season to replay, e.g. 2023-24")
+@click.option("--start-gw", type=int, default=2, show_default=True, help="First gameweek to predict")
+@click.option("--end-gw", type=int, default=None, help="Last gameweek (default: last with results)")
+@click.option("--budget", type=float, default=100.0, show_default=True, help="Squad budget (m)")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPUs - 1)")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the full JSON report here")
+def backtest(season: str, start_gw: int, end_gw: int | None, budget: float, workers: int | None, output: str | None):
+    """Replay a past season GW-by-GW and score predictions and picked squads."""
+    import json
+    from app.services.ml.backtest import BacktestRunner
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        report = BacktestRunner(db, max_workers=workers).run(season, start_gw, end_gw, budget)
+    finally:
+        db.close()
+
+    for r in report["gameweeks"]:
+        if r.get("status") != "ok":
+            click.echo(f"GW{r['gw']:>2}: {r.get('status')}")
+            continue
+        click.echo(
+            f"GW{r['gw']:>2}: MAE={r['mae']:.2f} RMSE={r['rmse']:.2f} "
+            f"rho={r['spearman'] if r['spearman'] is None else round(r['spearman'], 3)} "
+            f"XI pts={r['squad_points']}"
+        )
+    s = report["summary"]
+    click.echo(f"✅ {season}: {s.get('gameweeks', 0)} gameweeks")
+    if s.get("gameweeks"):
+        click.echo(f"   MAE {s['mae']:.3f} | RMSE {s['rmse']:.3f} | bias {s['bias']:+.3f} | Spearman {s['spearman_mean']}")
+        click.echo(f"   Squad points {s['squad_points_total']:.0f} (mean {s['squad_points_mean']}) | feature cache hits {s['feature_cache_hits']}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        click.echo(f"   Report written to {output}")
+
+
+@cli.command("export-pl-parquet")
+@click.option("--out", "out_dir", default="historical/pl_parquet", type=click.Path(file_okay=False), help="Output directory")
+@click.option("--season", "seasons", multiple=True, type=int, help="Season year to (re)export (repeatable; default: all)")
+@click.option("--training-rows", type=click.Path(dir_okay=False), default=None, help="Also write per-player-per-match training rows to this Parquet file")
+def export_pl_parquet(out_dir: str, seasons: tuple, training_rows: str | None):
+    """Export PremierLeague.com match tables to season-partitioned Parquet (optionally build training rows with DuckDB)."""
+    import time
+    from app.services.pl_warehouse import PLWarehouse, export_parquet
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        started = time.perf_counter()
+        counts = export_parquet(db, Path(out_dir), seasons=seasons or None)
+        click.echo(f"✅ Exported to {out_dir} in {time.perf_counter() - started:.1f}s: {counts}")
+    finally:
+        db.close()
+
+    if training_rows:
+        started = time.perf_counter()
+        wh = PLWarehouse(Path(out_dir))
+        try:
+            n = wh.write_player_match_rows(Path(training_rows), seasons=seasons or None)
+        finally:
+            wh.close()
+        click.echo(f"✅ {n} training rows written to {training_rows} in {time.perf_counter() - started:.1f}s")
+
+
+@cli.command("run-scheduler")
+@click.option("--season", default="2025-26", help="FPL season to keep ingested (e.g. 2025-26)")
+def run_scheduler(season: str):
+    """
+    Run the ingestion scheduler until interrupted.
+
+    Polls event-live every 60s while fixtures are live, bootstrap-static hourly and after
+    deadlines, and PremierLeague.com match data after full time.
+    """
+    import asyncio
+    import signal
+    from app.services.scheduler import IngestionScheduler
+
+    init_db()
+    scheduler = IngestionScheduler(season=season)
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        await scheduler.run(stop)
+
+    click.echo(f"Scheduler running for {season}; status in {scheduler.status_path}")
+    asyncio.run(main())
+
+
 @cli.command()
 def run():
     """Run the development server."""
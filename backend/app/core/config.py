@@ -54,6 +54,8 @@ class Settings(BaseSettings):
         default_factory=lambda: Path("historical"),
         env="ML_TRAINING_DATA_DIR"
     )
+    # Seconds an identical (season, gw, horizon, player pool) prediction is reused
+    PREDICTION_CACHE_TTL_S: float = Field(default=60.0, env="PREDICTION_CACHE_TTL_S")
     
     # LLM / AI - Multiple provider support (use whichever API key is available)
     OPENAI_API_KEY: str = Field(default="", env="OPENAI_API_KEY")
@@ -68,8 +70,27 @@ class Settings(BaseSettings):
     LLM_MAX_TOKENS: int = 2000
     
     # FPL API
-    FPL_API_BASE_URL: str = "https://fantasy.premierleague.com/api"
+    FPL_API_BASE_URL: str = Field(default="https://fantasy.premierleague.com/api", env="FPL_API_BASE_URL")
     FPL_API_RATE_LIMIT: float = 0.5  # seconds between requests
+    FPL_API_CONCURRENCY: int = 8  # in-flight requests for bulk fetches
+    FPL_API_MAX_RETRIES: int = 4  # attempts per request on 429/5xx
+    # On-disk HTTP cache for the FPL / PremierLeague.com clients: off, default, record, replay
+    HTTP_CACHE_MODE: str = Field(default="default", env="HTTP_CACHE_MODE")
+    HTTP_CACHE_DIR: Path = Field(
+        default_factory=lambda: Path("http_cache"),
+        env="HTTP_CACHE_DIR"
+    )
+    # PremierLeague.com (PulseLive) data API
+    PL_API_BASE_URL: str = Field(
+        default="https://sdp-prem-prod.premier-league-prod.pulselive.com",
+        env="PL_API_BASE_URL"
+    )
+    
+    # Ingestion scheduler (run-scheduler): status file served by /admin/scheduler/status
+    SCHEDULER_STATUS_PATH: Path = Field(
+        default_factory=lambda: Path("scheduler_status.json"),
+        env="SCHEDULER_STATUS_PATH"
+    )
     
     # Celery
     CELERY_BROKER_URL: str = Field(
@@ -0,0 +1,241 @@
+"""
+On-disk HTTP cache for the FPL and PremierLeague.com API clients.
+
+`CachingTransport` wraps an httpx async transport. It operates in one of four modes:
+
+- off:     pass-through.
+- default: honours Cache-Control max-age/no-cache/no-store and Expires. Stale entries
+           are revalidated with If-None-Match / If-Modified-Since, so an unchanged
+           payload costs a 304 instead of a full download.
+- record:  always fetches from the network and stores every 200 (no-store included),
+           building a corpus for replay.
+- replay:  serves stored responses only and never touches the network. A miss raises
+           `CacheMiss`, so offline ingestion runs and benchmarks are reproducible.
+
+Only GETs without cookies or an Authorization header are cached.
+
+Bodies are content-addressed (`blobs/ab/<sha256>`), so identical payloads from
+different URLs, or repeated recordings, are stored once. Each URL has a small JSON
+index entry holding its status, validators and body hash. Writes go to a temp file
+and are moved into place with os.replace, so concurrent processes can share a cache
+directory.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import httpx
+
+MODES = ("off", "default", "record", "replay")
+
+# Response headers kept with a cached body
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date")
+
+
+class CacheMiss(httpx.RequestError):
+    """Replay mode found no recorded response for a request (never retried)."""
+
+
+def cache_key(request: httpx.Request) -> str:
+    """Method plus URL with query parameters in a canonical order."""
+    params = sorted(request.url.params.multi_items())
+    url = request.url.copy_with(query=None)
+    if params:
+        url = url.copy_with(params=params)
+    return f"{request.method} {url}"
+
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    out: Dict[str, Optional[str]] = {}
+    for part in (headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            out[name.lower()] = value.strip('"') or None
+    return out
+
+
+def freshness_lifetime(headers: Dict[str, str]) -> float:
+    """Seconds a response may be served without revalidation (0 = always revalidate)."""
+    cc = _cache_control(headers)
+    if "no-cache" in cc or "no-store" in cc:
+        return 0.0
+    if cc.get("max-age"):
+        try:
+            return max(0.0, float(cc["max-age"]))
+        except ValueError:
+            return 0.0
+    if headers.get("expires"):
+        try:
+            expires = parsedate_to_datetime(headers["expires"])
+            date = parsedate_to_datetime(headers["date"]) if headers.get("date") else None
+            base = date.timestamp() if date else time.time()
+            return max(0.0, expires.timestamp() - base)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class HTTPCacheStore:
+    """Content-addressed bodies plus one JSON index entry per request key."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _entry_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / "index" / digest[:2] / f"{digest}.json"
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.root / "blobs" / sha[:2] / sha
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        return entry if self._blob_path(entry.get("sha256", "")).exists() else None
+
+    def put(self, key: str, entry: Dict[str, Any], body: Optional[bytes] = None) -> Dict[str, Any]:
+        """Write the index entry; with `body`, also store it (once per content hash)."""
+        if body is not None:
+            entry["sha256"] = hashlib.sha256(body).hexdigest()
+            entry["size"] = len(body)
+            blob = self._blob_path(entry["sha256"])
+            if not blob.exists():
+                self._write_atomic(blob, body)
+        self._write_atomic(self._entry_path(key), json.dumps(entry, sort_keys=True).encode("utf-8"))
+        return entry
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        return self._blob_path(entry["sha256"]).read_bytes()
+
+    def usage(self) -> Dict[str, int]:
+        entries = sum(1 for _ in (self.root / "index").glob("*/*.json"))
+        blobs = list((self.root / "blobs").glob("*/*"))
+        return {"entries": entries, "blobs": len(blobs), "bytes": sum(p.stat().st_size for p in blobs)}
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Usage:
+        client = httpx.AsyncClient(transport=CachingTransport(HTTPCacheStore("http_cache")))
+    """
+
+    def __init__(
+        self,
+        store: HTTPCacheStore,
+        mode: str = "default",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown HTTP cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.store = store
+        self.mode = mode
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self._clock = clock
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "replayed": 0, "stored": 0, "bytes_saved": 0}
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def _cacheable(self, request: httpx.Request) -> bool:
+        return (
+            self.mode != "off"
+            and request.method == "GET"
+            and "cookie" not in request.headers
+            and "authorization" not in request.headers
+        )
+
+    def _from_cache(self, entry: Dict[str, Any], request: httpx.Request, status: str) -> httpx.Response:
+        body = self.store.body(entry)
+        self.stats["bytes_saved"] += len(body)
+        headers = {**entry.get("headers", {}), "x-cache": status}
+        return httpx.Response(entry.get("status", 200), headers=headers, content=body, request=request)
+
+    def _entry(self, response: httpx.Response, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        headers = dict((previous or {}).get("headers", {}))
+        headers.update({h: response.headers[h] for h in STORED_HEADERS if h in response.headers})
+        return {
+            **(previous or {}),
+            "url": str(response.request.url),
+            "status": previous["status"] if previous else response.status_code,
+            "headers": headers,
+            "stored_at": self._clock(),
+            "max_age": freshness_lifetime(headers),
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._cacheable(request):
+            return await self.transport.handle_async_request(request)
+
+        key = cache_key(request)
+        entry = self.store.get(key)
+
+        if self.mode == "replay":
+            if entry is None:
+                raise CacheMiss(f"No recorded response for {key}", request=request)
+            self.stats["replayed"] += 1
+            return self._from_cache(entry, request, "REPLAY")
+
+        if self.mode == "default" and entry is not None:
+            if self._clock() - entry.get("stored_at", 0) < entry.get("max_age", 0):
+                self.stats["hits"] += 1
+                return self._from_cache(entry, request, "HIT")
+            if entry["headers"].get("etag"):
+                request.headers["if-none-match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                request.headers["if-modified-since"] = entry["headers"]["last-modified"]
+
+        response = await self.transport.handle_async_request(request)
+        response.request = request
+
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            entry = self.store.put(key, self._entry(response, previous=entry))
+            self.stats["revalidated"] += 1
+            return self._from_cache(entry, request, "REVALIDATED")
+
+        self.stats["misses"] += 1
+        body = await response.aread()
+        storable = "no-store" not in _cache_control(response.headers) or self.mode == "record"
+        if response.status_code == 200 and storable:
+            self.store.put(key, self._entry(response), body)
+            self.stats["stored"] += 1
+        # The body is already decoded, so drop the transfer-level headers with it
+        dropped = ("content-encoding", "content-length", "transfer-encoding")
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in dropped]
+        return httpx.Response(
+            response.status_code, headers=[*headers, ("x-cache", "MISS")], content=body, request=request
+        )
+
+
+def cached_transport(mode: Optional[str] = None, root: Optional[Union[str, Path]] = None) -> Optional[CachingTransport]:
+    """The configured cache transport for API clients (None when the cache is off)."""
+    from app.core.config import settings
+
+    mode = mode or settings.HTTP_CACHE_MODE
+    if mode == "off":
+        return None
+    return CachingTransport(HTTPCacheStore(root or settings.HTTP_CACHE_DIR), mode=mode)
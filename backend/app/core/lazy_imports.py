@@ -0,0 +1,91 @@
+"""
+Deferred imports for heavy optional dependencies (numpy, pandas, scikit-learn, joblib).
+
+Importing those packages costs well over a second, and most requests (and every
+`/health` check) never touch them. Modules bind them through `lazy_import` instead:
+the returned proxy imports the real module on first attribute access, so importing
+a service module (and therefore `app.main`) stays cheap.
+
+Availability flags use `importlib.util.find_spec`, which locates a package without
+importing it.
+
+Usage:
+    np = lazy_import("numpy")
+    sk_ensemble = lazy_import("sklearn.ensemble")
+    ML_AVAILABLE = modules_available("numpy", "pandas", "sklearn")
+
+    def fit(...):
+        model = sk_ensemble.RandomForestRegressor(...)   # sklearn imported here
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+import types
+from functools import lru_cache
+from typing import Any, Dict
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+_proxies: Dict[str, LazyModule] = {}
+_proxies_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Proxy for module `name`; one shared proxy per module name."""
+    with _proxies_lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = LazyModule(name)
+        return proxy
+
+
+@lru_cache(maxsize=None)
+def module_available(name: str) -> bool:
+    """
+    True if `name` can be imported, checked without importing it.
+
+    Pass top-level package names: `find_spec` imports the parents of a dotted name.
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def modules_available(*names: str) -> bool:
+    """True if every module in `names` can be imported."""
+    return all(module_available(name) for name in names)
@@ -0,0 +1,127 @@
+"""
+Client-side rate limiting and retries for outbound HTTP calls.
+
+`AsyncTokenBucket` is shared by every coroutine hitting one upstream. Each request
+takes a token, and tokens refill at `rate` per second up to `capacity`. This caps
+throughput no matter how many fetchers run concurrently. Waiters are served in
+arrival order.
+
+`retry_http` re-runs a call that failed with 429, 5xx or a transport error. It backs
+off exponentially with jitter and honours `Retry-After` when the server sends one.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class AsyncTokenBucket:
+    """
+    Usage:
+        limiter = AsyncTokenBucket.from_interval(settings.FPL_API_RATE_LIMIT)
+        await limiter.acquire()
+        response = await client.get(url)
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        self.rate = rate  # tokens per second; <= 0 disables limiting
+        self.capacity = max(1.0, capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited_s = 0.0
+
+    @classmethod
+    def from_interval(cls, seconds: float, burst: float = 1.0, **kwargs: Any) -> "AsyncTokenBucket":
+        """A bucket allowing one request every `seconds` on average (0 = unlimited)."""
+        return cls(1.0 / seconds if seconds and seconds > 0 else 0.0, capacity=burst, **kwargs)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        self.acquired += 1
+        if self.rate <= 0:
+            return
+        # Holding the lock while sleeping queues later callers behind this one
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                wait = (1.0 - self._tokens) / self.rate
+                self.waited_s += wait
+                await self._sleep(wait)
+                self._refill()
+            self._tokens -= 1.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_s": self.rate,
+            "capacity": self.capacity,
+            "acquired": self.acquired,
+            "waited_s": round(self.waited_s, 3),
+        }
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        # HTTP-date form; fall back to our own backoff
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx and connection/timeout errors are worth retrying; other 4xx are not."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUSES
+    return isinstance(error, httpx.TransportError)
+
+
+async def retry_http(
+    call: Callable[[], Awaitable[T]],
+    attempts: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+) -> T:
+    """
+    Await `call()` up to `attempts` times, retrying retryable HTTP failures.
+
+    The delay before retry n is `base_delay * 2**n`, capped at `max_delay` and
+    jittered to 50-100% of that value. A `Retry-After` header replaces the
+    computed delay, still capped at `max_delay`.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = base_delay * (2 ** attempt) * (0.5 + random.random() / 2)
+            await sleep(min(delay, max_delay))
+    raise RuntimeError("retry_http called with attempts < 1")
@@ -0,0 +1,111 @@
+"""
+Per-process single-flight calls with a short TTL result cache.
+
+Concurrent callers asking for the same key share one computation: the first caller
+(the leader) runs the function, and everyone arriving while it is in flight waits for
+its result instead of recomputing. Results are then served from a TTL cache for
+`ttl_s` seconds. Exceptions reach every waiter but are never cached.
+
+Callers run on threads (sync endpoints and FastAPI's threadpool), so coordination uses
+a lock and one `threading.Event` per in-flight key.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Usage:
+        flight = SingleFlight("predictions", ttl_s=60)
+        result = flight.do(key, lambda: expensive(...))
+    """
+
+    def __init__(self, name: str, ttl_s: float = 60.0, max_entries: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {"computed": 0, "coalesced": 0, "cache_hits": 0, "errors": 0, "invalidations": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return the cached or in-flight result for `key`, computing it with `fn` if neither exists."""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                expires_at, value = cached
+                if self._clock() < expires_at:
+                    self._cache.move_to_end(key)
+                    self._stats["cache_hits"] += 1
+                    return value
+                del self._cache[key]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None:
+                    self._stats["computed"] += 1
+                    if self.ttl_s > 0:
+                        self._cache[key] = (self._clock() + self.ttl_s, call.result)
+                        while len(self._cache) > self.max_entries:
+                            self._cache.popitem(last=False)
+            call.event.set()
+        return call.result
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop cached results (all, or those whose key matches `predicate`). In-flight calls finish normally."""
+        with self._lock:
+            keys = [k for k in self._cache if predicate is None or predicate(k)]
+            for k in keys:
+                del self._cache[k]
+            self._stats["invalidations"] += 1
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._stats["computed"] + self._stats["coalesced"] + self._stats["cache_hits"]
+            return {
+                "name": self.name,
+                "ttl_s": self.ttl_s,
+                **self._stats,
+                "in_flight": len(self._inflight),
+                "cached": len(self._cache),
+                "shared_rate": round((self._stats["coalesced"] + self._stats["cache_hits"]) / calls, 4) if calls else 0.0,
+            }
@@ -84,6 +84,7 @@ def init_db() -> None:
         Team,
         Fixture,
         FPLApiSnapshot,
+        FPLPayloadBlob,
         PlayerSeasonStat,
         PLTeam,
         PLPlayer,
@@ -92,6 +93,11 @@ def init_db() -> None:
         PLMatchEvent,
         PLMatchLineup,
         PLIngestState,
+        PLMatchSyncState,
+        PlayerFeatureRow,
+        PLPlayerAppearance,
+        PLPlayerAvailability,
+        PlayerChangeEvent,
         CopilotConversation,
         CopilotMessage,
         CopilotAction,
@@ -21,7 +21,7 @@ def ensure_sqlite_schema(engine: Engine) -> None:
     """
     Apply additive migrations for SQLite:
     - add players.fpl_id
-    - ensure fpl_api_snapshots table exists
+    - ensure fpl_api_snapshots table exists (+ payload_hash for deduplicated payloads)
     - ensure player_season_stats table exists (added later)
     """
     if engine.dialect.name != "sqlite":
@@ -62,6 +62,11 @@ CREATE INDEX IF NOT EXISTS idx_fpl_snapshot_lookup
 """
             )
         )
+        if not _has_column(conn, "fpl_api_snapshots", "payload_hash"):
+            conn.execute(text("ALTER TABLE fpl_api_snapshots ADD COLUMN payload_hash VARCHAR(64)"))
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_fpl_api_snapshots_payload_hash ON fpl_api_snapshots (payload_hash)")
+            )
 
         # Player season stats table (historical backfill from element-summary history_past)
         conn.execute(
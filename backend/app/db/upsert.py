@@ -0,0 +1,232 @@
+"""
+Set-based upserts for ingestion.
+
+`bulk_upsert` replaces the per-row "query, then insert or mutate" ORM pattern:
+1. It loads the existing values for the incoming keys in a few chunked `IN` queries,
+   or takes a map the caller already built.
+2. It classifies each row as inserted, updated or unchanged.
+3. It writes only the new and changed rows, in one executemany
+   `INSERT ... ON CONFLICT DO UPDATE` per chunk.
+
+`insert_missing` is for content-addressed rows that never change once written: it
+inserts with `ON CONFLICT DO NOTHING`, so concurrent writers of the same key do not
+fail on the unique index.
+
+SQLite and PostgreSQL use their native ON CONFLICT clause, which needs a unique index
+on `index_elements`. Other dialects fall back to an executemany INSERT of the new rows
+plus an executemany UPDATE of the changed ones.
+
+The session's transaction is used but not committed.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, bindparam, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+# Rows per statement; keeps bound parameters under SQLite's limit for wide tables
+CHUNK_SIZE = 500
+
+Key = Tuple[Any, ...]
+
+
+def normalize_value(value: Any) -> Any:
+    """Make DB and payload values comparable (naive UTC datetimes, ints vs floats)."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def load_existing(
+    db: Session,
+    model: Any,
+    index_elements: Sequence[str],
+    columns: Sequence[str],
+    keys: Optional[Iterable[Key]] = None,
+) -> Dict[Key, Dict[str, Any]]:
+    """
+    Existing rows as {key tuple: {column: value}}.
+
+    With `keys` only those rows are read (chunked IN queries); otherwise the whole table.
+    """
+    table = model.__table__
+    key_cols = [table.c[c] for c in index_elements]
+    wanted = list(dict.fromkeys([*index_elements, *columns]))
+    stmt = select(*[table.c[c] for c in wanted])
+
+    out: Dict[Key, Dict[str, Any]] = {}
+
+    def collect(result: Any) -> None:
+        for row in result:
+            values = dict(zip(wanted, row))
+            out[tuple(values[c] for c in index_elements)] = values
+
+    if keys is None:
+        collect(db.execute(stmt))
+        return out
+    keys = list(dict.fromkeys(keys))
+    for chunk in _chunks(keys, CHUNK_SIZE):
+        if len(key_cols) == 1:
+            clause = key_cols[0].in_([k[0] for k in chunk])
+        else:
+            clause = tuple_(*key_cols).in_(chunk)
+        collect(db.execute(stmt.where(clause)))
+    return out
+
+
+def bulk_upsert(
+    db: Session,
+    model: Any,
+    rows: List[Dict[str, Any]],
+    index_elements: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    existing: Optional[Mapping[Key, Mapping[str, Any]]] = None,
+    keep_existing: Sequence[str] = (),
+    written: Optional[List[Key]] = None,
+) -> Dict[str, int]:
+    """
+    Insert or update `rows` keyed on `index_elements`.
+
+    Args:
+        db: Database session
+        model: ORM model whose table is written
+        rows: Column dicts; every row must have the same keys
+        index_elements: Columns of a unique index identifying a row
+        update_columns: Columns overwritten on existing rows (default: every
+            non-key column in the rows). `updated_at` is bumped on changed rows.
+        existing: Pre-loaded {key: {column: value}} (see `load_existing`); loaded
+            here when omitted
+        keep_existing: Update columns that are only filled in when currently NULL
+        written: When given, the keys of inserted and changed rows are appended to it
+
+    Returns:
+        {"inserted": n, "updated": n, "unchanged": n}
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counts
+
+    table = model.__table__
+    # A key may appear only once per statement (PostgreSQL rejects repeats); last wins
+    rows = list({tuple(r[c] for c in index_elements): r for r in rows}.values())
+    columns = list(rows[0].keys())
+    if update_columns is None:
+        update_columns = [c for c in columns if c not in index_elements]
+    update_columns = [c for c in update_columns if c in columns]
+    if existing is None:
+        existing = load_existing(
+            db, model, index_elements, update_columns, keys=[tuple(r[c] for c in index_elements) for r in rows]
+        )
+
+    new_rows: List[Dict[str, Any]] = []
+    changed_rows: List[Dict[str, Any]] = []
+    for row in rows:
+        current = existing.get(tuple(row[c] for c in index_elements))
+        if current is None:
+            new_rows.append(row)
+            continue
+        for col in update_columns:
+            incoming = row.get(col)
+            if col in keep_existing and current.get(col) is not None:
+                incoming = current.get(col)
+            if normalize_value(incoming) != normalize_value(current.get(col)):
+                changed_rows.append(row)
+                break
+        else:
+            counts["unchanged"] += 1
+    counts["inserted"] = len(new_rows)
+    counts["updated"] = len(changed_rows)
+
+    pending = new_rows + changed_rows
+    if written is not None:
+        written.extend(tuple(r[c] for c in index_elements) for r in pending)
+    if not pending:
+        return counts
+
+    now = datetime.utcnow()
+    has_updated_at = "updated_at" in table.c and "updated_at" not in columns
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        set_ = {}
+        for col in update_columns:
+            if col in keep_existing:
+                set_[col] = func.coalesce(table.c[col], stmt.excluded[col])
+            else:
+                set_[col] = stmt.excluded[col]
+        if has_updated_at:
+            set_["updated_at"] = now
+        stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_)
+        for chunk in _chunks(pending, CHUNK_SIZE):
+            db.execute(stmt, list(chunk))
+        return counts
+
+    # Generic fallback: plain executemany INSERT + keyed UPDATE
+    for chunk in _chunks(new_rows, CHUNK_SIZE):
+        db.execute(insert(table), list(chunk))
+    if changed_rows:
+        where = and_(*[table.c[c] == bindparam(f"_key_{c}") for c in index_elements])
+        values = {c: bindparam(f"_v_{c}") for c in update_columns if c not in keep_existing}
+        for col in keep_existing:
+            if col in update_columns:
+                values[col] = func.coalesce(table.c[col], bindparam(f"_v_{col}"))
+        if has_updated_at:
+            values["updated_at"] = now
+        stmt = update(table).where(where).values(values)
+        params = [
+            {**{f"_v_{c}": r[c] for c in update_columns}, **{f"_key_{c}": r[c] for c in index_elements}}
+            for r in changed_rows
+        ]
+        for chunk in _chunks(params, CHUNK_SIZE):
+            db.execute(stmt, list(chunk))
+    return counts
+
+
+def insert_missing(
+    db: Session,
+    model: Any,
+    rows: List[Dict[str, Any]],
+    index_elements: Sequence[str],
+) -> None:
+    """
+    Insert `rows` whose key is not stored yet; existing rows are left untouched.
+
+    On SQLite and PostgreSQL a row another transaction inserted concurrently is
+    skipped by the database. Other dialects skip the keys stored at read time only.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    rows = list({tuple(r[c] for c in index_elements): r for r in rows}.values())
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=list(index_elements))
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            db.execute(stmt, list(chunk))
+        return
+
+    existing = load_existing(
+        db, model, index_elements, [], keys=[tuple(r[c] for c in index_elements) for r in rows]
+    )
+    new_rows = [r for r in rows if tuple(r[c] for c in index_elements) not in existing]
+    for chunk in _chunks(new_rows, CHUNK_SIZE):
+        db.execute(insert(table), list(chunk))
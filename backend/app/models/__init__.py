@@ -18,7 +18,7 @@ from .copilot import (
     ActionStatus,
     ActionRisk,
 )
-from .fpl_snapshot import FPLApiSnapshot
+from .fpl_snapshot import FPLApiSnapshot, FPLPayloadBlob
 from .player_season_stat import PlayerSeasonStat
 from .pl_team import PLTeam
 from .pl_player import PLPlayer
@@ -27,6 +27,10 @@ from .pl_match_team_stats import PLMatchTeamStats
 from .pl_match_event import PLMatchEvent
 from .pl_match_lineup import PLMatchLineup
 from .pl_ingest_state import PLIngestState
+from .pl_match_sync import PLMatchSyncState
+from .player_feature import PlayerFeatureRow
+from .pl_availability import PLPlayerAppearance, PLPlayerAvailability
+from .player_change import PlayerChangeEvent
 
 __all__ = [
     "Player",
@@ -48,6 +52,7 @@ __all__ = [
     "ActionStatus",
     "ActionRisk",
     "FPLApiSnapshot",
+    "FPLPayloadBlob",
     "PlayerSeasonStat",
     "PLTeam",
     "PLPlayer",
@@ -56,5 +61,10 @@ __all__ = [
     "PLMatchEvent",
     "PLMatchLineup",
     "PLIngestState",
+    "PLMatchSyncState",
+    "PlayerFeatureRow",
+    "PLPlayerAppearance",
+    "PLPlayerAvailability",
+    "PlayerChangeEvent",
 ]
 
@@ -2,13 +2,16 @@
 Generic storage for raw FPL API payloads.
 
 We store raw responses so we can reprocess/derive features later without re-fetching.
+Payloads are stored once per content hash in `fpl_payload_blobs` (compressed); snapshots
+reference them through `payload_hash`. Rows written before that keep an inline `payload`.
+See app/services/snapshot_store.py.
 """
 
 from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy import Column, Integer, LargeBinary, String, DateTime, Index
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 
 from app.db import Base
@@ -26,7 +29,9 @@ class FPLApiSnapshot(Base):
     entry_id = Column(Integer, nullable=True, index=True)
     gw = Column(Integer, nullable=True, index=True)
 
-    payload = Column(SQLiteJSON, nullable=False)
+    # Legacy inline payload (JSON null once the payload lives in fpl_payload_blobs)
+    payload = Column(SQLiteJSON, nullable=True)
+    payload_hash = Column(String(64), nullable=True, index=True)
     fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     __table_args__ = (
@@ -34,4 +39,13 @@ class FPLApiSnapshot(Base):
     )
 
 
+class FPLPayloadBlob(Base):
+    """One compressed payload, shared by every snapshot with the same content."""
 
+    __tablename__ = "fpl_payload_blobs"
+
+    sha256 = Column(String(64), primary_key=True)  # of the canonical JSON encoding
+    codec = Column(String(8), nullable=False)  # "zstd" or "gzip"
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
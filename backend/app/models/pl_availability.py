@@ -0,0 +1,69 @@
+"""
+Per-player appearances and the expected-minutes (availability) index.
+
+Both are derived from PremierLeague.com lineups and sub/card events:
+- `PLPlayerAppearance` holds one row per player per matchday squad, with whether
+  they started, when they came on / went off, and the minutes played.
+- `PLPlayerAvailability` holds one row per player, aggregated from their appearances:
+  start rate and average minutes over their team's recent matches, the distribution of
+  the minute they are substituted, and the current run of starts.
+
+Rows are rebuilt for a match's players whenever that match is ingested.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Index, JSON
+
+from app.db import Base
+
+
+class PLPlayerAppearance(Base):
+    __tablename__ = "pl_player_appearances"
+
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String(32), ForeignKey("pl_matches.match_id"), nullable=False, index=True)
+    player_id = Column(String(32), ForeignKey("pl_players.id"), nullable=False, index=True)
+    team_id = Column(String(16), ForeignKey("pl_teams.id"), nullable=False, index=True)
+    kickoff = Column(DateTime, nullable=True, index=True)
+
+    started = Column(Integer, nullable=False, default=0)  # 1 = in the starting XI
+    minutes = Column(Integer, nullable=False, default=0)
+    subbed_on_minute = Column(Integer, nullable=True)
+    subbed_off_minute = Column(Integer, nullable=True)
+    sent_off_minute = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("uq_pl_player_appearance", "match_id", "player_id", unique=True),
+        Index("idx_pl_player_appearance_player_kickoff", "player_id", "kickoff"),
+    )
+
+
+class PLPlayerAvailability(Base):
+    __tablename__ = "pl_player_availability"
+
+    player_id = Column(String(32), ForeignKey("pl_players.id"), primary_key=True)
+    # Matched FPL player (None until the name index finds one)
+    fpl_player_id = Column(Integer, ForeignKey("players.id"), nullable=True, index=True)
+    team_id = Column(String(16), ForeignKey("pl_teams.id"), nullable=True, index=True)
+
+    # Over the team's most recent matches (`window_matches` of them)
+    window_matches = Column(Integer, nullable=False, default=0)
+    start_rate = Column(Float, nullable=False, default=0.0)
+    squad_rate = Column(Float, nullable=False, default=0.0)
+    avg_minutes = Column(Float, nullable=False, default=0.0)
+    start_streak = Column(Integer, nullable=False, default=0)
+
+    # Over all starts on record
+    starts_total = Column(Integer, nullable=False, default=0)
+    appearances_total = Column(Integer, nullable=False, default=0)
+    completed_rate = Column(Float, nullable=False, default=0.0)  # starts lasting the full match
+    avg_subbed_off_minute = Column(Float, nullable=True)
+    subbed_off_hist = Column(JSON, nullable=True)  # counts per 15-minute bin, [0-15) ... [75-90]
+
+    last_kickoff = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<PLPlayerAvailability(player_id='{self.player_id}', start_rate={self.start_rate:.2f})>"
@@ -0,0 +1,30 @@
+"""
+Change-detection state for PremierLeague.com matches.
+
+The current-season refresher stores a fingerprint of each match's listing entry
+(period, clock, score, last-updated stamp) and a content hash per fetched resource.
+An unchanged listing means the match is not fetched again, and an unchanged resource
+payload is not rewritten.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, String
+
+from app.db import Base
+
+
+class PLMatchSyncState(Base):
+    __tablename__ = "pl_match_sync_state"
+
+    match_id = Column(String(32), ForeignKey("pl_matches.match_id"), primary_key=True)
+    # sha256 of the listing fields; None until every resource was fetched successfully
+    listing_hash = Column(String(64), nullable=True)
+    detail_hash = Column(String(64), nullable=True)
+    stats_hash = Column(String(64), nullable=True)
+    lineups_hash = Column(String(64), nullable=True)
+    events_hash = Column(String(64), nullable=True)
+
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # last full fetch
+    changed_at = Column(DateTime, nullable=True)  # last time any resource hash moved
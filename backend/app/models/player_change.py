@@ -0,0 +1,32 @@
+"""
+Typed change events for FPL players.
+
+Bootstrap ingestion compares each element against the stored player row and writes
+one event per detected change (price, status, news, chance of playing, stats, new
+player). Consumers poll by id (`id > last_seen`) to invalidate only what changed.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.db import Base
+
+
+class PlayerChangeEvent(Base):
+    __tablename__ = "player_change_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id"), nullable=False, index=True)
+    season = Column(String(16), nullable=False, index=True)
+    # "price", "status", "news", "availability", "stats", "new_player"
+    change_type = Column(String(16), nullable=False, index=True)
+    field = Column(String(255), nullable=True)  # column name(s) that changed
+    old_value = Column(Text, nullable=True)
+    new_value = Column(Text, nullable=True)
+    detected_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("idx_player_change_player_time", "player_id", "detected_at"),
+    )
@@ -0,0 +1,38 @@
+"""
+Persisted per-player feature rows (the ML feature store).
+
+One row holds the fixture-independent features used to predict `gw` for a player,
+built only from WeeklyScore history with `gw' < gw`. Rows are refreshed incrementally
+by ingestion, so prediction can read them instead of rebuilding.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Index, JSON
+
+from app.db import Base
+
+
+class PlayerFeatureRow(Base):
+    __tablename__ = "player_feature_rows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id"), nullable=False, index=True)
+    season = Column(String(16), nullable=False, index=True)  # e.g., "2024-25"
+    gw = Column(Integer, nullable=False, index=True)  # target gameweek the features predict
+
+    # Latest gameweek of history that went into this row (None if no history yet)
+    source_gw = Column(Integer, nullable=True)
+    features = Column(JSON, nullable=False)
+
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("uq_player_feature_rows_player_season_gw", "player_id", "season", "gw", unique=True),
+        Index("idx_player_feature_rows_season_gw", "season", "gw"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<PlayerFeatureRow(player_id={self.player_id}, season='{self.season}', gw={self.gw})>"
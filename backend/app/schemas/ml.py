@@ -13,5 +13,5 @@ class PredictRequest(BaseModel):
 
 class PredictResponse(BaseModel):
     """ML prediction response."""
-    predictions: List[dict]  # List of {player_id, predicted_points, confidence, risk_score}
+    predictions: List[dict]  # List of {player_id, predicted_points, predicted_points_total, confidence, risk_score}
 
@@ -0,0 +1,427 @@
+"""
+Expected-minutes index built from PremierLeague.com lineups and sub/card events.
+
+`parse_appearances` turns one match's lineups and events into per-player appearances:
+- Starters play until they are substituted or sent off, else 90 minutes.
+- Substitutes play from the minute they come on.
+- Unused bench players are recorded with 0 minutes.
+
+`AvailabilityIndex` stores appearances (`PLPlayerAppearance`) and rolls them up into
+one `PLPlayerAvailability` row per player:
+- start rate, squad rate and average minutes over the team's last `WINDOW` matches
+- the current run of consecutive starts
+- how often starts last the full match
+- a histogram of the minute the player is substituted
+
+Each row is matched to an FPL player through the name index.
+
+`rebuild()` makes a single pass over every stored lineup and event (grouped per match
+in one query each). `update_match()` is called by PL ingestion for each match. It
+refreshes the rows of every indexed player of both clubs, since a new match moves the
+whole squad's window. It then drops the cached predictions that may include those
+players. Stored feature rows are kept, because the index is joined onto them at read
+time.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models import PLMatch, PLMatchEvent, PLMatchLineup, PLPlayer, PLTeam
+from app.models.pl_availability import PLPlayerAppearance, PLPlayerAvailability
+from app.services.name_index import PlayerNameIndex
+
+logger = logging.getLogger(__name__)
+
+FULL_MATCH = 90
+SUB_BINS = 6  # 15-minute bins
+DEFAULT_SUBBED_OFF_MINUTE = 65.0
+# Squad players who do not start: most stay on the bench, some come on late
+BENCH_MINUTES = 8.0
+SENT_OFF_CARDS = {"red", "secondyellow", "yellowred", "second_yellow"}
+
+
+def _player_ids(obj: Any) -> List[str]:
+    """Player ids from the nested lineup/subs structures (lists of ids or of dicts)."""
+    out: List[str] = []
+    if obj is None:
+        return out
+    if isinstance(obj, dict):
+        pid = obj.get("id") or obj.get("playerId")
+        if pid is not None and not isinstance(pid, (list, dict)):
+            out.append(str(pid))
+        else:
+            for value in obj.values():
+                if isinstance(value, (list, dict)):
+                    out.extend(_player_ids(value))
+        return out
+    if isinstance(obj, (list, tuple)):
+        for item in obj:
+            out.extend(_player_ids(item))
+        return out
+    return [str(obj)]
+
+
+def _clamp_minute(minute: Optional[int]) -> Optional[int]:
+    if minute is None:
+        return None
+    return max(0, min(FULL_MATCH, int(minute)))
+
+
+def parse_appearances(
+    lineups: Iterable[Dict[str, Any]], events: Iterable[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Appearances for one match.
+
+    Args:
+        lineups: [{team_id, lineup, subs}] (stored PLMatchLineup fields)
+        events: [{event_type, minute, card_type, player_id, player_on_id, player_off_id}]
+
+    Returns:
+        [{player_id, team_id, started, minutes, subbed_on_minute, subbed_off_minute,
+          sent_off_minute}]
+    """
+    on_at: Dict[str, int] = {}
+    off_at: Dict[str, int] = {}
+    sent_off_at: Dict[str, int] = {}
+    for ev in events:
+        minute = _clamp_minute(ev.get("minute"))
+        if ev.get("event_type") == "sub":
+            if ev.get("player_on_id") and minute is not None:
+                on_at.setdefault(str(ev["player_on_id"]), minute)
+            if ev.get("player_off_id") and minute is not None:
+                off_at.setdefault(str(ev["player_off_id"]), minute)
+        elif ev.get("event_type") == "card" and ev.get("player_id") and minute is not None:
+            card = (ev.get("card_type") or "").replace(" ", "").lower()
+            if card in SENT_OFF_CARDS:
+                sent_off_at.setdefault(str(ev["player_id"]), minute)
+
+    appearances: Dict[str, Dict[str, Any]] = {}
+    for lu in lineups:
+        team_id = str(lu.get("team_id"))
+        starters = _player_ids(lu.get("lineup"))
+        bench = _player_ids(lu.get("subs"))
+        for pid in starters:
+            end = min(off_at.get(pid, FULL_MATCH), sent_off_at.get(pid, FULL_MATCH))
+            appearances[pid] = {
+                "player_id": pid, "team_id": team_id, "started": 1, "minutes": end,
+                "subbed_on_minute": None, "subbed_off_minute": off_at.get(pid),
+                "sent_off_minute": sent_off_at.get(pid),
+            }
+        for pid in bench:
+            if pid in appearances:
+                continue
+            start = on_at.get(pid)
+            minutes = 0
+            if start is not None:
+                end = min(off_at.get(pid, FULL_MATCH), sent_off_at.get(pid, FULL_MATCH))
+                # Off before on means a bad timestamp; count the player as coming on late.
+                minutes = max(end - start, 1) if end >= start else max(FULL_MATCH - start, 1)
+            appearances[pid] = {
+                "player_id": pid, "team_id": team_id, "started": 0, "minutes": minutes,
+                "subbed_on_minute": start,
+                "subbed_off_minute": off_at.get(pid) if start is not None else None,
+                "sent_off_minute": sent_off_at.get(pid),
+            }
+    return list(appearances.values())
+
+
+def summarize_appearances(
+    appearances: List[Dict[str, Any]], team_matches: List[str]
+) -> Dict[str, Any]:
+    """
+    Aggregate one player's appearances.
+
+    Args:
+        appearances: The player's appearances (any order), each with match_id
+        team_matches: Match ids of the player's current team, most recent first
+    """
+    by_match = {a["match_id"]: a for a in appearances}
+    window = team_matches
+    in_window = [by_match.get(mid) for mid in window]
+
+    streak = 0
+    for app in in_window:
+        if not app or not app["started"]:
+            break
+        streak += 1
+
+    starts = [a for a in appearances if a["started"]]
+    hist = [0] * SUB_BINS
+    off_minutes = []
+    for a in starts:
+        off = a.get("subbed_off_minute")
+        if off is not None and off < FULL_MATCH:
+            hist[min(off // 15, SUB_BINS - 1)] += 1
+            off_minutes.append(off)
+    completed = sum(1 for a in starts if a["minutes"] >= FULL_MATCH)
+
+    n = len(window)
+    return {
+        "window_matches": n,
+        "start_rate": sum(1 for a in in_window if a and a["started"]) / n if n else 0.0,
+        "squad_rate": sum(1 for a in in_window if a) / n if n else 0.0,
+        "avg_minutes": sum(a["minutes"] for a in in_window if a) / n if n else 0.0,
+        "start_streak": streak,
+        "starts_total": len(starts),
+        "appearances_total": sum(1 for a in appearances if a["minutes"] > 0),
+        "completed_rate": completed / len(starts) if starts else 0.0,
+        "avg_subbed_off_minute": sum(off_minutes) / len(off_minutes) if off_minutes else None,
+        "subbed_off_hist": hist,
+    }
+
+
+def expected_minutes(summary: Dict[str, Any]) -> float:
+    """
+    Expected minutes next match from an index row: starts last until the usual
+    substitution minute unless completed, bench appearances add `BENCH_MINUTES`.
+    """
+    start_rate = summary.get("start_rate") or 0.0
+    completed = summary.get("completed_rate") or 0.0
+    off_minute = summary.get("avg_subbed_off_minute") or DEFAULT_SUBBED_OFF_MINUTE
+    start_minutes = completed * FULL_MATCH + (1.0 - completed) * off_minute
+    bench_rate = max((summary.get("squad_rate") or 0.0) - start_rate, 0.0)
+    return float(start_rate * start_minutes + bench_rate * BENCH_MINUTES)
+
+
+class AvailabilityIndex:
+    """Maintains `PLPlayerAppearance` / `PLPlayerAvailability`."""
+
+    # Team matches the rates are computed over
+    WINDOW = 10
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._name_index: Optional[PlayerNameIndex] = None
+
+    # ------------------------------------------------------------------ writes
+
+    def update_match(self, match_id: str, commit: bool = True) -> int:
+        """
+        Re-derive one match's appearances and refresh the rows of both clubs' players
+        (the window moved for the whole squad, not only those in the lineups).
+        """
+        lineups = self.db.query(PLMatchLineup).filter(PLMatchLineup.match_id == match_id).all()
+        if not lineups:
+            return 0
+        events = (
+            self.db.query(PLMatchEvent)
+            .filter(PLMatchEvent.match_id == match_id)
+            .filter(PLMatchEvent.event_type.in_(["sub", "card"]))
+            .all()
+        )
+        match = self.db.get(PLMatch, match_id)
+        rows = parse_appearances(
+            [self._lineup_dict(lu) for lu in lineups], [self._event_dict(ev) for ev in events]
+        )
+        previous = {
+            pid for (pid,) in self.db.query(PLPlayerAppearance.player_id).filter(PLPlayerAppearance.match_id == match_id)
+        }
+        self.db.query(PLPlayerAppearance).filter(PLPlayerAppearance.match_id == match_id).delete()
+        self._insert_appearances(match_id, match.kickoff if match else None, rows)
+        self.db.flush()
+        teams = {lu.team_id for lu in lineups}
+        if match is not None:
+            teams |= {match.home_team_id, match.away_team_id}
+        squad = {
+            pid
+            for (pid,) in self.db.query(PLPlayerAvailability.player_id).filter(PLPlayerAvailability.team_id.in_(teams))
+        }
+        touched = previous | squad | {r["player_id"] for r in rows}
+        self.refresh_players(touched)
+        self.db.flush()
+        if match is not None:
+            self._invalidate_predictions(match.season, touched)
+        if commit:
+            self.db.commit()
+        return len(touched)
+
+    def rebuild(self, season: Optional[int] = None) -> Dict[str, int]:
+        """Recompute every appearance and index row in one pass over lineups and events."""
+        match_q = self.db.query(PLMatch.match_id, PLMatch.kickoff)
+        if season is not None:
+            match_q = match_q.filter(PLMatch.season == season)
+        kickoffs = dict(match_q.all())
+
+        lineups_by_match: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for lu in self.db.query(PLMatchLineup).filter(PLMatchLineup.match_id.in_(list(kickoffs))).yield_per(500):
+            lineups_by_match[lu.match_id].append(self._lineup_dict(lu))
+        events_by_match: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        events = (
+            self.db.query(PLMatchEvent)
+            .filter(PLMatchEvent.match_id.in_(list(lineups_by_match)))
+            .filter(PLMatchEvent.event_type.in_(["sub", "card"]))
+            .yield_per(2000)
+        )
+        for ev in events:
+            events_by_match[ev.match_id].append(self._event_dict(ev))
+
+        self.db.query(PLPlayerAppearance).filter(
+            PLPlayerAppearance.match_id.in_(list(kickoffs))
+        ).delete(synchronize_session=False)
+        players: Set[str] = set()
+        for match_id, lineups in lineups_by_match.items():
+            rows = parse_appearances(lineups, events_by_match.get(match_id, []))
+            self._insert_appearances(match_id, kickoffs.get(match_id), rows)
+            players.update(r["player_id"] for r in rows)
+        self.db.flush()
+
+        refreshed = self.refresh_players(players)
+        self.db.commit()
+        logger.info(f"Availability index rebuilt: {len(lineups_by_match)} matches, {refreshed} players")
+        return {"matches": len(lineups_by_match), "players": refreshed}
+
+    def refresh_players(self, player_ids: Iterable[str]) -> int:
+        """Recompute index rows for `player_ids` from their stored appearances."""
+        player_ids = sorted(set(player_ids))
+        if not player_ids:
+            return 0
+
+        apps_by_player: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for chunk_start in range(0, len(player_ids), 500):
+            chunk = player_ids[chunk_start:chunk_start + 500]
+            rows = (
+                self.db.query(PLPlayerAppearance)
+                .filter(PLPlayerAppearance.player_id.in_(chunk))
+                .all()
+            )
+            for a in rows:
+                apps_by_player[a.player_id].append({
+                    "match_id": a.match_id, "team_id": a.team_id, "kickoff": a.kickoff,
+                    "started": a.started, "minutes": a.minutes,
+                    "subbed_off_minute": a.subbed_off_minute,
+                })
+
+        team_matches: Dict[str, List[str]] = {}
+        existing = {
+            row.player_id: row
+            for row in self.db.query(PLPlayerAvailability).filter(PLPlayerAvailability.player_id.in_(player_ids))
+        }
+        pl_players = {p.id: p for p in self.db.query(PLPlayer).filter(PLPlayer.id.in_(player_ids))}
+        team_abbr = {t.id: (t.abbr or t.short_name or t.name) for t in self.db.query(PLTeam).all()}
+
+        for pid in player_ids:
+            apps = apps_by_player.get(pid)
+            row = existing.get(pid)
+            if not apps:
+                if row is not None:
+                    self.db.delete(row)
+                continue
+            latest = max(apps, key=lambda a: a["kickoff"] or datetime.min)
+            team_id = latest["team_id"]
+            if team_id not in team_matches:
+                team_matches[team_id] = self._recent_team_matches(team_id)
+            summary = summarize_appearances(apps, team_matches[team_id])
+
+            if row is None:
+                row = PLPlayerAvailability(player_id=pid)
+                self.db.add(row)
+            for key, value in summary.items():
+                setattr(row, key, value)
+            row.team_id = team_id
+            row.last_kickoff = latest["kickoff"]
+            if row.fpl_player_id is None:
+                row.fpl_player_id = self._match_fpl_player(pl_players.get(pid), team_abbr.get(team_id))
+        return len(player_ids)
+
+    # ------------------------------------------------------------------ reads
+
+    def for_fpl_players(self, fpl_player_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Index rows keyed by FPL `Player.id` (players without a matched row are omitted)."""
+        ids = list(set(fpl_player_ids))
+        if not ids:
+            return {}
+        rows = (
+            self.db.query(PLPlayerAvailability)
+            .filter(PLPlayerAvailability.fpl_player_id.in_(ids))
+            .all()
+        )
+        out: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            current = out.get(row.fpl_player_id)
+            # Several PL ids can map to one FPL player (e.g. a transfer); keep the latest.
+            if current is not None and (row.last_kickoff or datetime.min) <= (current["last_kickoff"] or datetime.min):
+                continue
+            summary = {
+                "start_rate": row.start_rate,
+                "squad_rate": row.squad_rate,
+                "avg_minutes": row.avg_minutes,
+                "start_streak": row.start_streak,
+                "completed_rate": row.completed_rate,
+                "avg_subbed_off_minute": row.avg_subbed_off_minute,
+                "window_matches": row.window_matches,
+                "last_kickoff": row.last_kickoff,
+            }
+            summary["expected_minutes"] = expected_minutes(summary)
+            summary["p_complete_90"] = row.start_rate * row.completed_rate
+            out[row.fpl_player_id] = summary
+        return out
+
+    # ------------------------------------------------------------------ helpers
+
+    def _invalidate_predictions(self, pl_season: int, player_ids: Iterable[str]) -> None:
+        """Drop cached predictions if any FPL player is behind `player_ids`."""
+        player_ids = sorted(set(player_ids))
+        fpl_ids: Set[int] = set()
+        for chunk_start in range(0, len(player_ids), 500):
+            chunk = player_ids[chunk_start:chunk_start + 500]
+            fpl_ids.update(
+                fid
+                for (fid,) in self.db.query(PLPlayerAvailability.fpl_player_id)
+                .filter(PLPlayerAvailability.player_id.in_(chunk))
+                .filter(PLPlayerAvailability.fpl_player_id.isnot(None))
+            )
+        if not fpl_ids:
+            return
+        season = f"{pl_season}-{(pl_season + 1) % 100:02d}"
+        try:
+            from app.services.ml.neural_predictor import PREDICTION_FLIGHT
+
+            PREDICTION_FLIGHT.invalidate(lambda key: key[0] == season)
+        except ImportError:
+            pass
+
+    def _recent_team_matches(self, team_id: str) -> List[str]:
+        rows = (
+            self.db.query(PLMatchLineup.match_id)
+            .join(PLMatch, PLMatch.match_id == PLMatchLineup.match_id)
+            .filter(PLMatchLineup.team_id == team_id)
+            .order_by(PLMatch.kickoff.desc())
+            .limit(self.WINDOW)
+            .all()
+        )
+        return [mid for (mid,) in rows]
+
+    def _match_fpl_player(self, pl_player: Optional[PLPlayer], team: Optional[str]) -> Optional[int]:
+        if pl_player is None:
+            return None
+        if self._name_index is None:
+            self._name_index = PlayerNameIndex(self.db)
+        return self._name_index.match(
+            name=pl_player.known_name,
+            first_name=pl_player.first_name,
+            last_name=pl_player.last_name,
+            team=team,
+        )
+
+    def _insert_appearances(self, match_id: str, kickoff: Any, rows: List[Dict[str, Any]]) -> None:
+        self.db.bulk_insert_mappings(
+            PLPlayerAppearance,
+            [{"match_id": match_id, "kickoff": kickoff, **r} for r in rows],
+        )
+
+    @staticmethod
+    def _lineup_dict(lu: PLMatchLineup) -> Dict[str, Any]:
+        return {"team_id": lu.team_id, "lineup": lu.lineup, "subs": lu.subs}
+
+    @staticmethod
+    def _event_dict(ev: PLMatchEvent) -> Dict[str, Any]:
+        return {
+            "event_type": ev.event_type, "minute": ev.minute, "card_type": ev.card_type,
+            "player_id": ev.player_id, "player_on_id": ev.player_on_id, "player_off_id": ev.player_off_id,
+        }
@@ -7,17 +7,21 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-logger = logging.getLogger(__name__)
+from app.core.config import settings
+from app.core.http_cache import cached_transport
 
-FPL_API_BASE = "https://fantasy.premierleague.com/api"
+logger = logging.getLogger(__name__)
 
 
 class FPLAPIService:
     """Service for interacting with the FPL API."""
     
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: int = 30, cache_mode: Optional[str] = None, base_url: Optional[str] = None):
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        # FPL_API_BASE_URL can point at a local stand-in of the API
+        self.base_url = (base_url or settings.FPL_API_BASE_URL).rstrip("/")
+        # Conditional GETs / record-replay via the on-disk HTTP cache (HTTP_CACHE_MODE)
+        self.client = httpx.AsyncClient(timeout=timeout, transport=cached_transport(cache_mode))
     
     async def close(self):
         """Close the HTTP client."""
@@ -38,7 +42,7 @@ class FPLAPIService:
             - game_settings
         """
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/bootstrap-static/")
+            response = await self.client.get(f"{self.base_url}/bootstrap-static/")
             response.raise_for_status()
             data = response.json()
             logger.info(f"Fetched bootstrap-static: {len(data.get('elements', []))} players, {len(data.get('teams', []))} teams")
@@ -58,7 +62,7 @@ class FPLAPIService:
             Player details including history, fixtures, history_past
         """
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/element-summary/{player_id}/")
+            response = await self.client.get(f"{self.base_url}/element-summary/{player_id}/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -73,7 +77,7 @@ class FPLAPIService:
             List of fixture dictionaries
         """
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/fixtures/")
+            response = await self.client.get(f"{self.base_url}/fixtures/")
             response.raise_for_status()
             fixtures = response.json()
             logger.info(f"Fetched {len(fixtures)} fixtures")
@@ -88,7 +92,7 @@ class FPLAPIService:
         Endpoint: /event/{gw_id}/live/
         """
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/event/{gw_id}/live/")
+            response = await self.client.get(f"{self.base_url}/event/{gw_id}/live/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -98,7 +102,7 @@ class FPLAPIService:
     async def fetch_entry_details(self, entry_id: int) -> Dict[str, Any]:
         """Endpoint: /entry/{entry_id}/"""
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/entry/{entry_id}/")
+            response = await self.client.get(f"{self.base_url}/entry/{entry_id}/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -108,7 +112,7 @@ class FPLAPIService:
     async def fetch_entry_history(self, entry_id: int) -> Dict[str, Any]:
         """Endpoint: /entry/{entry_id}/history/"""
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/entry/{entry_id}/history/")
+            response = await self.client.get(f"{self.base_url}/entry/{entry_id}/history/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -118,7 +122,7 @@ class FPLAPIService:
     async def fetch_entry_transfers(self, entry_id: int) -> List[Dict[str, Any]]:
         """Endpoint: /entry/{entry_id}/transfers/"""
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/entry/{entry_id}/transfers/")
+            response = await self.client.get(f"{self.base_url}/entry/{entry_id}/transfers/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -128,7 +132,7 @@ class FPLAPIService:
     async def fetch_entry_picks(self, entry_id: int, gw_id: int) -> Dict[str, Any]:
         """Endpoint: /entry/{entry_id}/event/{gw_id}/picks/"""
         try:
-            response = await self.client.get(f"{FPL_API_BASE}/entry/{entry_id}/event/{gw_id}/picks/")
+            response = await self.client.get(f"{self.base_url}/entry/{entry_id}/event/{gw_id}/picks/")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -139,7 +143,7 @@ class FPLAPIService:
         """Endpoint: /me/ (requires authentication cookie)."""
         try:
             response = await self.client.get(
-                f"{FPL_API_BASE}/me/",
+                f"{self.base_url}/me/",
                 headers={"cookie": cookie},
             )
             response.raise_for_status()
@@ -152,7 +156,7 @@ class FPLAPIService:
         """Endpoint: /my-team/{team_id}/ (requires authentication cookie)."""
         try:
             response = await self.client.get(
-                f"{FPL_API_BASE}/my-team/{team_id}/",
+                f"{self.base_url}/my-team/{team_id}/",
                 headers={"cookie": cookie},
             )
             response.raise_for_status()
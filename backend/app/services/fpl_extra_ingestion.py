@@ -8,20 +8,42 @@ Ingestion for additional FPL endpoints beyond bootstrap-static/fixtures.
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
-from app.models import Player, WeeklyScore, FPLApiSnapshot
+from app.db.upsert import bulk_upsert
+from app.models import Player, WeeklyScore
 from app.services.fpl_api import FPLAPIService
+from app.services.snapshot_store import SnapshotStore
 
 logger = logging.getLogger(__name__)
 
 
 class FPLExtraIngestionService:
+    # WeeklyScore column -> (event-live stat name, type)
+    # https://fantasy.premierleague.com/api/event/{gw}/live/
+    EVENT_LIVE_FIELDS = {
+        "minutes": ("minutes", int),
+        "points": ("total_points", float),
+        "bonus": ("bonus", int),
+        "goals_scored": ("goals_scored", int),
+        "assists": ("assists", int),
+        "clean_sheets": ("clean_sheets", int),
+        "goals_conceded": ("goals_conceded", int),
+        "yellow_cards": ("yellow_cards", int),
+        "red_cards": ("red_cards", int),
+        "saves": ("saves", int),
+        "expected_goals": ("expected_goals", float),
+        "expected_assists": ("expected_assists", float),
+        "expected_goal_involvements": ("expected_goal_involvements", float),
+        "expected_goals_conceded": ("expected_goals_conceded", float),
+    }
+
     def __init__(self, db: Session):
         self.db = db
         self.fpl_api = FPLAPIService()
+        self.snapshots = SnapshotStore(db)
 
     async def close(self) -> None:
         await self.fpl_api.close()
@@ -29,72 +51,52 @@ class FPLExtraIngestionService:
     async def ingest_event_live(self, season: str, gw: int) -> Dict[str, Any]:
         """
         Pull /event/{gw}/live and upsert WeeklyScore rows using Player.fpl_id mapping.
+
+        All rows go out in one set-based upsert on (player_id, season, gw); rows whose
+        stats match the previous poll are skipped, so polling during live matches only
+        writes (and refreshes features for) players whose numbers moved.
         """
         payload = await self.fpl_api.fetch_event_live(gw)
         self._save_snapshot(season=season, endpoint="event-live", gw=gw, payload=payload)
 
         elements = payload.get("elements") or []
-        updated = 0
+        player_ids = dict(self.db.query(Player.fpl_id, Player.id).filter(Player.fpl_id.isnot(None)))
         missing_player = 0
+        rows = []
 
         for el in elements:
             element_id = el.get("id")
-            stats = el.get("stats") or {}
             if not element_id:
                 continue
-
-            player = (
-                self.db.query(Player)
-                .filter(Player.fpl_id == int(element_id))
-                .first()
-            )
-            if not player:
+            player_id = player_ids.get(int(element_id))
+            if player_id is None:
                 missing_player += 1
                 continue
-
-            ws = (
-                self.db.query(WeeklyScore)
-                .filter(WeeklyScore.player_id == player.id)
-                .filter(WeeklyScore.season == season)
-                .filter(WeeklyScore.gw == gw)
-                .first()
-            )
-            if not ws:
-                ws = WeeklyScore(player_id=player.id, season=season, gw=gw)
-                self.db.add(ws)
-
-            # Core
-            ws.minutes = int(stats.get("minutes") or 0)
-            ws.points = float(stats.get("total_points") or 0)
-            ws.bonus = int(stats.get("bonus") or 0) if hasattr(ws, "bonus") else ws.bonus
-
-            # Common stat names in event live payload:
-            # https://fantasy.premierleague.com/api/event/{gw}/live/
-            ws.goals_scored = int(stats.get("goals_scored") or 0) if hasattr(ws, "goals_scored") else ws.goals_scored
-            ws.assists = int(stats.get("assists") or 0) if hasattr(ws, "assists") else ws.assists
-            ws.clean_sheets = int(stats.get("clean_sheets") or 0) if hasattr(ws, "clean_sheets") else ws.clean_sheets
-            ws.goals_conceded = int(stats.get("goals_conceded") or 0) if hasattr(ws, "goals_conceded") else ws.goals_conceded
-            ws.yellow_cards = int(stats.get("yellow_cards") or 0) if hasattr(ws, "yellow_cards") else ws.yellow_cards
-            ws.red_cards = int(stats.get("red_cards") or 0) if hasattr(ws, "red_cards") else ws.red_cards
-            ws.saves = int(stats.get("saves") or 0) if hasattr(ws, "saves") else ws.saves
-
-            # Expected metrics
-            if hasattr(ws, "expected_goals"):
-                ws.expected_goals = float(stats.get("expected_goals") or 0.0)
-            if hasattr(ws, "expected_assists"):
-                ws.expected_assists = float(stats.get("expected_assists") or 0.0)
-            if hasattr(ws, "expected_goal_involvements"):
-                ws.expected_goal_involvements = float(stats.get("expected_goal_involvements") or 0.0)
-            if hasattr(ws, "expected_goals_conceded"):
-                ws.expected_goals_conceded = float(stats.get("expected_goals_conceded") or 0.0)
-
-            updated += 1
-
+            stats = el.get("stats") or {}
+            rows.append({
+                "player_id": player_id,
+                "season": season,
+                "gw": gw,
+                **{col: cast(stats.get(key) or 0) for col, (key, cast) in self.EVENT_LIVE_FIELDS.items()},
+            })
+
+        written: List[tuple] = []
+        result = bulk_upsert(
+            self.db, WeeklyScore, rows, index_elements=["player_id", "season", "gw"], written=written
+        )
         self.db.commit()
+
+        touched_player_ids = [key[0] for key in written]
+        if touched_player_ids:
+            self._refresh_feature_store(season, gw, touched_player_ids)
+        # Every poll: the gameweek may finish on a poll that changed no rows
+        self._update_online_models(season, gw)
         return {
             "season": season,
             "gw": gw,
-            "updated_weekly_scores": updated,
+            "updated_weekly_scores": result["inserted"] + result["updated"],
+            "unchanged_weekly_scores": result["unchanged"],
+            "upserts": result,
             "missing_players": missing_player,
         }
 
@@ -140,6 +142,31 @@ class FPLExtraIngestionService:
         self.db.commit()
         return {"season": season, "entry_id": entry_id, "gw": gw, "snapshots_saved": snapshots}
 
+    def _refresh_feature_store(self, season: str, gw: int, player_ids: List[int]) -> None:
+        """Recompute GW gw+1 feature rows for the players this ingest touched."""
+        try:
+            from app.services.ml.feature_store import FeatureStore
+
+            FeatureStore(self.db).on_gameweek_ingested(season, gw, player_ids)
+        except Exception as e:
+            # Feature rows are rebuilt lazily on read if this fails.
+            logger.warning(f"Feature store refresh failed for {season} GW{gw}: {e}")
+            self.db.rollback()
+
+    def _update_online_models(self, season: str, gw: int) -> None:
+        """Apply the finished gameweek's rows to incremental (partial_fit) models."""
+        try:
+            from app.services.ml.online import OnlineModelUpdater
+
+            OnlineModelUpdater(self.db).update(season, gw)
+        except ImportError:
+            # ML extras not installed; nothing to update.
+            pass
+        except Exception as e:
+            # The next scheduled full retrain covers a missed online update.
+            logger.warning(f"Online model update failed for {season} GW{gw}: {e}")
+            self.db.rollback()
+
     def _save_snapshot(
         self,
         season: str,
@@ -148,14 +175,4 @@ class FPLExtraIngestionService:
         entry_id: Optional[int] = None,
         gw: Optional[int] = None,
     ) -> None:
-        snap = FPLApiSnapshot(
-            season=season,
-            endpoint=endpoint,
-            entry_id=entry_id,
-            gw=gw,
-            payload=payload,
-        )
-        self.db.add(snap)
-
-
-
+        self.snapshots.save(season=season, endpoint=endpoint, payload=payload, entry_id=entry_id, gw=gw)
@@ -5,10 +5,11 @@ from __future__ import annotations
 import logging
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from sqlalchemy import or_
+from sqlalchemy import update
 
+from app.db.upsert import bulk_upsert, load_existing
 from app.services.fpl_api import FPLAPIService
+from app.services.player_changes import PlayerChangeLog, diff_player
 from app.models.player import Player
 from app.models.fixture import Team, Fixture
 
@@ -18,10 +19,32 @@ logger = logging.getLogger(__name__)
 class FPLIngestionService:
     """Service for ingesting FPL data into the database."""
     
+    TEAM_STRENGTH_FIELDS = (
+        "strength",
+        "strength_attack_home", "strength_attack_away",
+        "strength_defence_home", "strength_defence_away",
+    )
+    PLAYER_STAT_FIELDS = (
+        "goals_scored", "assists", "clean_sheets", "goals_conceded",
+        "yellow_cards", "red_cards", "saves", "bonus", "bps",
+    )
+    # Columns refreshed on existing players (team, position and initial price are
+    # set on insert only); fpl_id is only filled in when missing
+    PLAYER_UPDATE_FIELDS = (
+        "fpl_id", "name", "first_name", "second_name", "price", "status", "news", "news_added",
+        "chance_of_playing_this_round", "chance_of_playing_next_round", "total_points",
+        *PLAYER_STAT_FIELDS,
+    )
+    
     def __init__(self, db: Session):
         self.db = db
         self.fpl_api = FPLAPIService()
         self.season = "2024-25"  # Default season
+        self.change_log = PlayerChangeLog(db)
+        # Change events from the last players ingest (see _record_player_changes)
+        self.player_changes: Dict[str, Any] = {}
+        # Gameweeks from the last bootstrap: [{"gw", "deadline", "finished"}] (read by the scheduler)
+        self.gameweeks: List[Dict[str, Any]] = []
     
     async def close(self):
         """Close API client."""
@@ -48,15 +71,20 @@ class FPLIngestionService:
             "players": 0,
             "gameweeks": 0,
             "fixtures": 0,
+            # inserted / updated / unchanged rows per table
+            "upserts": {},
         }
         
         # Ingest teams
         if "teams" in data:
-            counts["teams"] = await self._ingest_teams(data["teams"])
+            counts["upserts"]["teams"] = await self._ingest_teams(data["teams"])
+            counts["teams"] = counts["upserts"]["teams"]["inserted"]
         
         # Ingest players
         if "elements" in data:
-            counts["players"] = await self._ingest_players(data["elements"], data.get("teams", []))
+            counts["upserts"]["players"] = await self._ingest_players(data["elements"], data.get("teams", []))
+            counts["players"] = counts["upserts"]["players"]["inserted"]
+            counts["player_changes"] = self.player_changes
         
         # Ingest gameweeks (events)
         if "events" in data:
@@ -65,7 +93,8 @@ class FPLIngestionService:
         # Ingest fixtures
         try:
             fixtures_data = await self.fpl_api.fetch_fixtures()
-            counts["fixtures"] = await self._ingest_fixtures(fixtures_data)
+            counts["upserts"]["fixtures"] = await self._ingest_fixtures(fixtures_data)
+            counts["fixtures"] = counts["upserts"]["fixtures"]["inserted"]
         except Exception as e:
             logger.warning(f"Could not fetch fixtures: {e}")
         
@@ -73,126 +102,134 @@ class FPLIngestionService:
         logger.info(f"Bootstrap-static ingestion complete: {counts}")
         return counts
     
-    async def _ingest_teams(self, teams_data: List[Dict[str, Any]]) -> int:
-        """Ingest teams from FPL API data."""
-        count = 0
+    async def _ingest_teams(self, teams_data: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert teams from FPL API data (keyed on FPL team id)."""
+        # Older rows may predate fpl_id; attach it by name so the upsert updates them.
+        existing = self.db.query(Team.id, Team.fpl_id, Team.name).all()
+        known_ids = {fpl_id for _, fpl_id, _ in existing if fpl_id is not None}
+        unkeyed = {name: team_id for team_id, fpl_id, name in existing if fpl_id is None}
         for team_data in teams_data:
-            team = self.db.query(Team).filter(Team.fpl_id == team_data["id"]).first()
-            
-            if not team:
-                team = Team(
-                    fpl_id=team_data["id"],
-                    fpl_code=team_data.get("code"),
-                    name=team_data["name"],
-                    short_name=team_data.get("short_name", team_data["name"][:3]),
-                )
-                self.db.add(team)
-                count += 1
-            else:
-                # Update existing team
-                team.name = team_data["name"]
-                team.short_name = team_data.get("short_name", team_data["name"][:3])
-                team.fpl_code = team_data.get("code")
-            
+            team_id = unkeyed.get(team_data["name"])
+            if team_id is not None and team_data["id"] not in known_ids:
+                self.db.execute(update(Team).where(Team.id == team_id).values(fpl_id=team_data["id"]))
+        
+        # Strength ratings (priors for the team-strength model), when the payload has them
+        strength_fields = [
+            f for f in self.TEAM_STRENGTH_FIELDS
+            if all(t.get(f) is not None for t in teams_data)
+        ]
+        rows = [
+            {
+                "fpl_id": team_data["id"],
+                "fpl_code": team_data.get("code"),
+                "name": team_data["name"],
+                "short_name": team_data.get("short_name", team_data["name"][:3]),
+                **{f: team_data[f] for f in strength_fields},
+            }
+            for team_data in teams_data
+        ]
+        result = bulk_upsert(self.db, Team, rows, index_elements=["fpl_id"])
         self.db.commit()
-        logger.info(f"Ingested {count} new teams")
-        return count
+        logger.info(f"Teams upserted: {result}")
+        return result
     
-    async def _ingest_players(self, players_data: List[Dict[str, Any]], teams_data: List[Dict[str, Any]]) -> int:
-        """Ingest players from FPL API data."""
-        # Create team lookup
-        team_lookup = {t["id"]: t for t in teams_data}
+    async def _ingest_players(self, players_data: List[Dict[str, Any]], teams_data: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert players from FPL API data (keyed on the bootstrap `code`)."""
+        team_ids = dict(self.db.query(Team.fpl_id, Team.id).filter(Team.fpl_id.isnot(None)).all())
+        
+        # Existing players by code and element id. Be defensive: older DBs sometimes
+        # stored the element id in fpl_code; those rows get their real code first.
+        existing = self.db.query(Player.id, Player.fpl_id, Player.fpl_code).all()
+        by_code = {code: pid for pid, _, code in existing if code is not None}
+        by_element = {fpl_id: pid for pid, fpl_id, _ in existing if fpl_id is not None}
         
-        count = 0
+        rows = []
         for player_data in players_data:
-            # Find team in database
-            team = self.db.query(Team).filter(Team.fpl_id == player_data["team"]).first()
-            if not team:
+            team_id = team_ids.get(player_data["team"])
+            if team_id is None:
                 logger.warning(f"Team {player_data['team']} not found for player {player_data.get('web_name')}")
                 continue
             
             element_id = player_data.get("id")
-            code = player_data.get("code")
-
-            # Check if player exists (be defensive: older DBs sometimes stored element id in fpl_code)
-            player = (
-                self.db.query(Player)
-                .filter(
-                    or_(
-                        Player.fpl_id == element_id,
-                        Player.fpl_code == code,
-                        Player.fpl_code == element_id,
-                    )
-                )
-                .first()
-            )
+            code = player_data["code"]
+            if code not in by_code:
+                legacy_id = by_element.get(element_id) or by_code.get(element_id)
+                if legacy_id is not None:
+                    self.db.execute(update(Player).where(Player.id == legacy_id).values(fpl_code=code))
+                    by_code[code] = legacy_id
             
-            position = self.fpl_api.parse_position(player_data["element_type"])
-            price = self.fpl_api.parse_price(player_data["now_cost"])
             # Calculate initial price: now_cost - cost_change_start (cost_change_start is negative if price increased)
             cost_change_start = player_data.get("cost_change_start", 0)
-            initial_price = self.fpl_api.parse_price(player_data["now_cost"] - cost_change_start)
-            
-            if not player:
-                player = Player(
-                    fpl_id=element_id,
-                    fpl_code=player_data["code"],
-                    name=f"{player_data.get('first_name', '')} {player_data.get('second_name', '')}".strip(),
-                    first_name=player_data.get("first_name"),
-                    second_name=player_data.get("second_name"),
-                    team_id=team.id,
-                    position=position,
-                    price=price,
-                    initial_price=initial_price,
-                    status=player_data.get("status", "a"),
-                    news=player_data.get("news"),
-                    news_added=self.fpl_api.parse_datetime(player_data.get("news_added")),
-                    chance_of_playing_this_round=player_data.get("chance_of_playing_this_round"),
-                    chance_of_playing_next_round=player_data.get("chance_of_playing_next_round"),
-                    element_type=player_data["element_type"],
-                    total_points=float(player_data.get("total_points", 0)),
-                    goals_scored=player_data.get("goals_scored", 0),
-                    assists=player_data.get("assists", 0),
-                    clean_sheets=player_data.get("clean_sheets", 0),
-                    goals_conceded=player_data.get("goals_conceded", 0),
-                    yellow_cards=player_data.get("yellow_cards", 0),
-                    red_cards=player_data.get("red_cards", 0),
-                    saves=player_data.get("saves", 0),
-                    bonus=player_data.get("bonus", 0),
-                    bps=player_data.get("bps", 0),
-                )
-                self.db.add(player)
-                count += 1
-            else:
-                # Update existing player
-                if element_id and not player.fpl_id:
-                    player.fpl_id = element_id
-                # Always keep fpl_code in sync with bootstrap "code"
-                if code:
-                    player.fpl_code = code
-                player.name = f"{player_data.get('first_name', '')} {player_data.get('second_name', '')}".strip()
-                player.first_name = player_data.get("first_name")
-                player.second_name = player_data.get("second_name")
-                player.price = price
-                player.status = player_data.get("status", "a")
-                player.news = player_data.get("news")
-                player.news_added = self.fpl_api.parse_datetime(player_data.get("news_added"))
-                player.chance_of_playing_this_round = player_data.get("chance_of_playing_this_round")
-                player.chance_of_playing_next_round = player_data.get("chance_of_playing_next_round")
-                player.total_points = float(player_data.get("total_points", 0))
-                player.goals_scored = player_data.get("goals_scored", 0)
-                player.assists = player_data.get("assists", 0)
-                player.clean_sheets = player_data.get("clean_sheets", 0)
-                player.goals_conceded = player_data.get("goals_conceded", 0)
-                player.yellow_cards = player_data.get("yellow_cards", 0)
-                player.red_cards = player_data.get("red_cards", 0)
-                player.saves = player_data.get("saves", 0)
-                player.bonus = player_data.get("bonus", 0)
-                player.bps = player_data.get("bps", 0)
+            rows.append({
+                "fpl_id": element_id,
+                "fpl_code": code,
+                "name": f"{player_data.get('first_name', '')} {player_data.get('second_name', '')}".strip(),
+                "first_name": player_data.get("first_name"),
+                "second_name": player_data.get("second_name"),
+                "team_id": team_id,
+                "position": self.fpl_api.parse_position(player_data["element_type"]),
+                "price": self.fpl_api.parse_price(player_data["now_cost"]),
+                "initial_price": self.fpl_api.parse_price(player_data["now_cost"] - cost_change_start),
+                "status": player_data.get("status", "a"),
+                "news": player_data.get("news"),
+                "news_added": self.fpl_api.parse_datetime(player_data.get("news_added")),
+                "chance_of_playing_this_round": player_data.get("chance_of_playing_this_round"),
+                "chance_of_playing_next_round": player_data.get("chance_of_playing_next_round"),
+                "element_type": player_data["element_type"],
+                "total_points": float(player_data.get("total_points", 0)),
+                **{f: player_data.get(f, 0) for f in self.PLAYER_STAT_FIELDS},
+            })
         
+        # Stored values double as the previous snapshot: the upsert skips unchanged
+        # players and the same maps yield the typed change events.
+        existing = load_existing(
+            self.db, Player, ["fpl_code"], ["id", *self.PLAYER_UPDATE_FIELDS],
+            keys=[(r["fpl_code"],) for r in rows],
+        )
+        written: List[tuple] = []
+        result = bulk_upsert(
+            self.db,
+            Player,
+            rows,
+            index_elements=["fpl_code"],
+            update_columns=self.PLAYER_UPDATE_FIELDS,
+            keep_existing=["fpl_id"],
+            existing=existing,
+            written=written,
+        )
+        changed_ids = self._record_player_changes(rows, existing, written)
         self.db.commit()
-        logger.info(f"Ingested {count} new players, updated existing players")
-        return count
+        self.player_changes["invalidated"] = self.change_log.invalidate(self.season, changed_ids)
+        logger.info(f"Players upserted: {result}; changes: {self.player_changes}")
+        return result
+
+    def _record_player_changes(
+        self, rows: List[Dict[str, Any]], existing: Dict[tuple, Dict[str, Any]], written: List[tuple]
+    ) -> List[int]:
+        """Write change events for the players the upsert touched; returns their player ids."""
+        rows_by_code = {r["fpl_code"]: r for r in rows}
+        new_codes = [code for (code,) in written if (code,) not in existing]
+        new_ids = {}
+        if new_codes:
+            new_ids = dict(
+                self.db.query(Player.fpl_code, Player.id).filter(Player.fpl_code.in_(new_codes)).all()
+            )
+
+        events = []
+        for key in written:
+            current = existing.get(key)
+            player_id = current["id"] if current else new_ids.get(key[0])
+            if player_id is None:
+                continue
+            for event in diff_player(current, rows_by_code[key[0]]):
+                events.append({**event, "player_id": player_id})
+        self.change_log.record(self.season, events)
+
+        by_type: Dict[str, int] = {}
+        for event in events:
+            by_type[event["change_type"]] = by_type.get(event["change_type"], 0) + 1
+        self.player_changes = {"events": len(events), "by_type": by_type}
+        return sorted({e["player_id"] for e in events})
     
     def _ingest_gameweeks(self, events_data: List[Dict[str, Any]]) -> int:
         """Ingest gameweeks (events) from FPL API data."""
@@ -200,52 +237,56 @@ class FPLIngestionService:
         # in the WeeklyScore model or create a Gameweek model if needed
         count = len(events_data)
         logger.info(f"Found {count} gameweeks in API data")
+        self.gameweeks = [
+            {
+                "gw": event["id"],
+                "deadline": self.fpl_api.parse_datetime(event.get("deadline_time")),
+                "finished": bool(event.get("finished")),
+            }
+            for event in events_data
+            if event.get("id")
+        ]
         # For now, we'll just log this. Gameweek info is used when ingesting fixtures
         return count
     
-    async def _ingest_fixtures(self, fixtures_data: List[Dict[str, Any]]) -> int:
-        """Ingest fixtures from FPL API data."""
-        count = 0
+    async def _ingest_fixtures(self, fixtures_data: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert fixtures from FPL API data (keyed on FPL fixture id)."""
+        team_ids = dict(self.db.query(Team.fpl_id, Team.id).filter(Team.fpl_id.isnot(None)).all())
+        
+        rows = []
         for fixture_data in fixtures_data:
-            # Find teams
-            team_h = self.db.query(Team).filter(Team.fpl_id == fixture_data["team_h"]).first()
-            team_a = self.db.query(Team).filter(Team.fpl_id == fixture_data["team_a"]).first()
-            
-            if not team_h or not team_a:
+            team_h_id = team_ids.get(fixture_data["team_h"])
+            team_a_id = team_ids.get(fixture_data["team_a"])
+            if not team_h_id or not team_a_id:
                 logger.warning(f"Teams not found for fixture {fixture_data.get('id')}")
                 continue
-            
-            # Check if fixture exists
-            fixture = self.db.query(Fixture).filter(
-                and_(
-                    Fixture.fpl_id == fixture_data["id"],
-                    Fixture.season == self.season
-                )
-            ).first()
-            
-            if not fixture:
-                fixture = Fixture(
-                    fpl_id=fixture_data["id"],
-                    season=self.season,
-                    gw=fixture_data.get("event", 0) or 0,
-                    team_h_id=team_h.id,
-                    team_a_id=team_a.id,
-                    kickoff_time=self.fpl_api.parse_datetime(fixture_data.get("kickoff_time")),
-                    team_h_score=fixture_data.get("team_h_score"),
-                    team_a_score=fixture_data.get("team_a_score"),
-                    finished=fixture_data.get("finished", False),
-                    team_h_difficulty=fixture_data.get("team_h_difficulty", 3),
-                    team_a_difficulty=fixture_data.get("team_a_difficulty", 3),
-                )
-                self.db.add(fixture)
-                count += 1
-            else:
-                # Update existing fixture
-                fixture.team_h_score = fixture_data.get("team_h_score")
-                fixture.team_a_score = fixture_data.get("team_a_score")
-                fixture.finished = fixture_data.get("finished", False)
+            rows.append({
+                "fpl_id": fixture_data["id"],
+                "season": self.season,
+                "gw": fixture_data.get("event", 0) or 0,
+                "team_h_id": team_h_id,
+                "team_a_id": team_a_id,
+                "kickoff_time": self.fpl_api.parse_datetime(fixture_data.get("kickoff_time")),
+                "team_h_score": fixture_data.get("team_h_score"),
+                "team_a_score": fixture_data.get("team_a_score"),
+                "finished": fixture_data.get("finished", False),
+                "team_h_difficulty": fixture_data.get("team_h_difficulty", 3),
+                "team_a_difficulty": fixture_data.get("team_a_difficulty", 3),
+            })
+        
+        update_fields = ["team_h_score", "team_a_score", "finished"]
+        existing = load_existing(
+            self.db, Fixture, ["fpl_id"], ["season", *update_fields], keys=[(r["fpl_id"],) for r in rows]
+        )
+        # fpl_id is unique across seasons; never overwrite another season's fixture
+        clashes = {key for key, row in existing.items() if row["season"] != self.season}
+        if clashes:
+            logger.warning(f"Skipping {len(clashes)} fixtures whose FPL id belongs to another season")
+            rows = [r for r in rows if (r["fpl_id"],) not in clashes]
         
+        result = bulk_upsert(
+            self.db, Fixture, rows, index_elements=["fpl_id"], update_columns=update_fields, existing=existing
+        )
         self.db.commit()
-        logger.info(f"Ingested {count} new fixtures")
-        return count
-
+        logger.info(f"Fixtures upserted: {result}")
+        return result
@@ -8,12 +8,16 @@ we ingest here.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
 from typing import Dict, Any, List, Optional
 
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.rate_limit import AsyncTokenBucket, retry_http
+from app.db.upsert import bulk_upsert
 from app.models import Player, PlayerSeasonStat
 from app.services.fpl_api import FPLAPIService
 
@@ -33,85 +37,130 @@ def _normalize_season_name(season_name: str) -> Optional[str]:
 
 
 class FPLLastNSeasonsIngestionService:
-    def __init__(self, db: Session):
+    # history_past field (same name on PlayerSeasonStat) -> type
+    SEASON_STAT_FIELDS = {
+        "total_points": int,
+        "minutes": int,
+        "goals_scored": int,
+        "assists": int,
+        "clean_sheets": int,
+        "goals_conceded": int,
+        "yellow_cards": int,
+        "red_cards": int,
+        "starts": int,
+        "bonus": int,
+        "bps": int,
+        "influence": float,
+        "creativity": float,
+        "threat": float,
+        "ict_index": float,
+    }
+    # Players whose rows are buffered before one bulk upsert + commit
+    WRITE_BATCH = 100
+
+    def __init__(self, db: Session, limiter: Optional[AsyncTokenBucket] = None):
         self.db = db
         self.fpl_api = FPLAPIService()
+        # One bucket for every concurrent fetcher, so the configured rate holds overall
+        self.limiter = limiter or AsyncTokenBucket.from_interval(settings.FPL_API_RATE_LIMIT)
 
     async def close(self) -> None:
         await self.fpl_api.close()
 
+    async def _fetch_summary(self, fpl_id: int) -> Dict[str, Any]:
+        async def call() -> Dict[str, Any]:
+            await self.limiter.acquire()
+            return await self.fpl_api.fetch_player_details(fpl_id)
+
+        return await retry_http(call, attempts=settings.FPL_API_MAX_RETRIES)
+
     async def ingest_player_season_summaries(
         self,
         seasons: List[str],
         limit_players: Optional[int] = None,
+        concurrency: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         For each player with fpl_id, fetch element-summary and ingest history_past rows
         for the requested seasons.
+
+        Up to `concurrency` element-summary requests are in flight at once, all drawing
+        from the shared rate limiter. A single consumer turns the responses into
+        PlayerSeasonStat rows and writes them in batches with `bulk_upsert`.
         """
-        q = self.db.query(Player).filter(Player.fpl_id.isnot(None))
+        q = self.db.query(Player.id, Player.fpl_id).filter(Player.fpl_id.isnot(None)).order_by(Player.id)
         if limit_players:
             q = q.limit(limit_players)
         players = q.all()
+        concurrency = max(1, concurrency or settings.FPL_API_CONCURRENCY)
 
-        created = 0
-        updated = 0
-        missing = 0
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(player_id: int, fpl_id: int) -> None:
+            async with semaphore:
+                try:
+                    payload = await self._fetch_summary(int(fpl_id))
+                except Exception as e:
+                    logger.warning(f"Failed element-summary for player {player_id} fpl_id={fpl_id}: {e}")
+                    payload = None
+            await queue.put((player_id, payload))
 
-        for p in players:
-            try:
-                payload = await self.fpl_api.fetch_player_details(int(p.fpl_id))
-            except Exception as e:
-                logger.warning(f"Failed element-summary for player {p.id} fpl_id={p.fpl_id}: {e}")
-                continue
-
-            history_past = payload.get("history_past") or []
-            for row in history_past:
-                s = _normalize_season_name(row.get("season_name"))
-                if not s or s not in seasons:
+        async def produce() -> None:
+            await asyncio.gather(*(fetch(pid, fpl_id) for pid, fpl_id in players))
+            await queue.put(None)
+
+        totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+        missing = 0
+        failed = 0
+        rows: List[Dict[str, Any]] = []
+        buffered = 0
+
+        def flush() -> None:
+            nonlocal rows, buffered
+            if rows:
+                result = bulk_upsert(self.db, PlayerSeasonStat, rows, index_elements=["player_id", "season"])
+                for k in totals:
+                    totals[k] += result[k]
+            self.db.commit()
+            rows, buffered = [], 0
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                player_id, payload = item
+                if payload is None:
+                    failed += 1
                     continue
+                in_range = 0
+                for row in payload.get("history_past") or []:
+                    s = _normalize_season_name(row.get("season_name"))
+                    if not s or s not in seasons:
+                        continue
+                    in_range += 1
+                    rows.append({
+                        "player_id": player_id,
+                        "season": s,
+                        **{f: cast(row.get(f) or 0) for f, cast in self.SEASON_STAT_FIELDS.items()},
+                    })
+                # If a player has no history_past entries in our range, count as missing for visibility.
+                if not in_range:
+                    missing += 1
+                buffered += 1
+                if buffered >= self.WRITE_BATCH:
+                    flush()
+            flush()
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
 
-                stat = (
-                    self.db.query(PlayerSeasonStat)
-                    .filter(PlayerSeasonStat.player_id == p.id)
-                    .filter(PlayerSeasonStat.season == s)
-                    .first()
-                )
-                if not stat:
-                    stat = PlayerSeasonStat(player_id=p.id, season=s)
-                    self.db.add(stat)
-                    created += 1
-                else:
-                    updated += 1
-
-                stat.total_points = int(row.get("total_points") or 0)
-                stat.minutes = int(row.get("minutes") or 0)
-                stat.goals_scored = int(row.get("goals_scored") or 0)
-                stat.assists = int(row.get("assists") or 0)
-                stat.clean_sheets = int(row.get("clean_sheets") or 0)
-                stat.goals_conceded = int(row.get("goals_conceded") or 0)
-                stat.yellow_cards = int(row.get("yellow_cards") or 0)
-                stat.red_cards = int(row.get("red_cards") or 0)
-                stat.starts = int(row.get("starts") or 0)
-                stat.bonus = int(row.get("bonus") or 0)
-                stat.bps = int(row.get("bps") or 0)
-                stat.influence = float(row.get("influence") or 0.0)
-                stat.creativity = float(row.get("creativity") or 0.0)
-                stat.threat = float(row.get("threat") or 0.0)
-                stat.ict_index = float(row.get("ict_index") or 0.0)
-
-            # If a player has no history_past entries in our range, count as missing for visibility.
-            if not any(_normalize_season_name(r.get("season_name")) in seasons for r in history_past):
-                missing += 1
-
-        self.db.commit()
         return {
             "players_processed": len(players),
-            "stats_created": created,
-            "stats_updated": updated,
+            "players_failed": failed,
+            "stats_created": totals["inserted"],
+            "stats_updated": totals["updated"],
+            "stats_unchanged": totals["unchanged"],
             "players_missing_history_in_range": missing,
             "seasons": seasons,
+            "rate_limiter": self.limiter.stats(),
         }
-
-
-
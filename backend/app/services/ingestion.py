@@ -1,24 +1,59 @@
 """
 Data ingestion service for FPL data.
 Enhanced with validation and error handling.
+
+Weekly-score CSVs are parsed in chunks. For each chunk:
+- names are resolved to player ids once per distinct name, through `PlayerNameIndex`;
+- numeric columns are coerced column-wise;
+- rows are written with one `bulk_upsert` on (player_id, season, gw), split only when
+  rows differ in which optional xG/xA cells are filled.
+Unmatched names and unparseable rows are reported in aggregate, not per row.
 """
 from __future__ import annotations
 import io
-import pandas as pd
-from typing import Any, Dict
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Tuple
 from sqlalchemy.orm import Session
 
-from app.models import Player, WeeklyScore
+from app.core.lazy_imports import lazy_import
+from app.db.upsert import bulk_upsert
+from app.models import WeeklyScore
+from app.services.name_index import PlayerNameIndex
+
+# Imported on first CSV ingest rather than at app startup
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
 
 
 class DataIngestionService:
     """Handles data ingestion from CSVs (weekly scores)."""
-    
+
     REQUIRED_COLUMNS = ["Name", "GW", "Points", "Minutes"]
-    
+    # CSV column -> (WeeklyScore column, cast); missing columns are written as 0
+    CSV_FIELDS = {
+        "Points": ("points", float),
+        "Minutes": ("minutes", int),
+        "Goals": ("goals_scored", int),
+        "Assists": ("assists", int),
+        "Clean Sheets": ("clean_sheets", int),
+        "Goals Conceded": ("goals_conceded", int),
+        "Yellow Cards": ("yellow_cards", int),
+        "Red Cards": ("red_cards", int),
+        "Saves": ("saves", int),
+        "Bonus": ("bonus", int),
+    }
+    # Written only where the cell has a value, so blanks keep the stored figure
+    OPTIONAL_FIELDS = {
+        "xG": "expected_goals",
+        "xA": "expected_assists",
+    }
+    CHUNK_ROWS = 5000
+
     def __init__(self, db: Session):
         self.db = db
-    
+
     async def ingest_weekly_scores(
         self,
         season: str,
@@ -26,94 +61,104 @@ class DataIngestionService:
         csv_file,
     ) -> Dict[str, Any]:
         """Ingest weekly scores from CSV with validation."""
-        errors = []
+        errors: List[str] = []
         ingested_count = 0
-        
+        unmatched: Counter = Counter()
+        upserts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        touched: Dict[int, List[int]] = {}  # gw -> player ids written
+
         try:
-            # Read CSV
-            content = await csv_file.read()
-            csv_text = content.decode("utf-8")
-            
-            # Parse CSV
-            df = pd.read_csv(io.StringIO(csv_text))
-            
-            # Validate columns
-            missing_cols = set(self.REQUIRED_COLUMNS) - set(df.columns)
-            if missing_cols:
-                raise ValueError(f"Missing required columns: {missing_cols}")
-            
-            # Process each row
-            for _, row in df.iterrows():
-                try:
-                    player_name = row.get("Name") or row.get("name")
-                    if not player_name or pd.isna(player_name):
-                        continue
-                    
-                    # Find player
-                    player = self.db.query(Player).filter(
-                        Player.name.ilike(f"%{player_name}%")
-                    ).first()
-                    
-                    if not player:
-                        errors.append(f"Player not found: {player_name}")
+            # Uploads spool to a temp file; parse it in place rather than reading it whole
+            source = getattr(csv_file, "file", None)
+            if source is not None:
+                source.seek(0)
+            else:
+                source = io.BytesIO(await csv_file.read())
+
+            index = PlayerNameIndex(self.db)
+            resolved: Dict[Tuple[str, Any], Any] = {}
+            chunks = 0
+
+            for chunk in pd.read_csv(source, chunksize=self.CHUNK_ROWS, encoding="utf-8"):
+                missing_cols = set(self.REQUIRED_COLUMNS) - set(chunk.columns)
+                if missing_cols:
+                    raise ValueError(f"Missing required columns: {missing_cols}")
+                chunks += 1
+
+                chunk = chunk[chunk["Name"].notna()]
+                names = chunk["Name"].astype(str).str.strip()
+                if "Team" in chunk.columns:
+                    teams = chunk["Team"].astype(object)
+                else:
+                    teams = pd.Series(None, index=chunk.index, dtype=object)
+                pairs = list(zip(names, teams.where(teams.notna(), None)))
+                # Resolve each distinct (name, team) pair once across the whole upload
+                for pair in set(pairs):
+                    if pair not in resolved:
+                        resolved[pair] = index.match(pair[0], team=pair[1])
+                player_ids = pd.Series([resolved[pair] for pair in pairs], index=chunk.index, dtype=object)
+                unmatched.update(names[player_ids.isna()])
+
+                frame = pd.DataFrame({"player_id": player_ids, "season": season})
+                frame["gw"] = pd.to_numeric(chunk["GW"], errors="coerce").fillna(gameweek)
+                valid = player_ids.notna()
+                for col, (field, cast) in self.CSV_FIELDS.items():
+                    if col not in chunk.columns:
+                        frame[field] = cast(0)
                         continue
-                    
-                    # Parse gameweek
-                    gw = int(row.get("GW", gameweek))
-                    
-                    # Create or update WeeklyScore
-                    ws = (
-                        self.db.query(WeeklyScore)
-                        .filter(WeeklyScore.player_id == player.id)
-                        .filter(WeeklyScore.season == season)
-                        .filter(WeeklyScore.gw == gw)
-                        .first()
-                    )
-                    
-                    if not ws:
-                        ws = WeeklyScore(
-                            player_id=player.id,
-                            season=season,
-                            gw=gw,
-                        )
-                        self.db.add(ws)
-                    
-                    # Update fields
-                    ws.points = float(row.get("Points", 0) or 0)
-                    ws.minutes = int(row.get("Minutes", 0) or 0)
-                    ws.goals_scored = int(row.get("Goals", 0) or 0)
-                    ws.assists = int(row.get("Assists", 0) or 0)
-                    ws.clean_sheets = int(row.get("Clean Sheets", 0) or 0)
-                    ws.goals_conceded = int(row.get("Goals Conceded", 0) or 0)
-                    ws.yellow_cards = int(row.get("Yellow Cards", 0) or 0)
-                    ws.red_cards = int(row.get("Red Cards", 0) or 0)
-                    ws.saves = int(row.get("Saves", 0) or 0)
-                    ws.bonus = int(row.get("Bonus", 0) or 0)
-                    
-                    # Expected metrics if available
-                    if "xG" in row and not pd.isna(row["xG"]):
-                        ws.expected_goals = float(row["xG"])
-                    if "xA" in row and not pd.isna(row["xA"]):
-                        ws.expected_assists = float(row["xA"])
-                    
-                    ingested_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Error processing row: {str(e)}")
+                    values = pd.to_numeric(chunk[col], errors="coerce")
+                    # A non-blank cell that is not a number invalidates the row
+                    valid &= values.notna() | chunk[col].isna()
+                    frame[field] = values.fillna(0).astype(cast)
+                optional = [c for c in self.OPTIONAL_FIELDS if c in chunk.columns]
+                for col in optional:
+                    frame[self.OPTIONAL_FIELDS[col]] = pd.to_numeric(chunk[col], errors="coerce")
+
+                invalid = int((player_ids.notna() & ~valid).sum())
+                if invalid:
+                    errors.append(f"{invalid} rows with non-numeric values skipped")
+                frame = frame[valid]
+                if frame.empty:
                     continue
-            
+                frame["player_id"] = frame["player_id"].astype(int)
+                frame["gw"] = frame["gw"].astype(int)
+
+                # Rows differ in which optional stats they carry; one upsert per combination
+                optional_fields = [self.OPTIONAL_FIELDS[c] for c in optional]
+                combo = pd.Series(0, index=frame.index)
+                for bit, field in enumerate(optional_fields):
+                    combo += frame[field].notna().astype(int) * (1 << bit)
+                for code in combo.unique():
+                    drop = [field for bit, field in enumerate(optional_fields) if not (code >> bit) & 1]
+                    rows = frame[combo == code].drop(columns=drop).to_dict("records")
+                    written: List[tuple] = []
+                    result = bulk_upsert(
+                        self.db, WeeklyScore, rows, index_elements=["player_id", "season", "gw"], written=written
+                    )
+                    for key in upserts:
+                        upserts[key] += result[key]
+                    for player_id, _, gw in written:
+                        touched.setdefault(gw, []).append(player_id)
+                ingested_count += len(frame)
+
             # Commit changes
             self.db.commit()
-            
+            self._refresh_feature_store(season, touched)
+
+            errors = [f"Player not found: {name} ({n} rows)" for name, n in unmatched.most_common()] + errors
             return {
                 "status": "success",
                 "season": season,
                 "gameweek": gameweek,
                 "ingested_count": ingested_count,
+                "upserts": upserts,
+                "chunks": chunks,
+                "unmatched_names": len(unmatched),
+                "unmatched_rows": sum(unmatched.values()),
                 "errors": errors[:10],  # Limit error output
                 "error_count": len(errors),
             }
-            
+
         except Exception as e:
             self.db.rollback()
             return {
@@ -121,3 +166,16 @@ class DataIngestionService:
                 "message": str(e),
                 "ingested_count": ingested_count,
             }
+
+    def _refresh_feature_store(self, season: str, touched: Dict[int, List[int]]) -> None:
+        """Recompute next-GW feature rows for every (gw, players) written."""
+        try:
+            from app.services.ml.feature_store import FeatureStore
+
+            store = FeatureStore(self.db)
+            for gw in sorted(touched):
+                store.on_gameweek_ingested(season, gw, touched[gw])
+        except Exception as e:
+            # Feature rows are rebuilt lazily on read if this fails.
+            logger.warning(f"Feature store refresh failed for {season}: {e}")
+            self.db.rollback()
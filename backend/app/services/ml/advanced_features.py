@@ -3,30 +3,25 @@ Advanced feature engineering for ML-based player points prediction.
 Multi-dimensional features for neural network input.
 """
 from __future__ import annotations
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from datetime import datetime, timedelta
 
-# Make numpy/pandas optional for Vercel deployment
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    pd = None  # type: ignore
-
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    NUMPY_AVAILABLE = False
-    np = None  # type: ignore
+# numpy/pandas are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, module_available
+
+pd = lazy_import("pandas")
+PANDAS_AVAILABLE = module_available("pandas")
+np = lazy_import("numpy")
+NUMPY_AVAILABLE = module_available("numpy")
 
 from app.models import Player, WeeklyScore
 from app.models.fixture import Fixture, Team
 from app.models.scoring import ScoreObject
 from app.core.logging import logger
+from app.services.availability_index import AvailabilityIndex
+from app.services.ml.team_strength import StrengthMatrix, TeamStrengthModel, fixture_window_features
 
 
 class AdvancedFeatureBuilder:
@@ -43,11 +38,35 @@ class AdvancedFeatureBuilder:
     """
     
     POSITION_MAP = {"GK": 0, "DEF": 1, "MID": 2, "FWD": 3}
+    # Number of most recent gameweeks of history used per player
+    HISTORY_WINDOW = 15
+    # Bound IN-lists so large player pools stay under driver parameter limits
+    PREFETCH_CHUNK = 500
+    # Season aggregate -> WeeklyScore column summed for it
+    SEASON_TOTALS = {
+        "season_total_points": WeeklyScore.points,
+        "season_goals": WeeklyScore.goals_scored,
+        "season_assists": WeeklyScore.assists,
+        "season_clean_sheets": WeeklyScore.clean_sheets,
+        "season_bonus": WeeklyScore.bonus,
+        "season_xg": WeeklyScore.expected_goals,
+        "season_xa": WeeklyScore.expected_assists,
+    }
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, point_in_time: bool = False):
+        """
+        Args:
+            db: Database session
+            point_in_time: Mask Player fields that reflect *today's* state (price,
+                status, news, season totals, ...) so features for a past gameweek only
+                use information available before it. Used by backtests.
+        """
         self.db = db
+        self.point_in_time = point_in_time
         self._team_cache: Dict[int, Team] = {}
         self._fixture_cache: Dict[str, List[Fixture]] = {}
+        self._strength_matrix: Optional[StrengthMatrix] = None
+        self._availability: Dict[int, Dict[str, Any]] = {}
     
     def build_features(
         self,
@@ -68,166 +87,270 @@ class AdvancedFeatureBuilder:
         Returns:
             DataFrame with feature columns for each player
         """
-        features_list = []
-        
-        # Pre-fetch data for efficiency
-        self._load_team_cache()
-        self._load_fixture_cache(season, gameweek, horizon)
-        
+        history_features = self.build_history_features(player_ids, season, gameweek)
+        return self.assemble_features(player_ids, history_features, season, gameweek, horizon)
+
+    def build_history_features(
+        self,
+        player_ids: List[int],
+        season: str,
+        gameweek: int,
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Build the fixture-independent features (season, form, historical, fitness,
+        context) for each player, using only history before `gameweek`.
+
+        Combines `build_stored_features` with the current-state overlay from
+        `apply_current_state`.
+        """
+        stored = self.build_stored_features(player_ids, season, gameweek)
+        return self.apply_current_state(player_ids, stored)
+
+    def build_stored_features(
+        self,
+        player_ids: List[int],
+        season: str,
+        gameweek: int,
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Build the features derived from weekly-score history before `gameweek`
+        (season, form, historical, minutes). This is the payload persisted by the
+        feature store.
+
+        Players and their weekly scores are prefetched in bulk rather than queried
+        per player.
+        """
+        players = self._prefetch_players(player_ids)
+        history_by_player = self._prefetch_history(list(players.keys()), season, gameweek)
+        totals_by_player = self._prefetch_season_totals(list(players.keys()), season, gameweek)
+
+        out: Dict[int, Dict[str, float]] = {}
         for player_id in player_ids:
+            player = players.get(player_id)
+            if not player:
+                continue
             try:
-                features = self._build_player_features(player_id, season, gameweek, horizon)
-                if features:
-                    features_list.append(features)
+                out[player_id] = self._build_player_stored_features(
+                    player, history_by_player.get(player_id, []), totals_by_player.get(player_id, {})
+                )
             except Exception as e:
                 logger.warning(f"Failed to build features for player {player_id}: {e}")
                 continue
-        
-        if not features_list:
-            if PANDAS_AVAILABLE:
-                return pd.DataFrame()
-            return []  # Return empty list if pandas not available
-        
-        if not PANDAS_AVAILABLE:
-            # Return list of dicts instead of DataFrame
-            return features_list
-        
-        df = pd.DataFrame(features_list)
-        
-        # Fill NaN with sensible defaults
-        df = df.fillna(0.0)
-        
-        return df
+        return out
+
+    def apply_current_state(
+        self,
+        player_ids: List[int],
+        stored: Dict[int, Dict[str, float]],
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Overlay features read from the Player row as it is now (status, news,
+        chance of playing, price, ownership, FPL form, ...) and the lineup-based
+        availability index onto `stored` rows. Returns new dicts.
+        """
+        ids = [pid for pid in player_ids if pid in stored]
+        players = self._prefetch_players(ids)
+        self._availability = self._prefetch_availability(list(players.keys()))
+
+        out: Dict[int, Dict[str, float]] = {}
+        for player_id in ids:
+            player = players.get(player_id)
+            if not player:
+                continue
+            features = dict(stored[player_id])
+            features.update(self._build_player_current_features(player, features))
+            out[player_id] = features
+        return out
+
+    def assemble_features(
+        self,
+        player_ids: List[int],
+        history_features: Dict[int, Dict[str, float]],
+        season: str,
+        gameweek: int,
+        horizon: int = 1,
+    ) -> Any:
+        """
+        Combine per-player history features with fixture features for the
+        `[gameweek, gameweek + horizon)` window into the final feature matrix.
+        """
+        return self.assemble_horizons(player_ids, history_features, season, gameweek, [horizon])[horizon]
+
+    def assemble_horizons(
+        self,
+        player_ids: List[int],
+        history_features: Dict[int, Dict[str, float]],
+        season: str,
+        gameweek: int,
+        horizons: Sequence[int],
+    ) -> Dict[int, Any]:
+        """
+        Feature matrices for several horizons from one set of history features.
+
+        Fixtures are loaded once for the longest window; each horizon only re-slices
+        the per-team fixture lists, so only the fixture columns differ between frames.
+        Fixture features are computed once per (team, horizon) and shared by that
+        team's players.
+
+        Returns:
+            horizon -> feature matrix (as `assemble_features`)
+        """
+        horizons = sorted(set(int(h) for h in horizons))
+
+        # Pre-fetch data for efficiency
+        self._load_team_cache()
+        self._load_fixture_cache(season, gameweek, max(horizons))
+        self._load_strength_matrix(season, gameweek)
+
+        team_fixture_features: Dict[Tuple[int, int], Dict[str, float]] = {}
+        features_by_horizon: Dict[int, List[Dict[str, Any]]] = {h: [] for h in horizons}
+        for player_id in player_ids:
+            base = history_features.get(player_id)
+            if base is None:
+                continue
+            team_id = int(base.get("team_id") or 0)
+            for h in horizons:
+                fixture_features = team_fixture_features.get((team_id, h))
+                if fixture_features is None:
+                    fixture_features = self._fixture_features(team_id, season, gameweek, h)
+                    team_fixture_features[(team_id, h)] = fixture_features
+                features = {"player_id": player_id, **base}
+                features.update(fixture_features)
+                features_by_horizon[h].append(features)
+
+        frames: Dict[int, Any] = {}
+        for h, features_list in features_by_horizon.items():
+            if not features_list:
+                frames[h] = pd.DataFrame() if PANDAS_AVAILABLE else []
+            elif not PANDAS_AVAILABLE:
+                # Return list of dicts instead of DataFrame
+                frames[h] = features_list
+            else:
+                # Fill NaN with sensible defaults
+                frames[h] = pd.DataFrame(features_list).fillna(0.0)
+        return frames
     
-    def _build_player_features(
-        self, player_id: int, season: str, gameweek: int, horizon: int
-    ) -> Optional[Dict[str, Any]]:
-        """Build all features for a single player."""
-        player = self.db.query(Player).filter(Player.id == player_id).first()
-        if not player:
-            return None
-        
-        # Get historical weekly scores
-        historical = (
-            self.db.query(WeeklyScore)
-            .filter(
-                WeeklyScore.player_id == player_id,
-                WeeklyScore.season == season,
-                WeeklyScore.gw < gameweek,
-            )
-            .order_by(WeeklyScore.gw.desc())
-            .limit(15)  # Get more history for trend analysis
-            .all()
-        )
-        
-        features = {"player_id": player_id}
+    def _build_player_stored_features(
+        self, player: Player, historical: List[WeeklyScore], totals: Dict[str, float]
+    ) -> Dict[str, float]:
+        """Build the history-derived features for a single player."""
+        features: Dict[str, float] = {}
+        if self.point_in_time:
+            player = PointInTimePlayer(player)
         
         # 1. Season Performance Features
-        features.update(self._season_performance_features(player, historical))
+        features.update(self._season_performance_features(totals))
         
         # 2. Form Features (recent trends)
         features.update(self._form_features(historical))
         
-        # 3. Fixture Difficulty Features
-        features.update(self._fixture_features(player, season, gameweek, horizon))
-        
-        # 4. Historical/Pattern Features
+        # 3. Historical/Pattern Features
         features.update(self._historical_features(player, historical))
         
-        # 5. Fitness/Availability Features
-        features.update(self._fitness_features(player, historical))
-        
-        # 6. Contextual Features
-        features.update(self._context_features(player))
+        # 4. Playing-time history
+        features.update(self._minutes_features(historical))
         
         return features
-    
-    def _season_performance_features(
-        self, player: Player, historical: List[WeeklyScore]
+
+    def _build_player_current_features(
+        self, player: Player, stored: Dict[str, float]
     ) -> Dict[str, float]:
-        """Season-level performance aggregates."""
-        features = {}
+        """Build the current-state features for a single player."""
+        features: Dict[str, float] = {}
+        if self.point_in_time:
+            player = PointInTimePlayer(player)
         
-        # Total season stats from player model
-        # Use getattr to safely access attributes that might not exist
-        features["season_total_points"] = float(getattr(player, 'total_points', 0) or 0)
-        features["season_goals"] = float(getattr(player, 'goals_scored', 0) or 0)
-        features["season_assists"] = float(getattr(player, 'assists', 0) or 0)
-        features["season_clean_sheets"] = float(getattr(player, 'clean_sheets', 0) or 0)
-        features["season_bonus"] = float(getattr(player, 'bonus', 0) or 0)
-        
-        # Also try to get from historical if player model lacks data
-        if features["season_total_points"] == 0 and historical:
-            features["season_total_points"] = sum(
-                getattr(ws, 'points', 0) or 0 for ws in historical
-            )
-        if features["season_goals"] == 0 and historical:
-            features["season_goals"] = sum(
-                getattr(ws, 'goals_scored', 0) or getattr(ws, 'goals', 0) or 0 
-                for ws in historical
-            )
-        if features["season_assists"] == 0 and historical:
-            features["season_assists"] = sum(
-                getattr(ws, 'assists', 0) or 0 for ws in historical
-            )
+        # 4. Fitness/Availability Features
+        features.update(self._fitness_features(player))
+        features.update(self._availability_features({**stored, **features}, self._availability.get(player.id)))
         
-        # Games played - count historical entries OR estimate from player data
-        if historical:
-            games_played = len(historical)
-        else:
-            # Estimate games from FPL form string length or default
-            form_str = getattr(player, 'form', None)
-            if form_str and isinstance(form_str, (int, float)):
-                games_played = 5  # Form is typically last 5 games
-            else:
-                games_played = max(1, features["season_total_points"] // 4)  # Rough estimate
-        
-        features["games_played"] = float(max(games_played, 1))
-        
-        # Points per game
-        features["points_per_game"] = features["season_total_points"] / max(games_played, 1)
-        
-        # Goals per game
-        features["goals_per_game"] = features["season_goals"] / max(games_played, 1)
-        
-        # Assists per game
-        features["assists_per_game"] = features["season_assists"] / max(games_played, 1)
+        # 5. Contextual Features
+        features.update(self._context_features(player))
         
-        # Contributions (goals + assists) per game
+        return features
+
+    def _prefetch_players(self, player_ids: List[int]) -> Dict[int, Player]:
+        """Load all requested players in bulk."""
+        players: Dict[int, Player] = {}
+        for chunk in chunked(player_ids, self.PREFETCH_CHUNK):
+            for p in self.db.query(Player).filter(Player.id.in_(chunk)).all():
+                players[p.id] = p
+        return players
+
+    def _prefetch_history(
+        self, player_ids: List[int], season: str, gameweek: int
+    ) -> Dict[int, List[WeeklyScore]]:
+        """
+        Load the last HISTORY_WINDOW weekly scores before `gameweek` for every
+        player, most recent first.
+        """
+        history: Dict[int, List[WeeklyScore]] = {}
+        for chunk in chunked(player_ids, self.PREFETCH_CHUNK):
+            rows = (
+                self.db.query(WeeklyScore)
+                .filter(
+                    WeeklyScore.player_id.in_(chunk),
+                    WeeklyScore.season == season,
+                    WeeklyScore.gw < gameweek,
+                )
+                .order_by(WeeklyScore.player_id, WeeklyScore.gw.desc())
+                .all()
+            )
+            for ws in rows:
+                bucket = history.setdefault(ws.player_id, [])
+                if len(bucket) < self.HISTORY_WINDOW:
+                    bucket.append(ws)
+        return history
+
+    def _prefetch_season_totals(
+        self, player_ids: List[int], season: str, gameweek: int
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Sum every weekly score of `season` before `gameweek` per player (the whole
+        season so far, not just HISTORY_WINDOW), plus the number of games.
+        """
+        names = list(self.SEASON_TOTALS)
+        totals: Dict[int, Dict[str, float]] = {}
+        for chunk in chunked(player_ids, self.PREFETCH_CHUNK):
+            rows = (
+                self.db.query(
+                    WeeklyScore.player_id,
+                    func.count(WeeklyScore.id),
+                    *[func.coalesce(func.sum(col), 0) for col in self.SEASON_TOTALS.values()],
+                )
+                .filter(
+                    WeeklyScore.player_id.in_(chunk),
+                    WeeklyScore.season == season,
+                    WeeklyScore.gw < gameweek,
+                )
+                .group_by(WeeklyScore.player_id)
+                .all()
+            )
+            for player_id, games, *sums in rows:
+                totals[player_id] = {"games_played": float(games), **dict(zip(names, map(float, sums)))}
+        return totals
+    
+    def _season_performance_features(self, totals: Dict[str, float]) -> Dict[str, float]:
+        """Season-level performance aggregates from the season's weekly scores so far."""
+        features = {name: float(totals.get(name, 0.0)) for name in self.SEASON_TOTALS}
+        games_played = max(totals.get("games_played", 0.0), 1.0)
+        features["games_played"] = games_played
+        
+        # Per-game rates
+        features["points_per_game"] = features["season_total_points"] / games_played
+        features["goals_per_game"] = features["season_goals"] / games_played
+        features["assists_per_game"] = features["season_assists"] / games_played
         features["contributions_per_game"] = (
             features["goals_per_game"] + features["assists_per_game"]
         )
-        
         # Clean sheet rate (for defenders/GKs)
-        features["clean_sheet_rate"] = features["season_clean_sheets"] / max(games_played, 1)
-        
-        # Bonus point rate
-        features["bonus_rate"] = features["season_bonus"] / max(games_played, 1)
+        features["clean_sheet_rate"] = features["season_clean_sheets"] / games_played
+        features["bonus_rate"] = features["season_bonus"] / games_played
+        features["xg_per_game"] = features["season_xg"] / games_played
+        features["xa_per_game"] = features["season_xa"] / games_played
         
-        # xG and xA aggregates from weekly scores
-        # Handle both possible attribute names (xg vs expected_goals)
-        if historical:
-            total_xg = sum(
-                getattr(ws, 'xg', None) or getattr(ws, 'expected_goals', None) or 0 
-                for ws in historical
-            )
-            total_xa = sum(
-                getattr(ws, 'xa', None) or getattr(ws, 'expected_assists', None) or 0 
-                for ws in historical
-            )
-            features["season_xg"] = total_xg
-            features["season_xa"] = total_xa
-            features["xg_per_game"] = total_xg / max(len(historical), 1)
-            features["xa_per_game"] = total_xa / max(len(historical), 1)
-            
-            # xG overperformance (goals vs xG)
-            features["xg_overperformance"] = features["season_goals"] - total_xg
-        else:
-            features["season_xg"] = 0.0
-            features["season_xa"] = 0.0
-            features["xg_per_game"] = 0.0
-            features["xa_per_game"] = 0.0
-            features["xg_overperformance"] = 0.0
+        # xG overperformance (goals vs xG)
+        features["xg_overperformance"] = features["season_goals"] - features["season_xg"]
         
         return features
     
@@ -297,32 +420,36 @@ class AdvancedFeatureBuilder:
         return features
     
     def _fixture_features(
-        self, player: Player, season: str, gameweek: int, horizon: int
+        self, team_id: int, season: str, gameweek: int, horizon: int
     ) -> Dict[str, float]:
-        """Upcoming fixture difficulty features."""
-        features = {}
+        """Upcoming fixture difficulty and team-strength (xG / clean sheet) features."""
+        features = fixture_window_features(self._strength_matrix, team_id, [])
         
-        if not player.team_id:
-            return {
+        if not team_id:
+            features.update({
                 "fixture_difficulty_1": 3.0, "fixture_difficulty_avg": 3.0,
                 "is_home_1": 0.5, "home_games_pct": 0.5,
                 "opponent_strength": 0.5, "easy_fixtures_count": 0.0,
-            }
+            })
+            return features
         
         # Get upcoming fixtures for this team
-        team_fixtures = self._fixture_cache.get(f"{player.team_id}_{season}", [])
+        team_fixtures = self._fixture_cache.get(f"{team_id}_{season}", [])
         upcoming = [f for f in team_fixtures if gameweek <= f.gw < gameweek + horizon]
         
         if not upcoming:
-            return {
+            features.update({
                 "fixture_difficulty_1": 3.0, "fixture_difficulty_avg": 3.0,
                 "is_home_1": 0.5, "home_games_pct": 0.5,
                 "opponent_strength": 0.5, "easy_fixtures_count": 0.0,
-            }
+            })
+            return features
+        
+        features.update(fixture_window_features(self._strength_matrix, team_id, upcoming))
         
         # First fixture difficulty
         first_fixture = upcoming[0]
-        if first_fixture.team_h_id == player.team_id:
+        if first_fixture.team_h_id == team_id:
             features["fixture_difficulty_1"] = float(first_fixture.team_h_difficulty or 3)
             features["is_home_1"] = 1.0
         else:
@@ -333,7 +460,7 @@ class AdvancedFeatureBuilder:
         difficulties = []
         home_count = 0
         for fix in upcoming:
-            if fix.team_h_id == player.team_id:
+            if fix.team_h_id == team_id:
                 difficulties.append(fix.team_h_difficulty or 3)
                 home_count += 1
             else:
@@ -382,21 +509,50 @@ class AdvancedFeatureBuilder:
         
         return features
     
-    def _fitness_features(
-        self, player: Player, historical: List[WeeklyScore]
+    def _prefetch_availability(self, player_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Expected-minutes index rows (PremierLeague.com lineups) for `player_ids`.
+
+        The index reflects the latest lineups rather than those before the target
+        gameweek, so it is skipped for point-in-time builds.
+        """
+        if self.point_in_time or not player_ids:
+            return {}
+        try:
+            return AvailabilityIndex(self.db).for_fpl_players(player_ids)
+        except Exception as e:
+            logger.warning(f"Availability index unavailable: {e}")
+            return {}
+
+    def _availability_features(
+        self, fitness: Dict[str, float], availability: Optional[Dict[str, Any]]
     ) -> Dict[str, float]:
-        """Injury and fitness likelihood features."""
-        features = {}
-        
-        # FPL API chance of playing
-        features["chance_playing_this"] = float(player.chance_of_playing_this_round or 100) / 100.0
-        features["chance_playing_next"] = float(player.chance_of_playing_next_round or 100) / 100.0
-        
-        # Status encoding (a=available, d=doubtful, i=injured, s=suspended, u=unavailable)
-        status_risk = {
-            "a": 0.0, "d": 0.3, "i": 0.8, "s": 0.9, "u": 1.0, None: 0.0, "": 0.0
+        """
+        Lineup-based availability features; falls back to the FPL minutes history
+        when the player has no index row.
+        """
+        if not availability or not availability.get("window_matches"):
+            started = fitness.get("started_recently", 1.0)
+            return {
+                "start_rate": started,
+                "expected_minutes": fitness.get("recent_minutes_avg", 90.0),
+                "p_complete_90": started * 0.5,
+                "start_streak": 0.0,
+            }
+        chance = fitness.get("chance_playing_this", 1.0)
+        return {
+            # Lineups are a better recent-minutes signal than FPL history
+            "recent_minutes_avg": float(availability["avg_minutes"]),
+            "started_recently": float(availability["start_rate"]),
+            "start_rate": float(availability["start_rate"]),
+            "expected_minutes": float(availability["expected_minutes"]) * chance,
+            "p_complete_90": float(availability["p_complete_90"]) * chance,
+            "start_streak": float(availability["start_streak"]),
         }
-        features["injury_risk"] = status_risk.get(player.status, 0.5)
+
+    def _minutes_features(self, historical: List[WeeklyScore]) -> Dict[str, float]:
+        """Recent playing-time features from the weekly history."""
+        features = {}
         
         # Recent playing time trend (are they playing regularly?)
         if historical:
@@ -412,6 +568,22 @@ class AdvancedFeatureBuilder:
             features["started_recently"] = 1.0
             features["missed_games_recent"] = 0.0
         
+        return features
+
+    def _fitness_features(self, player: Player) -> Dict[str, float]:
+        """Injury and fitness likelihood features."""
+        features = {}
+        
+        # FPL API chance of playing
+        features["chance_playing_this"] = float(player.chance_of_playing_this_round or 100) / 100.0
+        features["chance_playing_next"] = float(player.chance_of_playing_next_round or 100) / 100.0
+        
+        # Status encoding (a=available, d=doubtful, i=injured, s=suspended, u=unavailable)
+        status_risk = {
+            "a": 0.0, "d": 0.3, "i": 0.8, "s": 0.9, "u": 1.0, None: 0.0, "": 0.0
+        }
+        features["injury_risk"] = status_risk.get(player.status, 0.5)
+        
         # Days since news (if available)
         if player.news_added:
             days_since_news = (datetime.utcnow() - player.news_added).days
@@ -481,8 +653,19 @@ class AdvancedFeatureBuilder:
             teams = self.db.query(Team).all()
             self._team_cache = {t.id: t for t in teams}
     
+    def _load_strength_matrix(self, season: str, gameweek: int):
+        """Team-strength matrix for the gameweek (cached per process by the model)."""
+        try:
+            model = TeamStrengthModel(self.db, use_priors=not self.point_in_time)
+            self._strength_matrix = model.matrix(season, gameweek)
+        except Exception as e:
+            logger.warning(f"Team strength model unavailable for {season} GW{gameweek}: {e}")
+            self._strength_matrix = None
+
     def _load_fixture_cache(self, season: str, start_gw: int, horizon: int):
         """Load fixtures into cache for efficiency."""
+        # Rebuild per window so a reused builder never mixes windows.
+        self._fixture_cache = {}
         fixtures = (
             self.db.query(Fixture)
             .filter(Fixture.season == season)
@@ -505,6 +688,35 @@ class AdvancedFeatureBuilder:
             self._fixture_cache[key_a].append(fix)
 
 
+class PointInTimePlayer:
+    """
+    Read-only view of a Player with current-state fields masked.
+
+    Season totals read as zero (stored features sum the time-filtered weekly history
+    instead), availability reads as fully fit, and price is the season's initial price.
+    """
+
+    MASKED = {
+        "total_points": 0, "goals_scored": 0, "assists": 0, "clean_sheets": 0,
+        "bonus": 0, "bps": 0, "form": None, "ict_index": 0, "influence": 0,
+        "creativity": 0, "threat": 0, "selected_by_percent": 0,
+        "status": "a", "news": None, "news_added": None,
+        "chance_of_playing_this_round": None, "chance_of_playing_next_round": None,
+    }
+
+    def __init__(self, player: Player):
+        self._player = player
+
+    @property
+    def price(self) -> float:
+        return self._player.initial_price or self._player.price
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self.MASKED:
+            return self.MASKED[name]
+        return getattr(self._player, name)
+
+
 def get_feature_columns() -> Tuple[List[str], List[str]]:
     """
     Get list of feature column names for the neural network.
@@ -529,6 +741,9 @@ def get_feature_columns() -> Tuple[List[str], List[str]]:
         "fixture_difficulty_1", "fixture_difficulty_avg",
         "is_home_1", "home_games_pct",
         "opponent_strength", "easy_fixtures_count",
+        "team_xg_1", "team_xga_1", "clean_sheet_prob_1",
+        "team_xg_avg", "clean_sheet_prob_avg",
+        "attack_fixture_index_1", "defence_fixture_index_1",
         # Historical
         "home_ppg", "away_ppg", "home_away_diff",
         "big_haul_rate", "blank_rate",
@@ -536,6 +751,7 @@ def get_feature_columns() -> Tuple[List[str], List[str]]:
         "chance_playing_this", "chance_playing_next",
         "injury_risk", "recent_minutes_avg", "started_recently",
         "missed_games_recent", "days_since_news", "has_injury_news",
+        "start_rate", "expected_minutes", "p_complete_90", "start_streak",
         # Context
         "price", "price_initial", "price_change", "price_change_pct",
         "position_num", "is_gk", "is_def", "is_mid", "is_fwd", "bps",
@@ -545,3 +761,8 @@ def get_feature_columns() -> Tuple[List[str], List[str]]:
     
     return numerical, categorical
 
+
+def chunked(items: List[int], size: int):
+    """Yield successive `size`-length slices of `items`."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,280 @@
+"""
+Model artifacts shared across worker processes.
+
+Every uvicorn worker used to `joblib.load` its own copy of each trained pipeline.
+Artifacts are now written uncompressed and loaded with `mmap_mode="r"`, so numpy arrays
+(scaler statistics, linear coefficients, MLP weights) are mapped read-only from the
+file. All workers share one page-cache copy of them.
+
+sklearn trees copy their node arrays into private buffers when unpickled, so mapping
+does not help them. `save_artifact` therefore swaps fitted RandomForest / GradientBoosting
+regressors for `NumpyForestRegressor`, a predict-only equivalent that keeps the nodes of
+all trees in flat numpy arrays. Those arrays are then mapped like any other.
+
+Loaded artifacts are cached per process and keyed on the file's mtime/size, so an
+artifact replaced on disk (retrain, online update) is picked up on the next load.
+`process_memory()` reports RSS split into file-backed (shared page cache) and anonymous
+(private) memory; it is logged around each load and exposed by `/ml/memory`.
+"""
+from __future__ import annotations
+
+import copy
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# joblib/numpy are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, modules_available
+
+joblib = lazy_import("joblib")
+np = lazy_import("numpy")
+ARTIFACTS_AVAILABLE = modules_available("joblib", "numpy")
+
+from app.core.logging import logger
+
+_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+class NumpyForestRegressor:
+    """
+    Predict-only tree ensemble over flat node arrays.
+
+    The trees are concatenated; `left`/`right` hold global node indices (-1 at leaves)
+    and `roots` the first node of each tree.
+    - random forest: prediction = mean of the leaf values
+    - gradient boosting: prediction = init + learning_rate * sum of the leaf values
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        roots: Any,
+        left: Any,
+        right: Any,
+        feature: Any,
+        threshold: Any,
+        value: Any,
+        n_features_in_: int,
+        learning_rate: float = 1.0,
+        init: float = 0.0,
+        max_depth: int = 0,
+    ):
+        self.kind = kind
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.n_features_in_ = n_features_in_
+        self.learning_rate = learning_rate
+        self.init = init
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, model: Any) -> "NumpyForestRegressor":
+        """Flatten a fitted RandomForestRegressor / GradientBoostingRegressor."""
+        name = type(model).__name__
+        if name == "RandomForestRegressor":
+            kind, trees = "mean", [est.tree_ for est in model.estimators_]
+            learning_rate, init = 1.0, 0.0
+        elif name == "GradientBoostingRegressor":
+            kind, trees = "boosted", [est.tree_ for est in model.estimators_[:, 0]]
+            learning_rate = float(model.learning_rate)
+            init = 0.0
+            if model.init_ != "zero":
+                init = float(model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+        else:
+            raise TypeError(f"Unsupported estimator: {name}")
+
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            roots.append(offset)
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+            offset += tree.node_count
+        return cls(
+            kind=kind,
+            roots=np.asarray(roots, dtype=np.int64),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            value=np.concatenate(value).astype(np.float64),
+            n_features_in_=int(model.n_features_in_),
+            learning_rate=learning_rate,
+            init=init,
+            max_depth=max(int(t.max_depth) for t in trees) if trees else 0,
+        )
+
+    def predict(self, X: Any) -> Any:
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.right[node]), node)
+        leaf_values = self.value[node]
+        if self.kind == "mean":
+            return leaf_values.mean(axis=1)
+        return self.init + self.learning_rate * leaf_values.sum(axis=1)
+
+
+def compact_estimator(model: Any) -> Any:
+    """
+    Replace tree ensembles inside `model` (bare or nested in Pipelines) with
+    `NumpyForestRegressor`. Other estimators are returned unchanged; Pipelines are
+    shallow-copied, so `model` itself is never modified.
+    """
+    if type(model).__name__ in ("RandomForestRegressor", "GradientBoostingRegressor"):
+        return NumpyForestRegressor.from_sklearn(model)
+    steps = getattr(model, "steps", None)
+    if steps:
+        model = copy.copy(model)
+        model.steps = [(name, compact_estimator(step)) for name, step in steps]
+    return model
+
+
+def save_artifact(blob: Dict[str, Any], path: Path) -> Path:
+    """
+    Write a model artifact that can be memory-mapped on load.
+
+    Tree ensembles in `blob["model"]` are compacted in the written copy; the caller's
+    dict and estimator are left as they were. The file is written
+    uncompressed (mapping needs raw arrays) via a temp file, so concurrent loaders
+    never see a partial artifact.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if blob.get("model") is not None:
+        blob = {**blob, "model": compact_estimator(blob["model"])}
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    joblib.dump(blob, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_artifact(path: Path) -> Dict[str, Any]:
+    """
+    Load an artifact with its arrays memory-mapped, cached for the life of the process.
+
+    The cached copy is reused until the file's mtime or size changes. The returned
+    arrays are read-only; callers that modify a model (online updates) should use
+    `joblib.load` directly.
+    """
+    path = Path(path)
+    stat = path.stat()
+    key = str(path.resolve())
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry["signature"] == signature:
+            return entry["blob"]
+
+        before = process_memory()
+        started = time.perf_counter()
+        blob = joblib.load(path, mmap_mode="r")
+        after = process_memory()
+        _cache[key] = {
+            "blob": blob,
+            "signature": signature,
+            "size_bytes": stat.st_size,
+            "loaded_at": time.time(),
+            "load_ms": (time.perf_counter() - started) * 1000.0,
+            "rss_before_mb": before["rss_mb"],
+            "rss_after_mb": after["rss_mb"],
+        }
+    logger.info(
+        "Loaded model artifact",
+        path=str(path),
+        size_mb=round(stat.st_size / 2**20, 2),
+        rss_before_mb=before["rss_mb"],
+        rss_after_mb=after["rss_mb"],
+        private_after_mb=after.get("private_mb"),
+    )
+    return blob
+
+
+def clear_cache() -> None:
+    """Drop every cached artifact (their mappings are released once unreferenced)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def loaded_artifacts() -> List[Dict[str, Any]]:
+    """Artifacts cached in this process, with the RSS measured around each load."""
+    with _cache_lock:
+        return [
+            {
+                "path": key,
+                "size_mb": round(entry["size_bytes"] / 2**20, 3),
+                "load_ms": round(entry["load_ms"], 1),
+                "rss_before_mb": entry["rss_before_mb"],
+                "rss_after_mb": entry["rss_after_mb"],
+            }
+            for key, entry in _cache.items()
+        ]
+
+
+def _proc_status() -> Dict[str, int]:
+    """kB fields from /proc/self/status (Linux only)."""
+    fields: Dict[str, int] = {}
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                name, _, rest = line.partition(":")
+                parts = rest.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    fields[name] = int(parts[0])
+    except OSError:
+        pass
+    return fields
+
+
+def process_memory() -> Dict[str, Optional[float]]:
+    """
+    Current process memory in MB.
+
+    On Linux RSS is split into `shared_file_mb` (file-backed pages such as mapped
+    artifacts, shared with other workers) and `private_mb` (anonymous memory).
+    Elsewhere only the peak RSS from `getrusage` is available.
+    """
+    status = _proc_status()
+    if "VmRSS" in status:
+        return {
+            "rss_mb": round(status["VmRSS"] / 1024, 1),
+            "shared_file_mb": round(status.get("RssFile", 0) / 1024, 1),
+            "private_mb": round(status.get("RssAnon", 0) / 1024, 1),
+            "peak_rss_mb": round(status.get("VmHWM", 0) / 1024, 1),
+        }
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kB on Linux/BSD
+    peak_mb = peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    return {"rss_mb": round(peak_mb, 1), "shared_file_mb": None, "private_mb": None, "peak_rss_mb": round(peak_mb, 1)}
+
+
+def memory_report() -> Dict[str, Any]:
+    """Payload for `/ml/memory`."""
+    return {
+        "pid": os.getpid(),
+        "memory": process_memory(),
+        "artifacts": loaded_artifacts(),
+    }
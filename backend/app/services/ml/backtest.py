@@ -0,0 +1,259 @@
+"""
+Walk-forward backtest of the points predictor and squad optimizer.
+
+Replays a past season gameweek by gameweek. For each GW it:
+  1. builds point-in-time features (only WeeklyScore rows before the GW, and Player
+     fields masked to what was known then; see `PointInTimePlayer`),
+  2. predicts with `NeuralPointsPredictor` (the heuristic, unless a trained model is
+     active),
+  3. picks a squad / starting XI / captain with `SquadOptimizer`'s selection and
+     formation logic, and
+  4. scores predictions and the picked XI against the actual WeeklyScore points.
+
+Gameweeks are independent, so they are spread across a process pool; each worker
+opens its own database session. Feature matrices are the expensive part and do not
+depend on the heuristic, so they are cached per (season, GW) under
+MODEL_DIR/backtest_cache. Re-running after a heuristic change only re-predicts and
+re-optimizes.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.lazy_imports import lazy_import, modules_available
+from app.core.logging import logger
+from app.models import Player, WeeklyScore
+from app.models.fixture import Fixture
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+ML_AVAILABLE = modules_available("numpy", "pandas")
+
+
+# Bump when feature definitions change so stale cached matrices are not reused.
+FEATURE_CACHE_VERSION = 3
+
+
+def _init_worker() -> None:
+    """Drop connections inherited from the parent; each worker opens its own."""
+    from app.db.sqlalchemy import engine
+
+    engine.dispose(close=False)
+
+
+def _run_gameweek(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: backtest a single gameweek in its own DB session."""
+    from app.db.sqlalchemy import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return GameweekBacktest(db, Path(job["cache_dir"]), job["fingerprint"]).run(
+            job["season"], job["gw"], job["budget"]
+        )
+    finally:
+        db.close()
+
+
+class GameweekBacktest:
+    """Prediction + selection + scoring for one gameweek."""
+
+    def __init__(self, db: Session, cache_dir: Path, fingerprint: str):
+        self.db = db
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+
+    def run(self, season: str, gw: int, budget: float = 100.0) -> Dict[str, Any]:
+        from app.services.ml.neural_predictor import NeuralPointsPredictor
+        from app.services.optimizer import SquadOptimizer, DummyScoreObject
+        from app.services.ml.advanced_features import PointInTimePlayer
+
+        actual = self._actual_points(season, gw)
+        if not actual:
+            return {"season": season, "gw": gw, "status": "no_results"}
+
+        player_ids = self._candidate_ids(season, gw)
+        features, cache_hit = self._features(player_ids, season, gw)
+        if features.empty:
+            return {"season": season, "gw": gw, "status": "no_features"}
+
+        predictor = NeuralPointsPredictor(self.db)
+        predictions = predictor._predict_with_model(features, horizon=1)
+        pred_dict = {p["player_id"]: p for p in predictions}
+
+        # Prediction accuracy over players who actually featured.
+        scored = [(pred_dict[pid]["predicted_points"], pts) for pid, pts in actual.items() if pid in pred_dict]
+        pred_arr = np.array([p for p, _ in scored], dtype=float)
+        act_arr = np.array([a for _, a in scored], dtype=float)
+        errors = pred_arr - act_arr
+        spearman = float(pd.Series(pred_arr).corr(pd.Series(act_arr), method="spearman")) if len(scored) > 2 else None
+
+        # Squad selection on point-in-time player views.
+        players = self.db.query(Player).filter(Player.id.in_(list(pred_dict))).all()
+        candidates = [(PointInTimePlayer(p), DummyScoreObject(p.id, season, 0.0)) for p in players]
+        optimizer = SquadOptimizer(self.db)
+        squad = optimizer._optimize_unconstrained(candidates, budget, set(), pred_dict, 1)
+
+        squad_points = None
+        xi_ids: List[int] = []
+        captain_id = None
+        if len(squad) == 15:
+            formations = optimizer._generate_formations(squad, pred_dict, 1)
+            if formations:
+                starting_xi = formations[0][0]
+                xi_ids = [p.id for p in starting_xi]
+                captain_id = max(xi_ids, key=lambda pid: pred_dict[pid]["predicted_points"])
+                squad_points = sum(actual.get(pid, 0.0) for pid in xi_ids) + actual.get(captain_id, 0.0)
+
+        return {
+            "season": season,
+            "gw": gw,
+            "status": "ok",
+            "n_players": len(scored),
+            "mae": float(np.mean(np.abs(errors))),
+            "rmse": float(np.sqrt(np.mean(errors ** 2))),
+            "bias": float(np.mean(errors)),
+            "spearman": spearman,
+            "squad_points": squad_points,
+            "captain_id": captain_id,
+            "captain_points": actual.get(captain_id, 0.0) if captain_id else None,
+            "xi": xi_ids,
+            "feature_cache_hit": cache_hit,
+        }
+
+    def _features(self, player_ids: List[int], season: str, gw: int):
+        """Point-in-time feature matrix for the GW, from cache when available."""
+        from app.services.ml.advanced_features import AdvancedFeatureBuilder
+
+        path = self.cache_dir / f"{season}_gw{gw:02d}_{self.fingerprint}.pkl"
+        if path.exists():
+            return pd.read_pickle(path), True
+
+        builder = AdvancedFeatureBuilder(self.db, point_in_time=True)
+        features = builder.build_features(player_ids, season, gw, horizon=1)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        features.to_pickle(tmp)
+        os.replace(tmp, path)
+        return features, False
+
+    def _candidate_ids(self, season: str, gw: int) -> List[int]:
+        """Players with any history before the GW (GW1: anyone who played that season)."""
+        q = self.db.query(WeeklyScore.player_id).filter(WeeklyScore.season == season)
+        if gw > 1:
+            q = q.filter(WeeklyScore.gw < gw)
+        return [pid for (pid,) in q.distinct().all()]
+
+    def _actual_points(self, season: str, gw: int) -> Dict[int, float]:
+        rows = (
+            self.db.query(WeeklyScore.player_id, func.sum(WeeklyScore.points))
+            .filter(WeeklyScore.season == season)
+            .filter(WeeklyScore.gw == gw)
+            .group_by(WeeklyScore.player_id)
+            .all()
+        )
+        return {pid: float(pts or 0.0) for pid, pts in rows}
+
+
+class BacktestRunner:
+    """
+    Runs `GameweekBacktest` over a range of gameweeks in a process pool.
+
+    Usage:
+        report = BacktestRunner(db).run("2023-24", start_gw=2, end_gw=38)
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+    ):
+        if not ML_AVAILABLE:
+            raise ImportError("Backtesting requires numpy and pandas.")
+        self.db = db
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.cache_dir = Path(cache_dir or Path(settings.MODEL_DIR) / "backtest_cache")
+
+    def run(
+        self,
+        season: str,
+        start_gw: int = 2,
+        end_gw: Optional[int] = None,
+        budget: float = 100.0,
+    ) -> Dict[str, Any]:
+        """Backtest `season` from `start_gw` to `end_gw` (default: last GW with results)."""
+        if end_gw is None:
+            end_gw = self.db.query(func.max(WeeklyScore.gw)).filter(WeeklyScore.season == season).scalar() or 0
+        gameweeks = list(range(start_gw, end_gw + 1))
+        if not gameweeks:
+            raise ValueError(f"No gameweeks to backtest for {season}")
+
+        fingerprint = self._data_fingerprint(season)
+        jobs = [
+            {"season": season, "gw": gw, "budget": budget, "cache_dir": str(self.cache_dir), "fingerprint": fingerprint}
+            for gw in gameweeks
+        ]
+
+        workers = min(self.max_workers, len(jobs))
+        # In-memory SQLite cannot be shared with child processes.
+        if workers <= 1 or str(self.db.get_bind().url) == "sqlite:///:memory:":
+            results = [
+                GameweekBacktest(self.db, self.cache_dir, fingerprint).run(season, gw, budget)
+                for gw in gameweeks
+            ]
+        else:
+            logger.info(f"Backtesting {len(jobs)} gameweeks across {workers} worker processes")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = list(pool.map(_run_gameweek, jobs))
+
+        return {"season": season, "gameweeks": results, "summary": self.summarize(results)}
+
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Season-level aggregates over gameweeks that produced results."""
+        ok = [r for r in results if r.get("status") == "ok"]
+        if not ok:
+            return {"gameweeks": 0}
+        weights = np.array([r["n_players"] for r in ok], dtype=float)
+        squad = [r["squad_points"] for r in ok if r["squad_points"] is not None]
+        spearman = [r["spearman"] for r in ok if r["spearman"] is not None]
+        return {
+            "gameweeks": len(ok),
+            "mae": float(np.average([r["mae"] for r in ok], weights=weights)),
+            "rmse": float(np.sqrt(np.average([r["rmse"] ** 2 for r in ok], weights=weights))),
+            "bias": float(np.average([r["bias"] for r in ok], weights=weights)),
+            "spearman_mean": float(np.mean(spearman)) if spearman else None,
+            "squad_points_total": float(sum(squad)),
+            "squad_points_mean": float(np.mean(squad)) if squad else None,
+            "captain_points_mean": float(np.mean([r["captain_points"] for r in ok if r["captain_points"] is not None] or [0.0])),
+            "feature_cache_hits": sum(1 for r in ok if r.get("feature_cache_hit")),
+        }
+
+    def _data_fingerprint(self, season: str) -> str:
+        """Changes whenever the season's scores or fixtures change, invalidating cached features."""
+        # WeeklyScore has no updated_at; column sums catch in-place corrections.
+        ws_count, ws_max_id, ws_points, ws_minutes = (
+            self.db.query(
+                func.count(WeeklyScore.id),
+                func.max(WeeklyScore.id),
+                func.sum(WeeklyScore.points),
+                func.sum(WeeklyScore.minutes),
+            )
+            .filter(WeeklyScore.season == season)
+            .one()
+        )
+        fx_count, fx_updated = (
+            self.db.query(func.count(Fixture.id), func.max(Fixture.updated_at))
+            .filter(Fixture.season == season)
+            .one()
+        )
+        raw = f"v{FEATURE_CACHE_VERSION}|{ws_count}|{ws_max_id}|{ws_points}|{ws_minutes}|{fx_count}|{fx_updated}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:12]
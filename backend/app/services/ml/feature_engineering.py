@@ -1,10 +1,13 @@
 """Feature engineering for ML models."""
-import pandas as pd
-import numpy as np
+from __future__ import annotations
 from typing import List, Dict, Any
 from sqlalchemy.orm import Session
+from app.core.lazy_imports import lazy_import
 from app.models import Player, WeeklyScore, ScoreObject
 
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
 
 def build_features(
     db: Session,
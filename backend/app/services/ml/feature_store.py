@@ -0,0 +1,183 @@
+"""
+Incremental feature store for player points prediction.
+
+Feature rows (form windows, xG windows, home/away splits, minutes trends, ...) are
+persisted per (player, season, gameweek) in `player_feature_rows` instead of being
+rebuilt from raw WeeklyScore history on every prediction.
+
+Rows are kept fresh incrementally: when ingestion writes GW n for a set of players,
+only those players' GW n+1 rows are recomputed (and any later rows for them, which
+would now be stale, are dropped and rebuilt lazily on next read).
+
+Only features derived from weekly-score history are stored. Player state that moves
+between ingests (price, status, news, chance of playing, ownership, FPL form) and the
+lineup availability index are joined at read time, as are fixture features, which
+depend on the prediction horizon.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models import Player, PlayerFeatureRow
+from app.services.ml.advanced_features import AdvancedFeatureBuilder, chunked
+from app.core.logging import logger
+
+
+class FeatureStore:
+    """Reads and incrementally maintains persisted player feature rows."""
+
+    def __init__(self, db: Session, builder: Optional[AdvancedFeatureBuilder] = None):
+        self.db = db
+        self.builder = builder or AdvancedFeatureBuilder(db)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get_rows(
+        self, player_ids: List[int], season: str, gameweek: int
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Return feature rows for `gameweek`: the stored history features (computing
+        and persisting any that are missing, so the first request for a GW fills
+        the store) joined with the players' current state.
+        """
+        rows = self._read(player_ids, season, gameweek)
+        missing = [pid for pid in player_ids if pid not in rows]
+        if missing:
+            built = self.builder.build_stored_features(missing, season, gameweek)
+            if built:
+                try:
+                    self._write(season, gameweek, built)
+                    self.db.commit()
+                except Exception as e:
+                    # The store is a cache; a failed write must not fail the prediction.
+                    logger.warning(f"Feature store write failed for {season} GW{gameweek}: {e}")
+                    self.db.rollback()
+                rows.update(built)
+        return self.builder.apply_current_state(player_ids, rows)
+
+    def build_frame(
+        self, player_ids: List[int], season: str, gameweek: int, horizon: int = 1
+    ) -> Any:
+        """Feature matrix for prediction: stored rows plus fixture features for the horizon."""
+        rows = self.get_rows(player_ids, season, gameweek)
+        return self.builder.assemble_features(player_ids, rows, season, gameweek, horizon)
+
+    def build_frames(
+        self, player_ids: List[int], season: str, gameweek: int, horizons: Sequence[int]
+    ) -> Dict[int, Any]:
+        """Feature matrices for several horizons from one read of the stored rows."""
+        rows = self.get_rows(player_ids, season, gameweek)
+        return self.builder.assemble_horizons(player_ids, rows, season, gameweek, horizons)
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+    def refresh(
+        self, season: str, gameweek: int, player_ids: Optional[List[int]] = None
+    ) -> int:
+        """(Re)compute and persist rows for `gameweek`; all players if none given."""
+        if player_ids is None:
+            player_ids = [pid for (pid,) in self.db.query(Player.id).all()]
+        built = self.builder.build_stored_features(player_ids, season, gameweek)
+        self._write(season, gameweek, built)
+        return len(built)
+
+    def on_gameweek_ingested(
+        self, season: str, gw: int, player_ids: List[int]
+    ) -> Dict[str, int]:
+        """
+        Hook for ingestion after GW `gw` was written for `player_ids`.
+
+        Recomputes those players' GW gw+1 rows and drops their rows for later
+        gameweeks (history changed underneath them). Commits.
+        """
+        if not player_ids:
+            return {"refreshed": 0, "invalidated": 0}
+
+        invalidated = 0
+        for chunk in chunked(list(player_ids), AdvancedFeatureBuilder.PREFETCH_CHUNK):
+            invalidated += (
+                self.db.query(PlayerFeatureRow)
+                .filter(PlayerFeatureRow.player_id.in_(chunk))
+                .filter(PlayerFeatureRow.season == season)
+                .filter(PlayerFeatureRow.gw > gw + 1)
+                .delete(synchronize_session=False)
+            )
+        refreshed = self.refresh(season, gw + 1, list(player_ids))
+        self.db.commit()
+        logger.info(
+            f"Feature store refreshed {refreshed} rows for {season} GW{gw + 1} "
+            f"({invalidated} later rows invalidated)"
+        )
+        return {"refreshed": refreshed, "invalidated": invalidated}
+
+    def invalidate(self, season: str, player_ids: List[int]) -> int:
+        """Drop every stored row for these players in `season` (rebuilt lazily)."""
+        deleted = 0
+        for chunk in chunked(list(player_ids), AdvancedFeatureBuilder.PREFETCH_CHUNK):
+            deleted += (
+                self.db.query(PlayerFeatureRow)
+                .filter(PlayerFeatureRow.player_id.in_(chunk))
+                .filter(PlayerFeatureRow.season == season)
+                .delete(synchronize_session=False)
+            )
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+    def _read(
+        self, player_ids: List[int], season: str, gameweek: int
+    ) -> Dict[int, Dict[str, float]]:
+        rows: Dict[int, Dict[str, float]] = {}
+        for chunk in chunked(list(player_ids), AdvancedFeatureBuilder.PREFETCH_CHUNK):
+            q = (
+                self.db.query(PlayerFeatureRow.player_id, PlayerFeatureRow.features)
+                .filter(PlayerFeatureRow.player_id.in_(chunk))
+                .filter(PlayerFeatureRow.season == season)
+                .filter(PlayerFeatureRow.gw == gameweek)
+            )
+            for player_id, features in q.all():
+                rows[player_id] = dict(features or {})
+        return rows
+
+    def _write(self, season: str, gameweek: int, built: Dict[int, Dict[str, float]]) -> None:
+        """Insert or overwrite rows for `gameweek` (flushes; caller commits)."""
+        if not built:
+            return
+        existing: Dict[int, PlayerFeatureRow] = {}
+        for chunk in chunked(list(built.keys()), AdvancedFeatureBuilder.PREFETCH_CHUNK):
+            for row in (
+                self.db.query(PlayerFeatureRow)
+                .filter(PlayerFeatureRow.player_id.in_(chunk))
+                .filter(PlayerFeatureRow.season == season)
+                .filter(PlayerFeatureRow.gw == gameweek)
+                .all()
+            ):
+                existing[row.player_id] = row
+
+        now = datetime.utcnow()
+        source_gw = gameweek - 1 if gameweek > 1 else None
+        for player_id, features in built.items():
+            payload = {k: float(v) for k, v in features.items()}
+            row = existing.get(player_id)
+            if row is None:
+                self.db.add(
+                    PlayerFeatureRow(
+                        player_id=player_id,
+                        season=season,
+                        gw=gameweek,
+                        source_gw=source_gw,
+                        features=payload,
+                        computed_at=now,
+                    )
+                )
+            else:
+                row.features = payload
+                row.source_gw = source_gw
+                row.computed_at = now
+        self.db.flush()
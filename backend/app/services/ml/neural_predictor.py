@@ -3,44 +3,34 @@ Neural Network based player points predictor.
 Uses multi-dimensional features for prediction.
 """
 from __future__ import annotations
-from typing import List, Dict, Any, Optional, Tuple
+import copy
+import hashlib
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
 
-# Make numpy/pandas optional for Vercel deployment (large dependencies ~50-80MB)
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    NUMPY_AVAILABLE = False
-    np = None  # type: ignore
+# numpy/pandas/sklearn are optional for Vercel deployment (large dependencies ~50-80MB)
+# and are imported on first use so importing this module stays cheap.
+from app.core.lazy_imports import lazy_import, module_available
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    pd = None  # type: ignore
-
-# Make sklearn optional for Vercel deployment (large dependency)
-try:
-    from sklearn.preprocessing import StandardScaler, MinMaxScaler
-    from sklearn.neural_network import MLPRegressor
-    from sklearn.ensemble import GradientBoostingRegressor
-    import joblib
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    StandardScaler = None  # type: ignore
-    MinMaxScaler = None  # type: ignore
-    MLPRegressor = None  # type: ignore
-    GradientBoostingRegressor = None  # type: ignore
-    joblib = None  # type: ignore
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sk_preprocessing = lazy_import("sklearn.preprocessing")
+sk_neural_network = lazy_import("sklearn.neural_network")
+NUMPY_AVAILABLE = module_available("numpy")
+PANDAS_AVAILABLE = module_available("pandas")
+SKLEARN_AVAILABLE = module_available("sklearn") and module_available("joblib")
 
 from pathlib import Path
 
-from app.services.ml.advanced_features import AdvancedFeatureBuilder, get_feature_columns
+from app.services.ml.artifacts import load_artifact, save_artifact
+from app.services.ml.advanced_features import get_feature_columns
+from app.services.ml.feature_store import FeatureStore
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.singleflight import SingleFlight
+
+# Shared by every NeuralPointsPredictor in this process
+PREDICTION_FLIGHT = SingleFlight("neural_predictions", ttl_s=settings.PREDICTION_CACHE_TTL_S)
 
 
 class NeuralPointsPredictor:
@@ -58,10 +48,11 @@ class NeuralPointsPredictor:
     
     def __init__(self, db: Session):
         self.db = db
-        self.feature_builder = AdvancedFeatureBuilder(db)
+        self.feature_store = FeatureStore(db)
+        self.feature_builder = self.feature_store.builder
         self.model_dir = Path(settings.MODEL_DIR) if hasattr(settings, 'MODEL_DIR') else Path("models_store")
-        self.model: Optional[MLPRegressor] = None
-        self.scaler: Optional[StandardScaler] = None
+        self.model: Optional[sk_neural_network.MLPRegressor] = None
+        self.scaler: Optional[sk_preprocessing.StandardScaler] = None
         self.numerical_features, self.categorical_features = get_feature_columns()
         
     def predict(
@@ -70,6 +61,7 @@ class NeuralPointsPredictor:
         season: str,
         gameweek: int,
         horizon: int = 1,
+        horizons: Optional[Sequence[int]] = None,
     ) -> Dict[str, Any]:
         """
         Predict expected points for players.
@@ -79,23 +71,47 @@ class NeuralPointsPredictor:
             season: Season identifier
             gameweek: Target gameweek
             horizon: Number of gameweeks to predict for
+            horizons: Extra horizons (e.g. [1, 3, 5, 8]) to project from the same
+                feature build; each prediction then carries `projections`
+                ({horizon: points}) and `predicted_points` stays the `horizon` value
             
         Returns:
             Dict with predictions for each player
         """
         if not player_ids:
             return {"predictions": []}
+        # Identical concurrent requests share one computation (and its result for a
+        # few seconds); callers get their own copy since they annotate predictions.
+        pool = hashlib.sha1(",".join(map(str, sorted(set(player_ids)))).encode()).hexdigest()
+        key = (
+            season, gameweek, horizon, tuple(sorted(set(horizons))) if horizons else None, pool,
+            self.feature_builder.point_in_time,
+        )
+        result = PREDICTION_FLIGHT.do(key, lambda: self._predict(player_ids, season, gameweek, horizon, horizons))
+        return copy.deepcopy(result)
+
+    def _predict(
+        self,
+        player_ids: List[int],
+        season: str,
+        gameweek: int,
+        horizon: int,
+        horizons: Optional[Sequence[int]],
+    ) -> Dict[str, Any]:
+        all_horizons = sorted({horizon, *(horizons or [])})
         
         # Check if pandas/numpy are available
         if not PANDAS_AVAILABLE or not NUMPY_AVAILABLE:
             logger.info("Pandas/numpy not available, using pure Python fallback predictions")
-            return {"predictions": self._fallback_predictions(player_ids)}
+            return {"predictions": self._fallback_predictions(player_ids, all_horizons if horizons else None)}
         
         try:
-            # Build features
-            features_df = self.feature_builder.build_features(
-                player_ids, season, gameweek, horizon
+            # Read persisted feature rows (built lazily on first use) once; only the
+            # fixture columns differ between horizons.
+            frames = self.feature_store.build_frames(
+                player_ids, season, gameweek, all_horizons
             )
+            features_df = frames[horizon]
             
             # Check if empty (DataFrame or list)
             is_empty = False
@@ -108,16 +124,36 @@ class NeuralPointsPredictor:
             
             if is_empty:
                 logger.warning("No features built for any players")
-                return {"predictions": self._fallback_predictions(player_ids)}
+                return {"predictions": self._fallback_predictions(player_ids, all_horizons if horizons else None)}
             
             # Get predictions
             predictions = self._predict_with_model(features_df, horizon)
+            if horizons:
+                self._attach_projections(predictions, frames, horizon)
             
             return {"predictions": predictions}
             
         except Exception as e:
             logger.error(f"Neural prediction failed: {e}", exc_info=True)
-            return {"predictions": self._fallback_predictions(player_ids)}
+            return {"predictions": self._fallback_predictions(player_ids, all_horizons if horizons else None)}
+
+    def _attach_projections(
+        self, predictions: List[Dict[str, Any]], frames: Dict[int, Any], horizon: int
+    ) -> None:
+        """Add `projections` ({horizon: points}) to each prediction from the per-horizon frames."""
+        by_player = {p["player_id"]: p for p in predictions}
+        for p in predictions:
+            p["projections"] = {horizon: p["predicted_points"]}
+        for h, frame in frames.items():
+            if h == horizon:
+                continue
+            records = frame.to_dict("records") if hasattr(frame, "to_dict") else frame
+            for row in records:
+                pred = by_player.get(int(row.get("player_id", 0)))
+                if pred is not None:
+                    pred["projections"][h] = round(self._heuristic_prediction(row, h), 2)
+        for p in predictions:
+            p["projections"] = dict(sorted(p["projections"].items()))
     
     def _predict_with_model(
         self, features_df: Any, horizon: int
@@ -166,6 +202,7 @@ class NeuralPointsPredictor:
                     "form": round(row_dict.get("form_weighted", 0), 2),
                     "fixture_difficulty": round(row_dict.get("fixture_difficulty_1", 3), 1),
                     "fitness": round(row_dict.get("chance_playing_this", 1) * 100, 0),
+                    "volatility": round(row_dict.get("consistency", 0), 2),
                 }
             })
         
@@ -258,6 +295,16 @@ class NeuralPointsPredictor:
         # Scale: difficulty 1 = +15%, difficulty 5 = -15%
         fixture_factor = 1.0 + (3 - fixture_diff) * 0.05
         
+        # Team-strength model: clean-sheet odds drive GK/DEF returns, team xG the rest.
+        # Indices are relative to an average fixture (1.0); blended with the FDR factor.
+        if "attack_fixture_index_1" in row:
+            if row.get("is_gk", 0) or row.get("is_def", 0):
+                strength_index = row.get("defence_fixture_index_1", 1.0)
+            else:
+                strength_index = row.get("attack_fixture_index_1", 1.0)
+            strength_factor = max(0.85, min(1.15, 1.0 + (strength_index - 1.0) * 0.3))
+            fixture_factor = (fixture_factor + strength_factor) / 2
+        
         # Home advantage: ~5-8% boost
         home_factor = 1.0 + (is_home - 0.5) * 0.12
         
@@ -420,9 +467,11 @@ class NeuralPointsPredictor:
         
         return float(upside)
     
-    def _fallback_predictions(self, player_ids: List[int]) -> List[Dict[str, Any]]:
+    def _fallback_predictions(
+        self, player_ids: List[int], horizons: Optional[Sequence[int]] = None
+    ) -> List[Dict[str, Any]]:
         """Fallback predictions when model fails."""
-        return [
+        predictions = [
             {
                 "player_id": pid,
                 "predicted_points": 3.0,  # Conservative default
@@ -433,6 +482,10 @@ class NeuralPointsPredictor:
             }
             for pid in player_ids
         ]
+        if horizons:
+            for p in predictions:
+                p["projections"] = {h: 3.0 * h for h in horizons}
+        return predictions
     
     def train(
         self,
@@ -458,11 +511,11 @@ class NeuralPointsPredictor:
         y = training_data[target_col]
         
         # Scale features
-        self.scaler = StandardScaler()
+        self.scaler = sk_preprocessing.StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
         # Train model
-        self.model = MLPRegressor(
+        self.model = sk_neural_network.MLPRegressor(
             hidden_layer_sizes=(128, 64, 32),
             activation='relu',
             solver='adam',
@@ -512,7 +565,7 @@ class NeuralPointsPredictor:
         """Save model and scaler to disk."""
         self.model_dir.mkdir(exist_ok=True, parents=True)
         
-        joblib.dump({
+        save_artifact({
             "model": self.model,
             "scaler": self.scaler,
             "features": self.numerical_features,
@@ -529,7 +582,7 @@ class NeuralPointsPredictor:
             return False
         
         try:
-            data = joblib.load(model_path)
+            data = load_artifact(model_path)
             self.model = data["model"]
             self.scaler = data["scaler"]
             self.numerical_features = data["features"]
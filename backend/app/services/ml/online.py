@@ -0,0 +1,181 @@
+"""
+Online (incremental) model updates after a gameweek is ingested.
+
+Models that support `partial_fit` (sgd, mlp) are nudged with the finished gameweek's
+WeeklyScore rows (all of them, not only those a given poll touched) instead of being retrained across all seasons. The categorical
+encoder stays frozen (unseen categories are ignored). The numerical scaler keeps running
+statistics via `StandardScaler.partial_fit`, then the regressor takes one `partial_fit`
+pass over the new rows.
+
+Each model's registry entry carries a `trained_through` (season, gw) marker, so a
+gameweek is applied at most once even though live ingestion polls it repeatedly. Only
+gameweeks whose fixtures are all finished are applied. After `MAX_INCREMENTAL_UPDATES`
+updates the entry is flagged `needs_full_retrain`; the scheduled `train-models` full
+retrain is the correctness backstop and resets the counter.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.lazy_imports import lazy_import, modules_available
+
+joblib = lazy_import("joblib")
+np = lazy_import("numpy")
+sk_metrics = lazy_import("sklearn.metrics")
+ML_AVAILABLE = modules_available("joblib", "numpy", "sklearn")
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.models.fixture import Fixture
+from app.services.ml.artifacts import save_artifact
+from app.services.ml.registry import ModelRegistry
+
+
+# Models whose estimators implement partial_fit
+INCREMENTAL_MODELS = ("sgd", "mlp")
+
+
+class OnlineModelUpdater:
+    """Applies a finished gameweek's rows to the active incremental models."""
+
+    # Online updates allowed before a full retrain is flagged as due
+    MAX_INCREMENTAL_UPDATES = 6
+
+    def __init__(self, db: Session, model_dir: Optional[Path] = None):
+        if not ML_AVAILABLE:
+            raise ImportError("OnlineModelUpdater requires joblib, numpy and scikit-learn.")
+        self.db = db
+        self.model_dir = Path(model_dir or settings.MODEL_DIR)
+        self.registry = ModelRegistry(self.model_dir)
+
+    def active_models(self) -> List[str]:
+        """Registered incremental models with an artifact on disk."""
+        models = self.registry.load()["models"]
+        return [
+            name
+            for name in INCREMENTAL_MODELS
+            if name in models and Path(models[name].get("model_path", "")).exists()
+        ]
+
+    def update(
+        self,
+        season: str,
+        gw: int,
+        model_names: Optional[List[str]] = None,
+        force: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Update each active incremental model with every GW `gw` row.
+
+        Args:
+            model_names: Models to update (default: all active incremental models)
+            force: Apply even if the gameweek is unfinished or already applied
+
+        Returns:
+            model name -> {status, rows, rmse_before, rmse_after, incremental_updates}
+        """
+        names = model_names or self.active_models()
+        if not names:
+            return {}
+        if not force and not self._gameweek_finished(season, gw):
+            return {name: {"status": "skipped", "reason": "gameweek not finished"} for name in names}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        entries: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            entry = self.registry.get(name) or {}
+            through = entry.get("trained_through") or {}
+            if not force and through and (season, gw) <= (through.get("season"), int(through.get("gw", 0))):
+                results[name] = {"status": "skipped", "reason": "already applied"}
+            else:
+                entries[name] = entry
+        if not entries:
+            return results
+
+        from app.services.ml.trainer import MLTrainer
+
+        trainer = MLTrainer(self.db)
+        df = trainer._load_training_data([season], gw=gw)
+        df = df[~df[MLTrainer.TARGET].isna()]
+        if df.empty:
+            results.update({name: {"status": "skipped", "reason": "no rows"} for name in entries})
+            return results
+
+        X = df[MLTrainer.NUMERICAL_FEATURES + MLTrainer.CATEGORICAL_FEATURES]
+        y = df[MLTrainer.TARGET].to_numpy(dtype=np.float32)
+
+        for name, entry in entries.items():
+            results[name] = self._update_model(name, entry, X, y, season, gw)
+        return results
+
+    def _update_model(
+        self, name: str, entry: Dict[str, Any], X: Any, y: Any, season: str, gw: int
+    ) -> Dict[str, Any]:
+        path = Path(entry["model_path"])
+        blob = joblib.load(path)
+        pipeline = blob["model"]
+
+        # Layout produced by ParallelTrainer: encoder -> (scaler -> model)
+        encoder = pipeline.named_steps["encoder"]
+        regressor = pipeline.named_steps["regressor"]
+        scaler_ct = regressor.named_steps["scaler"]
+        scaler = scaler_ct.named_transformers_["num"]
+        model = regressor.named_steps["model"]
+        if not hasattr(model, "partial_fit"):
+            return {"status": "skipped", "reason": f"{type(model).__name__} has no partial_fit"}
+
+        # float32, matching the training matrix (SGD keeps coef_ in the fit dtype)
+        X_enc = np.asarray(encoder.transform(X), dtype=np.float32)
+        # Out-of-sample check: these rows have not been seen by the model yet.
+        rmse_before = float(np.sqrt(sk_metrics.mean_squared_error(y, model.predict(scaler_ct.transform(X_enc)))))
+
+        scaler.partial_fit(X_enc[:, : scaler.n_features_in_])
+        X_scaled = scaler_ct.transform(X_enc)
+        model.partial_fit(X_scaled, y)
+        rmse_after = float(np.sqrt(sk_metrics.mean_squared_error(y, model.predict(X_scaled))))
+
+        updates = int(entry.get("incremental_updates", 0)) + 1
+        blob["model"] = pipeline
+        blob["incremental_updates"] = updates
+        # Written via a temp file so concurrent predictors never load a partial artifact.
+        save_artifact(blob, path)
+
+        self.registry.update(
+            name,
+            incremental_updates=updates,
+            needs_full_retrain=updates >= self.MAX_INCREMENTAL_UPDATES,
+            trained_through={"season": season, "gw": gw},
+            last_incremental={
+                "season": season,
+                "gw": gw,
+                "rows": int(len(y)),
+                "rmse_before": rmse_before,
+                "rmse_after": rmse_after,
+                "applied_at": datetime.utcnow().isoformat(),
+            },
+        )
+        logger.info(
+            f"Online update of {name} with {season} GW{gw}: {len(y)} rows, "
+            f"rmse {rmse_before:.3f} -> {rmse_after:.3f} (update {updates})"
+        )
+        return {
+            "status": "updated",
+            "rows": int(len(y)),
+            "rmse_before": rmse_before,
+            "rmse_after": rmse_after,
+            "incremental_updates": updates,
+        }
+
+    def _gameweek_finished(self, season: str, gw: int) -> bool:
+        """True when the gameweek has fixtures and every one of them is finished."""
+        fixtures = (
+            self.db.query(Fixture.finished)
+            .filter(Fixture.season == season)
+            .filter(Fixture.gw == gw)
+            .all()
+        )
+        return bool(fixtures) and all(bool(finished) for (finished,) in fixtures)
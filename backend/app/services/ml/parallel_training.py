@@ -0,0 +1,301 @@
+"""
+Parallel model training with walk-forward (time-ordered) cross-validation.
+
+Random K-fold CV leaks future gameweeks into training folds. Here rows are ordered by
+(season, gameweek) and every fold trains on a prefix of gameweeks and validates on the
+block that follows it.
+
+Candidate models and their CV folds are fitted concurrently in a process pool. The
+categorical encoding is fitted once in the parent, and the encoded float32 feature matrix
+is written to a `.npy` file that every worker opens with `mmap_mode="r"`, so workers share
+one page-cache copy instead of each receiving a pickled copy. Scaling is fitted inside
+each fold on its training prefix only.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# numpy/pandas/sklearn are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, modules_available
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sk_compose = lazy_import("sklearn.compose")
+sk_preprocessing = lazy_import("sklearn.preprocessing")
+sk_linear_model = lazy_import("sklearn.linear_model")
+sk_ensemble = lazy_import("sklearn.ensemble")
+sk_neural_network = lazy_import("sklearn.neural_network")
+sk_pipeline = lazy_import("sklearn.pipeline")
+sk_metrics = lazy_import("sklearn.metrics")
+ML_AVAILABLE = modules_available("numpy", "pandas", "sklearn")
+
+from app.core.logging import logger
+
+
+def make_regressor(model_name: str, hyperparameters: Optional[Dict[str, Any]] = None):
+    """
+    Build an unfitted regressor by name.
+
+    Accepts the trainer names (ridge, xgboost, random_forest, sgd, mlp) and the pipeline
+    names (gradient_boosting). Tree ensembles use a single thread because parallelism
+    comes from the process pool. sgd and mlp support `partial_fit` for online updates.
+    """
+    hp = hyperparameters or {}
+    if model_name == "ridge":
+        return sk_linear_model.Ridge(alpha=hp.get("alpha", 1.5), random_state=42)
+    if model_name in ("xgboost", "gradient_boosting"):
+        return sk_ensemble.GradientBoostingRegressor(
+            n_estimators=hp.get("n_estimators", 100),
+            max_depth=hp.get("max_depth", 5 if model_name == "xgboost" else 3),
+            learning_rate=hp.get("learning_rate", 0.1),
+            subsample=hp.get("subsample", 1.0),
+            random_state=42,
+        )
+    if model_name == "random_forest":
+        return sk_ensemble.RandomForestRegressor(
+            n_estimators=hp.get("n_estimators", 100),
+            max_depth=hp.get("max_depth", 10),
+            min_samples_leaf=hp.get("min_samples_leaf", 1),
+            random_state=42,
+            n_jobs=1,
+        )
+    if model_name == "sgd":
+        return sk_linear_model.SGDRegressor(
+            alpha=hp.get("alpha", 1e-4),
+            penalty=hp.get("penalty", "l2"),
+            learning_rate=hp.get("learning_rate", "invscaling"),
+            eta0=hp.get("eta0", 0.01),
+            max_iter=hp.get("max_iter", 1000),
+            tol=1e-3,
+            random_state=42,
+        )
+    if model_name == "mlp":
+        return sk_neural_network.MLPRegressor(
+            hidden_layer_sizes=tuple(hp.get("hidden_layer_sizes", (64, 32))),
+            alpha=hp.get("alpha", 1e-4),
+            learning_rate_init=hp.get("learning_rate_init", 1e-3),
+            max_iter=hp.get("max_iter", 200),
+            random_state=42,
+        )
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+def walk_forward_splits(
+    periods: Sequence[Tuple[str, int]], n_splits: int = 5
+) -> List[Tuple[int, int]]:
+    """
+    Walk-forward folds over rows already sorted by (season, gw).
+
+    The distinct periods are cut into `n_splits + 1` contiguous blocks; fold k trains on
+    blocks 0..k and validates on block k+1. Because rows are sorted, each fold is returned
+    as row bounds `(train_end, val_end)`: train = rows[:train_end],
+    validation = rows[train_end:val_end].
+    """
+    if n_splits < 1:
+        raise ValueError("n_splits must be >= 1")
+    n_rows = len(periods)
+    if n_rows == 0:
+        return []
+
+    # Row index where each distinct period starts.
+    starts: List[int] = [0]
+    for i in range(1, n_rows):
+        if tuple(periods[i]) != tuple(periods[i - 1]):
+            starts.append(i)
+    n_periods = len(starts)
+    if n_periods < n_splits + 1:
+        n_splits = max(1, n_periods - 1)
+        if n_periods < 2:
+            return []
+
+    blocks = np.array_split(np.arange(n_periods), n_splits + 1)
+    period_start = starts + [n_rows]
+    folds = []
+    for k in range(n_splits):
+        train_end = period_start[int(blocks[k][-1]) + 1]
+        val_end = period_start[int(blocks[k + 1][-1]) + 1]
+        folds.append((train_end, val_end))
+    return folds
+
+
+def sort_by_period(
+    X: pd.DataFrame, y: Any, periods: Sequence[Tuple[str, int]]
+) -> Tuple[pd.DataFrame, np.ndarray, List[Tuple[str, int]]]:
+    """Reorder rows chronologically by (season, gw) so folds can be row prefixes."""
+    order = sorted(range(len(periods)), key=lambda i: (str(periods[i][0]), int(periods[i][1])))
+    return (
+        X.iloc[order],
+        np.asarray(y, dtype=np.float32)[order],
+        [periods[i] for i in order],
+    )
+
+
+def _scaled_estimator(model_name: str, hyperparameters: Dict[str, Any], n_numerical: int):
+    """Scale the numerical block (first `n_numerical` columns) and fit the regressor."""
+    scaler = sk_compose.ColumnTransformer(
+        transformers=[("num", sk_preprocessing.StandardScaler(), list(range(n_numerical)))],
+        remainder="passthrough",
+    )
+    return sk_pipeline.Pipeline([("scaler", scaler), ("model", make_regressor(model_name, hyperparameters))])
+
+
+def _fit_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker entry point: fit one (candidate, fold) on the shared memory-mapped matrix.
+
+    `val_end is None` marks the final fit on all rows; the fitted estimator is returned.
+    """
+    X = np.load(job["x_path"], mmap_mode="r")
+    y = np.load(job["y_path"], mmap_mode="r")
+    train_end, val_end = job["train_end"], job["val_end"]
+
+    est = _scaled_estimator(job["model_name"], job["hyperparameters"], job["n_numerical"])
+    est.fit(X[:train_end], y[:train_end])
+
+    out: Dict[str, Any] = {"candidate": job["candidate"], "fold": job["fold"]}
+    if val_end is None:
+        pred = est.predict(X[:train_end])
+        out["rmse"] = float(np.sqrt(sk_metrics.mean_squared_error(y[:train_end], pred)))
+        out["mae"] = float(sk_metrics.mean_absolute_error(y[:train_end], pred))
+        out["estimator"] = est
+    else:
+        pred = est.predict(X[train_end:val_end])
+        out["rmse"] = float(np.sqrt(sk_metrics.mean_squared_error(y[train_end:val_end], pred)))
+        out["mae"] = float(sk_metrics.mean_absolute_error(y[train_end:val_end], pred))
+        out["n_train"] = int(train_end)
+        out["n_val"] = int(val_end - train_end)
+    return out
+
+
+class ParallelTrainer:
+    """
+    Fits candidate models and walk-forward CV folds across a process pool.
+
+    Usage:
+        trainer = ParallelTrainer(numerical=[...], categorical=[...])
+        results = trainer.run(X, y, periods, {"ridge": ("ridge", {"alpha": 1.5})})
+    """
+
+    def __init__(
+        self,
+        numerical: List[str],
+        categorical: List[str],
+        n_splits: int = 5,
+        max_workers: Optional[int] = None,
+        work_dir: Optional[Path] = None,
+    ):
+        if not ML_AVAILABLE:
+            raise ImportError("ParallelTrainer requires numpy, pandas and scikit-learn.")
+        self.numerical = list(numerical)
+        self.categorical = list(categorical)
+        self.n_splits = n_splits
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.work_dir = work_dir
+
+    def encode(self, X: pd.DataFrame) -> Tuple[Any, np.ndarray]:
+        """
+        Fit the categorical encoder once and return (encoder, float32 matrix) with the
+        numerical columns first. One-hot categories carry no target information, so
+        fitting on all rows does not leak across folds.
+        """
+        encoder = sk_compose.ColumnTransformer(
+            transformers=[
+                ("num", "passthrough", self.numerical),
+                ("cat", sk_preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False), self.categorical),
+            ]
+        )
+        matrix = np.ascontiguousarray(encoder.fit_transform(X), dtype=np.float32)
+        return encoder, matrix
+
+    def run(
+        self,
+        X: pd.DataFrame,
+        y: Any,
+        periods: Sequence[Tuple[str, int]],
+        candidates: Dict[str, Tuple[str, Dict[str, Any]]],
+        fit_final: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Cross-validate every candidate and (optionally) fit it on all rows.
+
+        Args:
+            X: Feature frame containing `numerical + categorical` columns
+            y: Target aligned with X
+            periods: (season, gw) per row, used to order rows in time
+            candidates: label -> (model_name, hyperparameters)
+            fit_final: Also fit each candidate on all rows and return the pipeline
+
+        Returns:
+            label -> {cv_rmse, cv_mae, folds, rmse, mae, model}
+        """
+        X_sorted, y_sorted, periods_sorted = sort_by_period(X, y, periods)
+
+        encoder, matrix = self.encode(X_sorted)
+        folds = walk_forward_splits(periods_sorted, self.n_splits)
+        if not folds:
+            logger.warning("Not enough distinct gameweeks for walk-forward CV; skipping CV")
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix="xgenius-train-", dir=self.work_dir))
+        try:
+            x_path, y_path = tmp_dir / "X.npy", tmp_dir / "y.npy"
+            np.save(x_path, matrix)
+            np.save(y_path, y_sorted)
+            del matrix
+
+            jobs = []
+            for label, (model_name, hp) in candidates.items():
+                base = {
+                    "candidate": label,
+                    "model_name": model_name,
+                    "hyperparameters": hp or {},
+                    "n_numerical": len(self.numerical),
+                    "x_path": str(x_path),
+                    "y_path": str(y_path),
+                }
+                for k, (train_end, val_end) in enumerate(folds):
+                    jobs.append({**base, "fold": k, "train_end": train_end, "val_end": val_end})
+                if fit_final:
+                    jobs.append({**base, "fold": None, "train_end": len(y_sorted), "val_end": None})
+
+            outputs = self._execute(jobs)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        results: Dict[str, Dict[str, Any]] = {label: {"folds": []} for label in candidates}
+        for out in outputs:
+            res = results[out["candidate"]]
+            if out["fold"] is None:
+                res["rmse"] = out["rmse"]
+                res["mae"] = out["mae"]
+                res["model"] = sk_pipeline.Pipeline([("encoder", encoder), ("regressor", out["estimator"])])
+            else:
+                res["folds"].append({k: out[k] for k in ("fold", "rmse", "mae", "n_train", "n_val")})
+
+        for res in results.values():
+            res["folds"].sort(key=lambda f: f["fold"])
+            if res["folds"]:
+                # Weight folds by validation size so small tail blocks don't dominate.
+                n_val = np.array([f["n_val"] for f in res["folds"]], dtype=float)
+                mse = np.array([f["rmse"] ** 2 for f in res["folds"]])
+                res["cv_rmse"] = float(np.sqrt((mse * n_val).sum() / n_val.sum()))
+                res["cv_mae"] = float(
+                    (np.array([f["mae"] for f in res["folds"]]) * n_val).sum() / n_val.sum()
+                )
+            else:
+                res["cv_rmse"] = None
+                res["cv_mae"] = None
+        return results
+
+    def _execute(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run jobs in a process pool (or inline when a single worker is requested)."""
+        workers = min(self.max_workers, len(jobs))
+        if workers <= 1:
+            return [_fit_job(job) for job in jobs]
+        logger.info(f"Training {len(jobs)} jobs across {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_fit_job, jobs))
@@ -1,39 +1,27 @@
 """ML training pipeline."""
+from __future__ import annotations
+
 import os
 from pathlib import Path
-from typing import Dict, List, Tuple
-
-# Make ML dependencies optional for Vercel deployment
-try:
-    import joblib
-    import numpy as np
-    import pandas as pd
-    from sklearn.compose import ColumnTransformer
-    from sklearn.preprocessing import StandardScaler, OneHotEncoder
-    from sklearn.linear_model import Ridge
-    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-    from sklearn.pipeline import Pipeline
-    from sklearn.model_selection import cross_val_score
-    from sklearn.metrics import mean_squared_error, mean_absolute_error
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
-    joblib = None  # type: ignore
-    np = None  # type: ignore
-    pd = None  # type: ignore
-    ColumnTransformer = None  # type: ignore
-    StandardScaler = None  # type: ignore
-    OneHotEncoder = None  # type: ignore
-    Ridge = None  # type: ignore
-    RandomForestRegressor = None  # type: ignore
-    GradientBoostingRegressor = None  # type: ignore
-    Pipeline = None  # type: ignore
-    cross_val_score = None  # type: ignore
-    mean_squared_error = None  # type: ignore
-    mean_absolute_error = None  # type: ignore
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# joblib/numpy/pandas/sklearn are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, modules_available
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sk_compose = lazy_import("sklearn.compose")
+sk_preprocessing = lazy_import("sklearn.preprocessing")
+sk_linear_model = lazy_import("sklearn.linear_model")
+sk_ensemble = lazy_import("sklearn.ensemble")
+sk_pipeline = lazy_import("sklearn.pipeline")
+sk_metrics = lazy_import("sklearn.metrics")
+ML_AVAILABLE = modules_available("joblib", "numpy", "pandas", "sklearn")
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.services.ml.artifacts import load_artifact, save_artifact
+from app.services.ml.parallel_training import ParallelTrainer
 
 
 FEATURES_NUM = [
@@ -49,48 +37,64 @@ FEATURES_CAT = ["position", "team_hash"]
 TARGET = "points"
 
 
-def build_ridge_pipeline(alpha: float = 1.5) -> Pipeline:
+def build_ridge_pipeline(alpha: float = 1.5) -> sk_pipeline.Pipeline:
     """Build Ridge regression pipeline."""
-    preprocessor = ColumnTransformer(
+    preprocessor = sk_compose.ColumnTransformer(
         transformers=[
-            ("num", StandardScaler(), FEATURES_NUM),
-            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
+            ("num", sk_preprocessing.StandardScaler(), FEATURES_NUM),
+            ("cat", sk_preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
         ]
     )
-    model = Ridge(alpha=alpha, random_state=42)
-    return Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
+    model = sk_linear_model.Ridge(alpha=alpha, random_state=42)
+    return sk_pipeline.Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
 
 
-def build_rf_pipeline(n_estimators: int = 100) -> Pipeline:
+def build_rf_pipeline(n_estimators: int = 100) -> sk_pipeline.Pipeline:
     """Build Random Forest pipeline."""
-    preprocessor = ColumnTransformer(
+    preprocessor = sk_compose.ColumnTransformer(
         transformers=[
-            ("num", StandardScaler(), FEATURES_NUM),
-            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
+            ("num", sk_preprocessing.StandardScaler(), FEATURES_NUM),
+            ("cat", sk_preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
         ]
     )
-    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
-    return Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
+    model = sk_ensemble.RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+    return sk_pipeline.Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
 
 
-def build_gb_pipeline(n_estimators: int = 100) -> Pipeline:
+def build_gb_pipeline(n_estimators: int = 100) -> sk_pipeline.Pipeline:
     """Build Gradient Boosting pipeline."""
-    preprocessor = ColumnTransformer(
+    preprocessor = sk_compose.ColumnTransformer(
         transformers=[
-            ("num", StandardScaler(), FEATURES_NUM),
-            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
+            ("num", sk_preprocessing.StandardScaler(), FEATURES_NUM),
+            ("cat", sk_preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False), FEATURES_CAT),
         ]
     )
-    model = GradientBoostingRegressor(n_estimators=n_estimators, random_state=42)
-    return Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
+    model = sk_ensemble.GradientBoostingRegressor(n_estimators=n_estimators, random_state=42)
+    return sk_pipeline.Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
+
+
+# Saved artifact per candidate: label -> (model name, hyperparameters, file name)
+TRAINING_CANDIDATES = {
+    "ridge": ("ridge", {"alpha": 1.5}, "ridge_points.joblib"),
+    "random_forest": ("random_forest", {"n_estimators": 100, "max_depth": None}, "rf_points.joblib"),
+    "gradient_boosting": ("gradient_boosting", {"n_estimators": 100}, "gb_points.joblib"),
+}
 
 
 def train_models(
     X: pd.DataFrame,
     y: pd.Series,
     model_dir: Path = None,
+    periods: Optional[Sequence[Tuple[str, int]]] = None,
+    n_splits: int = 5,
+    max_workers: Optional[int] = None,
 ) -> Dict[str, Dict]:
-    """Train multiple models and save them."""
+    """
+    Train multiple models in parallel and save them.
+
+    `periods` gives the (season, gw) of each row for walk-forward CV; without it
+    rows are assumed to already be in chronological order.
+    """
     if not ML_AVAILABLE:
         raise ImportError("ML dependencies (joblib, sklearn, numpy, pandas) are not available. ML training requires these packages.")
     
@@ -99,43 +103,44 @@ def train_models(
     
     model_dir.mkdir(parents=True, exist_ok=True)
     
-    results = {}
-    
-    # Train Ridge
-    logger.info("Training Ridge model...")
-    ridge_pipe = build_ridge_pipeline()
-    ridge_pipe.fit(X, y)
-    ridge_pred = ridge_pipe.predict(X)
-    ridge_rmse = np.sqrt(mean_squared_error(y, ridge_pred))
-    ridge_mae = mean_absolute_error(y, ridge_pred)
-    
-    ridge_path = model_dir / "ridge_points.joblib"
-    joblib.dump({"model": ridge_pipe, "rmse": ridge_rmse, "mae": ridge_mae}, ridge_path)
-    results["ridge"] = {"rmse": ridge_rmse, "mae": ridge_mae, "path": str(ridge_path)}
-    
-    # Train Random Forest
-    logger.info("Training Random Forest model...")
-    rf_pipe = build_rf_pipeline()
-    rf_pipe.fit(X, y)
-    rf_pred = rf_pipe.predict(X)
-    rf_rmse = np.sqrt(mean_squared_error(y, rf_pred))
-    rf_mae = mean_absolute_error(y, rf_pred)
-    
-    rf_path = model_dir / "rf_points.joblib"
-    joblib.dump({"model": rf_pipe, "rmse": rf_rmse, "mae": rf_mae}, rf_path)
-    results["random_forest"] = {"rmse": rf_rmse, "mae": rf_mae, "path": str(rf_path)}
+    if periods is None:
+        periods = [("", i) for i in range(len(X))]
     
-    # Train Gradient Boosting
-    logger.info("Training Gradient Boosting model...")
-    gb_pipe = build_gb_pipeline()
-    gb_pipe.fit(X, y)
-    gb_pred = gb_pipe.predict(X)
-    gb_rmse = np.sqrt(mean_squared_error(y, gb_pred))
-    gb_mae = mean_absolute_error(y, gb_pred)
+    logger.info("Training models...", models=list(TRAINING_CANDIDATES))
+    trainer = ParallelTrainer(
+        numerical=FEATURES_NUM,
+        categorical=FEATURES_CAT,
+        n_splits=n_splits,
+        max_workers=max_workers,
+    )
+    fitted = trainer.run(
+        X,
+        y,
+        periods,
+        {label: (name, hp) for label, (name, hp, _) in TRAINING_CANDIDATES.items()},
+    )
     
-    gb_path = model_dir / "gb_points.joblib"
-    joblib.dump({"model": gb_pipe, "rmse": gb_rmse, "mae": gb_mae}, gb_path)
-    results["gradient_boosting"] = {"rmse": gb_rmse, "mae": gb_mae, "path": str(gb_path)}
+    results = {}
+    for label, (_, _, filename) in TRAINING_CANDIDATES.items():
+        res = fitted[label]
+        path = model_dir / filename
+        save_artifact(
+            {
+                "model": res["model"],
+                "rmse": res["rmse"],
+                "mae": res["mae"],
+                "cv_rmse": res["cv_rmse"],
+                "cv_mae": res["cv_mae"],
+            },
+            path,
+        )
+        results[label] = {
+            "rmse": res["rmse"],
+            "mae": res["mae"],
+            "cv_rmse": res["cv_rmse"],
+            "cv_mae": res["cv_mae"],
+            "path": str(path),
+        }
     
     logger.info("Model training complete", results=results)
     return results
@@ -157,5 +162,5 @@ def load_model(model_name: str = "ridge", model_dir: Path = None):
     if not model_path.exists():
         raise FileNotFoundError(f"Model not found: {model_path}")
     
-    blob = joblib.load(model_path)
+    blob = load_artifact(model_path)
     return blob["model"], blob.get("rmse", None), blob.get("mae", None)
@@ -1,6 +1,8 @@
 """ML prediction service."""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 from sqlalchemy.orm import Session
+from app.models import Player
+from app.models.fixture import Fixture
 from app.services.ml.feature_engineering import build_features
 from app.services.ml.pipeline import load_model
 from app.core.logging import logger
@@ -13,8 +15,17 @@ def predict_points(
     gameweek: int,
     horizon: int = 1,
     model_name: str = "ridge",
+    horizons: Optional[Sequence[int]] = None,
 ) -> Dict[str, Any]:
-    """Predict points for players."""
+    """
+    Predict points for players.
+
+    The model predicts a single gameweek: `predicted_points` is that per-GW figure and
+    `predicted_points_total` is it times the player's team fixtures in the `horizon`
+    window (blank and double gameweeks count 0 and 2). Pass `horizons` (e.g. [1, 3])
+    to also get a `projections` dict ({horizon: total points}) per player from the
+    same feature build, model call and fixture load.
+    """
     try:
         # Build features
         features_df = build_features(db, player_ids, season, gameweek)
@@ -43,24 +54,69 @@ def predict_points(
         # Predict
         predictions = model.predict(X)
         
+        # Fixture windows for every horizon from one load of the longest window
+        all_horizons = sorted({horizon, *(horizons or [])})
+        fixture_counts = _fixture_counts(
+            db, [int(pid) for pid in features_df["player_id"]], season, gameweek, all_horizons[-1]
+        )
+        
         # Build response
         results = []
         for idx, row in features_df.iterrows():
             player_id = int(row["player_id"])
-            pred_points = float(predictions[idx])
+            per_gw = float(predictions[idx])
+            counts = fixture_counts.get(player_id, [1] * all_horizons[-1])
             
             # Simple uncertainty estimate (could be improved with ensemble)
-            uncertainty = abs(pred_points * 0.2)  # 20% uncertainty
+            uncertainty = abs(per_gw * 0.2)  # 20% uncertainty
             
-            results.append({
+            result = {
                 "player_id": player_id,
-                "predicted_points": round(pred_points, 2),
+                "predicted_points": round(per_gw, 2),
+                "predicted_points_total": round(per_gw * sum(counts[:horizon]), 2),
                 "confidence": max(0.0, min(1.0, 1.0 - (uncertainty / 10.0))),
                 "risk_score": min(1.0, uncertainty / 5.0),
-            })
+            }
+            if horizons:
+                result["projections"] = {
+                    h: round(per_gw * sum(counts[:h]), 2) for h in all_horizons
+                }
+            results.append(result)
         
         return {"predictions": results}
     
     except Exception as e:
         logger.error("Prediction failed", error=str(e), exc_info=True)
         raise
+
+
+def _fixture_counts(
+    db: Session, player_ids: List[int], season: str, gameweek: int, span: int
+) -> Dict[int, List[int]]:
+    """
+    Fixtures of each player's team in every gameweek of `[gameweek, gameweek + span)`.
+
+    A gameweek with no fixtures stored for any team counts as one fixture each, so a
+    schedule that is not loaded yet falls back to one match per gameweek.
+    """
+    fixtures = (
+        db.query(Fixture.gw, Fixture.team_h_id, Fixture.team_a_id)
+        .filter(Fixture.season == season)
+        .filter(Fixture.gw >= gameweek)
+        .filter(Fixture.gw < gameweek + span)
+        .all()
+    )
+    scheduled = {gw for gw, _, _ in fixtures}
+    per_team: Dict[tuple, int] = {}
+    for gw, home, away in fixtures:
+        for team_id in (home, away):
+            per_team[(team_id, gw)] = per_team.get((team_id, gw), 0) + 1
+
+    teams = dict(db.query(Player.id, Player.team_id).filter(Player.id.in_(player_ids)).all()) if player_ids else {}
+    return {
+        pid: [
+            per_team.get((teams.get(pid), gw), 0) if gw in scheduled else 1
+            for gw in range(gameweek, gameweek + span)
+        ]
+        for pid in player_ids
+    }
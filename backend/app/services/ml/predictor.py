@@ -2,20 +2,22 @@
 ML prediction service for player points.
 """
 from __future__ import annotations
+from collections import defaultdict
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from sqlalchemy.orm import Session
 
-# Make joblib optional for Vercel deployment
-try:
-    import joblib
-    JOBLIB_AVAILABLE = True
-except ImportError:
-    JOBLIB_AVAILABLE = False
-    joblib = None  # type: ignore
+# joblib/pandas are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, module_available
+
+pd = lazy_import("pandas")
+JOBLIB_AVAILABLE = module_available("joblib")
 
 from app.core.config import settings
 from app.models import Player, WeeklyScore
+from app.services.ml.artifacts import load_artifact
+from app.services.ml.registry import ModelRegistry
 
 
 class MLPredictor:
@@ -25,6 +27,21 @@ class MLPredictor:
         self.db = db
         self.model_dir = Path(settings.MODEL_DIR)
     
+    # Players predicted per batch by `iter_predictions`
+    CHUNK_SIZE = 100
+    # Most recent gameweeks averaged into each feature row
+    RECENT_GWS = 5
+    
+    def load(self, model_name: str) -> Dict[str, Any]:
+        """Load a trained model artifact (memory-mapped and cached per process)."""
+        if not JOBLIB_AVAILABLE:
+            raise ImportError("joblib is not available. ML predictions require joblib to be installed.")
+        
+        model_path = self.model_dir / f"{model_name}_points.joblib"
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model not found: {model_path}")
+        return load_artifact(model_path)
+    
     async def predict(
         self,
         player_ids: List[int],
@@ -33,77 +50,90 @@ class MLPredictor:
         model_name: str = "xgboost",
     ) -> Dict[str, Any]:
         """Predict points for players."""
-        if not JOBLIB_AVAILABLE:
-            raise ImportError("joblib is not available. ML predictions require joblib to be installed.")
-        
-        # Load model
-        model_path = self.model_dir / f"{model_name}_points.joblib"
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model not found: {model_path}")
+        predictions: List[Dict[str, Any]] = []
+        for chunk in self.iter_predictions(player_ids, season, gameweek, model_name):
+            predictions.extend(chunk)
         
-        model_data = joblib.load(model_path)
-        pipeline = model_data["model"]
-        features = model_data["features"]
+        registered = ModelRegistry(self.model_dir).get(model_name)
+        return {
+            "predictions": predictions,
+            "model_name": model_name,
+            "model_version": str(registered["version"]) if registered else "1.0",
+            "prediction_timestamp": datetime.now().isoformat(),
+        }
+    
+    def iter_predictions(
+        self,
+        player_ids: Iterable[int],
+        season: str,
+        gameweek: int,
+        model_name: str = "xgboost",
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield predictions `chunk_size` players at a time.
+
+        Each chunk prefetches its players and recent weekly scores in two queries and
+        runs one batched `predict`, so memory stays bounded by the chunk rather than
+        the whole player pool.
+        """
+        pipeline = self.load(model_name)["model"]
+        size = chunk_size or self.CHUNK_SIZE
         
-        # Fetch player data for prediction
-        predictions = []
+        batch: List[int] = []
         for player_id in player_ids:
-            player = self.db.query(Player).filter(Player.id == player_id).first()
-            if not player:
-                continue
-            
-            # Get recent stats (last 5 gameweeks)
-            recent_scores = (
-                self.db.query(WeeklyScore)
-                .filter(WeeklyScore.player_id == player_id)
-                .filter(WeeklyScore.season == season)
-                .filter(WeeklyScore.gw < gameweek)
-                .order_by(WeeklyScore.gw.desc())
-                .limit(5)
-                .all()
-            )
-            
-            # Aggregate recent stats
-            avg_minutes = sum(ws.minutes for ws in recent_scores) / max(len(recent_scores), 1)
-            avg_xg = sum(ws.expected_goals or 0.0 for ws in recent_scores) / max(len(recent_scores), 1)
-            avg_xa = sum(ws.expected_assists or 0.0 for ws in recent_scores) / max(len(recent_scores), 1)
-            avg_shots = sum(ws.shots or 0 for ws in recent_scores) / max(len(recent_scores), 1)
-            avg_key_passes = sum(ws.key_passes or 0 for ws in recent_scores) / max(len(recent_scores), 1)
-            
-            # Prepare feature vector
-            import pandas as pd
-            
-            feature_dict = {
-                "minutes": avg_minutes,
-                "expected_goals": avg_xg,
-                "expected_assists": avg_xa,
-                "shots": avg_shots,
-                "key_passes": avg_key_passes,
-                "position": player.position,
-                "team_id": player.team_id or 0,
-            }
-            
-            # Convert to DataFrame
-            X = pd.DataFrame([feature_dict])
-            
-            # Predict
-            predicted_points = float(pipeline.predict(X)[0])
-            
-            predictions.append({
-                "player_id": player_id,
+            batch.append(player_id)
+            if len(batch) >= size:
+                yield self._predict_chunk(pipeline, batch, season, gameweek, model_name)
+                batch = []
+        if batch:
+            yield self._predict_chunk(pipeline, batch, season, gameweek, model_name)
+    
+    def _predict_chunk(
+        self, pipeline: Any, player_ids: List[int], season: str, gameweek: int, model_name: str
+    ) -> List[Dict[str, Any]]:
+        players = {p.id: p for p in self.db.query(Player).filter(Player.id.in_(player_ids)).all()}
+        if not players:
+            return []
+        
+        recent: Dict[int, List[WeeklyScore]] = defaultdict(list)
+        scores = (
+            self.db.query(WeeklyScore)
+            .filter(WeeklyScore.player_id.in_(list(players)))
+            .filter(WeeklyScore.season == season)
+            .filter(WeeklyScore.gw < gameweek)
+            .order_by(WeeklyScore.player_id, WeeklyScore.gw.desc())
+            .all()
+        )
+        for ws in scores:
+            if len(recent[ws.player_id]) < self.RECENT_GWS:
+                recent[ws.player_id].append(ws)
+        
+        ordered = [players[pid] for pid in player_ids if pid in players]
+        X = pd.DataFrame([self._feature_row(player, recent.get(player.id, [])) for player in ordered])
+        predicted = pipeline.predict(X)
+        
+        return [
+            {
+                "player_id": player.id,
                 "player_name": player.name,
-                "predicted_points": max(0.0, predicted_points),  # Points can't be negative
+                "predicted_points": max(0.0, float(points)),  # Points can't be negative
                 "model_name": model_name,
                 "gameweek": gameweek,
-            })
-        
-        import pandas as pd
-        from datetime import datetime
-        
+            }
+            for player, points in zip(ordered, predicted)
+        ]
+    
+    @staticmethod
+    def _feature_row(player: Player, recent_scores: List[WeeklyScore]) -> Dict[str, Any]:
+        """Average the recent weekly stats into the model's feature vector."""
+        n = max(len(recent_scores), 1)
         return {
-            "predictions": predictions,
-            "model_name": model_name,
-            "model_version": "1.0",
-            "prediction_timestamp": datetime.now().isoformat(),
+            "minutes": sum(ws.minutes for ws in recent_scores) / n,
+            "expected_goals": sum(ws.expected_goals or 0.0 for ws in recent_scores) / n,
+            "expected_assists": sum(ws.expected_assists or 0.0 for ws in recent_scores) / n,
+            "shots": sum(ws.shots or 0 for ws in recent_scores) / n,
+            "key_passes": sum(ws.key_passes or 0 for ws in recent_scores) / n,
+            "position": player.position,
+            "team_id": player.team_id or 0,
         }
-
@@ -0,0 +1,91 @@
+"""
+Model registry metadata.
+
+A small JSON document (`registry.json` in MODEL_DIR) recording, per model name, the
+active artifact, its version, training metrics and hyperparameters, and the latest
+tuning results (best configuration plus leaderboard). Artifacts themselves stay in the
+`{model_name}_points.joblib` files.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class ModelRegistry:
+    """Reads and updates `registry.json`; writes are atomic (temp file + rename)."""
+
+    FILENAME = "registry.json"
+    _lock = threading.Lock()
+
+    def __init__(self, model_dir: Optional[Path] = None):
+        self.model_dir = Path(model_dir or settings.MODEL_DIR)
+        self.path = self.model_dir / self.FILENAME
+
+    def load(self) -> Dict[str, Any]:
+        """Full registry document ({"models": {...}})."""
+        if not self.path.exists():
+            return {"models": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {"models": {}}
+        data.setdefault("models", {})
+        return data
+
+    def get(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Metadata for one model, or None if it was never registered."""
+        return self.load()["models"].get(model_name)
+
+    def update(self, model_name: str, **fields: Any) -> Dict[str, Any]:
+        """Merge `fields` into a model's entry and persist."""
+        with self._lock:
+            data = self.load()
+            entry = data["models"].setdefault(model_name, {})
+            entry.update(fields)
+            entry["updated_at"] = datetime.utcnow().isoformat()
+            self._save(data)
+            return entry
+
+    def record_training(
+        self,
+        model_name: str,
+        model_path: str,
+        metrics: Dict[str, Any],
+        hyperparameters: Dict[str, Any],
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """Register a freshly trained artifact as the active version."""
+        with self._lock:
+            data = self.load()
+            entry = data["models"].setdefault(model_name, {})
+            entry.update(
+                {
+                    "version": int(entry.get("version", 0)) + 1,
+                    "model_path": model_path,
+                    "metrics": metrics,
+                    "hyperparameters": hyperparameters,
+                    "trained_at": datetime.utcnow().isoformat(),
+                    # A full retrain supersedes any online updates.
+                    "incremental_updates": 0,
+                    "needs_full_retrain": False,
+                    **extra,
+                }
+            )
+            entry["updated_at"] = entry["trained_at"]
+            self._save(data)
+            return entry
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp, self.path)
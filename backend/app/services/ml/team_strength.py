@@ -0,0 +1,306 @@
+"""
+Team attack/defence ratings and a precomputed fixture matrix.
+
+A multiplicative Poisson model (Maher): in a match between home team i and away
+team j,
+
+    home goals ~ Poisson(mu_home * attack_i * defence_j)
+    away goals ~ Poisson(mu_away * attack_j * defence_i)
+
+where `defence` is a conceding multiplier (below 1 is a good defence). Ratings are fitted
+by alternating closed-form maximum-likelihood updates. The inputs are the season's
+finished `Fixture` results before the target gameweek, exponentially down-weighted by
+age. Ratings are shrunk toward priors derived from the FPL `Team.strength_attack_*` /
+`strength_defence_*` columns, which dominate early in the season when few results exist.
+
+For every (season, gameweek) the fitted ratings are expanded into a team x team x venue
+matrix of expected goals. Clean-sheet probability is derived from it (P(0) = exp(-xGA)).
+Feature building and the optimizer then look fixtures up in O(1).
+
+Matrices are cached per process and refitted only when the season's results or team
+strength columns change.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.lazy_imports import lazy_import, module_available
+from app.core.logging import logger
+from app.models.fixture import Fixture, Team
+
+np = lazy_import("numpy")
+NUMPY_AVAILABLE = module_available("numpy")
+
+HOME, AWAY = 0, 1
+
+# Goals per team per match used when there is no history at all
+DEFAULT_HOME_GOALS = 1.55
+DEFAULT_AWAY_GOALS = 1.25
+
+
+class StrengthMatrix:
+    """
+    Expected goals and clean-sheet probabilities for every pairing and venue.
+
+    `xg[i, j, HOME]` is team i's expected goals at home to team j, and
+    `xg[i, j, AWAY]` is team i's expected goals away at team j (indices via `index`).
+    """
+
+    def __init__(
+        self,
+        team_ids: List[int],
+        attack: Any,
+        defence: Any,
+        mu_home: float,
+        mu_away: float,
+        season: str,
+        gameweek: int,
+        n_matches: int,
+    ):
+        self.team_ids = list(team_ids)
+        self.index = {tid: i for i, tid in enumerate(self.team_ids)}
+        self.attack = attack
+        self.defence = defence
+        self.mu_home = float(mu_home)
+        self.mu_away = float(mu_away)
+        self.season = season
+        self.gameweek = gameweek
+        self.n_matches = n_matches
+
+        # (n, n, 2): attack of the row team x defence of the column team, per venue
+        base = np.outer(attack, defence)
+        self.xg = np.stack([base * self.mu_home, base * self.mu_away], axis=-1)
+        self.clean_sheet = np.exp(-self.xg)
+        n = len(self.team_ids)
+        off_diag = ~np.eye(n, dtype=bool)
+        self.mean_xg = float(self.xg[off_diag].mean()) if n > 1 else (self.mu_home + self.mu_away) / 2
+        self.mean_clean_sheet = float(self.clean_sheet[off_diag].mean()) if n > 1 else math.exp(-self.mean_xg)
+
+    def fixture(self, team_id: int, opponent_id: int, is_home: bool) -> Optional[Dict[str, float]]:
+        """Expected goals for/against and clean-sheet probability for one side of a fixture."""
+        i = self.index.get(team_id)
+        j = self.index.get(opponent_id)
+        if i is None or j is None:
+            return None
+        venue, opp_venue = (HOME, AWAY) if is_home else (AWAY, HOME)
+        xg_for = float(self.xg[i, j, venue])
+        xg_against = float(self.xg[j, i, opp_venue])
+        return {
+            "xg": xg_for,
+            "xga": xg_against,
+            "clean_sheet_prob": math.exp(-xg_against),
+        }
+
+    def ratings(self) -> List[Dict[str, Any]]:
+        """Per-team ratings, strongest attack first."""
+        rows = [
+            {"team_id": tid, "attack": float(self.attack[i]), "defence": float(self.defence[i])}
+            for tid, i in self.index.items()
+        ]
+        return sorted(rows, key=lambda r: -r["attack"])
+
+
+class TeamStrengthModel:
+    """
+    Fits attack/defence ratings and builds a `StrengthMatrix` per (season, gameweek).
+
+    Usage:
+        matrix = TeamStrengthModel(db).matrix("2024-25", 12)
+        matrix.fixture(team_id, opponent_id, is_home=True)["clean_sheet_prob"]
+    """
+
+    # Weight of the prior, in pseudo-matches per team
+    PRIOR_MATCHES = 6.0
+    # FPL strength columns span a much narrower range than real scoring rates
+    PRIOR_EXPONENT = 2.5
+    # Per-gameweek decay of older results (half-life of ~17 gameweeks)
+    DECAY_PER_GW = 0.96
+    MAX_ITER = 50
+
+    _cache: "OrderedDict[Tuple[str, int, bool], Tuple[str, StrengthMatrix]]" = OrderedDict()
+    _cache_size = 64
+    _lock = threading.Lock()
+
+    def __init__(self, db: Session, use_priors: bool = True):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("TeamStrengthModel requires numpy.")
+        self.db = db
+        # Strength columns reflect the current state; backtests turn them off.
+        self.use_priors = use_priors
+
+    def matrix(self, season: str, gameweek: int) -> Optional[StrengthMatrix]:
+        """Matrix fitted on results before `gameweek`; cached until results change."""
+        teams = self.db.query(Team).order_by(Team.id).all()
+        if not teams:
+            return None
+        key = (season, int(gameweek), self.use_priors)
+        fingerprint = self._fingerprint(season, gameweek, teams)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == fingerprint:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        matrix = self.fit(season, gameweek, teams)
+        with self._lock:
+            self._cache[key] = (fingerprint, matrix)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return matrix
+
+    def fit(self, season: str, gameweek: int, teams: Optional[List[Team]] = None) -> StrengthMatrix:
+        """Fit ratings on finished fixtures of `season` before `gameweek`."""
+        teams = teams if teams is not None else self.db.query(Team).order_by(Team.id).all()
+        team_ids = [t.id for t in teams]
+        index = {tid: i for i, tid in enumerate(team_ids)}
+        n = len(team_ids)
+
+        results = (
+            self.db.query(
+                Fixture.gw, Fixture.team_h_id, Fixture.team_a_id,
+                Fixture.team_h_score, Fixture.team_a_score,
+            )
+            .filter(Fixture.season == season)
+            .filter(Fixture.gw < gameweek)
+            .filter(Fixture.finished == True)  # noqa: E712
+            .filter(Fixture.team_h_score.isnot(None))
+            .filter(Fixture.team_a_score.isnot(None))
+            .all()
+        )
+        rows = [r for r in results if r.team_h_id in index and r.team_a_id in index]
+
+        prior_attack, prior_defence = self._priors(teams)
+        if rows:
+            h = np.array([index[r.team_h_id] for r in rows])
+            a = np.array([index[r.team_a_id] for r in rows])
+            hg = np.array([r.team_h_score for r in rows], dtype=float)
+            ag = np.array([r.team_a_score for r in rows], dtype=float)
+            w = self.DECAY_PER_GW ** (gameweek - 1 - np.array([r.gw for r in rows], dtype=float))
+            mu_home = max(float((w * hg).sum() / w.sum()), 0.1)
+            mu_away = max(float((w * ag).sum() / w.sum()), 0.1)
+        else:
+            h = a = np.zeros(0, dtype=int)
+            hg = ag = w = np.zeros(0)
+            mu_home, mu_away = DEFAULT_HOME_GOALS, DEFAULT_AWAY_GOALS
+
+        attack = prior_attack.copy()
+        defence = prior_defence.copy()
+        k = self.PRIOR_MATCHES
+        # Goals scored / conceded per team (weighted), constant across iterations
+        scored = np.bincount(h, weights=w * hg, minlength=n) + np.bincount(a, weights=w * ag, minlength=n)
+        conceded = np.bincount(h, weights=w * ag, minlength=n) + np.bincount(a, weights=w * hg, minlength=n)
+        mu_avg = (mu_home + mu_away) / 2
+
+        for _ in range(self.MAX_ITER if rows else 0):
+            # Expected goals for each team at attack == 1, given current defences
+            exposure_att = (
+                np.bincount(h, weights=w * mu_home * defence[a], minlength=n)
+                + np.bincount(a, weights=w * mu_away * defence[h], minlength=n)
+            )
+            new_attack = (scored + k * mu_avg * prior_attack) / (exposure_att + k * mu_avg)
+            new_attack /= new_attack.mean()
+
+            exposure_def = (
+                np.bincount(h, weights=w * mu_away * new_attack[a], minlength=n)
+                + np.bincount(a, weights=w * mu_home * new_attack[h], minlength=n)
+            )
+            new_defence = (conceded + k * mu_avg * prior_defence) / (exposure_def + k * mu_avg)
+
+            # Home/away base rates given the ratings
+            mu_home = max(float((w * hg).sum() / max((w * new_attack[h] * new_defence[a]).sum(), 1e-9)), 0.1)
+            mu_away = max(float((w * ag).sum() / max((w * new_attack[a] * new_defence[h]).sum(), 1e-9)), 0.1)
+
+            converged = np.abs(new_attack - attack).max() < 1e-6 and np.abs(new_defence - defence).max() < 1e-6
+            attack, defence = new_attack, new_defence
+            if converged:
+                break
+
+        logger.info(
+            f"Fitted team strengths for {season} GW{gameweek} on {len(rows)} results "
+            f"(mu_home={mu_home:.2f}, mu_away={mu_away:.2f})"
+        )
+        return StrengthMatrix(team_ids, attack, defence, mu_home, mu_away, season, gameweek, len(rows))
+
+    def _priors(self, teams: List[Team]) -> Tuple[Any, Any]:
+        """Attack / defence priors from the FPL strength columns (flat without them)."""
+        n = len(teams)
+        if not self.use_priors or n == 0:
+            return np.ones(n), np.ones(n)
+        att = np.array(
+            [((t.strength_attack_home or 1000) + (t.strength_attack_away or 1000)) / 2 for t in teams],
+            dtype=float,
+        )
+        dfn = np.array(
+            [((t.strength_defence_home or 1000) + (t.strength_defence_away or 1000)) / 2 for t in teams],
+            dtype=float,
+        )
+        prior_attack = (att / att.mean()) ** self.PRIOR_EXPONENT
+        # Higher FPL defence strength means fewer goals conceded
+        prior_defence = (dfn.mean() / dfn) ** self.PRIOR_EXPONENT
+        return prior_attack / prior_attack.mean(), prior_defence / prior_defence.mean()
+
+    def _fingerprint(self, season: str, gameweek: int, teams: List[Team]) -> str:
+        count, max_updated, goals = (
+            self.db.query(
+                func.count(Fixture.id),
+                func.max(Fixture.updated_at),
+                func.sum(Fixture.team_h_score + Fixture.team_a_score),
+            )
+            .filter(Fixture.season == season)
+            .filter(Fixture.gw < gameweek)
+            .filter(Fixture.finished == True)  # noqa: E712
+            .one()
+        )
+        team_updated = max((t.updated_at for t in teams if t.updated_at), default=None)
+        return f"{len(teams)}|{count}|{max_updated}|{goals}|{team_updated}"
+
+
+def fixture_window_features(
+    matrix: Optional[StrengthMatrix], team_id: int, fixtures: List[Fixture]
+) -> Dict[str, float]:
+    """
+    Strength-based fixture features for a team over its fixtures in a window.
+
+    Indices are relative to the league average (1.0 = an average fixture).
+    """
+    if matrix is None:
+        return {
+            "team_xg_1": DEFAULT_HOME_GOALS, "team_xga_1": DEFAULT_AWAY_GOALS,
+            "clean_sheet_prob_1": math.exp(-DEFAULT_AWAY_GOALS),
+            "team_xg_avg": DEFAULT_HOME_GOALS, "clean_sheet_prob_avg": math.exp(-DEFAULT_AWAY_GOALS),
+            "attack_fixture_index_1": 1.0, "defence_fixture_index_1": 1.0,
+        }
+
+    lookups = []
+    for fix in fixtures:
+        is_home = fix.team_h_id == team_id
+        opponent = fix.team_a_id if is_home else fix.team_h_id
+        value = matrix.fixture(team_id, opponent, is_home)
+        if value is not None:
+            lookups.append(value)
+
+    if not lookups:
+        return {
+            "team_xg_1": matrix.mean_xg, "team_xga_1": matrix.mean_xg,
+            "clean_sheet_prob_1": matrix.mean_clean_sheet,
+            "team_xg_avg": matrix.mean_xg, "clean_sheet_prob_avg": matrix.mean_clean_sheet,
+            "attack_fixture_index_1": 1.0, "defence_fixture_index_1": 1.0,
+        }
+
+    first = lookups[0]
+    return {
+        "team_xg_1": first["xg"],
+        "team_xga_1": first["xga"],
+        "clean_sheet_prob_1": first["clean_sheet_prob"],
+        "team_xg_avg": sum(v["xg"] for v in lookups) / len(lookups),
+        "clean_sheet_prob_avg": sum(v["clean_sheet_prob"] for v in lookups) / len(lookups),
+        "attack_fixture_index_1": first["xg"] / max(matrix.mean_xg, 1e-6),
+        "defence_fixture_index_1": first["clean_sheet_prob"] / max(matrix.mean_clean_sheet, 1e-6),
+    }
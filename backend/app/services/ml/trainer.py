@@ -5,59 +5,42 @@ Supports Ridge Regression, Gradient Boosting, and Random Forest.
 from __future__ import annotations
 import os
 from pathlib import Path
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 
-# Make numpy/pandas/sklearn optional for Vercel deployment
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    NUMPY_AVAILABLE = False
-    np = None  # type: ignore
+# numpy/pandas/sklearn are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, module_available, modules_available
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    pd = None  # type: ignore
-
-try:
-    import joblib
-    from sklearn.compose import ColumnTransformer
-    from sklearn.preprocessing import OneHotEncoder, StandardScaler
-    from sklearn.linear_model import Ridge
-    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-    from sklearn.pipeline import Pipeline
-    from sklearn.model_selection import train_test_split, cross_val_score
-    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    joblib = None  # type: ignore
-    ColumnTransformer = None  # type: ignore
-    OneHotEncoder = None  # type: ignore
-    StandardScaler = None  # type: ignore
-    Ridge = None  # type: ignore
-    GradientBoostingRegressor = None  # type: ignore
-    RandomForestRegressor = None  # type: ignore
-    Pipeline = None  # type: ignore
-    train_test_split = None  # type: ignore
-    cross_val_score = None  # type: ignore
-    mean_squared_error = None  # type: ignore
-    mean_absolute_error = None  # type: ignore
-    r2_score = None  # type: ignore
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sk_metrics = lazy_import("sklearn.metrics")
+NUMPY_AVAILABLE = module_available("numpy")
+PANDAS_AVAILABLE = module_available("pandas")
+SKLEARN_AVAILABLE = modules_available("sklearn", "joblib")
 
 from app.core.config import settings
+from app.services.ml.artifacts import save_artifact
+from app.services.ml.parallel_training import ParallelTrainer
+from app.services.ml.registry import ModelRegistry
+from app.services.ml.tuning import SuccessiveHalvingTuner
 
 
 class MLTrainer:
-    """Trains ML models for FPL point prediction."""
+    """
+    Trains ML models for FPL point prediction.
+
+    ridge, xgboost and random_forest are batch models; sgd and mlp additionally
+    support online updates between full retrains (see `OnlineModelUpdater`).
+    """
     
     NUMERICAL_FEATURES = ["minutes", "expected_goals", "expected_assists", "shots", "key_passes"]
     CATEGORICAL_FEATURES = ["position", "team_id"]
     TARGET = "points"
+    # Walk-forward folds over (season, gw) for cross-validation
+    CV_SPLITS = 5
+    # Candidates sampled per tuning run (whole grid if smaller)
+    TUNING_CANDIDATES = 16
     
     def __init__(self, db: Session):
         if not SKLEARN_AVAILABLE or not NUMPY_AVAILABLE or not PANDAS_AVAILABLE:
@@ -74,8 +57,17 @@ class MLTrainer:
         model_name: str,
         seasons: List[str],
         hyperparameters: Dict[str, Any] = None,
+        tune: bool = False,
+        search_space: Optional[Dict[str, List[Any]]] = None,
+        n_candidates: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Train a model on historical data."""
+        """
+        Train a model on historical data.
+
+        With `tune=True`, a successive-halving search over `search_space` (or the
+        model's default space) picks the hyperparameters first; explicit
+        `hyperparameters` override the tuned values.
+        """
         hyperparameters = hyperparameters or {}
         
         # Load training data
@@ -92,66 +84,73 @@ class MLTrainer:
         mask = ~y.isna()
         X = X[mask]
         y = y[mask]
+        periods = list(zip(df.loc[mask, "season"].astype(str), df.loc[mask, "gw"].astype(int)))
         
-        # Build preprocessing pipeline
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ("num", StandardScaler(), self.NUMERICAL_FEATURES),
-                ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), self.CATEGORICAL_FEATURES),
-            ]
-        )
-        
-        # Select model
-        if model_name == "ridge":
-            model = Ridge(alpha=hyperparameters.get("alpha", 1.5), random_state=42)
-        elif model_name == "xgboost":
-            model = GradientBoostingRegressor(
-                n_estimators=hyperparameters.get("n_estimators", 100),
-                max_depth=hyperparameters.get("max_depth", 5),
-                learning_rate=hyperparameters.get("learning_rate", 0.1),
-                random_state=42,
-            )
-        elif model_name == "random_forest":
-            model = RandomForestRegressor(
-                n_estimators=hyperparameters.get("n_estimators", 100),
-                max_depth=hyperparameters.get("max_depth", 10),
-                random_state=42,
+        tuning = None
+        if tune:
+            tuner = SuccessiveHalvingTuner(
+                numerical=self.NUMERICAL_FEATURES,
+                categorical=self.CATEGORICAL_FEATURES,
+                n_splits=self.CV_SPLITS,
+                n_candidates=n_candidates or self.TUNING_CANDIDATES,
             )
-        else:
-            raise ValueError(f"Unknown model: {model_name}")
-        
-        # Build full pipeline
-        pipeline = Pipeline([
-            ("preprocessor", preprocessor),
-            ("model", model),
-        ])
+            tuning = tuner.search(X, y, periods, model_name, search_space)
+            hyperparameters = {**tuning["best_params"], **hyperparameters}
         
-        # Train
-        pipeline.fit(X, y)
+        # Walk-forward CV folds and the final fit run in parallel worker processes
+        trainer = ParallelTrainer(
+            numerical=self.NUMERICAL_FEATURES,
+            categorical=self.CATEGORICAL_FEATURES,
+            n_splits=self.CV_SPLITS,
+        )
+        result = trainer.run(X, y, periods, {model_name: (model_name, hyperparameters)})[model_name]
+        pipeline = result["model"]
         
-        # Evaluate
+        # Evaluate (in-sample)
         y_pred = pipeline.predict(X)
-        rmse = float(np.sqrt(mean_squared_error(y, y_pred)))
-        mae = float(mean_absolute_error(y, y_pred))
-        r2 = float(r2_score(y, y_pred))
-        
-        # Cross-validation
-        cv_scores = cross_val_score(pipeline, X, y, cv=5, scoring="neg_mean_squared_error")
-        cv_rmse = float(np.sqrt(-cv_scores.mean()))
+        rmse = float(np.sqrt(sk_metrics.mean_squared_error(y, y_pred)))
+        mae = float(sk_metrics.mean_absolute_error(y, y_pred))
+        r2 = float(sk_metrics.r2_score(y, y_pred))
+        cv_rmse = result["cv_rmse"]
         
         # Save model
         model_path = self.model_dir / f"{model_name}_points.joblib"
-        joblib.dump({
+        save_artifact({
             "model": pipeline,
             "rmse": rmse,
             "mae": mae,
             "r2": r2,
             "cv_rmse": cv_rmse,
+            "cv_folds": result["folds"],
             "features": self.NUMERICAL_FEATURES + self.CATEGORICAL_FEATURES,
             "target": self.TARGET,
             "model_name": model_name,
         }, model_path)
         
+        last_season, last_gw = max(periods)
+        registry_fields = {
+            "seasons": seasons,
+            "n_samples": len(X),
+            "cv_folds": result["folds"],
+            "trained_through": {"season": last_season, "gw": last_gw},
+        }
+        if tuning is not None:
+            registry_fields["tuning"] = {
+                "best_params": tuning["best_params"],
+                "best_cv_rmse": tuning["best_cv_rmse"],
+                "leaderboard": tuning["leaderboard"],
+                "rounds": tuning["rounds"],
+                "search_space": tuning["search_space"],
+                "tuned_at": datetime.utcnow().isoformat(),
+            }
+        entry = ModelRegistry(self.model_dir).record_training(
+            model_name,
+            str(model_path),
+            metrics={"rmse": rmse, "mae": mae, "r2": r2, "cv_rmse": cv_rmse, "cv_mae": result["cv_mae"]},
+            hyperparameters=hyperparameters,
+            **registry_fields,
+        )
+        
         return {
             "model_name": model_name,
             "model_path": str(model_path),
@@ -159,35 +158,94 @@ class MLTrainer:
             "mae": mae,
             "r2": r2,
             "cv_rmse": cv_rmse,
+            "cv_mae": result["cv_mae"],
             "n_samples": len(X),
+            "version": entry["version"],
+            "hyperparameters": hyperparameters,
+            "best_params": tuning["best_params"] if tuning else None,
         }
     
-    def _load_training_data(self, seasons: List[str]) -> pd.DataFrame:
-        """Load training data from database."""
+    # Rows fetched per round trip when streaming training data
+    LOAD_CHUNK_SIZE = 20_000
+    # Compact dtypes for the training frame (float64/object would be 2-8x larger)
+    COLUMN_DTYPES = {
+        "player_id": "int32",
+        "season": "category",
+        "gw": "int16",
+        "minutes": "int16",
+        "expected_goals": "float32",
+        "expected_assists": "float32",
+        "shots": "int16",
+        "key_passes": "int16",
+        "position": "category",
+        "team_id": "int16",
+        "points": "float32",
+    }
+
+    def _load_training_data(
+        self,
+        seasons: List[str],
+        gw: Optional[int] = None,
+        player_ids: Optional[List[int]] = None,
+    ) -> pd.DataFrame:
+        """
+        Load training data from database.
+
+        Streams only the needed columns through a joined Core select (no ORM
+        objects, no lazy `ws.player` loads) in chunks, casting each chunk to
+        compact dtypes before concatenating. `gw`/`player_ids` narrow the load to a
+        single gameweek's rows (used by online updates).
+        """
+        chunks = list(self._iter_training_chunks(seasons, gw, player_ids))
+        if not chunks:
+            return pd.DataFrame(columns=list(self.COLUMN_DTYPES)).astype(self.COLUMN_DTYPES)
+
+        df = pd.concat(chunks, ignore_index=True)
+        # Chunks can disagree on category sets; re-establish compact categoricals.
+        for col, dtype in self.COLUMN_DTYPES.items():
+            if dtype == "category":
+                df[col] = df[col].astype("category")
+        return df
+
+    def _iter_training_chunks(
+        self,
+        seasons: List[str],
+        gw: Optional[int] = None,
+        player_ids: Optional[List[int]] = None,
+    ):
+        """Yield typed DataFrame chunks of (features, target) rows for `seasons`."""
+        from sqlalchemy import select, func
         from app.models import WeeklyScore, Player
-        
-        query = (
-            self.db.query(WeeklyScore)
+
+        stmt = (
+            select(
+                WeeklyScore.player_id,
+                WeeklyScore.season,
+                WeeklyScore.gw,
+                WeeklyScore.minutes,
+                func.coalesce(WeeklyScore.expected_goals, 0.0).label("expected_goals"),
+                func.coalesce(WeeklyScore.expected_assists, 0.0).label("expected_assists"),
+                func.coalesce(WeeklyScore.shots, 0).label("shots"),
+                func.coalesce(WeeklyScore.key_passes, 0).label("key_passes"),
+                Player.position,
+                func.coalesce(Player.team_id, 0).label("team_id"),
+                WeeklyScore.points,
+            )
             .join(Player, WeeklyScore.player_id == Player.id)
-            .filter(WeeklyScore.season.in_(seasons))
-            .filter(WeeklyScore.minutes > 0)  # Only players who played
+            .where(WeeklyScore.season.in_(seasons))
+            .where(WeeklyScore.minutes > 0)  # Only players who played
+            .order_by(WeeklyScore.season, WeeklyScore.gw, WeeklyScore.player_id)
+            .execution_options(yield_per=self.LOAD_CHUNK_SIZE)
         )
-        
-        data = []
-        for ws in query.all():
-            data.append({
-                "player_id": ws.player_id,
-                "season": ws.season,
-                "gw": ws.gw,
-                "minutes": ws.minutes,
-                "expected_goals": ws.expected_goals or 0.0,
-                "expected_assists": ws.expected_assists or 0.0,
-                "shots": ws.shots or 0,
-                "key_passes": ws.key_passes or 0,
-                "position": ws.player.position,
-                "team_id": ws.player.team_id or 0,
-                "points": ws.points,
-            })
-        
-        return pd.DataFrame(data)
+        if gw is not None:
+            stmt = stmt.where(WeeklyScore.gw == gw)
+        if player_ids is not None:
+            stmt = stmt.where(WeeklyScore.player_id.in_(player_ids))
 
+        columns = list(self.COLUMN_DTYPES)
+        result = self.db.execute(stmt)
+        for partition in result.partitions():
+            chunk = pd.DataFrame.from_records(partition, columns=columns)
+            # Target may be NULL; keep it as NaN so train() can drop those rows.
+            chunk["points"] = pd.to_numeric(chunk["points"], errors="coerce")
+            yield chunk.astype(self.COLUMN_DTYPES)
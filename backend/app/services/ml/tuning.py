@@ -0,0 +1,253 @@
+"""
+Hyperparameter search for the MLTrainer models using successive halving.
+
+Candidates are sampled from a search space and scored on walk-forward folds, with the
+number of folds as the budget. Every candidate starts on the most recent fold(s). After
+each round the best `1/eta` are kept and evaluated on more (older) folds; scores for
+folds already seen are reused.
+
+The preprocessing (scaler + one-hot) is fitted once per fold on that fold's training
+prefix. The transformed train/validation matrices are cached as `.npy` files that
+workers memory-map, so no candidate refits or re-pickles them. Candidate fits run in a
+bounded process pool.
+"""
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# numpy/pandas/sklearn are optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, modules_available
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sk_compose = lazy_import("sklearn.compose")
+sk_preprocessing = lazy_import("sklearn.preprocessing")
+sk_model_selection = lazy_import("sklearn.model_selection")
+sk_metrics = lazy_import("sklearn.metrics")
+ML_AVAILABLE = modules_available("numpy", "pandas", "sklearn")
+
+from app.core.logging import logger
+from app.services.ml.parallel_training import make_regressor, sort_by_period, walk_forward_splits
+
+
+DEFAULT_SEARCH_SPACES: Dict[str, Dict[str, List[Any]]] = {
+    "ridge": {
+        "alpha": [0.01, 0.1, 0.3, 1.0, 1.5, 3.0, 10.0, 30.0, 100.0],
+    },
+    "xgboost": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [3, 5, 7],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "subsample": [0.8, 1.0],
+    },
+    "random_forest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [6, 10, 16, None],
+        "min_samples_leaf": [1, 3, 5],
+    },
+    "sgd": {
+        "alpha": [1e-5, 1e-4, 1e-3, 1e-2],
+        "eta0": [0.001, 0.01, 0.05],
+        "penalty": ["l2", "elasticnet"],
+    },
+    "mlp": {
+        "hidden_layer_sizes": [[32], [64, 32], [128, 64]],
+        "alpha": [1e-5, 1e-4, 1e-3],
+        "learning_rate_init": [1e-3, 3e-3],
+    },
+}
+
+
+def _score_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: fit one candidate on one cached, preprocessed fold."""
+    X_train = np.load(job["x_train"], mmap_mode="r")
+    y_train = np.load(job["y_train"], mmap_mode="r")
+    X_val = np.load(job["x_val"], mmap_mode="r")
+    y_val = np.load(job["y_val"], mmap_mode="r")
+
+    model = make_regressor(job["model_name"], job["params"])
+    model.fit(X_train, y_train)
+    mse = float(sk_metrics.mean_squared_error(y_val, model.predict(X_val)))
+    return {"candidate": job["candidate"], "fold": job["fold"], "mse": mse, "n_val": int(len(y_val))}
+
+
+class SuccessiveHalvingTuner:
+    """
+    Successive-halving search over walk-forward folds.
+
+    Usage:
+        tuner = SuccessiveHalvingTuner(numerical=[...], categorical=[...])
+        result = tuner.search(X, y, periods, "ridge")
+        result["best_params"], result["leaderboard"]
+    """
+
+    def __init__(
+        self,
+        numerical: List[str],
+        categorical: List[str],
+        n_splits: int = 5,
+        n_candidates: int = 16,
+        eta: int = 3,
+        min_folds: int = 1,
+        max_workers: Optional[int] = None,
+        random_state: int = 42,
+        work_dir: Optional[Path] = None,
+    ):
+        if not ML_AVAILABLE:
+            raise ImportError("SuccessiveHalvingTuner requires numpy, pandas and scikit-learn.")
+        if eta < 2:
+            raise ValueError("eta must be >= 2")
+        self.numerical = list(numerical)
+        self.categorical = list(categorical)
+        self.n_splits = n_splits
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.min_folds = max(1, min_folds)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.random_state = random_state
+        self.work_dir = work_dir
+
+    def candidates(self, search_space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """Whole grid when small enough, otherwise a random sample of `n_candidates`."""
+        space = {k: list(v) if isinstance(v, (list, tuple)) else [v] for k, v in search_space.items()}
+        grid = sk_model_selection.ParameterGrid(space)
+        if len(grid) <= self.n_candidates:
+            return list(grid)
+        return list(sk_model_selection.ParameterSampler(space, n_iter=self.n_candidates, random_state=self.random_state))
+
+    def search(
+        self,
+        X: pd.DataFrame,
+        y: Any,
+        periods: Sequence[Tuple[str, int]],
+        model_name: str,
+        search_space: Optional[Dict[str, List[Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the search.
+
+        Returns:
+            {best_params, best_cv_rmse, leaderboard, rounds, search_space}
+        """
+        if search_space is None:
+            if model_name not in DEFAULT_SEARCH_SPACES:
+                raise ValueError(f"No default search space for model: {model_name}")
+            search_space = DEFAULT_SEARCH_SPACES[model_name]
+
+        X_sorted, y_sorted, periods_sorted = sort_by_period(X, y, periods)
+        folds = walk_forward_splits(periods_sorted, self.n_splits)
+        if not folds:
+            raise ValueError("Not enough distinct gameweeks to tune with walk-forward CV")
+        # Most recent fold first: it is the closest proxy for next gameweek's error.
+        fold_order = list(range(len(folds)))[::-1]
+
+        params_list = self.candidates(search_space)
+        alive = list(range(len(params_list)))
+        scores: Dict[int, Dict[int, Tuple[float, int]]] = {i: {} for i in alive}
+        rounds = []
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix="xgenius-tune-", dir=self.work_dir))
+        pool = None
+        try:
+            fold_files = self._cache_folds(X_sorted, y_sorted, folds, tmp_dir)
+            workers = min(self.max_workers, len(params_list) * len(folds))
+            if workers > 1:
+                pool = ProcessPoolExecutor(max_workers=workers)
+
+            budget = self.min_folds
+            round_idx = 0
+            while True:
+                n_folds = min(len(folds), budget)
+                jobs = [
+                    {
+                        "candidate": c,
+                        "fold": k,
+                        "model_name": model_name,
+                        "params": params_list[c],
+                        **fold_files[k],
+                    }
+                    for c in alive
+                    for k in fold_order[:n_folds]
+                    if k not in scores[c]
+                ]
+                outputs = list(pool.map(_score_job, jobs)) if pool else [_score_job(j) for j in jobs]
+                for out in outputs:
+                    scores[out["candidate"]][out["fold"]] = (out["mse"], out["n_val"])
+
+                alive.sort(key=lambda c: self._rmse(scores[c]))
+                rounds.append({"round": round_idx, "candidates": len(alive), "folds": n_folds})
+                logger.info(
+                    f"Tuning {model_name} round {round_idx}: {len(alive)} candidates on {n_folds} folds, "
+                    f"best rmse {self._rmse(scores[alive[0]]):.4f}"
+                )
+
+                if len(alive) == 1 or n_folds == len(folds):
+                    break
+                alive = alive[: max(1, math.ceil(len(alive) / self.eta))]
+                budget *= self.eta
+                round_idx += 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        leaderboard = sorted(
+            (
+                {
+                    "params": params_list[c],
+                    "cv_rmse": self._rmse(fold_scores),
+                    "folds_evaluated": len(fold_scores),
+                }
+                for c, fold_scores in scores.items()
+            ),
+            # Candidates that survived longer were judged on more folds; rank them first.
+            key=lambda row: (-row["folds_evaluated"], row["cv_rmse"]),
+        )
+        return {
+            "best_params": leaderboard[0]["params"],
+            "best_cv_rmse": leaderboard[0]["cv_rmse"],
+            "leaderboard": leaderboard,
+            "rounds": rounds,
+            "search_space": search_space,
+        }
+
+    def _cache_folds(
+        self, X: pd.DataFrame, y: np.ndarray, folds: List[Tuple[int, int]], tmp_dir: Path
+    ) -> List[Dict[str, str]]:
+        """Fit the preprocessor once per fold and persist the transformed arrays."""
+        files = []
+        for k, (train_end, val_end) in enumerate(folds):
+            preprocessor = sk_compose.ColumnTransformer(
+                transformers=[
+                    ("num", sk_preprocessing.StandardScaler(), self.numerical),
+                    ("cat", sk_preprocessing.OneHotEncoder(handle_unknown="ignore", sparse_output=False), self.categorical),
+                ]
+            )
+            X_train = preprocessor.fit_transform(X.iloc[:train_end])
+            X_val = preprocessor.transform(X.iloc[train_end:val_end])
+            paths = {
+                "x_train": str(tmp_dir / f"fold{k}_X_train.npy"),
+                "y_train": str(tmp_dir / f"fold{k}_y_train.npy"),
+                "x_val": str(tmp_dir / f"fold{k}_X_val.npy"),
+                "y_val": str(tmp_dir / f"fold{k}_y_val.npy"),
+            }
+            np.save(paths["x_train"], np.ascontiguousarray(X_train, dtype=np.float32))
+            np.save(paths["y_train"], y[:train_end])
+            np.save(paths["x_val"], np.ascontiguousarray(X_val, dtype=np.float32))
+            np.save(paths["y_val"], y[train_end:val_end])
+            files.append(paths)
+        return files
+
+    @staticmethod
+    def _rmse(fold_scores: Dict[int, Tuple[float, int]]) -> float:
+        """Validation-size-weighted RMSE over the folds scored so far."""
+        if not fold_scores:
+            return float("inf")
+        total = sum(n for _, n in fold_scores.values())
+        return float(math.sqrt(sum(mse * n for mse, n in fold_scores.values()) / max(total, 1)))
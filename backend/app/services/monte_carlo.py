@@ -0,0 +1,162 @@
+"""
+Vectorized Monte Carlo simulation of a 15-player FPL squad's gameweek score.
+
+All N simulations are drawn in one NumPy pass as N x 15 matrices:
+- availability: Bernoulli(p_play) per player (a non-playing player scores 0),
+- team shocks: one Normal(1, s) multiplier per (simulation, club), shared by every
+  squad player from that club (teammates' returns are correlated),
+- individual noise: Normal(0, sd) around the conditional-on-playing mean (draws
+  are not floored, so each player's expected points equal the input mean),
+- auto-subs: bench players (in bench order) who played replace starters who did not
+  (goalkeeper for goalkeeper, outfield for outfield),
+- captaincy: the captain's points count twice; if the captain does not play the
+  vice-captain's points are doubled instead.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+# numpy is optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, module_available
+
+np = lazy_import("numpy")
+NUMPY_AVAILABLE = module_available("numpy")
+
+
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+class SquadSimulator:
+    """
+    Simulates squad points from per-player predicted distributions.
+
+    Usage:
+        sim = SquadSimulator(n_sims=100_000, seed=7)
+        result = sim.simulate(mean, p_play, sd, team, is_gk, starting, captain_idx=3, vice_idx=7)
+    """
+
+    def __init__(
+        self,
+        n_sims: int = 100_000,
+        seed: Optional[int] = None,
+        team_shock_sd: float = 0.25,
+    ):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("SquadSimulator requires numpy.")
+        self.n_sims = int(n_sims)
+        self.rng = np.random.default_rng(seed)
+        self.team_shock_sd = float(team_shock_sd)
+
+    def simulate(
+        self,
+        mean_points: Sequence[float],
+        p_play: Sequence[float],
+        sd_points: Sequence[float],
+        team_ids: Sequence[int],
+        is_gk: Sequence[bool],
+        starting: Sequence[bool],
+        captain_idx: Optional[int] = None,
+        vice_idx: Optional[int] = None,
+        target: Optional[float] = None,
+        percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+    ) -> Dict[str, Any]:
+        """
+        Simulate the squad's total points.
+
+        Args:
+            mean_points: Expected (unconditional) points per player
+            p_play: Probability each player features
+            sd_points: Points standard deviation given the player features
+            team_ids: Club per player (for shared team shocks)
+            is_gk: Goalkeeper flags (auto-subs are GK-for-GK)
+            starting: Starting XI flags; the rest is the bench, in the given order
+            captain_idx / vice_idx: Squad positions of captain and vice-captain
+            target: Score for `p_beat_target`
+
+        Returns:
+            {n_simulations, mean, std, percentiles, p_beat_target,
+             captain_bonus_mean, autosub_points_mean}
+        """
+        n = self.n_sims
+        f32 = np.float32
+        mean = np.asarray(mean_points, dtype=f32)
+        p = np.clip(np.asarray(p_play, dtype=f32), 0.0, 1.0)
+        sd = np.asarray(sd_points, dtype=f32)
+        gk = np.asarray(is_gk, dtype=bool)
+        xi = np.asarray(starting, dtype=bool)
+        _, team_idx, team_counts = np.unique(
+            np.asarray(team_ids), return_inverse=True, return_counts=True
+        )
+
+        # Conditional-on-playing mean so that E[points] == mean_points.
+        cond_mean = np.where(p > 0, mean / np.maximum(p, 1e-6), 0.0).astype(f32)
+        # Team shock sd for each player, proportional to its mean (multiplier 1 + s*G).
+        shock_sd = cond_mean * f32(self.team_shock_sd)
+        shared = team_counts[team_idx] >= 2
+        # A shock only shared by one squad player is just extra individual variance,
+        # so only clubs with 2+ squad players get their own draw.
+        noise_sd = np.sqrt(sd * sd + np.where(shared, 0.0, shock_sd * shock_sd)).astype(f32)
+
+        plays = self.rng.random((n, len(mean)), dtype=f32) < p
+        points = self.rng.standard_normal((n, len(mean)), dtype=f32)
+        points *= noise_sd
+        points += cond_mean
+        shared_teams = np.flatnonzero(team_counts >= 2)
+        if shared_teams.size:
+            # (clubs x players) loading matrix: one BLAS matmul applies every club shock.
+            loading = np.where(team_idx[None, :] == shared_teams[:, None], shock_sd[None, :], 0.0).astype(f32)
+            team_shocks = self.rng.standard_normal((n, shared_teams.size), dtype=f32)
+            points += team_shocks @ loading
+        # Not clamped at 0: FPL scores can be negative, and a clamp would lift the mean.
+        points *= plays
+
+        total = points @ xi.astype(f32)
+
+        # Auto-subs: bench outfielders fill missing outfield starters in bench order.
+        autosub = np.zeros(n, dtype=f32)
+        bench_out = np.flatnonzero(~xi & ~gk)
+        if bench_out.size:
+            missing_out = ((~plays) & xi & ~gk).sum(axis=1)
+            bench_plays = plays[:, bench_out]
+            used = bench_plays & (np.cumsum(bench_plays, axis=1) <= missing_out[:, None])
+            autosub += np.einsum("ij,ij->i", points[:, bench_out], used.astype(f32))
+        bench_gk = np.flatnonzero(~xi & gk)
+        start_gk = np.flatnonzero(xi & gk)
+        if bench_gk.size and start_gk.size:
+            gk_missing = ~plays[:, start_gk[0]]
+            autosub += points[:, bench_gk[0]] * gk_missing
+        total += autosub
+
+        # Captaincy: double the captain, or the vice if the captain did not play.
+        captain_bonus = np.zeros(n, dtype=f32)
+        if captain_idx is not None:
+            captain_bonus = points[:, captain_idx].copy()
+            if vice_idx is not None:
+                captain_bonus = np.where(plays[:, captain_idx], captain_bonus, points[:, vice_idx])
+        total += captain_bonus
+
+        pct_values = np.percentile(total, list(percentiles))
+        return {
+            "n_simulations": n,
+            "mean": float(total.mean()),
+            "std": float(total.std()),
+            "percentiles": {f"p{q}": float(v) for q, v in zip(percentiles, pct_values)},
+            "p_beat_target": float((total > target).mean()) if target is not None else None,
+            "captain_bonus_mean": float(captain_bonus.mean()),
+            "autosub_points_mean": float(autosub.mean()),
+        }
+
+
+def player_distribution(prediction: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Map a NeuralPointsPredictor prediction to (mean, p_play, sd).
+
+    p_play comes from the FPL chance of playing (capped at 0.98 for rotation risk);
+    sd is the player's recent points volatility, floored so no player is deterministic.
+    """
+    mean = max(float(prediction.get("predicted_points") or 0.0), 0.0)
+    features = prediction.get("features") or {}
+    p_play = min(max(float(features.get("fitness", 100) or 0.0) / 100.0, 0.0), 0.98)
+    volatility = float(features.get("volatility") or 0.0)
+    sd = max(volatility, 0.6 * mean, 1.0)
+    return {"mean": mean, "p_play": p_play, "sd": sd}
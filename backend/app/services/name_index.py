@@ -0,0 +1,117 @@
+"""
+Name index for matching external player names to FPL `Player` rows.
+
+PremierLeague.com (and CSV uploads) identify players by name, while everything else
+keys on `Player.id`. Names are normalized (accents stripped, lower-cased, punctuation
+removed), and each FPL player is indexed under several keys:
+- the display name,
+- "first second",
+- the second name on its own.
+
+A key is only trusted when it is unique, or when the team disambiguates it.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models import Player
+from app.models.fixture import Team
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """'Martin Ødegaard' -> 'martin odegaard'."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    # Letters NFKD does not decompose
+    text = text.translate(str.maketrans({"ø": "o", "Ø": "o", "ł": "l", "Ł": "l", "ß": "ss", "æ": "ae", "đ": "d"}))
+    text = _NON_ALNUM.sub(" ", text.lower().replace("-", " ").replace("'", ""))
+    return " ".join(text.split())
+
+
+class PlayerNameIndex:
+    """
+    In-memory name -> FPL player id index, built with one query over players and teams.
+
+    Usage:
+        index = PlayerNameIndex(db)
+        player_id = index.match("Bukayo Saka", team="ARS")
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._by_key: Dict[str, Set[int]] = defaultdict(set)
+        self._team_of: Dict[int, Optional[int]] = {}
+        self._team_keys: Dict[str, int] = {}
+        self._build()
+
+    def _build(self) -> None:
+        for team in self.db.query(Team).all():
+            for key in (team.name, team.short_name):
+                norm = normalize_name(key)
+                if norm:
+                    self._team_keys[norm] = team.id
+
+        rows = self.db.query(Player.id, Player.name, Player.first_name, Player.second_name, Player.team_id).all()
+        for pid, name, first, second, team_id in rows:
+            self._team_of[pid] = team_id
+            for key in self._keys(name, first, second):
+                self._by_key[key].add(pid)
+
+    @staticmethod
+    def _keys(name: Optional[str], first: Optional[str], second: Optional[str]) -> Iterable[str]:
+        keys = {normalize_name(name), normalize_name(f"{first or ''} {second or ''}"), normalize_name(second)}
+        return [k for k in keys if k]
+
+    def team_id(self, team: Optional[str]) -> Optional[int]:
+        """FPL Team id for a team name, short name or abbreviation."""
+        return self._team_keys.get(normalize_name(team)) if team else None
+
+    def match(
+        self,
+        name: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        team: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Best FPL player id for the given name parts, or None when unmatched or ambiguous.
+
+        Full names are tried before the bare last name; `team` (any team name/abbr)
+        breaks ties between players sharing a key.
+        """
+        team_id = self.team_id(team)
+        candidates_keys = [
+            normalize_name(name),
+            normalize_name(f"{first_name or ''} {last_name or ''}"),
+            normalize_name(last_name),
+        ]
+        for key in candidates_keys:
+            if not key:
+                continue
+            ids = self._by_key.get(key)
+            if not ids:
+                continue
+            if len(ids) == 1:
+                return next(iter(ids))
+            if team_id is not None:
+                same_team = [pid for pid in ids if self._team_of.get(pid) == team_id]
+                if len(same_team) == 1:
+                    return same_team[0]
+        return None
+
+    def match_many(self, names: Iterable[str], team: Optional[str] = None) -> Dict[str, Optional[int]]:
+        """Match a batch of display names (each distinct name is resolved once)."""
+        return {name: self.match(name, team=team) for name in set(names)}
+
+    def ambiguous(self) -> List[str]:
+        """Keys shared by more than one player (useful when auditing unmatched rows)."""
+        return sorted(k for k, ids in self._by_key.items() if len(ids) > 1)
@@ -435,6 +435,19 @@ class SquadOptimizer:
         position_counts = {"GK": 0, "DEF": 0, "MID": 0, "FWD": 0}
         team_counts: Dict[int, int] = {}
         
+        # Cheapest prices per position, to keep enough budget for the unfilled slots
+        cheapest = {
+            pos: sorted(p.price for p, _ in candidates if p.position == pos)
+            for pos in POSITION_REQUIREMENTS
+        }
+        
+        def reserve_after(position: str) -> float:
+            total = 0.0
+            for pos, required in POSITION_REQUIREMENTS.items():
+                open_slots = required - position_counts[pos] - (1 if pos == position else 0)
+                total += sum(cheapest[pos][:max(open_slots, 0)])
+            return total
+        
         # First, add locked players
         for score, p, s in scored:
             if p.id in lock_set:
@@ -460,8 +473,8 @@ class SquadOptimizer:
             if team_counts.get(p.team_id, 0) >= MAX_PLAYERS_PER_TEAM:
                 continue
             
-            # Check budget
-            if used_budget + p.price > budget:
+            # Check budget (leaving enough for the cheapest fill of remaining slots)
+            if used_budget + p.price + reserve_after(p.position) > budget:
                 continue
             
             # Check transfer constraint
@@ -603,6 +616,9 @@ class SquadOptimizer:
                     is_home=f["is_home"],
                     difficulty=f["difficulty"],
                     kickoff_time=f["kickoff_time"],
+                    expected_goals=f.get("expected_goals"),
+                    expected_goals_against=f.get("expected_goals_against"),
+                    clean_sheet_prob=f.get("clean_sheet_prob"),
                 )
                 for f in team_fixtures[:horizon_gw]
             ]
@@ -705,6 +721,7 @@ class SquadOptimizer:
             
             # Get team names
             teams = {t.id: t for t in self.db.query(Team).all()}
+            strength = self._strength_matrix(season, start_gw)
             
             for f in fixtures:
                 home_team = teams.get(f.team_h_id)
@@ -725,6 +742,7 @@ class SquadOptimizer:
                     "is_home": True,
                     "difficulty": f.team_h_difficulty or 3,
                     "kickoff_time": kickoff,
+                    **self._fixture_strength(strength, f.team_h_id, f.team_a_id, True),
                 })
                 
                 # Add fixture for away team
@@ -737,12 +755,34 @@ class SquadOptimizer:
                     "is_home": False,
                     "difficulty": f.team_a_difficulty or 3,
                     "kickoff_time": kickoff,
+                    **self._fixture_strength(strength, f.team_a_id, f.team_h_id, False),
                 })
                 
         except Exception as e:
             logger.warning(f"Failed to fetch fixtures: {e}")
         
         return fixtures_by_team
+
+    def _strength_matrix(self, season: str, gameweek: int):
+        """Team-strength matrix for the gameweek, or None if it cannot be fitted."""
+        try:
+            from app.services.ml.team_strength import TeamStrengthModel
+            return TeamStrengthModel(self.db).matrix(season, gameweek)
+        except Exception as e:
+            logger.warning(f"Team strength model unavailable: {e}")
+            return None
+
+    @staticmethod
+    def _fixture_strength(strength: Any, team_id: int, opponent_id: int, is_home: bool) -> Dict[str, Optional[float]]:
+        """Expected goals for/against and clean-sheet probability (O(1) matrix lookup)."""
+        value = strength.fixture(team_id, opponent_id, is_home) if strength is not None else None
+        if value is None:
+            return {"expected_goals": None, "expected_goals_against": None, "clean_sheet_prob": None}
+        return {
+            "expected_goals": round(value["xg"], 2),
+            "expected_goals_against": round(value["xga"], 2),
+            "clean_sheet_prob": round(value["clean_sheet_prob"], 3),
+        }
     
     def _deduplicate_options(self, options: List[SquadOption]) -> List[SquadOption]:
         """Remove duplicate options based on squad composition."""
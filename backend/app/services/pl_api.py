@@ -7,32 +7,51 @@ This is the structured JSON backing the pages like:
 
 from __future__ import annotations
 
-import asyncio
 import logging
 from typing import Any, Dict, List, Optional
 
 import httpx
 
+from app.core.config import settings
+from app.core.http_cache import cached_transport
+from app.core.rate_limit import AsyncTokenBucket, retry_http
+
 logger = logging.getLogger(__name__)
 
 
 class PremierLeagueAPI:
-    SDP_BASE = "https://sdp-prem-prod.premier-league-prod.pulselive.com"
-
-    def __init__(self, timeout: int = 30, rate_limit_s: float = 0.3):
-        self.client = httpx.AsyncClient(timeout=timeout, headers={"accept": "application/json"})
+    def __init__(
+        self,
+        timeout: int = 30,
+        rate_limit_s: float = 0.3,
+        limiter: Optional[AsyncTokenBucket] = None,
+        max_retries: int = 3,
+        cache_mode: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
+        # PL_API_BASE_URL can point at a local stand-in of the API
+        self.base_url = (base_url or settings.PL_API_BASE_URL).rstrip("/")
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            headers={"accept": "application/json"},
+            transport=cached_transport(cache_mode),
+        )
         self.rate_limit_s = rate_limit_s
+        # Shared by every concurrent caller: one request per rate_limit_s on average
+        self.limiter = limiter or AsyncTokenBucket.from_interval(rate_limit_s)
+        self.max_retries = max_retries
 
     async def close(self) -> None:
         await self.client.aclose()
 
     async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        # Simple rate limiter
-        if self.rate_limit_s:
-            await asyncio.sleep(self.rate_limit_s)
-        resp = await self.client.get(url, params=params)
-        resp.raise_for_status()
-        return resp.json()
+        async def call() -> Any:
+            await self.limiter.acquire()
+            resp = await self.client.get(url, params=params)
+            resp.raise_for_status()
+            return resp.json()
+
+        return await retry_http(call, attempts=self.max_retries)
 
     async def list_matches(self, season: int, matchweek: Optional[int] = None, limit: int = 1000) -> List[Dict[str, Any]]:
         """
@@ -44,7 +63,7 @@ class PremierLeagueAPI:
         params: Dict[str, Any] = {"competition": 8, "season": season, "_limit": page_size}
         if matchweek is not None:
             params["matchweek"] = matchweek
-        url = f"{self.SDP_BASE}/api/v2/matches"
+        url = f"{self.base_url}/api/v2/matches"
         out: List[Dict[str, Any]] = []
         next_cursor: Optional[str] = None
         seen: set[str] = set()
@@ -76,24 +95,24 @@ class PremierLeagueAPI:
         return out
 
     async def get_match(self, match_id: str) -> Dict[str, Any]:
-        return await self._get_json(f"{self.SDP_BASE}/api/v2/matches/{match_id}")
+        return await self._get_json(f"{self.base_url}/api/v2/matches/{match_id}")
 
     async def get_match_stats(self, match_id: str) -> List[Dict[str, Any]]:
         # Returns list: [{ side, teamId, stats: {...} }, ...]
-        return await self._get_json(f"{self.SDP_BASE}/api/v3/matches/{match_id}/stats")
+        return await self._get_json(f"{self.base_url}/api/v3/matches/{match_id}/stats")
 
     async def get_match_events(self, match_id: str) -> Dict[str, Any]:
         # Returns dict: { homeTeam: {...}, awayTeam: {...} }
-        return await self._get_json(f"{self.SDP_BASE}/api/v1/matches/{match_id}/events")
+        return await self._get_json(f"{self.base_url}/api/v1/matches/{match_id}/events")
 
     async def get_match_lineups(self, match_id: str) -> List[Dict[str, Any]]:
         # Returns list with 2 items (home/away): { teamId, formation, players, lineup, subs }
-        return await self._get_json(f"{self.SDP_BASE}/api/v1/matches/{match_id}/lineups")
+        return await self._get_json(f"{self.base_url}/api/v1/matches/{match_id}/lineups")
 
     async def get_team_squad(self, season: int, team_id: str) -> Dict[str, Any]:
-        return await self._get_json(f"{self.SDP_BASE}/api/v2/competitions/8/seasons/{season}/teams/{team_id}/squad")
+        return await self._get_json(f"{self.base_url}/api/v2/competitions/8/seasons/{season}/teams/{team_id}/squad")
 
     async def get_player(self, player_id: str) -> Dict[str, Any]:
-        return await self._get_json(f"{self.SDP_BASE}/api/v1/players/{player_id}")
+        return await self._get_json(f"{self.base_url}/api/v1/players/{player_id}")
 
 
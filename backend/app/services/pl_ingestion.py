@@ -3,30 +3,52 @@ PremierLeague.com ingestion pipeline.
 
 Backfills historical seasons once; incrementally updates current season by re-fetching
 matches that are not FullTime (and refreshing recently played ones).
+
+Change detection keeps the current-season refresh cheap. Each match's listing entry is
+fingerprinted and every fetched resource is hashed (`PLMatchSyncState`). A recent match
+whose listing is unchanged is not fetched at all, and a resource whose payload hash is
+unchanged is not snapshotted or rewritten.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
 from app.models import (
-    FPLApiSnapshot,
     PLIngestState,
     PLMatch,
     PLMatchEvent,
     PLMatchLineup,
+    PLMatchSyncState,
     PLMatchTeamStats,
     PLPlayer,
     PLTeam,
 )
+from app.services.availability_index import AvailabilityIndex
 from app.services.pl_api import PremierLeagueAPI
+from app.services.snapshot_store import SnapshotStore, encode_payload
 
 logger = logging.getLogger(__name__)
 
+# Listing fields that move when a match's data does (dotted paths; missing keys hash as None)
+LISTING_FINGERPRINT_FIELDS = (
+    "period",
+    "clock",
+    "kickoff",
+    "homeTeam.score",
+    "awayTeam.score",
+    "homeTeam.halfTimeScore",
+    "awayTeam.halfTimeScore",
+    "lastUpdated",
+    "updatedAt",
+)
+
 
 def _parse_kickoff(dt_str: Optional[str]) -> Optional[datetime]:
     if not dt_str:
@@ -45,10 +67,31 @@ def _safe_int(x: Any) -> Optional[int]:
         return None
 
 
+def listing_fingerprint(listing: Dict[str, Any]) -> str:
+    """sha256 over the listing fields that change when the match's data does."""
+    values: Dict[str, Any] = {}
+    for path in LISTING_FINGERPRINT_FIELDS:
+        value: Any = listing
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        values[path] = value
+    return encode_payload(values)[0]
+
+
+def _is_live(listing: Dict[str, Any]) -> bool:
+    return (listing.get("period") or "").lower() not in ("prematch", "fulltime")
+
+
 class PremierLeagueIngestionService:
-    def __init__(self, db: Session, rate_limit_s: float = 0.3):
+    # Sub-resources fetched per match alongside the match detail
+    MATCH_RESOURCES = ("stats", "lineups", "events")
+
+    def __init__(self, db: Session, rate_limit_s: float = 0.3, concurrency: int = 4, batch_size: int = 20):
         self.db = db
         self.api = PremierLeagueAPI(rate_limit_s=rate_limit_s)
+        self.snapshots = SnapshotStore(db)
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
 
     async def close(self) -> None:
         await self.api.close()
@@ -65,26 +108,27 @@ class PremierLeagueIngestionService:
         matches = await self.api.list_matches(season=season)
         self._snapshot("pl.matches", season=season, payload=matches)
 
-        ingested = 0
-        for m in matches:
-            match_id = str(m.get("matchId"))
-            if not match_id:
-                continue
-
-            await self.ingest_match(season=season, match_id=match_id, listing=m)
-            ingested += 1
+        report = await self.ingest_matches(season, [m for m in matches if m.get("matchId")])
 
-        state.backfilled = 1
+        # A season with failed matches stays un-backfilled so the next run retries it
+        if report["failed"]:
+            state.last_error = f"{report['failed']} matches failed"[:255]
+        else:
+            state.backfilled = 1
         state.last_run_at = datetime.utcnow()
         self.db.commit()
-        return {"season": season, "matches_ingested": ingested}
+        return {"season": season, "matches_ingested": report["ingested"], **report}
 
-    async def update_current_season(self, season: int, refresh_last_n: int = 60) -> Dict[str, Any]:
+    async def update_current_season(self, season: int, refresh_last_n: int = 60, force: bool = False) -> Dict[str, Any]:
         """
         Incremental updater:
         - ingest matches not FullTime
         - also refresh most recent N matches (to catch late corrections)
+
+        A recent match whose listing fingerprint matches the one stored at its last
+        complete fetch is skipped; force=True refetches every selected match.
         """
+        requests_before = self.api.limiter.acquired
         matches = await self.api.list_matches(season=season)
         self._snapshot("pl.matches.current", season=season, payload=matches)
 
@@ -95,38 +139,172 @@ class PremierLeagueIngestionService:
         # De-duplicate and avoid treating future scheduled fixtures (PreMatch) as "needs refresh".
         # We still keep them in the DB via prior backfills / match listing, but we don't need to
         # continuously re-fetch match detail/stats/lineups/events for them.
-        processed: set[str] = set()
-
-        async def _process(m: Dict[str, Any]) -> None:
-            match_id = str(m.get("matchId"))
-            if not match_id or match_id in processed:
-                return
-            processed.add(match_id)
-            await self.ingest_match(season=season, match_id=match_id, listing=m)
+        selected: Dict[str, Dict[str, Any]] = {}
 
         # Always refresh recent N matches (covers recently completed + today)
         for m in recent:
-            await _process(m)
+            if m.get("matchId"):
+                selected.setdefault(str(m.get("matchId")), m)
 
         # Ensure in-progress matches are included (even if not in recent window)
         for m in matches_sorted:
             period = (m.get("period") or "").lower()
-            if period in ("prematch", "fulltime"):
+            if period in ("prematch", "fulltime") or not m.get("matchId"):
                 continue
-            await _process(m)
+            selected.setdefault(str(m.get("matchId")), m)
+
+        # Live matches are always fetched; others only when their listing moved
+        states = {
+            st.match_id: st.listing_hash
+            for st in self.db.query(PLMatchSyncState).filter(PLMatchSyncState.match_id.in_(list(selected)))
+        }
+        changed = [
+            m for match_id, m in selected.items()
+            if force or _is_live(m) or states.get(match_id) != listing_fingerprint(m)
+        ]
+
+        report = await self.ingest_matches(season, changed)
+        # Count the listing pages too: on a quiet day they are most of the requests
+        report["requests"] = self.api.limiter.acquired - requests_before
+        return {
+            "season": season,
+            "matches_refreshed": report["ingested"],
+            "matches_unchanged": len(selected) - len(changed),
+            **report,
+        }
+
+    async def ingest_matches(self, season: int, listings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Fetch and store many matches through a producer/consumer pipeline.
 
-        return {"season": season, "matches_refreshed": len(processed)}
+        Up to `concurrency` matches are fetched at once, each issuing its four requests
+        concurrently; every request draws from the API client's shared rate limiter.
+        A single writer stores finished matches and commits every `batch_size` matches.
 
-    async def ingest_match(self, season: int, match_id: str, listing: Optional[Dict[str, Any]] = None) -> None:
+        Returns counts plus end-to-end throughput in matches per minute.
+        """
+        started = time.monotonic()
+        requests_before = self.api.limiter.acquired
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(listing: Dict[str, Any]) -> None:
+            match_id = str(listing.get("matchId"))
+            async with semaphore:
+                try:
+                    bundle: Optional[Dict[str, Any]] = await self.fetch_match(match_id)
+                except Exception as e:
+                    logger.warning(f"Match fetch failed for {match_id}: {e}")
+                    bundle = None
+            await queue.put((match_id, listing, bundle))
+
+        async def produce() -> None:
+            await asyncio.gather(*(fetch(m) for m in listings))
+            await queue.put(None)
+
+        ingested = failed = pending = 0
+        resources = {"written": 0, "unchanged": 0}
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                match_id, listing, bundle = item
+                if bundle is None:
+                    failed += 1
+                    continue
+                try:
+                    written = self.write_match(season, match_id, listing, bundle, commit=False)
+                except Exception as e:
+                    logger.warning(f"Match write failed for {match_id}: {e}")
+                    self.db.rollback()
+                    # The rollback dropped the rest of the uncommitted batch too
+                    failed += 1 + pending
+                    ingested -= pending
+                    pending = 0
+                    continue
+                ingested += 1
+                pending += 1
+                for key in resources:
+                    resources[key] += written[key]
+                if pending >= self.batch_size:
+                    self.db.commit()
+                    pending = 0
+            self.db.commit()
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+        elapsed = time.monotonic() - started
+        report = {
+            "ingested": ingested,
+            "failed": failed,
+            "resources_written": resources["written"],
+            "resources_unchanged": resources["unchanged"],
+            "requests": self.api.limiter.acquired - requests_before,
+            "elapsed_s": round(elapsed, 2),
+            "matches_per_min": round(ingested * 60.0 / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        logger.info(f"PL season {season}: {report}")
+        return report
+
+    async def ingest_match(self, season: int, match_id: str, listing: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """
         Ingest one match: match row + team stats + lineups + events.
         """
+        bundle = await self.fetch_match(match_id)
+        return self.write_match(season, match_id, listing, bundle)
+
+    async def fetch_match(self, match_id: str) -> Dict[str, Any]:
+        """
+        Fetch the detail, stats, lineups and events of one match concurrently.
+
+        A failed detail request raises; a failed sub-resource is returned as its
+        exception so the writer can skip just that part.
+        """
+        results = await asyncio.gather(
+            self.api.get_match(match_id),
+            self.api.get_match_stats(match_id),
+            self.api.get_match_lineups(match_id),
+            self.api.get_match_events(match_id),
+            return_exceptions=True,
+        )
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        return dict(zip(("detail", *self.MATCH_RESOURCES), results))
+
+    def write_match(
+        self,
+        season: int,
+        match_id: str,
+        listing: Optional[Dict[str, Any]],
+        bundle: Dict[str, Any],
+        commit: bool = True,
+    ) -> Dict[str, int]:
+        """
+        Store one fetched match. Each sub-resource is written in its own savepoint, so a
+        bad payload only loses that part. With commit=False the caller commits.
+
+        Resources whose content hash matches the stored one are skipped. The listing
+        fingerprint is stored only once every resource is stored, so a partial fetch is
+        retried by the next refresh. Returns counts of resources written and unchanged.
+        """
+        fingerprint = listing_fingerprint(listing) if listing else None
         if not listing:
             listing = {}
+        state = self.db.get(PLMatchSyncState, match_id)
+        hashes = {
+            name: encode_payload(payload)[0]
+            for name, payload in bundle.items()
+            if not isinstance(payload, BaseException)
+        }
+        counts = {"written": 0, "unchanged": 0}
 
         # Match detail is sometimes minimal; listing carries matchWeek, kickoff, teams, etc.
-        detail = await self.api.get_match(match_id)
-        self._snapshot("pl.match", season=season, payload=detail, extra={"match_id": match_id})
+        detail = bundle["detail"]
+        if state is not None and state.detail_hash == hashes["detail"]:
+            counts["unchanged"] += 1
+        else:
+            self._snapshot("pl.match", season=season, payload=detail, extra={"match_id": match_id})
+            counts["written"] += 1
 
         home = (listing.get("homeTeam") or detail.get("homeTeam") or {})
         away = (listing.get("awayTeam") or detail.get("awayTeam") or {})
@@ -158,143 +336,176 @@ class PremierLeagueIngestionService:
             plm.home_team_id = str(home.get("id") or plm.home_team_id)
             plm.away_team_id = str(away.get("id") or plm.away_team_id)
 
-        self.db.commit()
+        self.db.flush()
 
-        # Stats (team-level)
-        try:
-            stats = await self.api.get_match_stats(match_id)
-            self._snapshot("pl.match.stats", season=season, payload=stats, extra={"match_id": match_id})
-            for s in stats or []:
-                team_id = str(s.get("teamId"))
-                side = s.get("side")
-                stats_obj = (
-                    self.db.query(PLMatchTeamStats)
-                    .filter(PLMatchTeamStats.match_id == match_id)
-                    .filter(PLMatchTeamStats.team_id == team_id)
-                    .first()
-                )
-                if not stats_obj:
-                    stats_obj = PLMatchTeamStats(match_id=match_id, team_id=team_id, side=side, stats=s.get("stats") or {})
-                    self.db.add(stats_obj)
-                else:
-                    stats_obj.side = side
-                    stats_obj.stats = s.get("stats") or {}
+        if state is None:
+            state = PLMatchSyncState(match_id=match_id)
+            self.db.add(state)
+        previous = {name: getattr(state, f"{name}_hash") for name in hashes}
+        state.detail_hash = hashes["detail"]
+
+        complete = True
+        written = []
+        for resource in self.MATCH_RESOURCES:
+            payload = bundle.get(resource)
+            if isinstance(payload, BaseException):
+                logger.warning(f"{resource.capitalize()} fetch failed for match {match_id}: {payload}")
+                complete = False
+                continue
+            if previous[resource] == hashes[resource]:
+                counts["unchanged"] += 1
+                continue
+            try:
+                with self.db.begin_nested():
+                    self._snapshot(f"pl.match.{resource}", season=season, payload=payload, extra={"match_id": match_id})
+                    getattr(self, f"_write_{resource}")(match_id, payload)
+                setattr(state, f"{resource}_hash", hashes[resource])
+                written.append(resource)
+            except Exception as e:
+                logger.warning(f"{resource.capitalize()} ingest failed for match {match_id}: {e}")
+                complete = False
+        counts["written"] += len(written)
+
+        # Expected-minutes index for this match's players (derived from lineups and events)
+        if "lineups" in written or "events" in written:
+            try:
+                with self.db.begin_nested():
+                    AvailabilityIndex(self.db).update_match(match_id, commit=False)
+            except Exception as e:
+                logger.warning(f"Availability index update failed for match {match_id}: {e}")
+                # Refetch and rewrite the lineups next refresh so the update is retried
+                complete = False
+                state.lineups_hash = None
+
+        now = datetime.utcnow()
+        state.fetched_at = now
+        if written or previous["detail"] != hashes["detail"]:
+            state.changed_at = now
+        if not complete:
+            state.listing_hash = None
+        elif fingerprint is not None:
+            state.listing_hash = fingerprint
+
+        if commit:
             self.db.commit()
-        except Exception as e:
-            logger.warning(f"Stats ingest failed for match {match_id}: {e}")
-            self.db.rollback()
-
-        # Lineups
-        try:
-            lineups = await self.api.get_match_lineups(match_id)
-            self._snapshot("pl.match.lineups", season=season, payload=lineups, extra={"match_id": match_id})
-            for l in lineups or []:
-                team_id = str(l.get("teamId"))
-                lu = (
-                    self.db.query(PLMatchLineup)
-                    .filter(PLMatchLineup.match_id == match_id)
-                    .filter(PLMatchLineup.team_id == team_id)
-                    .first()
+        return counts
+
+    def _write_stats(self, match_id: str, stats: List[Dict[str, Any]]) -> None:
+        """Team-level stats."""
+        for s in stats or []:
+            team_id = str(s.get("teamId"))
+            side = s.get("side")
+            stats_obj = (
+                self.db.query(PLMatchTeamStats)
+                .filter(PLMatchTeamStats.match_id == match_id)
+                .filter(PLMatchTeamStats.team_id == team_id)
+                .first()
+            )
+            if not stats_obj:
+                stats_obj = PLMatchTeamStats(match_id=match_id, team_id=team_id, side=side, stats=s.get("stats") or {})
+                self.db.add(stats_obj)
+            else:
+                stats_obj.side = side
+                stats_obj.stats = s.get("stats") or {}
+
+    def _write_lineups(self, match_id: str, lineups: List[Dict[str, Any]]) -> None:
+        """Lineups, plus basic rows for every listed player."""
+        for l in lineups or []:
+            team_id = str(l.get("teamId"))
+            lu = (
+                self.db.query(PLMatchLineup)
+                .filter(PLMatchLineup.match_id == match_id)
+                .filter(PLMatchLineup.team_id == team_id)
+                .first()
+            )
+            if not lu:
+                lu = PLMatchLineup(
+                    match_id=match_id,
+                    team_id=team_id,
+                    formation=l.get("formation"),
+                    subs=l.get("subs"),
+                    lineup=l.get("lineup"),
+                    players=l.get("players"),
                 )
-                if not lu:
-                    lu = PLMatchLineup(
+                self.db.add(lu)
+            else:
+                lu.formation = l.get("formation")
+                lu.subs = l.get("subs")
+                lu.lineup = l.get("lineup")
+                lu.players = l.get("players")
+
+            # Upsert players from the lineup list with basic names
+            for p in (l.get("players") or []):
+                pid = p.get("id")
+                if pid:
+                    self._upsert_player_basic(pid=str(pid), known_name=p.get("knownName"), first_name=p.get("firstName"), last_name=p.get("lastName"), team_id=team_id)
+
+    def _write_events(self, match_id: str, ev: Dict[str, Any]) -> None:
+        """Goals, cards and subs."""
+        # Remove existing events and re-insert (simpler + idempotent)
+        self.db.query(PLMatchEvent).filter(PLMatchEvent.match_id == match_id).delete()
+
+        for side_key in ("homeTeam", "awayTeam"):
+            t = ev.get(side_key) or {}
+            team_id = str(t.get("id"))
+            side = "home" if side_key == "homeTeam" else "away"
+
+            for g in t.get("goals") or []:
+                self.db.add(
+                    PLMatchEvent(
                         match_id=match_id,
                         team_id=team_id,
-                        formation=l.get("formation"),
-                        subs=l.get("subs"),
-                        lineup=l.get("lineup"),
-                        players=l.get("players"),
-                    )
-                    self.db.add(lu)
-                else:
-                    lu.formation = l.get("formation")
-                    lu.subs = l.get("subs")
-                    lu.lineup = l.get("lineup")
-                    lu.players = l.get("players")
-
-                # Upsert players from the lineup list with basic names
-                for p in (l.get("players") or []):
-                    pid = p.get("id")
-                    if pid:
-                        self._upsert_player_basic(pid=str(pid), known_name=p.get("knownName"), first_name=p.get("firstName"), last_name=p.get("lastName"), team_id=team_id)
-
-            self.db.commit()
-        except Exception as e:
-            logger.warning(f"Lineup ingest failed for match {match_id}: {e}")
-            self.db.rollback()
-
-        # Events (goals/cards/subs)
-        try:
-            ev = await self.api.get_match_events(match_id)
-            self._snapshot("pl.match.events", season=season, payload=ev, extra={"match_id": match_id})
-            # Remove existing events and re-insert (simpler + idempotent)
-            self.db.query(PLMatchEvent).filter(PLMatchEvent.match_id == match_id).delete()
-
-            for side_key in ("homeTeam", "awayTeam"):
-                t = ev.get(side_key) or {}
-                team_id = str(t.get("id"))
-                side = "home" if side_key == "homeTeam" else "away"
-
-                for g in t.get("goals") or []:
-                    self.db.add(
-                        PLMatchEvent(
-                            match_id=match_id,
-                            team_id=team_id,
-                            side=side,
-                            event_type="goal",
-                            period=g.get("period"),
-                            minute=_safe_int(g.get("time")),
-                            timestamp=g.get("timestamp"),
-                            goal_type=g.get("goalType"),
-                            player_id=str(g.get("playerId")) if g.get("playerId") else None,
-                            assist_player_id=str(g.get("assistPlayerId")) if g.get("assistPlayerId") else None,
-                        )
+                        side=side,
+                        event_type="goal",
+                        period=g.get("period"),
+                        minute=_safe_int(g.get("time")),
+                        timestamp=g.get("timestamp"),
+                        goal_type=g.get("goalType"),
+                        player_id=str(g.get("playerId")) if g.get("playerId") else None,
+                        assist_player_id=str(g.get("assistPlayerId")) if g.get("assistPlayerId") else None,
                     )
-                    if g.get("playerId"):
-                        self._upsert_player_basic(pid=str(g.get("playerId")))
-                    if g.get("assistPlayerId"):
-                        self._upsert_player_basic(pid=str(g.get("assistPlayerId")))
-
-                for c in t.get("cards") or []:
-                    self.db.add(
-                        PLMatchEvent(
-                            match_id=match_id,
-                            team_id=team_id,
-                            side=side,
-                            event_type="card",
-                            period=c.get("period"),
-                            minute=_safe_int(c.get("time")),
-                            timestamp=c.get("timestamp"),
-                            card_type=c.get("type"),
-                            player_id=str(c.get("playerId")) if c.get("playerId") else None,
-                        )
+                )
+                if g.get("playerId"):
+                    self._upsert_player_basic(pid=str(g.get("playerId")))
+                if g.get("assistPlayerId"):
+                    self._upsert_player_basic(pid=str(g.get("assistPlayerId")))
+
+            for c in t.get("cards") or []:
+                self.db.add(
+                    PLMatchEvent(
+                        match_id=match_id,
+                        team_id=team_id,
+                        side=side,
+                        event_type="card",
+                        period=c.get("period"),
+                        minute=_safe_int(c.get("time")),
+                        timestamp=c.get("timestamp"),
+                        card_type=c.get("type"),
+                        player_id=str(c.get("playerId")) if c.get("playerId") else None,
                     )
-                    if c.get("playerId"):
-                        self._upsert_player_basic(pid=str(c.get("playerId")))
-
-                for s in t.get("subs") or []:
-                    self.db.add(
-                        PLMatchEvent(
-                            match_id=match_id,
-                            team_id=team_id,
-                            side=side,
-                            event_type="sub",
-                            period=s.get("period"),
-                            minute=_safe_int(s.get("time")),
-                            timestamp=s.get("timestamp"),
-                            player_on_id=str(s.get("playerOnId")) if s.get("playerOnId") else None,
-                            player_off_id=str(s.get("playerOffId")) if s.get("playerOffId") else None,
-                        )
+                )
+                if c.get("playerId"):
+                    self._upsert_player_basic(pid=str(c.get("playerId")))
+
+            for s in t.get("subs") or []:
+                self.db.add(
+                    PLMatchEvent(
+                        match_id=match_id,
+                        team_id=team_id,
+                        side=side,
+                        event_type="sub",
+                        period=s.get("period"),
+                        minute=_safe_int(s.get("time")),
+                        timestamp=s.get("timestamp"),
+                        player_on_id=str(s.get("playerOnId")) if s.get("playerOnId") else None,
+                        player_off_id=str(s.get("playerOffId")) if s.get("playerOffId") else None,
                     )
-                    if s.get("playerOnId"):
-                        self._upsert_player_basic(pid=str(s.get("playerOnId")))
-                    if s.get("playerOffId"):
-                        self._upsert_player_basic(pid=str(s.get("playerOffId")))
+                )
+                if s.get("playerOnId"):
+                    self._upsert_player_basic(pid=str(s.get("playerOnId")))
+                if s.get("playerOffId"):
+                    self._upsert_player_basic(pid=str(s.get("playerOffId")))
 
-            self.db.commit()
-        except Exception as e:
-            logger.warning(f"Event ingest failed for match {match_id}: {e}")
-            self.db.rollback()
 
     def _get_or_create_state(self, season: int) -> PLIngestState:
         st = self.db.query(PLIngestState).filter(PLIngestState.season == season).first()
@@ -344,15 +555,4 @@ class PremierLeagueIngestionService:
 
     def _snapshot(self, endpoint: str, season: int, payload: Any, extra: Optional[Dict[str, Any]] = None) -> None:
         # Reuse existing snapshot mechanism; store PL payloads too.
-        snap = FPLApiSnapshot(
-            season=str(season),
-            endpoint=endpoint,
-            entry_id=None,
-            gw=None,
-            payload={"extra": extra or {}, "data": payload},
-        )
-        self.db.add(snap)
-        self.db.commit()
-
-
-
+        self.snapshots.save(season=str(season), endpoint=endpoint, payload={"extra": extra or {}, "data": payload})
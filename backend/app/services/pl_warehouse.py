@@ -0,0 +1,302 @@
+"""
+Columnar export of the PremierLeague.com match tables and a DuckDB query layer over it.
+
+`export_parquet` writes each PL table to Parquet under `root/<table>/`:
+- Match-level tables (matches, events, lineups, team stats, player appearances) are
+  partitioned by season into `season=<year>/data.parquet`.
+- Players and teams are written to a single `data.parquet`.
+
+Columns are typed from the ORM model; JSON columns (team stats blobs, lineups) are
+stored as JSON text. Re-exporting a season rewrites only that season's partition.
+
+`PLWarehouse` opens an in-process DuckDB over those files. `player_match_rows` builds
+one training row per player per matchday squad with vectorized SQL:
+- minutes and whether they started, from `pl_player_appearances` (built by the
+  availability index)
+- goals, assists and cards, from the event stream
+- team and opponent xG and shots, pulled out of the JSON stats blobs
+
+The whole history is aggregated in a single query instead of walking JSON row by row
+through the ORM.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, select
+from sqlalchemy.orm import Session
+
+# pyarrow/duckdb are optional (analytics only) and imported on first use
+from app.core.lazy_imports import lazy_import, modules_available
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+duckdb = lazy_import("duckdb")
+PARQUET_AVAILABLE = modules_available("pyarrow")
+WAREHOUSE_AVAILABLE = modules_available("pyarrow", "duckdb")
+
+from app.models import PLMatch, PLMatchEvent, PLMatchLineup, PLMatchTeamStats, PLPlayer, PLTeam
+from app.models.pl_availability import PLPlayerAppearance
+
+logger = logging.getLogger(__name__)
+
+# Table name -> model; match-level tables are partitioned by their match's season
+PARTITIONED_TABLES = {
+    "pl_matches": PLMatch,
+    "pl_match_events": PLMatchEvent,
+    "pl_match_lineups": PLMatchLineup,
+    "pl_match_team_stats": PLMatchTeamStats,
+    "pl_player_appearances": PLPlayerAppearance,
+}
+UNPARTITIONED_TABLES = {
+    "pl_players": PLPlayer,
+    "pl_teams": PLTeam,
+}
+
+# Candidate keys in the PulseLive team stats blob, first present wins
+TEAM_STAT_KEYS = {
+    "xg": ("expectedGoals", "expected_goals", "xG"),
+    "shots": ("totalScoringAtt", "totalShots", "shots"),
+    "shots_on_target": ("ontargetScoringAtt", "shotsOnTarget"),
+    "possession": ("possessionPercentage", "possession"),
+}
+
+EXPORT_BATCH = 5000
+
+
+def _arrow_type(column: Any) -> Any:
+    col_type = column.type
+    if isinstance(col_type, Boolean):
+        return pa.bool_()
+    if isinstance(col_type, Integer):
+        return pa.int64()
+    if isinstance(col_type, Float):
+        return pa.float64()
+    if isinstance(col_type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _is_json(column: Any) -> bool:
+    return isinstance(column.type, JSON) or type(column.type).__name__.upper().endswith("JSON")
+
+
+def _schema(model: Any, with_season: bool) -> Any:
+    fields = [pa.field(c.name, _arrow_type(c)) for c in model.__table__.columns]
+    if with_season and "season" not in model.__table__.columns:
+        fields.append(pa.field("season", pa.int64()))
+    return pa.schema(fields)
+
+
+def _write(path: Path, columns: Dict[str, List[Any]], schema: Any) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.table({f.name: pa.array(columns.get(f.name, []), type=f.type) for f in schema}, schema=schema)
+    pq.write_table(table, path, compression="zstd")
+    return table.num_rows
+
+
+def export_parquet(db: Session, root: Path, seasons: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    """
+    Export the PL tables to Parquet under `root`.
+
+    Args:
+        db: Database session
+        root: Output directory
+        seasons: Season years to (re)write; None exports every season
+
+    Returns:
+        Rows written per table
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow is not installed. Parquet export requires pyarrow.")
+    root = Path(root)
+    season_filter = set(seasons) if seasons is not None else None
+
+    match_q = db.query(PLMatch.match_id, PLMatch.season)
+    if season_filter is not None:
+        match_q = match_q.filter(PLMatch.season.in_(season_filter))
+    season_of = dict(match_q.all())
+    export_seasons = season_filter if season_filter is not None else set(season_of.values())
+
+    counts: Dict[str, int] = {}
+    for name, model in PARTITIONED_TABLES.items():
+        table = model.__table__
+        json_cols = {c.name for c in table.columns if _is_json(c)}
+        col_names = [c.name for c in table.columns]
+        schema = _schema(model, with_season=True)
+
+        by_season: Dict[int, Dict[str, List[Any]]] = defaultdict(lambda: defaultdict(list))
+        stmt = select(table)
+        if "season" in table.columns:
+            if season_filter is not None:
+                stmt = stmt.where(table.c.season.in_(season_filter))
+        elif season_filter is not None:
+            stmt = stmt.where(table.c.match_id.in_(list(season_of)))
+        for row in db.execute(stmt.execution_options(yield_per=EXPORT_BATCH)):
+            values = dict(zip(col_names, row))
+            season = values["season"] if "season" in values else season_of.get(values["match_id"])
+            if season is None:
+                continue
+            values["season"] = season
+            bucket = by_season[season]
+            for col in schema.names:
+                value = values.get(col)
+                bucket[col].append(json.dumps(value) if col in json_cols and value is not None else value)
+
+        table_root = root / name
+        (table_root / "empty.parquet").unlink(missing_ok=True)
+        written = 0
+        for season in export_seasons:
+            shutil.rmtree(table_root / f"season={season}", ignore_errors=True)
+            if season in by_season:
+                written += _write(table_root / f"season={season}" / "data.parquet", by_season[season], schema)
+        if not any(table_root.glob("season=*/*.parquet")):
+            # Keep the table queryable (with its schema) when there is no data yet
+            _write(table_root / "empty.parquet", {}, schema)
+        counts[name] = written
+
+    for name, model in UNPARTITIONED_TABLES.items():
+        table = model.__table__
+        json_cols = {c.name for c in table.columns if _is_json(c)}
+        schema = _schema(model, with_season=False)
+        columns: Dict[str, List[Any]] = defaultdict(list)
+        for row in db.execute(select(table).execution_options(yield_per=EXPORT_BATCH)):
+            for col, value in zip(schema.names, row):
+                columns[col].append(json.dumps(value) if col in json_cols and value is not None else value)
+        counts[name] = _write(root / name / "data.parquet", columns, schema)
+
+    logger.info(f"Exported PL tables to {root}: {counts}")
+    return counts
+
+
+class PLWarehouse:
+    """
+    DuckDB views over an `export_parquet` directory.
+
+    Usage:
+        wh = PLWarehouse("data/pl_parquet")
+        rows = wh.player_match_rows(seasons=[2023, 2024])  # pandas DataFrame
+    """
+
+    def __init__(self, root: Path, threads: Optional[int] = None):
+        if not WAREHOUSE_AVAILABLE:
+            raise ImportError("duckdb and pyarrow are required for the PL warehouse.")
+        self.root = Path(root)
+        self.con = duckdb.connect(database=":memory:")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        for name in [*PARTITIONED_TABLES, *UNPARTITIONED_TABLES]:
+            pattern = (self.root / name / "**" / "*.parquet").as_posix()
+            if not any((self.root / name).rglob("*.parquet")):
+                raise FileNotFoundError(f"No Parquet files for {name} under {self.root}; run export_parquet first")
+            self.con.execute(
+                f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{pattern}', union_by_name = true)"
+            )
+
+    def close(self) -> None:
+        self.con.close()
+
+    def query(self, sql: str, params: Optional[Sequence[Any]] = None) -> Any:
+        """Run SQL against the views and return a pandas DataFrame."""
+        return self.con.execute(sql, params or []).df()
+
+    @staticmethod
+    def _stat_expr(key: str) -> str:
+        candidates = ", ".join(f"json_extract_string(stats, '$.{k}')" for k in TEAM_STAT_KEYS[key])
+        return f"TRY_CAST(COALESCE({candidates}) AS DOUBLE)"
+
+    def player_match_rows_sql(self, seasons: Optional[Iterable[int]] = None) -> str:
+        season_list = sorted(set(int(s) for s in seasons)) if seasons is not None else None
+        season_where = f"WHERE m.season IN ({', '.join(map(str, season_list))})" if season_list else ""
+        stat_cols = ",\n                ".join(f"{self._stat_expr(k)} AS {k}" for k in TEAM_STAT_KEYS)
+        return f"""
+        WITH goal_events AS (
+            SELECT match_id, team_id, player_id, assist_player_id,
+                   COALESCE(goal_type, '') ILIKE '%own%' AS own_goal,
+                   COALESCE(goal_type, '') ILIKE '%pen%' AS penalty
+            FROM pl_match_events
+            WHERE event_type = 'goal'
+        ),
+        goals AS (
+            SELECT match_id, player_id,
+                   COUNT(*) FILTER (WHERE NOT own_goal) AS goals,
+                   COUNT(*) FILTER (WHERE NOT own_goal AND penalty) AS penalty_goals,
+                   COUNT(*) FILTER (WHERE own_goal) AS own_goals
+            FROM goal_events WHERE player_id IS NOT NULL
+            GROUP BY match_id, player_id
+        ),
+        assists AS (
+            SELECT match_id, assist_player_id AS player_id, COUNT(*) AS assists
+            FROM goal_events WHERE assist_player_id IS NOT NULL AND NOT own_goal
+            GROUP BY match_id, assist_player_id
+        ),
+        cards AS (
+            SELECT match_id, player_id,
+                   COUNT(*) FILTER (WHERE lower(card_type) = 'yellow') AS yellow_cards,
+                   COUNT(*) FILTER (WHERE lower(replace(card_type, ' ', '')) IN ('red', 'secondyellow', 'yellowred')) AS red_cards
+            FROM pl_match_events
+            WHERE event_type = 'card' AND player_id IS NOT NULL
+            GROUP BY match_id, player_id
+        ),
+        team_goals AS (
+            SELECT match_id, team_id, COUNT(*) AS team_goals
+            FROM goal_events GROUP BY match_id, team_id
+        ),
+        team_stats AS (
+            SELECT match_id, team_id,
+                {stat_cols}
+            FROM pl_match_team_stats
+        )
+        SELECT
+            m.season, m.matchweek, m.match_id, m.kickoff,
+            a.player_id, p.known_name, p.first_name, p.last_name, p.position,
+            a.team_id, t.abbr AS team_abbr,
+            CASE WHEN a.team_id = m.home_team_id THEN m.away_team_id ELSE m.home_team_id END AS opponent_id,
+            (a.team_id = m.home_team_id)::INTEGER AS is_home,
+            a.started, a.minutes, a.subbed_on_minute, a.subbed_off_minute,
+            (a.sent_off_minute IS NOT NULL)::INTEGER AS sent_off,
+            COALESCE(g.goals, 0) AS goals,
+            COALESCE(g.penalty_goals, 0) AS penalty_goals,
+            COALESCE(g.own_goals, 0) AS own_goals,
+            COALESCE(ast.assists, 0) AS assists,
+            COALESCE(c.yellow_cards, 0) AS yellow_cards,
+            COALESCE(c.red_cards, 0) AS red_cards,
+            COALESCE(tg.team_goals, 0) AS team_goals,
+            COALESCE(og.team_goals, 0) AS team_goals_conceded,
+            ts.xg AS team_xg, os.xg AS team_xga,
+            ts.shots AS team_shots, os.shots AS team_shots_conceded,
+            ts.shots_on_target AS team_shots_on_target, ts.possession AS team_possession
+        FROM pl_player_appearances a
+        JOIN pl_matches m ON m.match_id = a.match_id
+        LEFT JOIN pl_players p ON p.id = a.player_id
+        LEFT JOIN pl_teams t ON t.id = a.team_id
+        LEFT JOIN goals g ON g.match_id = a.match_id AND g.player_id = a.player_id
+        LEFT JOIN assists ast ON ast.match_id = a.match_id AND ast.player_id = a.player_id
+        LEFT JOIN cards c ON c.match_id = a.match_id AND c.player_id = a.player_id
+        LEFT JOIN team_goals tg ON tg.match_id = a.match_id AND tg.team_id = a.team_id
+        LEFT JOIN team_goals og ON og.match_id = a.match_id
+            AND og.team_id = CASE WHEN a.team_id = m.home_team_id THEN m.away_team_id ELSE m.home_team_id END
+        LEFT JOIN team_stats ts ON ts.match_id = a.match_id AND ts.team_id = a.team_id
+        LEFT JOIN team_stats os ON os.match_id = a.match_id
+            AND os.team_id = CASE WHEN a.team_id = m.home_team_id THEN m.away_team_id ELSE m.home_team_id END
+        {season_where}
+        ORDER BY m.kickoff, m.match_id, a.team_id, a.started DESC, a.player_id
+        """
+
+    def player_match_rows(self, seasons: Optional[Iterable[int]] = None) -> Any:
+        """One row per player per matchday squad (see module docstring), as a DataFrame."""
+        return self.query(self.player_match_rows_sql(seasons))
+
+    def write_player_match_rows(self, path: Path, seasons: Optional[Iterable[int]] = None) -> int:
+        """Write the training rows straight to a Parquet file (no pandas round trip)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.con.execute(
+            f"COPY ({self.player_match_rows_sql(seasons)}) TO '{path.as_posix()}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+        )
+        return int(self.con.execute(f"SELECT COUNT(*) FROM read_parquet('{path.as_posix()}')").fetchone()[0])
@@ -0,0 +1,114 @@
+"""
+Per-player change detection for bootstrap ingestion.
+
+`diff_player` compares an incoming player row with the stored values (the same
+`{column: value}` maps `bulk_upsert` compares) and returns typed change events.
+`PlayerChangeLog` writes those events, invalidates the cached predictions that may
+include the changed players, and serves the event feed to consumers. Stored feature
+rows are left alone: they only hold weekly-score history, and the player state these
+events track is joined onto them at read time.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.db.upsert import normalize_value
+from app.models import PlayerChangeEvent
+
+PRICE = "price"
+STATUS = "status"
+NEWS = "news"
+AVAILABILITY = "availability"
+STATS = "stats"
+NEW_PLAYER = "new_player"
+
+# Column -> change type; each of these columns gets its own event
+TYPED_FIELDS = {
+    "price": PRICE,
+    "status": STATUS,
+    "news": NEWS,
+    "chance_of_playing_this_round": AVAILABILITY,
+    "chance_of_playing_next_round": AVAILABILITY,
+}
+# Columns folded into one "stats" event per player (they move together after each GW)
+STAT_FIELDS = (
+    "total_points", "goals_scored", "assists", "clean_sheets", "goals_conceded",
+    "yellow_cards", "red_cards", "saves", "bonus", "bps",
+)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(normalize_value(value))
+
+
+def diff_player(current: Optional[Mapping[str, Any]], row: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Change events (without player_id/season) between the stored values and `row`.
+
+    `current` is None for a player not stored yet, which yields one "new_player" event.
+    """
+    if current is None:
+        return [{"change_type": NEW_PLAYER, "field": None, "old_value": None, "new_value": _text(row.get("price"))}]
+
+    events = []
+    for col, change_type in TYPED_FIELDS.items():
+        if col in row and normalize_value(row[col]) != normalize_value(current.get(col)):
+            events.append({
+                "change_type": change_type,
+                "field": col,
+                "old_value": _text(current.get(col)),
+                "new_value": _text(row[col]),
+            })
+    changed_stats = [c for c in STAT_FIELDS if c in row and normalize_value(row[c]) != normalize_value(current.get(c))]
+    if changed_stats:
+        events.append({
+            "change_type": STATS,
+            "field": ",".join(changed_stats),
+            "old_value": _text(current.get("total_points")),
+            "new_value": _text(row.get("total_points")),
+        })
+    return events
+
+
+class PlayerChangeLog:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, season: str, events: Sequence[Dict[str, Any]]) -> int:
+        """Insert events (each with player_id). Flushes with the caller's transaction."""
+        if not events:
+            return 0
+        self.db.execute(insert(PlayerChangeEvent), [{**e, "season": season} for e in events])
+        return len(events)
+
+    def invalidate(self, season: str, player_ids: Iterable[int]) -> Dict[str, int]:
+        """Drop cached predictions that depend on the changed players."""
+        out = {"predictions": 0}
+        if not set(player_ids):
+            return out
+        try:
+            from app.services.ml.neural_predictor import PREDICTION_FLIGHT
+
+            # Keys hash the player pool, so any cached result for the season may include them
+            out["predictions"] = PREDICTION_FLIGHT.invalidate(lambda key: key[0] == season)
+        except ImportError:
+            pass
+        return out
+
+    def since(
+        self,
+        after_id: int = 0,
+        change_types: Optional[Sequence[str]] = None,
+        player_id: Optional[int] = None,
+        limit: int = 500,
+    ) -> List[PlayerChangeEvent]:
+        """Events with id > after_id, oldest first."""
+        q = self.db.query(PlayerChangeEvent).filter(PlayerChangeEvent.id > after_id)
+        if change_types:
+            q = q.filter(PlayerChangeEvent.change_type.in_(list(change_types)))
+        if player_id is not None:
+            q = q.filter(PlayerChangeEvent.player_id == player_id)
+        return q.order_by(PlayerChangeEvent.id).limit(limit).all()
@@ -0,0 +1,397 @@
+"""
+Deadline-aware ingestion scheduler.
+
+One asyncio loop runs the ingestion jobs off the season calendar. The calendar is
+built from the gameweek deadlines in bootstrap-static and the kickoff times in the
+fixtures table. Jobs:
+
+- bootstrap:  bootstrap-static plus fixtures. Runs hourly, and again just after each
+              deadline. Each run reloads the calendar.
+- event_live: /event/{gw}/live every 60 s while a fixture is in its live window
+              (kickoff - 5 min to kickoff + 2 h 15 min); idle otherwise.
+- pl_matches: PremierLeague.com current-season refresh once a fixture reaches full
+              time, and at least daily.
+
+Each due job runs as its own task. A job still running when it comes due again is
+not started a second time, so a slow PremierLeague.com refresh never delays the live
+polls. Next runs are pushed back by a random jitter of up to 10%, so restarted
+schedulers do not line up on the upstream APIs. A failing job backs off exponentially
+(capped) without holding up the others.
+
+After every tick the loop writes a status JSON to SCHEDULER_STATUS_PATH, which
+`GET /admin/scheduler/status` serves from the API process. To run offline, point
+FPL_API_BASE_URL and PL_API_BASE_URL at a local stand-in of the APIs. The clock,
+sleep, job runners and calendar loader are injectable for tests.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from app.db.upsert import normalize_value
+
+logger = logging.getLogger(__name__)
+
+LIVE_LEAD = timedelta(minutes=5)  # live window opens before kickoff
+LIVE_SPAN = timedelta(hours=2, minutes=15)  # kickoff to (roughly) full time plus bonus
+LIVE_POLL = timedelta(seconds=60)
+BOOTSTRAP_EVERY = timedelta(hours=1)
+AFTER_DEADLINE = timedelta(minutes=2)
+PL_MATCHES_EVERY = timedelta(days=1)
+IDLE_RECHECK = timedelta(hours=1)  # event_live with no known upcoming fixture
+
+BACKOFF_BASE = timedelta(seconds=60)
+BACKOFF_MAX = timedelta(minutes=30)
+MAX_SLEEP = timedelta(minutes=5)  # status heartbeat interval while idle
+
+JOBS = ("bootstrap", "event_live", "pl_matches")
+
+Runner = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    return normalize_value(value) if value is not None else None
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+@dataclass
+class SeasonCalendar:
+    """Gameweek deadlines and fixture kickoffs, as naive UTC datetimes."""
+
+    deadlines: List[Tuple[int, datetime]] = field(default_factory=list)
+    kickoffs: List[Tuple[int, datetime]] = field(default_factory=list)
+
+    def live_gw(self, now: datetime) -> Optional[int]:
+        """Gameweek of a fixture whose live window contains `now`."""
+        for gw, kickoff in self.kickoffs:
+            if kickoff - LIVE_LEAD <= now <= kickoff + LIVE_SPAN:
+                return gw
+        return None
+
+    def next_live_start(self, now: datetime) -> Optional[datetime]:
+        return min((k - LIVE_LEAD for _, k in self.kickoffs if k - LIVE_LEAD > now), default=None)
+
+    def next_deadline(self, now: datetime) -> Optional[datetime]:
+        return min((d for _, d in self.deadlines if d > now), default=None)
+
+    def next_full_time(self, now: datetime) -> Optional[datetime]:
+        return min((k + LIVE_SPAN for _, k in self.kickoffs if k + LIVE_SPAN > now), default=None)
+
+
+@dataclass
+class JobState:
+    name: str
+    next_run: datetime
+    last_run: Optional[datetime] = None
+    last_ok: Optional[datetime] = None
+    last_error: Optional[str] = None
+    last_result: Optional[Dict[str, Any]] = None
+    runs: int = 0
+    failures: int = 0  # consecutive
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "next_run": _iso(self.next_run),
+            "last_run": _iso(self.last_run),
+            "last_ok": _iso(self.last_ok),
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "runs": self.runs,
+            "failures": self.failures,
+        }
+
+
+class IngestionScheduler:
+    """
+    Usage:
+        scheduler = IngestionScheduler(season="2025-26")
+        await scheduler.run(stop)   # until the asyncio.Event `stop` is set
+    """
+
+    def __init__(
+        self,
+        season: str,
+        session_factory: Optional[Callable[[], Any]] = None,
+        runners: Optional[Dict[str, Runner]] = None,
+        load_calendar: Optional[Callable[[], SeasonCalendar]] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        status_path: Optional[Union[str, Path]] = None,
+        jitter: float = 0.1,
+        rng: Optional[random.Random] = None,
+    ):
+        from app.core.config import settings
+
+        self.season = season
+        self.pl_season = int(season[:4])  # "2025-26" -> 2025
+        if session_factory is None:
+            from app.db import SessionLocal
+
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.runners: Dict[str, Runner] = {
+            "bootstrap": self._run_bootstrap,
+            "event_live": self._run_event_live,
+            "pl_matches": self._run_pl_matches,
+            **(runners or {}),
+        }
+        self.load_calendar = load_calendar or self._load_calendar
+        self.clock = clock
+        self._sleep = sleep
+        self.status_path = Path(status_path or settings.SCHEDULER_STATUS_PATH)
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+        now = clock()
+        self.started_at = now
+        self.calendar = SeasonCalendar()
+        self.deadlines: List[Tuple[int, datetime]] = []  # filled by the bootstrap runner
+        self.jobs = {name: JobState(name=name, next_run=now) for name in JOBS}
+        self._tasks: Dict[str, asyncio.Task] = {}  # jobs currently running
+
+    # ------------------------------------------------------------------ planning
+
+    def _jittered(self, now: datetime, delay: timedelta) -> datetime:
+        return now + delay * (1 + self.rng.uniform(0, self.jitter))
+
+    def next_run(self, name: str, now: datetime) -> datetime:
+        """When `name` should next run after a successful run at `now`."""
+        cal = self.calendar
+        if name == "event_live":
+            if cal.live_gw(now + LIVE_POLL) is not None:
+                return self._jittered(now, LIVE_POLL)
+            start = cal.next_live_start(now)
+            return start if start is not None else self._jittered(now, IDLE_RECHECK)
+        if name == "bootstrap":
+            hourly = self._jittered(now, BOOTSTRAP_EVERY)
+            deadline = cal.next_deadline(now)
+            return min(hourly, deadline + AFTER_DEADLINE) if deadline is not None else hourly
+        if name == "pl_matches":
+            daily = self._jittered(now, PL_MATCHES_EVERY)
+            full_time = cal.next_full_time(now)
+            return min(daily, full_time) if full_time is not None else daily
+        raise KeyError(name)
+
+    def _backoff(self, now: datetime, failures: int) -> datetime:
+        delay = min(BACKOFF_BASE * (2 ** (failures - 1)), BACKOFF_MAX)
+        return self._jittered(now, delay)
+
+    def _load_calendar(self) -> SeasonCalendar:
+        from app.models import Fixture
+
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(Fixture.gw, Fixture.kickoff_time)
+                .filter(Fixture.season == self.season)
+                .filter(Fixture.kickoff_time.isnot(None))
+                .all()
+            )
+        finally:
+            db.close()
+        kickoffs = sorted((gw, _naive_utc(kickoff)) for gw, kickoff in rows)
+        return SeasonCalendar(deadlines=list(self.deadlines), kickoffs=kickoffs)
+
+    def reload_calendar(self) -> None:
+        """Rebuild the calendar and pull forward any job it now wants sooner."""
+        self.calendar = self.load_calendar()
+        now = self.clock()
+        for name in ("event_live", "pl_matches"):
+            job = self.jobs[name]
+            job.next_run = min(job.next_run, self.next_run(name, now))
+
+    # ------------------------------------------------------------------ jobs
+
+    async def _run_bootstrap(self) -> Dict[str, Any]:
+        from app.services.fpl_ingestion import FPLIngestionService
+
+        db = self.session_factory()
+        service = FPLIngestionService(db)
+        try:
+            result = await service.ingest_bootstrap_static(season=self.season)
+            self.deadlines = sorted(
+                (g["gw"], _naive_utc(g["deadline"])) for g in service.gameweeks if g["deadline"] is not None
+            )
+            return {"players": result.get("upserts", {}).get("players"), "player_changes": result.get("player_changes")}
+        finally:
+            await service.close()
+            db.close()
+
+    async def _run_event_live(self, gw: int) -> Dict[str, Any]:
+        from app.services.fpl_extra_ingestion import FPLExtraIngestionService
+
+        db = self.session_factory()
+        service = FPLExtraIngestionService(db)
+        try:
+            result = await service.ingest_event_live(season=self.season, gw=gw)
+            return {"gw": gw, "updated": result["updated_weekly_scores"], "unchanged": result["unchanged_weekly_scores"]}
+        finally:
+            await service.close()
+            db.close()
+
+    async def _run_pl_matches(self) -> Dict[str, Any]:
+        from app.services.pl_ingestion import PremierLeagueIngestionService
+
+        db = self.session_factory()
+        service = PremierLeagueIngestionService(db)
+        try:
+            result = await service.update_current_season(season=self.pl_season)
+            return {key: result[key] for key in ("matches_refreshed", "matches_unchanged", "failed", "requests")}
+        finally:
+            await service.close()
+            db.close()
+
+    async def run_job(self, name: str) -> None:
+        """Run one job now and schedule its next run (or its backoff)."""
+        job = self.jobs[name]
+        now = self.clock()
+        kwargs: Dict[str, Any] = {}
+        if name == "event_live":
+            gw = self.calendar.live_gw(now)
+            if gw is None:
+                # The window moved (postponement, new calendar); wait for the next one
+                job.next_run = self.next_run(name, now)
+                return
+            kwargs["gw"] = gw
+
+        job.last_run = now
+        job.runs += 1
+        try:
+            job.last_result = await self.runners[name](**kwargs)
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"[:500]
+            job.next_run = self._backoff(self.clock(), job.failures)
+            logger.warning(f"Scheduler job {name} failed ({job.failures} in a row), retrying at {job.next_run}: {e}")
+            return
+
+        job.failures = 0
+        job.last_error = None
+        job.last_ok = self.clock()
+        if name == "bootstrap":
+            try:
+                self.reload_calendar()
+            except Exception as e:
+                logger.warning(f"Scheduler calendar reload failed: {e}")
+        job.next_run = self.next_run(name, self.clock())
+
+    # ------------------------------------------------------------------ loop
+
+    def _reap(self) -> None:
+        """Forget finished job tasks, logging any error `run_job` did not handle."""
+        for name, task in list(self._tasks.items()):
+            if not task.done():
+                continue
+            del self._tasks[name]
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Scheduler job {name} crashed: {task.exception()!r}")
+                self.jobs[name].next_run = self._backoff(self.clock(), max(self.jobs[name].failures, 1))
+
+    async def tick(self) -> float:
+        """
+        Start every due job that is not already running, each as its own task.
+
+        Returns seconds until the next idle job is due (capped).
+        """
+        self._reap()
+        for name in JOBS:
+            if name not in self._tasks and self.jobs[name].next_run <= self.clock():
+                self._tasks[name] = asyncio.ensure_future(self.run_job(name))
+        # Let jobs that finish without blocking settle before planning the sleep
+        await asyncio.sleep(0)
+        self._reap()
+        self.write_status()
+        idle = [job.next_run for name, job in self.jobs.items() if name not in self._tasks]
+        if not idle:
+            return MAX_SLEEP.total_seconds()
+        wait = min(idle) - self.clock()
+        return max(0.0, min(wait, MAX_SLEEP).total_seconds())
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Loop until `stop` is set."""
+        stop = stop or asyncio.Event()
+        try:
+            self.calendar = self.load_calendar()
+        except Exception as e:
+            logger.warning(f"Scheduler calendar load failed; waiting for bootstrap: {e}")
+        logger.info(f"Ingestion scheduler started for {self.season}")
+        # Bootstrap first: it fills the calendar the other jobs are planned from
+        await self.run_job("bootstrap")
+        while not stop.is_set():
+            wait = await self.tick()
+            if stop.is_set():
+                break
+            sleeper = asyncio.ensure_future(self._sleep(wait))
+            stopper = asyncio.ensure_future(stop.wait())
+            # A running job finishing also wakes the loop to plan its next run
+            await asyncio.wait(
+                {sleeper, stopper, *self._tasks.values()}, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in (sleeper, stopper):
+                task.cancel()
+        running = list(self._tasks.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self._tasks.clear()
+        self.write_status(stopped=True)
+        logger.info("Ingestion scheduler stopped")
+
+    # ------------------------------------------------------------------ status
+
+    def status(self, stopped: bool = False) -> Dict[str, Any]:
+        now = self.clock()
+        live_start = self.calendar.next_live_start(now)
+        return {
+            "season": self.season,
+            "pid": os.getpid(),
+            "started_at": _iso(self.started_at),
+            "heartbeat": _iso(now),
+            "stopped": stopped,
+            "live_gw": self.calendar.live_gw(now),
+            "next_deadline": _iso(self.calendar.next_deadline(now)),
+            "next_kickoff": _iso(live_start + LIVE_LEAD if live_start else None),
+            "jobs": {name: {**job.to_dict(), "running": name in self._tasks} for name, job in self.jobs.items()},
+        }
+
+    def write_status(self, stopped: bool = False) -> None:
+        data = json.dumps(self.status(stopped), default=str, indent=2).encode("utf-8")
+        try:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.status_path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.status_path)
+        except OSError as e:
+            logger.warning(f"Could not write scheduler status to {self.status_path}: {e}")
+
+
+def read_status(
+    path: Optional[Union[str, Path]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """The last status a scheduler process wrote, with `running` derived from its heartbeat."""
+    from app.core.config import settings
+
+    path = Path(path or settings.SCHEDULER_STATUS_PATH)
+    try:
+        status = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {"running": False, "status": "not_started"}
+    now = now or datetime.utcnow()
+    age = (now - datetime.fromisoformat(status["heartbeat"])).total_seconds()
+    # A live loop writes at least every MAX_SLEEP, whatever its jobs are doing
+    status["heartbeat_age_s"] = round(age, 1)
+    status["running"] = not status.get("stopped") and age < 2 * MAX_SLEEP.total_seconds()
+    return status
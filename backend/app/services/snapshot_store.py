@@ -0,0 +1,257 @@
+"""
+Deduplicated, compressed storage for raw API snapshots.
+
+Each distinct payload is encoded as canonical JSON, hashed (sha256) and stored once
+in `fpl_payload_blobs`, compressed with zstd when `zstandard` is installed and gzip
+otherwise. `FPLApiSnapshot` rows keep only metadata and the hash, so re-fetching an
+unchanged 1.5 MB bootstrap payload adds a row of metadata, not another copy.
+
+`compact` is for existing databases:
+1. Moves legacy inline payloads into blobs.
+2. Thins snapshots with per-endpoint retention tiers. Example: within 2 days keep
+   the latest snapshot per hour; within a year, the latest per day; after that,
+   the latest only.
+3. Drops blobs no snapshot references.
+It reports the bytes reclaimed.
+"""
+from __future__ import annotations
+
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.lazy_imports import lazy_import, module_available
+from app.db.upsert import insert_missing
+from app.models import FPLApiSnapshot, FPLPayloadBlob
+
+logger = logging.getLogger(__name__)
+
+zstd = lazy_import("zstandard")
+ZSTD_AVAILABLE = module_available("zstandard")
+
+# (max age, keep the latest snapshot per `interval`); None interval keeps every snapshot.
+# Snapshots older than the last tier keep only the latest one per group.
+Tier = Tuple[timedelta, Optional[timedelta]]
+
+DEFAULT_RETENTION: Sequence[Tier] = (
+    (timedelta(days=2), timedelta(hours=1)),
+    (timedelta(days=365), timedelta(days=1)),
+)
+# Endpoint glob -> tiers (None keeps everything). PremierLeague.com match snapshots have
+# no per-match column to group on, so they are only deduplicated, never thinned.
+RETENTION_RULES: Dict[str, Optional[Sequence[Tier]]] = {
+    "pl.match": None,
+    "pl.match.*": None,
+}
+
+BATCH_SIZE = 500
+
+
+def encode_payload(payload: Any) -> Tuple[str, bytes]:
+    """Canonical JSON bytes of `payload` and their sha256."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    if ZSTD_AVAILABLE:
+        return "zstd", zstd.ZstdCompressor(level=10).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6, mtime=0)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstd.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown payload codec {codec!r}")
+
+
+def retention_for(endpoint: str) -> Optional[Sequence[Tier]]:
+    for pattern, tiers in RETENTION_RULES.items():
+        if fnmatch.fnmatchcase(endpoint, pattern):
+            return tiers
+    return DEFAULT_RETENTION
+
+
+class SnapshotStore:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save(
+        self,
+        season: str,
+        endpoint: str,
+        payload: Any,
+        entry_id: Optional[int] = None,
+        gw: Optional[int] = None,
+    ) -> FPLApiSnapshot:
+        """Add a snapshot referencing the (possibly already stored) payload blob. Not committed."""
+        sha = self._store_blob(payload)
+        snap = FPLApiSnapshot(
+            season=season,
+            endpoint=endpoint,
+            entry_id=entry_id,
+            gw=gw,
+            payload=None,
+            payload_hash=sha,
+        )
+        self.db.add(snap)
+        return snap
+
+    def load(self, snap: FPLApiSnapshot) -> Any:
+        """The snapshot's payload, from its blob or the legacy inline column."""
+        if snap.payload_hash:
+            blob = self.db.get(FPLPayloadBlob, snap.payload_hash)
+            if blob is None:
+                raise LookupError(f"Payload blob {snap.payload_hash} missing for snapshot {snap.id}")
+            return json.loads(decompress(blob.codec, blob.data))
+        return snap.payload
+
+    def latest(
+        self,
+        endpoint: str,
+        season: Optional[str] = None,
+        entry_id: Optional[int] = None,
+        gw: Optional[int] = None,
+    ) -> Optional[Any]:
+        """Payload of the most recent matching snapshot, if any."""
+        q = self.db.query(FPLApiSnapshot).filter(FPLApiSnapshot.endpoint == endpoint)
+        if season is not None:
+            q = q.filter(FPLApiSnapshot.season == season)
+        if entry_id is not None:
+            q = q.filter(FPLApiSnapshot.entry_id == entry_id)
+        if gw is not None:
+            q = q.filter(FPLApiSnapshot.gw == gw)
+        snap = q.order_by(FPLApiSnapshot.fetched_at.desc(), FPLApiSnapshot.id.desc()).first()
+        return self.load(snap) if snap else None
+
+    def _store_blob(self, payload: Any) -> str:
+        sha, raw = encode_payload(payload)
+        if self.db.get(FPLPayloadBlob, sha) is None:
+            codec, data = compress(raw)
+            # Another session (a scheduler job, an API ingest) may store the same
+            # payload between the check and the insert; the insert then no-ops.
+            insert_missing(
+                self.db, FPLPayloadBlob,
+                [{"sha256": sha, "codec": codec, "size": len(raw), "data": data}], ["sha256"],
+            )
+        return sha
+
+    # ------------------------------------------------------------------ compaction
+
+    def stored_bytes(self) -> int:
+        """Bytes held in snapshot payloads: legacy inline JSON plus compressed blobs."""
+        inline = (
+            self.db.query(func.coalesce(func.sum(func.length(cast(FPLApiSnapshot.payload, Text))), 0))
+            .filter(FPLApiSnapshot.payload_hash.is_(None))
+            .scalar()
+        )
+        blobs = self.db.query(func.coalesce(func.sum(func.length(FPLPayloadBlob.data)), 0)).scalar()
+        return int(inline or 0) + int(blobs or 0)
+
+    def migrate_inline(self) -> int:
+        """Move legacy inline payloads into blobs; returns snapshots migrated."""
+        moved = 0
+        while True:
+            batch = (
+                self.db.query(FPLApiSnapshot)
+                .filter(FPLApiSnapshot.payload_hash.is_(None))
+                .order_by(FPLApiSnapshot.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                return moved
+            for snap in batch:
+                snap.payload_hash = self._store_blob(snap.payload)
+                snap.payload = None
+            moved += len(batch)
+            self.db.commit()
+
+    def expired_ids(self, now: Optional[datetime] = None) -> List[int]:
+        """Snapshot ids the retention rules no longer keep."""
+        now = now or datetime.utcnow()
+        rows = (
+            self.db.query(
+                FPLApiSnapshot.id,
+                FPLApiSnapshot.season,
+                FPLApiSnapshot.endpoint,
+                FPLApiSnapshot.entry_id,
+                FPLApiSnapshot.gw,
+                FPLApiSnapshot.fetched_at,
+            )
+            .order_by(FPLApiSnapshot.fetched_at.desc(), FPLApiSnapshot.id.desc())
+            .all()
+        )
+        kept: set = set()
+        expired: List[int] = []
+        for snap_id, season, endpoint, entry_id, gw, fetched_at in rows:
+            tiers = retention_for(endpoint)
+            if tiers is None:
+                continue
+            group = (season, endpoint, entry_id, gw)
+            age = now - fetched_at
+            bucket: Tuple[Any, ...] = (group, "final")
+            for i, (max_age, interval) in enumerate(tiers):
+                if age < max_age:
+                    if interval is None:
+                        bucket = (group, i, snap_id)
+                    else:
+                        bucket = (group, i, int(fetched_at.timestamp() // interval.total_seconds()))
+                    break
+            # Rows arrive newest first, so the first row per bucket is the one kept
+            if bucket in kept:
+                expired.append(snap_id)
+            else:
+                kept.add(bucket)
+        return expired
+
+    def compact(self, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Migrate inline payloads, apply retention and drop orphaned blobs."""
+        before = self.stored_bytes()
+        expired = self.expired_ids(now)
+        report: Dict[str, Any] = {"bytes_before": before, "snapshots_expired": len(expired)}
+        if dry_run:
+            report["payloads_migrated"] = (
+                self.db.query(func.count(FPLApiSnapshot.id)).filter(FPLApiSnapshot.payload_hash.is_(None)).scalar()
+            )
+            return report
+
+        for i in range(0, len(expired), BATCH_SIZE):
+            chunk = expired[i:i + BATCH_SIZE]
+            self.db.query(FPLApiSnapshot).filter(FPLApiSnapshot.id.in_(chunk)).delete(synchronize_session=False)
+        self.db.commit()
+        report["payloads_migrated"] = self.migrate_inline()
+
+        referenced = select(FPLApiSnapshot.payload_hash).where(FPLApiSnapshot.payload_hash.isnot(None))
+        report["blobs_deleted"] = (
+            self.db.query(FPLPayloadBlob)
+            .filter(FPLPayloadBlob.sha256.notin_(referenced))
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+
+        report["bytes_after"] = self.stored_bytes()
+        report["bytes_reclaimed"] = before - report["bytes_after"]
+        report["blobs"] = self.db.query(func.count(FPLPayloadBlob.sha256)).scalar()
+        report["snapshots"] = self.db.query(func.count(FPLApiSnapshot.id)).scalar()
+        logger.info(f"Snapshot compaction: {report}")
+        return report
+
+
+def sqlite_file_size(db: Session) -> Optional[int]:
+    """Size of the SQLite database file, or None for other backends / in-memory DBs."""
+    url = db.get_bind().url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    path = Path(url.database)
+    return path.stat().st_size if path.exists() else None
@@ -7,7 +7,6 @@ from app.models.player import Player
 from app.models.squad import ScoreObject
 from app.schemas.team import TeamEvaluateRequest, TeamEvaluateResponse, XGScoreResponse, PlayerEvaluation
 from app.services.ml.predict import predict_points
-from app.schemas.ml import PredictRequest
 
 
 def evaluate_team(
@@ -30,14 +29,8 @@ def evaluate_team(
     player_dict = {p.id: p for p in players}
     
     # Get predictions
-    predict_req = PredictRequest(
-        player_ids=player_ids,
-        season=request.season,
-        gameweek=request.gameweek,
-        horizon=1,
-    )
-    predictions = predict_points(db, predict_req)
-    pred_dict = {p.player_id: p for p in predictions.predictions}
+    predictions = predict_points(db, player_ids, request.season, request.gameweek, horizon=1)
+    pred_dict = {p["player_id"]: p for p in predictions["predictions"]}
     
     # Get score objects
     score_objects = (
@@ -64,8 +57,8 @@ def evaluate_team(
         score_obj = score_dict.get(pid)
         
         current_points = player.total_points or 0.0
-        predicted_points = pred.predicted_points if pred else 0.0
-        risk_score = pred.risk_score if pred else 0.5
+        predicted_points = pred["predicted_points"] if pred else 0.0
+        risk_score = pred["risk_score"] if pred else 0.5
         fixture_difficulty = score_obj.fixtures_difficulty if score_obj else 0.0
         
         # Determine recommendation
@@ -134,13 +127,7 @@ def calculate_xg_score(
     player_ids = [p.get("id") for p in request.squad if p.get("id")]
     
     # Get predictions
-    predict_req = PredictRequest(
-        player_ids=player_ids,
-        season=request.season,
-        gameweek=request.gameweek,
-        horizon=1,
-    )
-    predictions = predict_points(db, predict_req)
+    predictions = predict_points(db, player_ids, request.season, request.gameweek, horizon=1)
     
     # Get score objects
     score_objects = (
@@ -152,17 +139,17 @@ def calculate_xg_score(
     score_dict = {s.player_id: s for s in score_objects}
     
     # Calculate components
-    ml_contribution = sum(p.predicted_points for p in predictions.predictions)
+    ml_contribution = sum(p["predicted_points"] for p in predictions["predictions"])
     fixture_contribution = sum(
-        (score_dict.get(p.player_id, type('obj', (object,), {"fixtures_difficulty": 0.0})).fixtures_difficulty or 0.0)
-        for p in predictions.predictions
+        (score_dict.get(p["player_id"], type('obj', (object,), {"fixtures_difficulty": 0.0})).fixtures_difficulty or 0.0)
+        for p in predictions["predictions"]
     )
     form_contribution = sum(
-        (score_dict.get(p.player_id, type('obj', (object,), {"form": 0.0})).form or 0.0)
-        for p in predictions.predictions
+        (score_dict.get(p["player_id"], type('obj', (object,), {"form": 0.0})).form or 0.0)
+        for p in predictions["predictions"]
     )
-    risk_penalty = sum(p.risk_score for p in predictions.predictions) * 2.0
-    captaincy_bonus = max((p.captaincy_upside for p in predictions.predictions), default=0.0)
+    risk_penalty = sum(p["risk_score"] for p in predictions["predictions"]) * 2.0
+    captaincy_bonus = max((p.get("captaincy_upside", 0.0) for p in predictions["predictions"]), default=0.0)
     
     # Combine into XG score
     xg_score = (
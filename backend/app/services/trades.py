@@ -3,10 +3,9 @@ from __future__ import annotations
 from sqlalchemy.orm import Session
 
 from app.models.player import Player
-from app.models.squad import ScoreObject
+from app.models.scoring import ScoreObject
 from app.schemas.trades import TradeAdviceRequest, TradeAdviceResponse
-from app.services.ml.predict import predict_points
-from app.schemas.ml import PredictRequest
+from app.services.ml.neural_predictor import NeuralPointsPredictor
 
 
 def get_trade_advice(
@@ -21,15 +20,15 @@ def get_trade_advice(
     if not out_player or not in_player:
         raise ValueError("One or both players not found")
     
-    # Get predictions
-    predict_req = PredictRequest(
-        player_ids=[request.out_player_id, request.in_player_id],
-        season=request.season,
-        gameweek=request.gameweek,
+    # Next-GW and 3-GW projections from one feature build, each with its own fixture window
+    predictions = NeuralPointsPredictor(db).predict(
+        [request.out_player_id, request.in_player_id],
+        request.season,
+        request.gameweek,
         horizon=1,
+        horizons=[1, 3],
     )
-    predictions = predict_points(db, predict_req)
-    pred_dict = {p.player_id: p for p in predictions.predictions}
+    pred_dict = {p["player_id"]: p for p in predictions["predictions"]}
     
     # Get score objects
     score_objects = (
@@ -44,26 +43,14 @@ def get_trade_advice(
     out_pred = pred_dict.get(request.out_player_id)
     in_pred = pred_dict.get(request.in_player_id)
     
-    out_ev = out_pred.predicted_points if out_pred else 0.0
-    in_ev = in_pred.predicted_points if in_pred else 0.0
+    out_ev = out_pred["projections"][1] if out_pred else 0.0
+    in_ev = in_pred["projections"][1] if in_pred else 0.0
     
     delta_ev = in_ev - out_ev
     
     # Long-term (3 GW)
-    predict_req_3gw = PredictRequest(
-        player_ids=[request.out_player_id, request.in_player_id],
-        season=request.season,
-        gameweek=request.gameweek,
-        horizon=3,
-    )
-    predictions_3gw = predict_points(db, predict_req_3gw)
-    pred_dict_3gw = {p.player_id: p for p in predictions_3gw.predictions}
-    
-    out_pred_3gw = pred_dict_3gw.get(request.out_player_id)
-    in_pred_3gw = pred_dict_3gw.get(request.in_player_id)
-    
-    out_lt = out_pred_3gw.predicted_points if out_pred_3gw else 0.0
-    in_lt = in_pred_3gw.predicted_points if in_pred_3gw else 0.0
+    out_lt = out_pred["projections"][3] if out_pred else 0.0
+    in_lt = in_pred["projections"][3] if in_pred else 0.0
     
     delta_long_term = in_lt - out_lt
     
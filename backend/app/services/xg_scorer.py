@@ -3,24 +3,30 @@ Advanced XG Score calculation service.
 Combines ML predictions, fixture difficulty, Monte Carlo simulations, etc.
 """
 from __future__ import annotations
-from typing import List
+import math
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-# Make numpy optional for Vercel deployment
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    NUMPY_AVAILABLE = False
-    np = None  # type: ignore
+# numpy is optional for Vercel deployment and imported on first use
+from app.core.lazy_imports import lazy_import, module_available
+
+np = lazy_import("numpy")
+NUMPY_AVAILABLE = module_available("numpy")
 
 from app.api.v1.schemas.team import XGScoreResponse, SquadMember
-from app.models import Player
+from app.models import Player, WeeklyScore
+from app.services.monte_carlo import SquadSimulator, player_distribution
 
 
 class XGScorer:
     """Calculates advanced XG Scores for squads."""
     
+    N_SIMULATIONS = 100_000
+    # Rough distribution of manager gameweek scores, used for percentile_rank
+    AVERAGE_GW_SCORE = 50.0
+    GW_SCORE_SD = 15.0
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -29,14 +35,20 @@ class XGScorer:
         season: str,
         squad: List[SquadMember],
         gameweek: int = None,
+        target_score: Optional[float] = None,
+        n_simulations: Optional[int] = None,
     ) -> XGScoreResponse:
-        """Calculate XG Score for a squad."""
-        # Simplified implementation
-        # In production, would:
-        # - Use ML predictions
-        # - Account for fixture difficulty
-        # - Run Monte Carlo simulations
-        # - Calculate captaincy bonuses
+        """
+        Calculate XG Score for a squad.
+        
+        Per-player predictions (fixture-aware) from NeuralPointsPredictor become
+        points distributions, and the squad's gameweek total is simulated with
+        availability, auto-subs, shared team shocks and captaincy.
+        """
+        from app.services.ml.neural_predictor import NeuralPointsPredictor
+        
+        gameweek = gameweek or self._next_gameweek(season)
+        target = float(target_score if target_score is not None else self.AVERAGE_GW_SCORE)
         
         player_ids = [sm.player_id for sm in squad]
         players = (
@@ -44,33 +56,40 @@ class XGScorer:
             .filter(Player.id.in_(player_ids))
             .all()
         )
-        
         player_map = {p.id: p for p in players}
         
-        # Base score (simplified)
-        ml_prediction_score = 100.0  # Would use ML predictor
-        fixture_adjusted_score = 95.0  # Would adjust for fixtures
-        captaincy_bonus = 15.0  # Would calculate from captain
+        predictions = NeuralPointsPredictor(self.db).predict(player_ids, season, gameweek).get("predictions", [])
+        pred_map = {p["player_id"]: p for p in predictions}
+        dists = [player_distribution(pred_map.get(sm.player_id, {})) for sm in squad]
+        starting = [sm.is_starting_xi for sm in squad]
         
-        # Risk adjustment
-        risk_adjusted_score = fixture_adjusted_score * 0.9
+        captain_idx = next((i for i, sm in enumerate(squad) if sm.is_captain), None)
+        if captain_idx is None:
+            # No captain given: assume the highest expected starter.
+            starters = [i for i, s in enumerate(starting) if s]
+            captain_idx = max(starters, key=lambda i: dists[i]["mean"]) if starters else None
+        vice_idx = next((i for i, sm in enumerate(squad) if sm.is_vice_captain), None)
         
-        # Monte Carlo simulation (simplified)
-        monte_carlo_mean = risk_adjusted_score
-        monte_carlo_std = 10.0
+        ml_prediction_score = sum(d["mean"] for d, s in zip(dists, starting) if s)
+        # Predictions already account for fixture difficulty.
+        fixture_adjusted_score = ml_prediction_score
         
-        # Final XG Score
-        xg_score = monte_carlo_mean + captaincy_bonus
+        sim = self._simulate(squad, player_map, dists, starting, captain_idx, vice_idx, target, n_simulations)
+        captaincy_bonus = sim["captain_bonus_mean"]
+        monte_carlo_mean = sim["mean"]
+        # Expected XI points after availability and auto-subs, before captaincy
+        risk_adjusted_score = monte_carlo_mean - captaincy_bonus
         
-        # Percentile rank (simplified)
-        percentile_rank = 75.0
+        xg_score = monte_carlo_mean
+        z = (monte_carlo_mean - self.AVERAGE_GW_SCORE) / self.GW_SCORE_SD
+        percentile_rank = 100.0 * 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
         
         return XGScoreResponse(
             xg_score=xg_score,
             components={
                 "ml_prediction": ml_prediction_score,
-                "fixture_adjustment": -5.0,
-                "risk_adjustment": -5.0,
+                "fixture_adjustment": fixture_adjusted_score - ml_prediction_score,
+                "risk_adjustment": risk_adjusted_score - fixture_adjusted_score,
                 "captaincy_bonus": captaincy_bonus,
             },
             ml_prediction_score=ml_prediction_score,
@@ -78,7 +97,57 @@ class XGScorer:
             captaincy_bonus=captaincy_bonus,
             risk_adjusted_score=risk_adjusted_score,
             monte_carlo_mean=monte_carlo_mean,
-            monte_carlo_std=monte_carlo_std,
-            percentile_rank=percentile_rank,
+            monte_carlo_std=sim["std"],
+            percentile_rank=min(max(percentile_rank, 0.0), 100.0),
+            percentiles=sim["percentiles"],
+            p_beat_target=sim["p_beat_target"],
+            target_score=target,
+            n_simulations=sim["n_simulations"],
         )
-
+    
+    def _simulate(
+        self,
+        squad: List[SquadMember],
+        player_map: Dict[int, Player],
+        dists: List[Dict[str, float]],
+        starting: List[bool],
+        captain_idx: Optional[int],
+        vice_idx: Optional[int],
+        target: float,
+        n_simulations: Optional[int],
+    ) -> Dict[str, Any]:
+        if not NUMPY_AVAILABLE:
+            # Deterministic fallback: expected values only ("mean" already includes p_play).
+            mean = sum(d["mean"] for d, s in zip(dists, starting) if s)
+            captain = dists[captain_idx]["mean"] if captain_idx is not None else 0.0
+            return {
+                "n_simulations": 0,
+                "mean": mean + captain,
+                "std": 0.0,
+                "percentiles": None,
+                "p_beat_target": None,
+                "captain_bonus_mean": captain,
+            }
+        
+        # Unknown clubs get unique negative ids so they don't share a shock.
+        team_ids = [
+            (player_map[sm.player_id].team_id if sm.player_id in player_map else None) or -(i + 1)
+            for i, sm in enumerate(squad)
+        ]
+        simulator = SquadSimulator(n_sims=n_simulations or self.N_SIMULATIONS)
+        return simulator.simulate(
+            mean_points=[d["mean"] for d in dists],
+            p_play=[d["p_play"] for d in dists],
+            sd_points=[d["sd"] for d in dists],
+            team_ids=team_ids,
+            is_gk=[sm.position.upper() in ("GK", "GKP") for sm in squad],
+            starting=starting,
+            captain_idx=captain_idx,
+            vice_idx=vice_idx,
+            target=target,
+        )
+    
+    def _next_gameweek(self, season: str) -> int:
+        """Gameweek after the latest one with scores for the season."""
+        last = self.db.query(func.max(WeeklyScore.gw)).filter(WeeklyScore.season == season).scalar()
+        return min(int(last or 0) + 1, 38)
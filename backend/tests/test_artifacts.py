@@ -0,0 +1,36 @@
+"""Tests for memory-mapped model artifacts."""
+import pytest
+
+np = pytest.importorskip("numpy")
+sk_ensemble = pytest.importorskip("sklearn.ensemble")
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app.services.ml.artifacts import NumpyForestRegressor, clear_cache, load_artifact, save_artifact
+
+
+@pytest.mark.parametrize("make_model", [
+    lambda: sk_ensemble.RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0),
+    lambda: sk_ensemble.GradientBoostingRegressor(n_estimators=30, subsample=0.8, random_state=0),
+])
+def test_compacted_forest_matches_sklearn_and_is_mapped(tmp_path, make_model):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    y = 2 * X[:, 0] - X[:, 3] + rng.normal(scale=0.3, size=300)
+    pipeline = Pipeline([("scaler", StandardScaler()), ("model", make_model())]).fit(X, y)
+    expected = pipeline.predict(X)
+
+    saved = {"model": pipeline, "rmse": 1.0}
+    path = save_artifact(saved, tmp_path / "model.joblib")
+    # The caller's dict and pipeline are not compacted in place
+    assert saved["model"] is pipeline
+    assert type(pipeline.named_steps["model"]) is type(make_model())
+    clear_cache()
+    blob = load_artifact(path)
+
+    model = blob["model"].named_steps["model"]
+    assert isinstance(model, NumpyForestRegressor)
+    assert isinstance(model.threshold, np.memmap)
+    assert np.allclose(blob["model"].predict(X), expected)
+    # Cached until the file changes
+    assert load_artifact(path) is blob
@@ -0,0 +1,98 @@
+"""Tests for the PremierLeague.com lineup-based expected-minutes index."""
+from datetime import datetime
+
+from app.models import Player, PlayerFeatureRow, PLMatch, PLMatchLineup, PLTeam
+from app.models.pl_availability import PLPlayerAppearance, PLPlayerAvailability
+from app.services.availability_index import (
+    AvailabilityIndex,
+    expected_minutes,
+    parse_appearances,
+    summarize_appearances,
+)
+from app.services.name_index import normalize_name
+
+
+def test_parse_appearances_subs_and_red_cards():
+    lineups = [
+        {"team_id": "1", "lineup": [[{"id": "gk"}], ["d1", "d2"], [{"playerId": "m1"}]], "subs": ["b1", "b2"]},
+    ]
+    events = [
+        {"event_type": "sub", "minute": 70, "player_on_id": "b1", "player_off_id": "m1"},
+        {"event_type": "card", "minute": 55, "card_type": "Red", "player_id": "d2"},
+        {"event_type": "card", "minute": 20, "card_type": "Yellow", "player_id": "d1"},
+    ]
+    apps = {a["player_id"]: a for a in parse_appearances(lineups, events)}
+
+    assert apps["gk"]["started"] == 1 and apps["gk"]["minutes"] == 90
+    assert apps["d1"]["minutes"] == 90
+    assert apps["d2"]["minutes"] == 55 and apps["d2"]["sent_off_minute"] == 55
+    assert apps["m1"]["minutes"] == 70 and apps["m1"]["subbed_off_minute"] == 70
+    assert apps["b1"]["started"] == 0 and apps["b1"]["minutes"] == 20
+    assert apps["b2"]["minutes"] == 0
+
+
+def test_summary_rates_streak_and_expected_minutes():
+    team_matches = ["m5", "m4", "m3", "m2", "m1"]  # most recent first
+    apps = [
+        {"match_id": "m5", "started": 1, "minutes": 90, "subbed_off_minute": None},
+        {"match_id": "m4", "started": 1, "minutes": 62, "subbed_off_minute": 62},
+        {"match_id": "m3", "started": 0, "minutes": 15, "subbed_off_minute": None},
+        {"match_id": "m2", "started": 1, "minutes": 90, "subbed_off_minute": None},
+    ]
+    summary = summarize_appearances(apps, team_matches)
+
+    assert summary["window_matches"] == 5
+    assert summary["start_rate"] == 0.6
+    assert summary["squad_rate"] == 0.8
+    assert summary["start_streak"] == 2
+    assert summary["subbed_off_hist"][4] == 1  # 60-75
+    assert abs(summary["completed_rate"] - 2 / 3) < 1e-9
+
+    minutes = expected_minutes(summary)
+    assert 0.6 * 62 < minutes < 0.6 * 90 + 0.2 * 90
+
+
+def test_normalize_name():
+    assert normalize_name("Martin Ødegaard") == "martin odegaard"
+    assert normalize_name("  Trent Alexander-Arnold ") == "trent alexander arnold"
+    assert normalize_name(None) == ""
+
+
+def test_update_match_refreshes_players_left_out_and_keeps_their_feature_rows(db_session):
+    teams = [PLTeam(id="t-av-1", name="Index Home"), PLTeam(id="t-av-2", name="Index Away")]
+    fpl_player = Player(name="Dropped Index", position="MID", price=5.0)
+    db_session.add_all(teams + [fpl_player])
+    db_session.flush()
+    for n, day in ((1, 1), (2, 8)):
+        db_session.add(PLMatch(
+            match_id=f"av-m{n}", season=2035, kickoff=datetime(2035, 9, day),
+            home_team_id="t-av-1", away_team_id="t-av-2",
+        ))
+    db_session.add(PLMatchLineup(match_id="av-m1", team_id="t-av-1", lineup=["av-a", "av-b"], subs=[]))
+    db_session.commit()
+    index = AvailabilityIndex(db_session)
+    index.update_match("av-m1")
+    db_session.get(PLPlayerAvailability, "av-b").fpl_player_id = fpl_player.id
+    db_session.add(PlayerFeatureRow(player_id=fpl_player.id, season="2035-36", gw=5, features={"form_3": 1.0}))
+    db_session.commit()
+
+    # av-b is left out of the next matchday squad entirely
+    db_session.add(PLMatchLineup(match_id="av-m2", team_id="t-av-1", lineup=["av-a"], subs=[]))
+    db_session.commit()
+    index.update_match("av-m2")
+
+    dropped = db_session.get(PLPlayerAvailability, "av-b")
+    assert dropped.window_matches == 2 and dropped.start_rate == 0.5 and dropped.start_streak == 0
+    assert db_session.get(PLPlayerAvailability, "av-a").start_streak == 2
+    # The index is joined at read time, so the stored history row stays valid
+    assert db_session.query(PlayerFeatureRow).filter(PlayerFeatureRow.player_id == fpl_player.id).count() == 1
+
+    ids = ["av-m1", "av-m2"]
+    db_session.query(PlayerFeatureRow).filter(PlayerFeatureRow.player_id == fpl_player.id).delete()
+    db_session.query(PLPlayerAppearance).filter(PLPlayerAppearance.match_id.in_(ids)).delete(synchronize_session=False)
+    db_session.query(PLPlayerAvailability).filter(PLPlayerAvailability.team_id == "t-av-1").delete()
+    db_session.query(PLMatchLineup).filter(PLMatchLineup.match_id.in_(ids)).delete(synchronize_session=False)
+    db_session.query(PLMatch).filter(PLMatch.match_id.in_(ids)).delete(synchronize_session=False)
+    for obj in teams + [fpl_player]:
+        db_session.delete(obj)
+    db_session.commit()
@@ -0,0 +1,89 @@
+"""Tests for the walk-forward backtest: point-in-time inputs and the feature cache."""
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.models import Player, WeeklyScore
+from app.models.fixture import Team
+from app.services.ml.backtest import BacktestRunner, GameweekBacktest
+
+SEASON = "2034-35"
+POSITIONS = ["GK", "DEF", "DEF", "MID", "MID", "FWD"]
+
+
+@pytest.fixture
+def season_data(db_session, tmp_path, monkeypatch):
+    """Five teams of six players with GW1-3 results."""
+    # No trained model in MODEL_DIR: predictions use the heuristic
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path / "models"))
+    teams = [Team(name=f"Backtest FC {i}", short_name=f"BT{i}") for i in range(5)]
+    db_session.add_all(teams)
+    db_session.flush()
+    players = []
+    for t, team in enumerate(teams):
+        for i, position in enumerate(POSITIONS):
+            price = 4.5 + (t + i) % 4
+            players.append(Player(
+                name=f"Backtest {t}-{i}", position=position, team_id=team.id,
+                price=price, initial_price=price,
+            ))
+    db_session.add_all(players)
+    db_session.flush()
+    for gw in (1, 2, 3):
+        for n, player in enumerate(players):
+            db_session.add(WeeklyScore(
+                player_id=player.id, season=SEASON, gw=gw, minutes=90 if (n + gw) % 5 else 30,
+                points=float((n * 7 + gw * 3) % 11), was_home=(n + gw) % 2,
+            ))
+    db_session.commit()
+    yield players
+
+    db_session.query(WeeklyScore).filter(WeeklyScore.season == SEASON).delete()
+    for player in players:
+        db_session.delete(player)
+    for team in teams:
+        db_session.delete(team)
+    db_session.commit()
+
+
+def _features(cache_dir):
+    (path,) = cache_dir.glob("*.pkl")
+    return pd.read_pickle(path).sort_values("player_id").reset_index(drop=True)
+
+
+def test_future_results_and_prices_do_not_leak_into_past_gameweek(db_session, season_data, tmp_path):
+    before = GameweekBacktest(db_session, tmp_path / "before", "fp").run(SEASON, 3)
+    assert before["status"] == "ok" and len(before["xi"]) == 11
+
+    # A later gameweek lands and prices move after GW3
+    star = season_data[0]
+    db_session.add(WeeklyScore(player_id=star.id, season=SEASON, gw=4, minutes=90, points=24.0))
+    for player in season_data:
+        player.price = player.price + (2.0 if player.id == star.id else -0.5)
+    db_session.commit()
+
+    after = GameweekBacktest(db_session, tmp_path / "after", "fp").run(SEASON, 3)
+
+    pd.testing.assert_frame_equal(_features(tmp_path / "before"), _features(tmp_path / "after"))
+    for key in ("mae", "rmse", "squad_points", "captain_id", "xi"):
+        assert after[key] == before[key]
+
+
+def test_feature_cache_is_invalidated_when_the_data_fingerprint_changes(db_session, season_data, tmp_path):
+    runner = BacktestRunner(db_session, max_workers=1, cache_dir=tmp_path / "cache")
+
+    first = runner.run(SEASON, start_gw=2, end_gw=3)
+    second = runner.run(SEASON, start_gw=2, end_gw=3)
+    assert first["summary"]["feature_cache_hits"] == 0
+    assert second["summary"]["feature_cache_hits"] == 2
+
+    # An in-place points correction changes the fingerprint
+    fingerprint = runner._data_fingerprint(SEASON)
+    score = db_session.query(WeeklyScore).filter(WeeklyScore.season == SEASON, WeeklyScore.gw == 1).first()
+    score.points = score.points + 3
+    db_session.commit()
+    assert runner._data_fingerprint(SEASON) != fingerprint
+
+    third = runner.run(SEASON, start_gw=2, end_gw=3)
+    assert third["summary"]["feature_cache_hits"] == 0
+    assert len(list((tmp_path / "cache").glob("*.pkl"))) == 4
@@ -0,0 +1,129 @@
+"""Tests for the incremental ML feature store."""
+import pytest
+from app.models import Player, WeeklyScore, PlayerFeatureRow
+from app.models.fixture import Team
+from app.services.ml.feature_store import FeatureStore
+
+
+@pytest.fixture
+def season_data(db_session):
+    """Two players with three gameweeks of history."""
+    team = Team(name="Feature Store FC", short_name="FSF")
+    db_session.add(team)
+    db_session.flush()
+
+    players = []
+    for i, position in enumerate(["MID", "FWD"]):
+        player = Player(name=f"FS Player {i}", position=position, price=7.0, team_id=team.id)
+        db_session.add(player)
+        players.append(player)
+    db_session.flush()
+
+    for player in players:
+        for gw in (1, 2, 3):
+            db_session.add(WeeklyScore(
+                player_id=player.id, season="2030-31", gw=gw,
+                minutes=90, points=float(gw * 2), was_home=gw % 2,
+            ))
+    db_session.commit()
+    yield players
+
+    db_session.query(PlayerFeatureRow).delete()
+    db_session.query(WeeklyScore).filter(WeeklyScore.season == "2030-31").delete()
+    for player in players:
+        db_session.delete(player)
+    db_session.delete(team)
+    db_session.commit()
+
+
+def test_get_rows_fills_store_once(db_session, season_data):
+    store = FeatureStore(db_session)
+    ids = [p.id for p in season_data]
+
+    rows = store.get_rows(ids, "2030-31", 4)
+
+    assert set(rows) == set(ids)
+    assert rows[ids[0]]["form_3"] == pytest.approx(4.0)
+    stored = db_session.query(PlayerFeatureRow).filter(PlayerFeatureRow.gw == 4).count()
+    assert stored == 2
+
+
+def test_gameweek_ingest_refreshes_next_gw_only_for_touched_players(db_session, season_data):
+    store = FeatureStore(db_session)
+    first, second = season_data
+    store.get_rows([first.id, second.id], "2030-31", 5)
+
+    db_session.add(WeeklyScore(player_id=first.id, season="2030-31", gw=4, minutes=90, points=12.0))
+    db_session.commit()
+    result = store.on_gameweek_ingested("2030-31", 4, [first.id])
+
+    assert result == {"refreshed": 1, "invalidated": 0}
+    rows = store._read([first.id, second.id], "2030-31", 5)
+    assert rows[first.id]["ceiling"] == pytest.approx(12.0)
+    assert rows[second.id]["ceiling"] == pytest.approx(6.0)
+
+
+def test_build_frame_attaches_fixture_features(db_session, season_data):
+    store = FeatureStore(db_session)
+    frame = store.build_frame([p.id for p in season_data], "2030-31", 4, horizon=2)
+
+    assert len(frame) == 2
+    assert "fixture_difficulty_1" in frame.columns
+    assert "form_weighted" in frame.columns
+
+
+def test_multi_horizon_projections_match_single_horizon_predictions(db_session, season_data):
+    from app.services.ml.neural_predictor import NeuralPointsPredictor
+
+    predictor = NeuralPointsPredictor(db_session)
+    ids = [p.id for p in season_data]
+
+    multi = predictor.predict(ids, "2030-31", 4, horizon=1, horizons=[1, 3, 5])["predictions"]
+
+    for h in (1, 3, 5):
+        single = {p["player_id"]: p["predicted_points"] for p in predictor.predict(ids, "2030-31", 4, horizon=h)["predictions"]}
+        for pred in multi:
+            assert pred["projections"][h] == pytest.approx(single[pred["player_id"]])
+    assert all(p["predicted_points"] == p["projections"][1] for p in multi)
+
+
+def test_stored_rows_hold_history_only_and_reads_join_current_state(db_session, season_data):
+    store = FeatureStore(db_session)
+    player = season_data[0]
+    store.get_rows([player.id], "2030-31", 4)
+
+    stored = store._read([player.id], "2030-31", 4)[player.id]
+    assert "form_3" in stored and "recent_minutes_avg" in stored
+    for volatile in ("price", "injury_risk", "chance_playing_this", "days_since_news", "ownership", "fpl_form"):
+        assert volatile not in stored
+
+    player.price, player.status, player.news = 7.4, "i", "Hamstring"
+    player.chance_of_playing_this_round = 25
+    db_session.commit()
+    rows = store.get_rows([player.id], "2030-31", 4)
+
+    assert rows[player.id]["price"] == pytest.approx(7.4)
+    assert rows[player.id]["injury_risk"] == pytest.approx(0.8)
+    assert rows[player.id]["has_injury_news"] == 1.0
+    assert rows[player.id]["chance_playing_this"] == pytest.approx(0.25)
+    assert store._read([player.id], "2030-31", 4)[player.id] == stored
+
+
+def test_season_totals_come_from_history_before_the_gameweek(db_session, season_data, monkeypatch):
+    from app.services.ml.advanced_features import AdvancedFeatureBuilder
+
+    monkeypatch.setattr(AdvancedFeatureBuilder, "HISTORY_WINDOW", 2)
+    store = FeatureStore(db_session)
+    player = season_data[0]
+    # Current totals already include results after GW3
+    player.total_points, player.goals_scored, player.bonus = 99, 7, 12
+    db_session.add(WeeklyScore(player_id=player.id, season="2030-31", gw=4, minutes=90, points=15.0, goals_scored=2))
+    db_session.commit()
+
+    row = store.get_rows([player.id], "2030-31", 3)[player.id]
+
+    # GW1-2 only, counted over the whole season rather than the history window
+    assert row["season_total_points"] == pytest.approx(6.0)
+    assert row["season_goals"] == 0.0 and row["season_bonus"] == 0.0
+    assert row["games_played"] == 2.0 and row["points_per_game"] == pytest.approx(3.0)
+    assert store.get_rows([player.id], "2030-31", 5)[player.id]["games_played"] == 4.0
@@ -0,0 +1,28 @@
+"""Tests for SquadOptimizer's greedy selector (used when OR-Tools is absent)."""
+from app.models import Player
+from app.services.optimizer import MAX_PLAYERS_PER_TEAM, POSITION_REQUIREMENTS, SquadOptimizer
+
+
+def test_greedy_select_fills_fifteen_slots_within_budget():
+    # Premium picks score best but cannot all fit; budget fillers are needed
+    candidates, pred_dict = [], {}
+    pid = 0
+    for position, required in POSITION_REQUIREMENTS.items():
+        for tier, (price, points) in enumerate(((12.0, 9.0), (4.5, 2.0))):
+            for i in range(required + 2):
+                pid += 1
+                player = Player(id=pid, name=f"Greedy {pid}", position=position, price=price, team_id=pid % 10)
+                candidates.append((player, None))
+                pred_dict[pid] = {"predicted_points": points - 0.1 * i, "confidence": 0.8, "risk_score": 0.1}
+
+    squad = SquadOptimizer(db=None)._greedy_select(
+        candidates, 100.0, set(), pred_dict, 1, target_transfers=-1, current_squad=None
+    )
+
+    players = [p for p, _ in squad]
+    assert len(players) == 15
+    assert sum(p.price for p in players) <= 100.0
+    assert any(p.price == 12.0 for p in players)
+    for position, required in POSITION_REQUIREMENTS.items():
+        assert sum(p.position == position for p in players) == required
+    assert max(sum(p.team_id == t for p in players) for t in range(10)) <= MAX_PLAYERS_PER_TEAM
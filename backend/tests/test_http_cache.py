@@ -0,0 +1,84 @@
+"""Tests for the conditional-request HTTP cache and record/replay modes."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http_cache import CacheMiss, CachingTransport, HTTPCacheStore
+
+URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+
+
+class Origin:
+    """Mock upstream that answers conditional GETs with 304 while the payload is unchanged."""
+
+    def __init__(self, cache_control="max-age=30"):
+        self.body = b'{"elements": [1, 2, 3]}'
+        self.etag = '"v1"'
+        self.cache_control = cache_control
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"etag": self.etag, "cache-control": self.cache_control})
+        return httpx.Response(
+            200, content=self.body, headers={"etag": self.etag, "cache-control": self.cache_control, "content-type": "application/json"}
+        )
+
+
+def _get(transport, url=URL, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(url, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_default_mode_serves_fresh_then_revalidates(tmp_path):
+    origin = Origin()
+    now = [1000.0]
+    transport = CachingTransport(
+        HTTPCacheStore(tmp_path), transport=httpx.MockTransport(origin), clock=lambda: now[0]
+    )
+
+    assert _get(transport).headers["x-cache"] == "MISS"
+    now[0] += 10
+    hit = _get(transport)
+    assert hit.headers["x-cache"] == "HIT" and hit.json() == {"elements": [1, 2, 3]}
+    assert len(origin.requests) == 1
+
+    now[0] += 30
+    revalidated = _get(transport)
+    assert revalidated.headers["x-cache"] == "REVALIDATED" and revalidated.json() == {"elements": [1, 2, 3]}
+    assert origin.requests[-1].headers["if-none-match"] == '"v1"'
+
+    origin.body, origin.etag = b'{"elements": [4]}', '"v2"'
+    now[0] += 31
+    changed = _get(transport)
+    assert changed.headers["x-cache"] == "MISS" and changed.json() == {"elements": [4]}
+    assert transport.stats["hits"] == 1 and transport.stats["revalidated"] == 1
+
+
+def test_no_store_and_authenticated_requests_are_not_cached(tmp_path):
+    origin = Origin(cache_control="no-store")
+    store = HTTPCacheStore(tmp_path)
+    transport = CachingTransport(store, transport=httpx.MockTransport(origin))
+    _get(transport)
+    _get(transport, url="https://fantasy.premierleague.com/api/me/", headers={"cookie": "pl_profile=x"})
+    assert store.usage()["entries"] == 0 and len(origin.requests) == 2
+
+
+def test_record_then_replay_offline(tmp_path):
+    origin = Origin(cache_control="no-store")
+    store = HTTPCacheStore(tmp_path)
+    _get(CachingTransport(store, mode="record", transport=httpx.MockTransport(origin)), params={"b": 2, "a": 1})
+
+    def offline(request):
+        raise AssertionError("replay must not touch the network")
+
+    replay = CachingTransport(store, mode="replay", transport=httpx.MockTransport(offline))
+    response = _get(replay, params={"a": 1, "b": 2})
+    assert response.headers["x-cache"] == "REPLAY" and response.json() == {"elements": [1, 2, 3]}
+    with pytest.raises(CacheMiss):
+        _get(replay, url="https://fantasy.premierleague.com/api/fixtures/")
@@ -0,0 +1,57 @@
+"""Startup import-time budget for `app.main`."""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("slowapi")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Cumulative `-X importtime` budget for `import app.main`, in milliseconds. Framework
+# imports (FastAPI, SQLAlchemy, pydantic) account for most of it; the ML stack alone
+# used to add well over a second.
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "2500"))
+
+HEAVY_MODULES = ["numpy", "pandas", "sklearn", "joblib", "scipy"]
+
+
+def _import_app_main():
+    """Import app.main in a fresh interpreter; return (cumulative ms, heavy modules loaded)."""
+    code = (
+        "import sys, json, app.main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite:///:memory:")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", proc.stderr, re.MULTILINE)
+    assert match, "app.main missing from -X importtime output"
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return int(match.group(1)) / 1000.0, loaded
+
+
+def test_app_main_does_not_import_ml_stack():
+    _, loaded = _import_app_main()
+
+    assert loaded == []
+
+
+def test_app_main_import_time_within_budget():
+    # Best of two runs to smooth out a cold disk cache.
+    elapsed_ms = min(_import_app_main()[0] for _ in range(2))
+
+    assert elapsed_ms < IMPORT_BUDGET_MS, (
+        f"import app.main took {elapsed_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); "
+        "check for heavy modules imported at module level"
+    )
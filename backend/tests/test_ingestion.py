@@ -0,0 +1,59 @@
+"""Tests for chunked weekly-score CSV ingestion."""
+import asyncio
+import io
+
+from app.models.player import Player, WeeklyScore
+from app.services.ingestion import DataIngestionService
+
+
+class Upload:
+    def __init__(self, text):
+        self.file = io.BytesIO(text.encode("utf-8"))
+
+
+def test_weekly_scores_csv_resolves_names_and_upserts_in_chunks(db_session, monkeypatch):
+    players = [
+        Player(name="Ødegaardson", first_name="Martin", second_name="Ødegaardson", position="MID", price=8.5),
+        Player(name="Csvkeeper", first_name="Otto", second_name="Csvkeeper", position="GK", price=4.5),
+    ]
+    db_session.add_all(players)
+    db_session.commit()
+    season = "2035-36"
+    db_session.add(WeeklyScore(player_id=players[1].id, season=season, gw=2, points=1.0, expected_goals=0.4))
+    db_session.commit()
+
+    service = DataIngestionService(db_session)
+    service.CHUNK_ROWS = 2
+    monkeypatch.setattr(service, "_refresh_feature_store", lambda season, touched: refreshed.update(touched))
+    refreshed = {}
+    csv = "\n".join([
+        "Name,GW,Points,Minutes,Goals,xG",
+        "Martin Odegaardson,1,9,90,1,0.7",
+        "Otto Csvkeeper,2,6,90,,",
+        "Nobody Known,1,2,45,0,",
+        "Nobody Known,2,2,45,0,",
+        "Martin Odegaardson,2,abc,90,0,0.1",
+    ])
+
+    result = asyncio.run(service.ingest_weekly_scores(season, 1, Upload(csv)))
+
+    assert result["status"] == "success"
+    assert result["chunks"] == 3
+    assert result["ingested_count"] == 2
+    assert result["upserts"] == {"inserted": 1, "updated": 1, "unchanged": 0}
+    assert (result["unmatched_names"], result["unmatched_rows"]) == (1, 2)
+    assert result["errors"][0] == "Player not found: Nobody Known (2 rows)"
+    assert result["error_count"] == 2
+    rows = {
+        (ws.player_id, ws.gw): ws
+        for ws in db_session.query(WeeklyScore).filter(WeeklyScore.season == season)
+    }
+    assert set(rows) == {(players[0].id, 1), (players[1].id, 2)}
+    assert rows[(players[0].id, 1)].goals_scored == 1 and rows[(players[0].id, 1)].expected_goals == 0.7
+    # A blank xG cell keeps the stored value; blank counting stats become 0
+    assert rows[(players[1].id, 2)].points == 6.0 and rows[(players[1].id, 2)].expected_goals == 0.4
+    assert refreshed == {1: [players[0].id], 2: [players[1].id]}
+
+    db_session.query(WeeklyScore).filter(WeeklyScore.season == season).delete()
+    db_session.query(Player).filter(Player.id.in_([p.id for p in players])).delete(synchronize_session=False)
+    db_session.commit()
@@ -0,0 +1,159 @@
+"""Tests for the NDJSON bulk prediction stream (/ml/predict/stream)."""
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.v1.endpoints.ml as ml_endpoints
+from app.core.config import settings
+from app.core.database import Base
+from app.main import app
+from app.models import Player, WeeklyScore
+from app.models.fixture import Team
+from app.services.ml.predictor import MLPredictor
+
+URL = f"{settings.API_V1_PREFIX}/ml/predict/stream"
+PARAMS = {"season": "2036-37", "gameweek": 3, "team": "Stream", "chunk_size": 2}
+
+
+class MinutesModel:
+    """Stands in for a trained pipeline: a point per 30 average minutes."""
+
+    def predict(self, X):
+        return (X["minutes"] / 30.0).to_numpy()
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """Sessions the endpoint opens, on a database shared with the streaming thread."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    team = Team(name="Stream Test FC", short_name="STR")
+    other = Team(name="Elsewhere FC", short_name="ELS")
+    db.add_all([team, other])
+    db.flush()
+    for i in range(5):
+        player = Player(name=f"Streamer {i}", position="DEF" if i % 2 else "MID", price=5.0, team_id=team.id)
+        db.add(player)
+        db.flush()
+        db.add(WeeklyScore(player_id=player.id, season="2036-37", gw=2, minutes=30 * (i % 4)))
+    db.add(Player(name="Not Streamed", position="FWD", price=6.0, team_id=other.id))
+    db.commit()
+    db.close()
+
+    opened = []
+
+    def tracking_factory():
+        session = factory()
+        close = session.close
+        session.closed = False
+
+        def tracked_close():
+            session.closed = True
+            close()
+
+        session.close = tracked_close
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(ml_endpoints, "SessionLocal", tracking_factory)
+    monkeypatch.setattr(MLPredictor, "load", lambda self, name: {"model": MinutesModel()})
+    yield opened
+    engine.dispose()
+
+
+def test_stream_emits_one_line_per_player_and_closes_its_session(sessions):
+    client = TestClient(app)
+
+    response = client.get(URL, params=PARAMS)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 5
+    for row in rows:
+        assert set(row) == set(ml_endpoints.STREAM_FIELDS)
+        assert row["player_name"].startswith("Streamer")
+        assert row["gameweek"] == 3 and row["model_name"] == "xgboost"
+        assert row["position"] in ("DEF", "MID") and isinstance(row["team_id"], int)
+        assert row["predicted_points"] >= 0.0
+    assert [r["predicted_points"] for r in rows] == [0.0, 1.0, 2.0, 3.0, 0.0]
+    assert len(sessions) == 1 and sessions[0].closed
+
+    chunked = client.get(URL, params={**PARAMS, "per_chunk": True, "fields": "player_id,predicted_points"})
+    lines = [json.loads(line) for line in chunked.text.splitlines()]
+    assert [line["chunk"] for line in lines] == [0, 1, 2]
+    assert sum(len(line["predictions"]) for line in lines) == 5
+    assert all(set(p) == {"player_id", "predicted_points"} for line in lines for p in line["predictions"])
+
+    assert client.get(URL, params={**PARAMS, "fields": "player_id,salary"}).status_code == 400
+
+
+def _disconnect_after_first_chunk(bodies, sessions, pause):
+    """Drive the ASGI app directly: the client goes away after the first chunk."""
+
+    async def run():
+        disconnected = asyncio.Event()
+        requested = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                bodies.append(message["body"])
+                disconnected.set()
+                await asyncio.sleep(pause)
+
+        query = "&".join(f"{k}={v}" for k, v in PARAMS.items()).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": URL, "raw_path": URL.encode(), "query_string": query,
+            "headers": [(b"host", b"testserver")], "client": ("testclient", 50000),
+            "server": ("testserver", 80), "root_path": "",
+        }
+        await app(scope, receive, send)
+        # Checked before the event loop shuts down and finalizes leftover generators
+        return [s.closed for s in sessions]
+
+    return asyncio.run(run())
+
+
+def test_client_disconnect_closes_the_session(sessions):
+    bodies = []
+
+    closed = _disconnect_after_first_chunk(bodies, sessions, pause=0.05)
+
+    assert 0 < len(bodies) < 3
+    assert closed == [True]
+
+
+def test_disconnect_while_a_chunk_is_computing_closes_the_session(sessions, monkeypatch):
+    predict = MinutesModel.predict
+
+    def slow_predict(self, X):
+        time.sleep(0.1)
+        return predict(self, X)
+
+    monkeypatch.setattr(MinutesModel, "predict", slow_predict)
+    bodies = []
+
+    # The client leaves while a worker thread is inside the next chunk
+    closed = _disconnect_after_first_chunk(bodies, sessions, pause=0)
+
+    assert len(bodies) == 1
+    assert closed == [True]
@@ -0,0 +1,58 @@
+"""Tests for the vectorized squad Monte Carlo simulator."""
+import numpy as np
+import pytest
+
+from app.services.monte_carlo import SquadSimulator
+
+GK = [True] + [False] * 10 + [True] + [False] * 3
+XI = [True] * 11 + [False] * 4
+
+
+def test_always_available_squad_mean_matches_expected_points():
+    mean = [4.0] * 11 + [2.0] * 4
+    sim = SquadSimulator(n_sims=50_000, seed=1, team_shock_sd=0.0)
+
+    result = sim.simulate(mean, [1.0] * 15, [0.5] * 15, list(range(15)), GK, XI, captain_idx=0, target=40.0)
+
+    # 11 starters + captain doubled, no auto-subs when everyone plays.
+    assert result["mean"] == pytest.approx(48.0, rel=0.01)
+    assert result["autosub_points_mean"] == 0.0
+    assert result["p_beat_target"] > 0.99
+    assert result["percentiles"]["p5"] < result["percentiles"]["p50"] < result["percentiles"]["p95"]
+
+
+def test_vice_captain_doubles_when_captain_never_plays():
+    mean = [5.0] * 15
+    p_play = [1.0] * 15
+    p_play[1] = 0.0
+    sim = SquadSimulator(n_sims=20_000, seed=2, team_shock_sd=0.0)
+
+    result = sim.simulate(mean, p_play, [0.01] * 15, list(range(15)), GK, XI, captain_idx=1, vice_idx=2)
+
+    assert result["captain_bonus_mean"] == pytest.approx(5.0, rel=0.01)
+    # First bench outfielder replaces the missing starter.
+    assert result["autosub_points_mean"] == pytest.approx(5.0, rel=0.01)
+
+
+def test_shared_team_shock_increases_variance():
+    mean = [5.0] * 15
+    clubs_apart = list(range(15))
+    clubs_shared = [i // 3 for i in range(15)]
+    sim_kwargs = dict(n_sims=50_000, team_shock_sd=0.4)
+
+    apart = SquadSimulator(seed=3, **sim_kwargs).simulate(mean, [1.0] * 15, [1.0] * 15, clubs_apart, GK, XI)
+    shared = SquadSimulator(seed=3, **sim_kwargs).simulate(mean, [1.0] * 15, [1.0] * 15, clubs_shared, GK, XI)
+
+    assert shared["mean"] == pytest.approx(apart["mean"], rel=0.02)
+    assert shared["std"] > apart["std"] * 1.3
+
+
+def test_low_mean_high_variance_players_are_not_biased_upward():
+    mean = [1.0] * 15
+    sim = SquadSimulator(n_sims=50_000, seed=4, team_shock_sd=0.0)
+
+    # Bench never plays, so there are no auto-subs.
+    result = sim.simulate(mean, [0.8] * 11 + [0.0] * 4, [3.0] * 15, list(range(15)), GK, XI)
+
+    # Unconditional means are preserved even though many draws are negative.
+    assert result["mean"] == pytest.approx(11.0, abs=0.15)
@@ -0,0 +1,79 @@
+"""Tests for online (partial_fit) model updates after a gameweek is ingested."""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.models import Player, WeeklyScore
+from app.models.fixture import Fixture, Team
+from app.services.ml.online import OnlineModelUpdater
+from app.services.ml.registry import ModelRegistry
+from app.services.ml.trainer import MLTrainer
+
+SEASON = "2033-34"
+
+
+@pytest.fixture
+def sgd_model(db_session, tmp_path, monkeypatch):
+    """An sgd model trained through GW3, with GW4 played but its fixture unfinished."""
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path))
+    teams = [Team(name="Online Home FC", short_name="OHF"), Team(name="Online Away FC", short_name="OAF")]
+    db_session.add_all(teams)
+    db_session.flush()
+    players = [
+        Player(name=f"Online {i}", position=("DEF", "MID", "FWD")[i % 3], price=5.0, team_id=teams[i % 2].id)
+        for i in range(6)
+    ]
+    db_session.add_all(players)
+    db_session.flush()
+    for gw in range(1, 5):
+        db_session.add(Fixture(season=SEASON, gw=gw, team_h_id=teams[0].id, team_a_id=teams[1].id, finished=gw < 4))
+        for i, player in enumerate(players):
+            minutes = 90 - 15 * ((gw + i) % 3)
+            db_session.add(WeeklyScore(
+                player_id=player.id, season=SEASON, gw=gw, minutes=minutes,
+                points=float(minutes // 30 + i % 2), expected_goals=0.1 * i, shots=i % 3,
+            ))
+    db_session.commit()
+
+    # Train on GW1-3 only: GW4 is what the online update should add
+    trainer = MLTrainer(db_session)
+    full = trainer._load_training_data
+    monkeypatch.setattr(
+        trainer, "_load_training_data", lambda seasons, **kw: full(seasons, **kw).query("gw < 4")
+    )
+    asyncio.run(trainer.train("sgd", [SEASON], hyperparameters={"max_iter": 50}))
+    yield players
+
+    db_session.query(WeeklyScore).filter(WeeklyScore.season == SEASON).delete()
+    db_session.query(Fixture).filter(Fixture.season == SEASON).delete()
+    for player in players:
+        db_session.delete(player)
+    for team in teams:
+        db_session.delete(team)
+    db_session.commit()
+
+
+def test_unfinished_or_unknown_gameweek_is_skipped(db_session, sgd_model, tmp_path):
+    updater = OnlineModelUpdater(db_session, model_dir=tmp_path)
+
+    assert updater.update(SEASON, 4) == {"sgd": {"status": "skipped", "reason": "gameweek not finished"}}
+    # No fixtures known for GW5: not treated as finished
+    assert updater.update(SEASON, 5)["sgd"]["reason"] == "gameweek not finished"
+    assert ModelRegistry(tmp_path).get("sgd")["trained_through"]["gw"] == 3
+
+
+def test_finished_gameweek_applies_every_row_once(db_session, sgd_model, tmp_path):
+    db_session.query(Fixture).filter(Fixture.season == SEASON, Fixture.gw == 4).update({"finished": True})
+    db_session.commit()
+    updater = OnlineModelUpdater(db_session, model_dir=tmp_path)
+
+    result = updater.update(SEASON, 4)["sgd"]
+
+    assert result["status"] == "updated"
+    assert result["rows"] == len(sgd_model)
+    entry = ModelRegistry(tmp_path).get("sgd")
+    assert entry["trained_through"] == {"season": SEASON, "gw": 4}
+    assert entry["incremental_updates"] == 1
+    assert updater.update(SEASON, 4) == {"sgd": {"status": "skipped", "reason": "already applied"}}
+    assert ModelRegistry(tmp_path).get("sgd")["incremental_updates"] == 1
@@ -0,0 +1,46 @@
+"""Tests for walk-forward CV and the parallel training orchestrator."""
+import numpy as np
+import pandas as pd
+
+from app.services.ml.parallel_training import ParallelTrainer, walk_forward_splits
+
+
+def test_walk_forward_splits_never_validate_on_the_past():
+    periods = [("2023-24", gw) for gw in range(1, 7) for _ in range(3)]
+
+    folds = walk_forward_splits(periods, n_splits=5)
+
+    assert folds == [(3, 6), (6, 9), (9, 12), (12, 15), (15, 18)]
+    for train_end, val_end in folds:
+        assert max(periods[:train_end]) < min(periods[train_end:val_end])
+
+
+def test_walk_forward_splits_shrink_when_few_periods():
+    periods = [("2023-24", 1), ("2023-24", 1), ("2023-24", 2), ("2024-25", 1)]
+
+    assert walk_forward_splits(periods, n_splits=5) == [(2, 3), (3, 4)]
+    assert walk_forward_splits([("2023-24", 1)] * 4, n_splits=5) == []
+
+
+def test_parallel_trainer_fits_candidates_across_processes(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 240
+    X = pd.DataFrame({
+        "minutes": rng.integers(0, 91, n).astype(float),
+        "position": rng.choice(["DEF", "MID", "FWD"], n),
+    })
+    y = X["minutes"] / 30 + rng.normal(0, 0.1, n)
+    # Deliberately shuffled: the trainer must order rows by (season, gw) itself.
+    periods = [("2023-24", int(gw)) for gw in rng.integers(1, 13, n)]
+
+    trainer = ParallelTrainer(["minutes"], ["position"], n_splits=3, max_workers=2, work_dir=tmp_path)
+    results = trainer.run(
+        X, y, periods,
+        {"ridge": ("ridge", {"alpha": 1.0}), "rf": ("random_forest", {"n_estimators": 10})},
+    )
+
+    assert set(results) == {"ridge", "rf"}
+    assert [f["fold"] for f in results["ridge"]["folds"]] == [0, 1, 2]
+    assert results["ridge"]["cv_rmse"] < 0.5
+    assert results["rf"]["model"].predict(X.head(5)).shape == (5,)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,154 @@
+"""Tests for the concurrent PremierLeague.com match pipeline."""
+import asyncio
+
+from app.core.rate_limit import AsyncTokenBucket
+from app.models import (
+    FPLApiSnapshot,
+    PLMatch,
+    PLMatchEvent,
+    PLMatchLineup,
+    PLMatchSyncState,
+    PLMatchTeamStats,
+    PLPlayer,
+    PLTeam,
+)
+from app.services.availability_index import AvailabilityIndex
+from app.services.pl_ingestion import PremierLeagueIngestionService
+
+
+class FakePLAPI:
+    def __init__(self):
+        self.limiter = AsyncTokenBucket(rate=0)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _call(self, value):
+        await self.limiter.acquire()
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def get_match(self, match_id):
+        if match_id == "pm-bad":
+            return self._call(RuntimeError("detail down"))
+        return self._call({"period": "FullTime", "ground": "Test Park"})
+
+    def get_match_stats(self, match_id):
+        return self._call([{"teamId": "pt1", "side": "Home", "stats": {"expectedGoals": 1.2}}])
+
+    def get_match_lineups(self, match_id):
+        return self._call(RuntimeError("lineups down"))
+
+    def get_match_events(self, match_id):
+        return self._call({"homeTeam": {"id": "pt1", "goals": [{"time": "12", "playerId": "pp1"}]}, "awayTeam": {}})
+
+    async def close(self):
+        pass
+
+
+def test_ingest_matches_fetches_concurrently_and_writes_in_batches(db_session):
+    service = PremierLeagueIngestionService(db_session, concurrency=3, batch_size=2)
+    service.api = FakePLAPI()
+    listings = [
+        {"matchId": f"pm{i}", "matchWeek": 1, "kickoff": "2032-08-10 15:00:00",
+         "homeTeam": {"id": "pt1", "name": "Pipe Home"}, "awayTeam": {"id": "pt2", "name": "Pipe Away"}}
+        for i in range(5)
+    ] + [{"matchId": "pm-bad"}]
+
+    report = asyncio.run(service.ingest_matches(2032, listings))
+
+    assert (report["ingested"], report["failed"]) == (5, 1)
+    assert report["requests"] == 24 and report["matches_per_min"] > 0
+    # Three matches in flight, four requests each
+    assert service.api.peak > 4
+    assert db_session.query(PLMatch).filter(PLMatch.season == 2032).count() == 5
+    assert db_session.query(PLMatchTeamStats).filter(PLMatchTeamStats.match_id.like("pm%")).count() == 5
+    assert db_session.query(PLMatchEvent).filter(PLMatchEvent.match_id.like("pm%")).count() == 5
+    # The failed lineups fetch only skips that part of each match
+    assert db_session.query(PLMatchLineup).filter(PLMatchLineup.match_id.like("pm%")).count() == 0
+
+    for model in (PLMatchEvent, PLMatchTeamStats, PLMatchSyncState):
+        db_session.query(model).filter(model.match_id.like("pm%")).delete(synchronize_session=False)
+    db_session.query(PLMatch).filter(PLMatch.season == 2032).delete()
+    db_session.query(PLPlayer).filter(PLPlayer.id == "pp1").delete()
+    db_session.query(PLTeam).filter(PLTeam.id.in_(["pt1", "pt2"])).delete(synchronize_session=False)
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2032").delete()
+    db_session.commit()
+
+
+class ListingPLAPI(FakePLAPI):
+    def __init__(self, listings):
+        super().__init__()
+        self.listings = listings
+        self.goals = {}
+
+    def list_matches(self, season):
+        return self._call(self.listings)
+
+    def get_match_lineups(self, match_id):
+        return self._call([])
+
+    def get_match_events(self, match_id):
+        goals = [{"time": str(t), "playerId": "pp2"} for t in self.goals.get(match_id, [])]
+        return self._call({"homeTeam": {"id": "pt3", "goals": goals}, "awayTeam": {}})
+
+
+def test_current_season_refresh_skips_unchanged_matches_and_resources(db_session, monkeypatch):
+    service = PremierLeagueIngestionService(db_session)
+    listings = [
+        {"matchId": f"pq{i}", "period": "FullTime", "kickoff": f"2033-08-1{i} 15:00:00",
+         "homeTeam": {"id": "pt3", "score": 0}, "awayTeam": {"id": "pt4", "score": 0}}
+        for i in range(3)
+    ]
+    service.api = ListingPLAPI(listings)
+
+    first = asyncio.run(service.update_current_season(2033))
+    assert (first["matches_refreshed"], first["matches_unchanged"], first["requests"]) == (3, 0, 13)
+    assert db_session.query(PLMatchSyncState).filter(PLMatchSyncState.listing_hash.isnot(None)).count() >= 3
+
+    # Nothing moved: only the listing is requested
+    quiet = asyncio.run(service.update_current_season(2033))
+    assert (quiet["matches_refreshed"], quiet["matches_unchanged"], quiet["requests"]) == (0, 3, 1)
+
+    # A late goal changes one listing; only its events are rewritten
+    listings[1]["homeTeam"]["score"] = 1
+    service.api.goals["pq1"] = [88]
+    snapshots_before = db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033").count()
+    late = asyncio.run(service.update_current_season(2033))
+    assert (late["matches_refreshed"], late["matches_unchanged"], late["requests"]) == (1, 2, 5)
+    assert (late["resources_written"], late["resources_unchanged"]) == (1, 3)
+    # Listing snapshot plus the changed events payload
+    assert db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033").count() == snapshots_before + 2
+    assert db_session.query(PLMatchEvent).filter(PLMatchEvent.match_id == "pq1").count() == 1
+
+    # A failed availability update leaves the match to be retried on the next refresh
+    def broken_update(self, match_id, commit=True):
+        raise RuntimeError("index locked")
+
+    listings[2]["homeTeam"]["score"] = 1
+    service.api.goals["pq2"] = [12]
+    with monkeypatch.context() as m:
+        m.setattr(AvailabilityIndex, "update_match", broken_update)
+        asyncio.run(service.update_current_season(2033))
+    state = db_session.get(PLMatchSyncState, "pq2")
+    assert state.listing_hash is None and state.lineups_hash is None
+    retried = asyncio.run(service.update_current_season(2033))
+    assert (retried["matches_refreshed"], retried["resources_written"]) == (1, 1)
+    db_session.refresh(state)
+    assert state.listing_hash is not None and state.lineups_hash is not None
+
+    forced = asyncio.run(service.update_current_season(2033, force=True))
+    assert forced["matches_refreshed"] == 3 and forced["resources_written"] == 0
+
+    ids = [m["matchId"] for m in listings]
+    for model in (PLMatchEvent, PLMatchTeamStats, PLMatchSyncState):
+        db_session.query(model).filter(model.match_id.in_(ids)).delete(synchronize_session=False)
+    db_session.query(PLMatch).filter(PLMatch.season == 2033).delete()
+    db_session.query(PLPlayer).filter(PLPlayer.id == "pp2").delete()
+    db_session.query(PLTeam).filter(PLTeam.id.in_(["pt3", "pt4"])).delete(synchronize_session=False)
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033").delete()
+    db_session.commit()
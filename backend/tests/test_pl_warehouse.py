@@ -0,0 +1,55 @@
+"""Tests for the PremierLeague.com Parquet export and DuckDB training rows."""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("duckdb")
+
+from app.models import PLMatch, PLMatchEvent, PLMatchTeamStats, PLPlayer, PLTeam
+from app.models.pl_availability import PLPlayerAppearance
+from app.services.pl_warehouse import PLWarehouse, export_parquet
+
+
+@pytest.fixture
+def pl_match(db_session):
+    rows = [
+        PLTeam(id="w1", name="Warehouse Home", abbr="WHH"),
+        PLTeam(id="w2", name="Warehouse Away", abbr="WHA"),
+        PLPlayer(id="wp1", known_name="Striker", team_id="w1"),
+        PLPlayer(id="wp2", known_name="Winger", team_id="w1"),
+        PLPlayer(id="wp3", known_name="Defender", team_id="w2"),
+        PLMatch(match_id="wm1", season=2031, matchweek=1, kickoff=datetime(2031, 8, 10),
+                home_team_id="w1", away_team_id="w2"),
+        PLMatchTeamStats(match_id="wm1", team_id="w1", side="Home", stats={"expectedGoals": "1.85", "totalScoringAtt": 14}),
+        PLMatchTeamStats(match_id="wm1", team_id="w2", side="Away", stats={"expectedGoals": 0.4}),
+        PLMatchEvent(match_id="wm1", team_id="w1", event_type="goal", minute=20, player_id="wp1", assist_player_id="wp2"),
+        PLMatchEvent(match_id="wm1", team_id="w1", event_type="goal", minute=70, player_id="wp1", goal_type="Penalty"),
+        PLMatchEvent(match_id="wm1", team_id="w2", event_type="card", minute=69, player_id="wp3", card_type="Yellow"),
+        PLPlayerAppearance(match_id="wm1", player_id="wp1", team_id="w1", started=1, minutes=90),
+        PLPlayerAppearance(match_id="wm1", player_id="wp2", team_id="w1", started=0, minutes=25, subbed_on_minute=65),
+        PLPlayerAppearance(match_id="wm1", player_id="wp3", team_id="w2", started=1, minutes=90),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    yield
+    for row in reversed(rows):
+        db_session.delete(row)
+    db_session.commit()
+
+
+def test_export_and_player_match_rows(db_session, pl_match, tmp_path):
+    counts = export_parquet(db_session, tmp_path)
+    assert counts["pl_matches"] == 1 and counts["pl_player_appearances"] == 3
+    assert (tmp_path / "pl_match_events" / "season=2031" / "data.parquet").exists()
+
+    wh = PLWarehouse(tmp_path)
+    rows = wh.player_match_rows(seasons=[2031]).set_index("player_id")
+    wh.close()
+
+    striker, winger, defender = rows.loc["wp1"], rows.loc["wp2"], rows.loc["wp3"]
+    assert (striker.goals, striker.penalty_goals, striker.is_home) == (2, 1, 1)
+    assert striker.team_xg == pytest.approx(1.85) and striker.team_xga == pytest.approx(0.4)
+    assert striker.team_shots == 14
+    assert (winger.assists, winger.minutes, winger.started) == (1, 25, 0)
+    assert (defender.yellow_cards, defender.team_goals_conceded, defender.opponent_id) == (1, 2, "w1")
@@ -0,0 +1,81 @@
+"""Tests for delta bootstrap ingestion and player change events."""
+import asyncio
+
+from app.models import PlayerChangeEvent, PlayerFeatureRow, WeeklyScore
+from app.models.fixture import Team
+from app.models.player import Player
+from app.services.fpl_ingestion import FPLIngestionService
+from app.services.ml.feature_store import FeatureStore
+from app.services.player_changes import PlayerChangeLog
+
+
+def _element(element_id, code, **overrides):
+    element = {
+        "id": element_id, "code": code, "first_name": "Delta", "second_name": f"Player {code}",
+        "team": 9300, "element_type": 3, "now_cost": 60, "cost_change_start": 0,
+        "status": "a", "news": "", "total_points": 10,
+    }
+    element.update(overrides)
+    return element
+
+
+def test_second_ingest_writes_only_changed_players_and_emits_events(db_session, monkeypatch):
+    team = Team(fpl_id=9300, name="Delta FC", short_name="DFC")
+    db_session.add(team)
+    db_session.commit()
+
+    service = FPLIngestionService(db_session)
+    service.season = "2034-35"
+    invalidated = []
+    monkeypatch.setattr(service.change_log, "invalidate", lambda season, ids: invalidated.append(sorted(ids)) or {})
+    elements = [_element(9300 + i, 93000 + i) for i in range(4)]
+
+    first = asyncio.run(service._ingest_players(elements, []))
+    assert first["inserted"] == 4
+    assert service.player_changes["by_type"] == {"new_player": 4}
+
+    elements[0]["now_cost"] = 61
+    elements[1].update(status="d", news="Knock - 75% chance of playing", chance_of_playing_next_round=75)
+    second = asyncio.run(service._ingest_players(elements, []))
+    assert second == {"inserted": 0, "updated": 2, "unchanged": 2}
+    assert service.player_changes["by_type"] == {"price": 1, "status": 1, "news": 1, "availability": 1}
+
+    ids = dict(db_session.query(Player.fpl_code, Player.id).filter(Player.fpl_code.in_([93000, 93001])).all())
+    assert invalidated[-1] == sorted(ids.values())
+    price = PlayerChangeLog(db_session).since(0, change_types=["price"], player_id=ids[93000])
+    assert [(e.old_value, e.new_value) for e in price] == [("6", "6.1")]
+
+    db_session.query(PlayerChangeEvent).filter(PlayerChangeEvent.season == "2034-35").delete()
+    db_session.query(Player).filter(Player.team_id == team.id).delete()
+    db_session.delete(team)
+    db_session.commit()
+    asyncio.run(service.close())
+
+
+def test_price_only_change_keeps_stored_feature_rows(db_session):
+    team = Team(fpl_id=9310, name="Kept Rows FC", short_name="KRF")
+    db_session.add(team)
+    db_session.commit()
+    service = FPLIngestionService(db_session)
+    service.season = "2034-35"
+    elements = [_element(9310, 93100, team=9310)]
+    asyncio.run(service._ingest_players(elements, []))
+    player = db_session.query(Player).filter(Player.fpl_code == 93100).one()
+    db_session.add(WeeklyScore(player_id=player.id, season="2034-35", gw=1, minutes=90, points=6.0))
+    db_session.commit()
+    FeatureStore(db_session).get_rows([player.id], "2034-35", 2)
+
+    elements[0]["now_cost"] = 62
+    asyncio.run(service._ingest_players(elements, []))
+
+    assert service.player_changes["by_type"] == {"price": 1}
+    assert db_session.query(PlayerFeatureRow).filter(PlayerFeatureRow.player_id == player.id).count() == 1
+    assert FeatureStore(db_session).get_rows([player.id], "2034-35", 2)[player.id]["price"] == 6.2
+
+    db_session.query(PlayerFeatureRow).filter(PlayerFeatureRow.player_id == player.id).delete()
+    db_session.query(WeeklyScore).filter(WeeklyScore.player_id == player.id).delete()
+    db_session.query(PlayerChangeEvent).filter(PlayerChangeEvent.season == "2034-35").delete()
+    db_session.delete(player)
+    db_session.delete(team)
+    db_session.commit()
+    asyncio.run(service.close())
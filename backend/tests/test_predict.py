@@ -0,0 +1,43 @@
+"""Tests for predict_points' multi-horizon projections."""
+import numpy as np
+
+import app.services.ml.predict as predict_module
+from app.models import Player
+from app.models.fixture import Fixture, Team
+from app.services.ml.predict import predict_points
+
+SEASON = "2037-38"
+
+
+class FlatModel:
+    """Two points per gameweek for everyone."""
+
+    def predict(self, X):
+        return np.full(len(X), 2.0)
+
+
+def test_projections_follow_blank_and_double_gameweeks(db_session, monkeypatch):
+    monkeypatch.setattr(predict_module, "load_model", lambda model_name: (FlatModel(), 0.0, 0.0))
+    teams = [Team(name=f"Window FC {i}", short_name=f"WN{i}") for i in range(3)]
+    db_session.add_all(teams)
+    db_session.flush()
+    a, b, c = (t.id for t in teams)
+    player = Player(name="Window Player", position="MID", price=6.0, team_id=a)
+    db_session.add(player)
+    # GW10 single, GW11 blank for A, GW12 double; GW13+ not scheduled yet
+    for gw, home, away in ((10, a, b), (11, b, c), (12, a, b), (12, c, a)):
+        db_session.add(Fixture(season=SEASON, gw=gw, team_h_id=home, team_a_id=away))
+    db_session.commit()
+
+    result = predict_points(db_session, [player.id], SEASON, 10, horizon=3, horizons=[1, 5])
+
+    (pred,) = result["predictions"]
+    assert pred["predicted_points"] == 2.0
+    assert pred["predicted_points_total"] == 6.0
+    assert pred["projections"] == {1: 2.0, 3: 6.0, 5: 10.0}
+
+    db_session.query(Fixture).filter(Fixture.season == SEASON).delete()
+    db_session.delete(player)
+    for team in teams:
+        db_session.delete(team)
+    db_session.commit()
@@ -0,0 +1,109 @@
+"""Tests for the token bucket, HTTP retries and the concurrent season backfill."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.rate_limit import AsyncTokenBucket, retry_http
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("GET", "https://example.test/")
+    return httpx.HTTPStatusError("err", request=request, response=httpx.Response(status, headers=headers, request=request))
+
+
+def test_token_bucket_spaces_concurrent_callers():
+    clock = FakeClock()
+    bucket = AsyncTokenBucket(rate=2.0, capacity=2.0, clock=clock, sleep=clock.sleep)
+
+    async def run():
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+
+    asyncio.run(run())
+    # Two burst tokens, then one every 0.5s
+    assert clock.now == pytest.approx(2.0)
+    assert bucket.stats()["acquired"] == 6
+
+
+def test_retry_http_backs_off_on_429_and_5xx_only():
+    clock = FakeClock()
+    errors = [_status_error(429, {"retry-after": "3"}), _status_error(503)]
+
+    async def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(retry_http(flaky, attempts=3, base_delay=1.0, sleep=clock.sleep)) == "ok"
+    assert clock.sleeps[0] == 3.0 and 1.0 <= clock.sleeps[1] <= 2.0
+
+    async def not_found():
+        raise _status_error(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(retry_http(not_found, attempts=3, sleep=clock.sleep))
+    assert len(clock.sleeps) == 2
+
+
+def test_season_backfill_fetches_concurrently_and_upserts(db_session, monkeypatch):
+    from app.models import Player, PlayerSeasonStat
+    from app.models.fixture import Team
+    from app.services.fpl_last5_ingestion import FPLLastNSeasonsIngestionService
+
+    team = Team(name="Backfill FC", short_name="BFC")
+    db_session.add(team)
+    db_session.flush()
+    players = [
+        Player(fpl_id=9200 + i, name=f"Backfill {i}", position="DEF", price=4.5, team_id=team.id)
+        for i in range(5)
+    ]
+    db_session.add_all(players)
+    db_session.commit()
+
+    service = FPLLastNSeasonsIngestionService(db_session, limiter=AsyncTokenBucket(rate=0))
+    in_flight, peak = [0], [0]
+
+    async def fetch_player_details(fpl_id):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        if fpl_id == 9204:
+            raise _status_error(404)
+        return {"history_past": [
+            {"season_name": "2029/30", "total_points": fpl_id - 9200, "ict_index": "12.5"},
+            {"season_name": "2018/19", "total_points": 99},
+        ]}
+
+    monkeypatch.setattr(service.fpl_api, "fetch_player_details", fetch_player_details)
+
+    result = asyncio.run(service.ingest_player_season_summaries(["2029-30"], concurrency=3))
+    assert (result["stats_created"], result["players_failed"]) == (4, 1)
+    assert peak[0] == 3
+
+    again = asyncio.run(service.ingest_player_season_summaries(["2029-30"], concurrency=3))
+    assert (again["stats_created"], again["stats_unchanged"]) == (0, 4)
+
+    stats = db_session.query(PlayerSeasonStat).filter(PlayerSeasonStat.season == "2029-30").all()
+    assert sorted(s.total_points for s in stats) == [0, 1, 2, 3]
+    assert all(s.ict_index == 12.5 for s in stats)
+
+    asyncio.run(service.close())
+    db_session.query(PlayerSeasonStat).filter(PlayerSeasonStat.season == "2029-30").delete()
+    for player in players:
+        db_session.delete(player)
+    db_session.delete(team)
+    db_session.commit()
@@ -0,0 +1,127 @@
+"""Tests for the deadline-aware ingestion scheduler, on a fake clock."""
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services.scheduler import IngestionScheduler, SeasonCalendar, read_status
+
+T0 = datetime(2036, 1, 10, 12, 0)
+
+
+def test_scheduler_polls_live_windows_and_backs_off_on_failure(tmp_path):
+    clock = {"now": T0}
+    calls = {"bootstrap": [], "event_live": [], "pl_matches": []}
+    calendar = SeasonCalendar(
+        deadlines=[(20, T0 + timedelta(hours=1, minutes=30))],
+        kickoffs=[(20, T0 + timedelta(hours=3)), (20, T0 + timedelta(hours=3))],
+    )
+
+    async def bootstrap():
+        calls["bootstrap"].append(clock["now"])
+        return {}
+
+    async def event_live(gw):
+        calls["event_live"].append((clock["now"], gw))
+        return {"gw": gw}
+
+    async def pl_matches():
+        calls["pl_matches"].append(clock["now"])
+        if len(calls["pl_matches"]) == 1:
+            raise RuntimeError("upstream 503")
+        return {"matches_refreshed": 0}
+
+    async def main():
+        stop = asyncio.Event()
+
+        async def sleep(seconds):
+            clock["now"] += timedelta(seconds=seconds)
+            if clock["now"] >= T0 + timedelta(hours=7):
+                stop.set()
+
+        scheduler = IngestionScheduler(
+            "2035-36",
+            session_factory=lambda: None,
+            runners={"bootstrap": bootstrap, "event_live": event_live, "pl_matches": pl_matches},
+            load_calendar=lambda: calendar,
+            clock=lambda: clock["now"],
+            sleep=sleep,
+            status_path=tmp_path / "status.json",
+            jitter=0.0,
+        )
+        await scheduler.run(stop)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+
+    # Hourly, plus once just after the 13:30 deadline
+    assert calls["bootstrap"][:4] == [T0 + timedelta(minutes=m) for m in (0, 60, 92, 152)]
+    # Every 60 s from kickoff - 5 min until the live window closes at kickoff + 2h15
+    live_times = [t for t, _ in calls["event_live"]]
+    assert live_times[0] == T0 + timedelta(hours=2, minutes=55)
+    assert live_times[-1] == T0 + timedelta(hours=5, minutes=15)
+    assert len(live_times) == 141 and {gw for _, gw in calls["event_live"]} == {20}
+    # Failure backs off 60 s, then the refresh waits for full time
+    assert calls["pl_matches"] == [T0, T0 + timedelta(minutes=1), T0 + timedelta(hours=5, minutes=15)]
+    assert scheduler.jobs["pl_matches"].failures == 0 and scheduler.jobs["pl_matches"].runs == 3
+
+    status = read_status(tmp_path / "status.json", now=clock["now"])
+    assert status["running"] is False and status["stopped"] is True
+    assert status["jobs"]["event_live"]["runs"] == 141
+    assert read_status(tmp_path / "missing.json") == {"running": False, "status": "not_started"}
+
+
+def test_slow_job_does_not_stall_live_polls_or_overlap(tmp_path):
+    clock = {"now": T0}
+    calls = {"event_live": [], "pl_matches": []}
+    order = []
+    calendar = SeasonCalendar(deadlines=[], kickoffs=[(21, T0 + timedelta(minutes=5))])
+
+    async def main():
+        stop = asyncio.Event()
+        release = asyncio.Event()
+
+        async def bootstrap():
+            await asyncio.sleep(0)
+            order.append("bootstrap")
+            return {}
+
+        async def event_live(gw):
+            order.append("event_live")
+            calls["event_live"].append(clock["now"])
+            if len(calls["event_live"]) == 5:
+                release.set()
+            return {"gw": gw}
+
+        async def pl_matches():
+            order.append("pl_matches")
+            calls["pl_matches"].append(clock["now"])
+            # Blocks until five live polls have gone through
+            await release.wait()
+            calls["pl_matches"].append(clock["now"])
+            return {"matches_refreshed": 0}
+
+        async def sleep(seconds):
+            clock["now"] += timedelta(seconds=seconds)
+            if len(calls["event_live"]) >= 8:
+                stop.set()
+
+        scheduler = IngestionScheduler(
+            "2035-36",
+            session_factory=lambda: None,
+            runners={"bootstrap": bootstrap, "event_live": event_live, "pl_matches": pl_matches},
+            load_calendar=lambda: calendar,
+            clock=lambda: clock["now"],
+            sleep=sleep,
+            status_path=tmp_path / "status.json",
+            jitter=0.0,
+        )
+        await scheduler.run(stop)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+
+    # The first bootstrap completes before the jobs planned from its calendar start
+    assert order[0] == "bootstrap"
+    assert calls["event_live"][:5] == [T0 + timedelta(minutes=m) for m in range(5)]
+    # Started once, finished after the fifth poll: never run twice at the same time
+    assert calls["pl_matches"] == [T0, T0 + timedelta(minutes=4)]
+    assert scheduler.jobs["pl_matches"].runs == 1
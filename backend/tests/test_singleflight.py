@@ -0,0 +1,57 @@
+"""Tests for single-flight call deduplication."""
+import threading
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight("test", ttl_s=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", compute))) for _ in range(5)]
+    for t in followers:
+        t.start()
+    while flight.stats()["coalesced"] < 5:
+        pass
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 6
+    stats = flight.stats()
+    assert stats["computed"] == 1 and stats["coalesced"] == 5 and stats["in_flight"] == 0
+
+
+def test_ttl_cache_and_errors_are_not_cached():
+    now = [0.0]
+    flight = SingleFlight("test", ttl_s=10, clock=lambda: now[0])
+    counter = iter(range(100))
+
+    assert flight.do("k", lambda: next(counter)) == 0
+    now[0] = 9.0
+    assert flight.do("k", lambda: next(counter)) == 0
+    now[0] = 10.5
+    assert flight.do("k", lambda: next(counter)) == 1
+    assert flight.stats()["cache_hits"] == 1
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("bad", fail)
+    assert flight.do("bad", lambda: "ok") == "ok"
+    assert flight.invalidate(lambda key: key == "k") == 1
@@ -0,0 +1,73 @@
+"""Tests for deduplicated snapshot storage and retention compaction."""
+from datetime import datetime, timedelta
+
+from app.models import FPLApiSnapshot, FPLPayloadBlob
+from app.services.snapshot_store import SnapshotStore
+
+
+def test_identical_payloads_share_one_compressed_blob(db_session):
+    store = SnapshotStore(db_session)
+    payload = {"elements": [{"id": i, "web_name": f"Player {i}"} for i in range(200)]}
+    store.save("2033-34", "bootstrap-static", {"elements": []})
+    store.save("2033-34", "bootstrap-static", payload)
+    snap = store.save("2033-34", "bootstrap-static", dict(reversed(list(payload.items()))))
+    db_session.commit()
+
+    hashes = {s.payload_hash for s in db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033-34")}
+    assert len(hashes) == 2
+    blob = db_session.get(FPLPayloadBlob, snap.payload_hash)
+    assert len(blob.data) < blob.size / 4
+    assert store.latest("bootstrap-static", season="2033-34") == payload
+
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033-34").delete()
+    db_session.query(FPLPayloadBlob).delete()
+    db_session.commit()
+
+
+def test_blob_stored_by_another_session_after_the_check_is_not_an_error(db_session, monkeypatch):
+    store = SnapshotStore(db_session)
+    payload = {"events": [{"id": 1, "is_current": True}]}
+    store.save("2033-34", "bootstrap-static", payload)
+    db_session.commit()
+
+    # The existence check misses a blob another session committed in the meantime
+    monkeypatch.setattr(db_session, "get", lambda model, key: None)
+    snap = store.save("2033-34", "bootstrap-static", payload)
+    db_session.commit()
+    monkeypatch.undo()
+
+    assert db_session.query(FPLPayloadBlob).filter(FPLPayloadBlob.sha256 == snap.payload_hash).count() == 1
+    assert store.latest("bootstrap-static", season="2033-34") == payload
+
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033-34").delete()
+    db_session.query(FPLPayloadBlob).delete()
+    db_session.commit()
+
+
+def test_compact_migrates_inline_payloads_and_applies_retention(db_session):
+    now = datetime(2033, 9, 1, 12, 0)
+    minutes = [5, 20, 50, 70, 60 * 24 * 3, 60 * 24 * 3 + 30, 60 * 24 * 500, 60 * 24 * 600]
+    for i, age in enumerate(minutes):
+        db_session.add(FPLApiSnapshot(
+            season="2033-34", endpoint="event-live", gw=1, payload={"poll": i, "elements": list(range(300))},
+            fetched_at=now - timedelta(minutes=age),
+        ))
+    db_session.add(FPLApiSnapshot(
+        season="2033-34", endpoint="pl.match", payload={"data": 1}, fetched_at=now - timedelta(days=900),
+    ))
+    db_session.commit()
+
+    store = SnapshotStore(db_session)
+    report = store.compact(now=now)
+
+    # Same hour (5, 20, 50 min) keeps one; same day at 3 days keeps one; > 1 year keeps the latest
+    assert report["snapshots_expired"] == 4
+    assert report["payloads_migrated"] == 5
+    assert report["bytes_reclaimed"] > 0
+    kept = db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033-34").all()
+    assert sorted(store.load(s).get("poll", -1) for s in kept) == [-1, 0, 3, 4, 6]
+    assert all(s.payload_hash for s in kept)
+
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2033-34").delete()
+    db_session.query(FPLPayloadBlob).delete()
+    db_session.commit()
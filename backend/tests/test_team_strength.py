@@ -0,0 +1,60 @@
+"""Tests for the team-strength Poisson model."""
+import pytest
+
+from app.models.fixture import Fixture, Team
+from app.services.ml.team_strength import TeamStrengthModel
+
+
+@pytest.fixture
+def league(db_session):
+    """Three teams; the first scores freely and keeps clean sheets."""
+    teams = [Team(name=f"Strength FC {i}", short_name=f"S{i}") for i in range(3)]
+    db_session.add_all(teams)
+    db_session.flush()
+    strong, mid, weak = teams
+    results = [
+        (1, strong, mid, 3, 0), (1, weak, strong, 0, 4),
+        (2, mid, weak, 2, 1), (2, strong, weak, 3, 0),
+        (3, mid, strong, 0, 2), (3, weak, mid, 1, 1),
+    ]
+    for gw, home, away, hg, ag in results:
+        db_session.add(Fixture(
+            season="2031-32", gw=gw, team_h_id=home.id, team_a_id=away.id,
+            finished=True, team_h_score=hg, team_a_score=ag,
+        ))
+    db_session.commit()
+    yield teams
+
+    db_session.query(Fixture).filter(Fixture.season == "2031-32").delete()
+    for team in teams:
+        db_session.delete(team)
+    db_session.commit()
+
+
+def test_ratings_and_fixture_lookup(db_session, league):
+    strong, mid, weak = league
+    matrix = TeamStrengthModel(db_session, use_priors=False).matrix("2031-32", 4)
+
+    assert matrix.n_matches == 6
+    strong_home = matrix.fixture(strong.id, weak.id, is_home=True)
+    weak_away = matrix.fixture(weak.id, strong.id, is_home=False)
+    assert strong_home["xg"] > weak_away["xg"]
+    assert strong_home["xga"] == pytest.approx(weak_away["xg"])
+    assert strong_home["clean_sheet_prob"] > matrix.mean_clean_sheet
+    # Home advantage: same pairing, better numbers at home
+    assert matrix.fixture(mid.id, weak.id, True)["xg"] > matrix.fixture(mid.id, weak.id, False)["xg"]
+
+
+def test_matrix_is_cached_until_results_change(db_session, league):
+    model = TeamStrengthModel(db_session, use_priors=False)
+    first = model.matrix("2031-32", 4)
+    assert model.matrix("2031-32", 4) is first
+
+    strong, mid, _ = league
+    db_session.add(Fixture(
+        season="2031-32", gw=3, team_h_id=strong.id, team_a_id=mid.id,
+        finished=True, team_h_score=1, team_a_score=1,
+    ))
+    db_session.commit()
+
+    assert model.matrix("2031-32", 4) is not first
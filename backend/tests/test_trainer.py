@@ -0,0 +1,111 @@
+"""Tests for MLTrainer's chunked training-data loader."""
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.models import Player, WeeklyScore
+from app.models.fixture import Team
+from app.services.ml.trainer import MLTrainer
+
+SEASONS = ["2031-32", "2032-33"]
+
+
+@pytest.fixture
+def training_rows(db_session):
+    """Three players over two seasons, with NULL stats, a NULL target and benched rows."""
+    team = Team(name="Loader FC", short_name="LDR")
+    db_session.add(team)
+    db_session.flush()
+    players = [
+        Player(name="Loader GK", position="GK", price=4.5, team_id=team.id),
+        Player(name="Loader MID", position="MID", price=8.0, team_id=team.id),
+        Player(name="Loader FWD", position="FWD", price=7.5, team_id=None),
+    ]
+    db_session.add_all(players)
+    db_session.flush()
+    for season in SEASONS:
+        for gw in range(1, 5):
+            for i, player in enumerate(players):
+                db_session.add(WeeklyScore(
+                    player_id=player.id, season=season, gw=gw,
+                    minutes=0 if (gw + i) % 4 == 0 else 90 - 10 * i,
+                    points=float(gw + i),
+                    expected_goals=0.1 * (i + 1),
+                    expected_assists=0.05 * gw,
+                    shots=gw,
+                    key_passes=i,
+                ))
+    db_session.flush()
+    # Column defaults replace None on insert, so write the NULLs afterwards
+    scores = db_session.query(WeeklyScore).filter(WeeklyScore.season.in_(SEASONS))
+    scores.filter(WeeklyScore.gw == 2, WeeklyScore.player_id == players[1].id).update({"points": None})
+    scores.filter(WeeklyScore.gw == 3).update({"expected_goals": None})
+    scores.filter(WeeklyScore.player_id == players[2].id).update({"shots": None})
+    db_session.commit()
+    yield players
+
+    db_session.query(WeeklyScore).filter(WeeklyScore.season.in_(SEASONS)).delete(synchronize_session=False)
+    for player in players:
+        db_session.delete(player)
+    db_session.delete(team)
+    db_session.commit()
+
+
+def _orm_loader(db, seasons):
+    """The per-object loader the chunked path replaced."""
+    query = (
+        db.query(WeeklyScore)
+        .join(Player, WeeklyScore.player_id == Player.id)
+        .filter(WeeklyScore.season.in_(seasons))
+        .filter(WeeklyScore.minutes > 0)
+    )
+    return pd.DataFrame([
+        {
+            "player_id": ws.player_id,
+            "season": ws.season,
+            "gw": ws.gw,
+            "minutes": ws.minutes,
+            "expected_goals": ws.expected_goals or 0.0,
+            "expected_assists": ws.expected_assists or 0.0,
+            "shots": ws.shots or 0,
+            "key_passes": ws.key_passes or 0,
+            "position": ws.player.position,
+            "team_id": ws.player.team_id or 0,
+            "points": ws.points,
+        }
+        for ws in query.all()
+    ])
+
+
+def test_chunked_loader_matches_orm_loader(db_session, training_rows, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path))
+    trainer = MLTrainer(db_session)
+    trainer.LOAD_CHUNK_SIZE = 5  # force several partitions
+
+    chunks = list(trainer._iter_training_chunks(SEASONS))
+    df = trainer._load_training_data(SEASONS)
+    expected = _orm_loader(db_session, SEASONS)
+
+    assert len(chunks) > 1
+    assert len(df) == len(expected) == sum(len(c) for c in chunks)
+    assert {col: str(dtype) for col, dtype in df.dtypes.items()} == MLTrainer.COLUMN_DTYPES
+    # The NULL target survives as NaN so train() can drop it
+    assert int(df["points"].isna().sum()) == int(expected["points"].isna().sum()) == 2
+    assert df.select_dtypes("number").notna().drop(columns="points").all().all()
+
+    key = ["season", "gw", "player_id"]
+    got = df.astype({"season": str, "position": str}).sort_values(key).reset_index(drop=True)
+    want = expected.sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, want, check_dtype=False, atol=1e-6)
+
+    one_gw = trainer._load_training_data(SEASONS[:1], gw=2, player_ids=[training_rows[0].id])
+    assert list(one_gw["player_id"]) == [training_rows[0].id]
+    assert list(one_gw["gw"]) == [2]
+
+
+def test_empty_load_keeps_compact_dtypes(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path))
+    df = MLTrainer(db_session)._load_training_data(["1999-00"])
+
+    assert df.empty
+    assert {col: str(dtype) for col, dtype in df.dtypes.items()} == MLTrainer.COLUMN_DTYPES
@@ -0,0 +1,35 @@
+"""Tests for successive-halving tuning and the model registry."""
+import numpy as np
+import pandas as pd
+
+from app.services.ml.registry import ModelRegistry
+from app.services.ml.tuning import SuccessiveHalvingTuner
+
+
+def test_successive_halving_promotes_survivors_to_more_folds():
+    rng = np.random.default_rng(0)
+    n = 300
+    X = pd.DataFrame({
+        "minutes": rng.integers(0, 91, n).astype(float),
+        "position": rng.choice(["DEF", "MID", "FWD"], n),
+    })
+    y = X["minutes"] / 30 + rng.normal(0, 0.2, n)
+    periods = [("2023-24", int(gw)) for gw in rng.integers(1, 13, n)]
+
+    tuner = SuccessiveHalvingTuner(["minutes"], ["position"], n_splits=5, eta=3, max_workers=1)
+    result = tuner.search(X, y, periods, "ridge", {"alpha": [0.01, 0.1, 1.0, 10.0, 100.0, 1000.0, 1e4, 1e5, 1e6]})
+
+    assert [(r["candidates"], r["folds"]) for r in result["rounds"]] == [(9, 1), (3, 3), (1, 5)]
+    assert result["leaderboard"][0]["folds_evaluated"] == 5
+    assert result["best_params"]["alpha"] <= 10.0
+
+
+def test_registry_versions_training_runs(tmp_path):
+    registry = ModelRegistry(tmp_path)
+
+    registry.record_training("ridge", "a.joblib", {"rmse": 1.0}, {"alpha": 1.0})
+    entry = registry.record_training("ridge", "a.joblib", {"rmse": 0.9}, {"alpha": 0.3}, tuning={"best_params": {"alpha": 0.3}})
+
+    assert entry["version"] == 2
+    assert ModelRegistry(tmp_path).get("ridge")["tuning"]["best_params"] == {"alpha": 0.3}
+    assert registry.get("xgboost") is None
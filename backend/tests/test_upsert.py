@@ -0,0 +1,89 @@
+"""Tests for set-based upserts."""
+from app.db.upsert import bulk_upsert
+from app.models.fixture import Team
+
+
+def test_bulk_upsert_counts_and_keep_existing(db_session):
+    rows = [
+        {"fpl_id": 9001, "fpl_code": None, "name": "Upsert United", "short_name": "UPU"},
+        {"fpl_id": 9002, "fpl_code": 902, "name": "Upsert City", "short_name": "UPC"},
+    ]
+    assert bulk_upsert(db_session, Team, rows, ["fpl_id"], keep_existing=["fpl_code"]) == {
+        "inserted": 2, "updated": 0, "unchanged": 0,
+    }
+    db_session.commit()
+
+    rows = [
+        {"fpl_id": 9001, "fpl_code": 901, "name": "Upsert United", "short_name": "UPU"},  # fills NULL code
+        {"fpl_id": 9002, "fpl_code": 999, "name": "Upsert City", "short_name": "UPC"},  # code kept
+        {"fpl_id": 9003, "fpl_code": None, "name": "Upsert Town", "short_name": "UPT"},
+    ]
+    assert bulk_upsert(db_session, Team, rows, ["fpl_id"], keep_existing=["fpl_code"]) == {
+        "inserted": 1, "updated": 1, "unchanged": 1,
+    }
+    db_session.commit()
+
+    teams = {t.fpl_id: t for t in db_session.query(Team).filter(Team.fpl_id.in_([9001, 9002, 9003]))}
+    assert teams[9001].fpl_code == 901 and teams[9002].fpl_code == 902
+    assert teams[9003].created_at is not None
+
+    for team in teams.values():
+        db_session.delete(team)
+    db_session.commit()
+
+
+def test_event_live_writes_only_changed_rows(db_session, monkeypatch):
+    import asyncio
+
+    from app.models import FPLApiSnapshot, Player, WeeklyScore
+    from app.services.fpl_extra_ingestion import FPLExtraIngestionService
+
+    team = Team(name="Live FC", short_name="LFC")
+    db_session.add(team)
+    db_session.flush()
+    players = [
+        Player(fpl_id=9100 + i, name=f"Live {i}", position="MID", price=5.0, team_id=team.id)
+        for i in range(2)
+    ]
+    db_session.add_all(players)
+    db_session.commit()
+
+    payload = {"elements": [
+        {"id": 9100, "stats": {"minutes": 45, "total_points": 2, "expected_goals": "0.31"}},
+        {"id": 9101, "stats": {"minutes": 45, "total_points": 1}},
+        {"id": 9999, "stats": {"minutes": 90}},
+    ]}
+    service = FPLExtraIngestionService(db_session)
+
+    async def fetch_event_live(gw):
+        return payload
+
+    refreshed, online = [], []
+    monkeypatch.setattr(service.fpl_api, "fetch_event_live", fetch_event_live)
+    monkeypatch.setattr(service, "_refresh_feature_store", lambda s, gw, ids: refreshed.append(sorted(ids)))
+    monkeypatch.setattr(service, "_update_online_models", lambda s, gw: online.append(gw))
+
+    first = asyncio.run(service.ingest_event_live("2031-32", 3))
+    assert first["upserts"] == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert first["missing_players"] == 1
+
+    payload["elements"][0]["stats"]["goals_scored"] = 1
+    second = asyncio.run(service.ingest_event_live("2031-32", 3))
+    assert second["upserts"] == {"inserted": 0, "updated": 1, "unchanged": 1}
+    assert refreshed == [sorted(p.id for p in players), [players[0].id]]
+
+    # A poll that changes nothing skips the feature store but still tries the online update
+    third = asyncio.run(service.ingest_event_live("2031-32", 3))
+    assert third["upserts"] == {"inserted": 0, "updated": 0, "unchanged": 2}
+    assert len(refreshed) == 2 and online == [3, 3, 3]
+
+    ws = db_session.query(WeeklyScore).filter_by(player_id=players[0].id, season="2031-32", gw=3).one()
+    assert (ws.goals_scored, ws.minutes, ws.expected_goals) == (1, 45, 0.31)
+
+    asyncio.run(service.close())
+    db_session.query(WeeklyScore).filter(WeeklyScore.season == "2031-32").delete()
+    db_session.query(FPLApiSnapshot).filter(FPLApiSnapshot.season == "2031-32").delete()
+    for player in players:
+        db_session.delete(player)
+    db_session.delete(team)
+    db_session.commit()